@@ -26,6 +26,14 @@ OCR_KEY = os.environ.get('OCR_KEY') or os.getenv("OCR_KEY") or "OCR_KEY"
 MULTIPLE_BOTS = os.environ.get('MULTIPLE_BOTS') or os.getenv("MULTIPLE_BOTS") or "false"
 MULTIPLE_BOTS = MULTIPLE_BOTS.lower() in ["true", "1", "yes", "y"]
 NUM_OF_BOTS = int(os.environ.get('NUM_OF_BOTS') or os.getenv("NUM_OF_BOTS") or "1")
+# MongoDB connection pool per bot process. In multi-bot mode every process opens its own pool,
+# so the default splits a 50-connection allowance between them.
+DB_MAX_POOL_SIZE = int(os.environ.get('DB_MAX_POOL_SIZE') or os.getenv("DB_MAX_POOL_SIZE") or (max(5, 50 // NUM_OF_BOTS) if MULTIPLE_BOTS else 20))
+DB_MIN_POOL_SIZE = int(os.environ.get('DB_MIN_POOL_SIZE') or os.getenv("DB_MIN_POOL_SIZE") or (1 if MULTIPLE_BOTS else 5))
+# Where per-user request locks live: "local" (this process only) or "mongo" (shared by all bot processes)
+REQUEST_STATE_BACKEND = (os.environ.get('REQUEST_STATE_BACKEND') or os.getenv("REQUEST_STATE_BACKEND") or ("mongo" if MULTIPLE_BOTS else "local")).lower()
+# Show AI replies while they are generated, editing the message as text streams in
+STREAM_RESPONSES = (os.environ.get('STREAM_RESPONSES') or os.getenv("STREAM_RESPONSES") or "true").lower() in ["true", "1", "yes", "y"]
 POLLINATIONS_KEY = os.environ.get('POLLINATIONS_KEY') or os.getenv("POLLINATIONS_KEY") or "POLLINATIONS_KEY"
 
 # Groq API Key for AI text generation  
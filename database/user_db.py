@@ -1,13 +1,10 @@
 import os
-from pymongo import MongoClient
-from config import DATABASE_URL
 import asyncio
-from modules.core.database import get_user_collection, get_user_lang_collection
+from modules.core.database import db_service, get_user_collection, get_user_lang_collection
 
-client = MongoClient(DATABASE_URL)
-db = client['aibotdb']
-users_collection = db['users']
-user_lang_collection = db['user_lang']
+# Collections from the shared connection pool
+users_collection = get_user_collection()
+user_lang_collection = get_user_lang_collection()
 
 
 
@@ -57,7 +54,7 @@ def get_user_language(user_id):
     return 'en'  # Default to English if not set
 
 
-block_users_collection = db['blocked_users']
+block_users_collection = db_service.get_collection('blocked_users')
 
 def check_and_add_blocked_user(user_id):
     users_collection = get_user_collection()
@@ -68,35 +65,16 @@ def check_and_add_blocked_user(user_id):
         block_users_collection.insert_one({"user_id": user_id})
         print(f"User ID {user_id} was added to the blocked users collection.")
 
-#get all user ids and send one message to all users one by one
+#send one message to all users through the broadcast engine
 
 async def get_user_ids_message(bot, update, text):
-    users_collection = get_user_collection()
-    user_ids = users_collection.distinct("user_id")
-    total=0
-    await update.reply_text(f"Sending message to {len(user_ids)} users...")
-    for user_id in user_ids:
-        try:
-            await bot.send_message(user_id, text)
-            await asyncio.sleep(0.05)
-            total+=1
-        except Exception as e:
-            print(f"Error sending message to user ID {user_id}: {e}")
-    await update.reply_text(f"Message sent to {total} users.")
-
-#get all usernames from the users collection and send one message to all users one by one
+    from modules.core.broadcast import broadcast_engine, text_payload
+    progress = await update.reply_text("📣 Preparing broadcast...")
+    await broadcast_engine.start(bot, text_payload(text), progress)
+
+#send one message to all users with a username (addressed by user id)
 
 async def get_usernames_message(bot, update, text):
-    users_collection = get_user_collection()
-    users = users_collection.find({"username": {"$exists": True}})
-    total=0
-    await update.reply_text(f"Sending message to users with usernames...")
-    for user in users:
-        try:
-            # print(user["username"])
-            await bot.send_message(user["username"], text)
-            await asyncio.sleep(0.05)
-            total+=1
-        except Exception as e:
-            print(f"Error sending message to user ID {user['user_id']}: {e}")
-    await update.reply_text(f"Message sent to {total} users.")
\ No newline at end of file
+    from modules.core.broadcast import broadcast_engine, text_payload
+    progress = await update.reply_text("📣 Preparing broadcast to users with usernames...")
+    await broadcast_engine.start(bot, text_payload(text), progress, audience="usernames")
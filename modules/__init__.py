@@ -5,7 +5,6 @@ Contains various functionality modules like AI response, image processing, voice
 
 import os
 import sys
-import asyncio
 
 # Add parent directory to python path to allow absolute imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -39,42 +38,12 @@ COMMON_UI_STRINGS = [
 # Supported languages
 LANGUAGES = ['hi', 'zh', 'ar', 'fr', 'ru']
 
-# Prefetch translations for common UI elements asynchronously
-async def prefetch_ui_translations():
-    try:
-        from modules.lang import batch_translate
-        
-        # Create a batch translation task for each language
-        tasks = []
-        for lang in LANGUAGES:
-            task = asyncio.create_task(batch_translate(COMMON_UI_STRINGS, lang=lang))
-            tasks.append(task)
-            
-        # Wait for all translations to complete
-        results = await asyncio.gather(*tasks)
-        print(f"✓ Prefetched translations for {len(COMMON_UI_STRINGS)} UI strings in {len(LANGUAGES)} languages")
-    except Exception as e:
-        print(f"⚠ Warning: Failed to prefetch UI translations: {e}")
-
-# Run the prefetch in the background if running in async context
-def run_prefetch():
-    try:
-        # Get or create event loop
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-        # Run the prefetch
-        if loop.is_running():
-            # Schedule as task if loop is already running
-            asyncio.create_task(prefetch_ui_translations())
-        else:
-            # Run until complete if loop is not running
-            loop.run_until_complete(prefetch_ui_translations())
-    except Exception as e:
-        print(f"⚠ Warning: Error in translation prefetch: {e}")
+# Precompiled translations of static UI strings: loaded now, completed in the background
+try:
+    from modules.lang_resources.ui_bundle import load_ui_bundles, warm_ui_bundles
+    load_ui_bundles()
+except Exception as e:
+    print(f"⚠ Warning: Failed to load UI translation bundles: {e}")
 
 # Initialize other modules as needed
 __all__ = [
@@ -90,13 +59,13 @@ __all__ = [
     'lang_resources'
 ]
 
-# Schedule the prefetch to run
+# Translate UI strings that are not bundled yet (e.g. added since the last deploy)
 try:
     import threading
-    prefetch_thread = threading.Thread(target=run_prefetch, daemon=True)
+    prefetch_thread = threading.Thread(target=warm_ui_bundles, args=(COMMON_UI_STRINGS,), daemon=True)
     prefetch_thread.start()
 except Exception as e:
-    print(f"⚠ Warning: Failed to start translation prefetch thread: {e}")
+    print(f"⚠ Warning: Failed to start UI translation warm-up thread: {e}")
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
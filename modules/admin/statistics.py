@@ -15,8 +15,18 @@ from pyrogram import Client
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from modules.core.database import get_user_collection, get_feature_settings_collection
 from modules.core.database import get_user_images_collection, get_history_collection, db_service
+from modules.core.client_pool import g4f_client_pool
+from modules.core.write_behind import write_behind
+from modules.core.scheduler import job_scheduler
+from modules.core.broadcast import broadcast_engine
+from modules.core.telegram_governor import outbound_governor
+from modules.core.waiting_indicator import waiting_indicators
+from modules.models.streaming_reply import get_streaming_stats
 from modules.ui.theme import Theme, Colors
-from modules.lang import async_translate_to_lang
+from modules.lang import async_translate_to_lang, get_translation_network_stats
+from modules.lang_resources.ui_bundle import get_bundle_stats
+from modules.core.panel_cache import panel_cache
+from modules.core.callback_router import callback_router
 from config import START_TIME, ADMINS
 
 # Configure logger
@@ -130,6 +140,17 @@ async def get_bot_statistics() -> Dict[str, Any]:
         stats['uptime'] = get_uptime_formatted()
         stats['cpu_usage'] = psutil.cpu_percent()
         stats['memory_usage'] = psutil.virtual_memory().percent
+        stats['client_pool'] = g4f_client_pool.get_stats()
+        stats['write_behind'] = write_behind.get_stats()
+        stats['scheduler'] = job_scheduler.get_stats()
+        stats['broadcast'] = broadcast_engine.get_stats()
+        stats['streaming'] = get_streaming_stats()
+        stats['outbound'] = outbound_governor.get_stats()
+        stats['waiting'] = waiting_indicators.get_stats()
+        stats['translation'] = get_translation_network_stats()
+        stats['ui_bundle'] = get_bundle_stats()
+        stats['panels'] = panel_cache.get_stats()
+        stats['callbacks'] = callback_router.get_stats()
         
         # 6. Feature usage statistics
         voice_query = {
@@ -273,7 +294,41 @@ async def generate_stats_text(user_id: int) -> str:
     message += f"**{system_header}**\n"
     message += f"• Uptime: {stats['uptime']}\n"
     message += f"• CPU: {stats['cpu_usage']}%\n"
-    message += f"• Memory: {stats['memory_usage']}%\n\n"
+    message += f"• Memory: {stats['memory_usage']}%\n"
+    pool_stats = stats.get('client_pool')
+    if pool_stats and pool_stats['leases']:
+        message += f"• Provider Client Objects Reused: {pool_stats['object_reuse_rate'] * 100:.0f}% of {pool_stats['leases']:,} calls\n"
+    buffer_stats = stats.get('write_behind')
+    if buffer_stats and buffer_stats['writes']:
+        message += f"• Stats Write Coalescing: {buffer_stats['coalescing_ratio']}x ({buffer_stats['events']:,} events, {buffer_stats['round_trips']:,} round trips)\n"
+    for feature, queue_stats in (stats.get('scheduler') or {}).items():
+        message += f"• {feature.title()} Jobs: {queue_stats['running']}/{queue_stats['limit']} running, {queue_stats['waiting']} waiting, avg wait {queue_stats['avg_wait']}s\n"
+    streaming_stats = stats.get('streaming')
+    if streaming_stats and streaming_stats['replies']:
+        message += f"• Streamed Replies: {streaming_stats['replies']:,}, avg first token {streaming_stats['avg_first_token']}s, {streaming_stats['edits']:,} edits\n"
+    outbound_stats = stats.get('outbound')
+    if outbound_stats and outbound_stats['calls']:
+        message += f"• Outbound API: {outbound_stats['queue_depth']} queued (max {outbound_stats['max_queue_depth']}), {outbound_stats['coalesced']:,} edits coalesced, {outbound_stats['dropped']:,} dropped, {outbound_stats['flood_waits']} flood waits\n"
+    waiting_stats = stats.get('waiting')
+    if waiting_stats and waiting_stats['waits']:
+        message += f"• Waiting Messages: {waiting_stats['active']} active, avg wait {waiting_stats['avg_wait']}s, {waiting_stats['chat_actions']:,} chat actions ({waiting_stats['chat_actions_shared']:,} shared), {waiting_stats['edits_skipped']:,} edits skipped\n"
+    translation_stats = stats.get('translation')
+    if translation_stats and translation_stats['misses']:
+        message += f"• Translation Misses: {translation_stats['misses']:,}, {translation_stats['requests']:,} translator requests ({translation_stats['strings_per_request']} strings each), {translation_stats['coalesced']:,} coalesced, {translation_stats['negative_hits']:,} negative hits\n"
+    bundle_stats = stats.get('ui_bundle')
+    if bundle_stats and bundle_stats['strings']:
+        message += f"• UI Bundles: {bundle_stats['strings']:,} strings in {bundle_stats['languages']} languages, {bundle_stats['hits']:,} hits\n"
+    panel_stats = stats.get('panels')
+    if panel_stats and panel_stats['renders']:
+        message += f"• Panel Cache: {panel_stats['entries']:,} panels, {panel_stats['hit_rate']}% hit rate, {panel_stats['renders']:,} renders\n"
+    callback_stats = stats.get('callbacks')
+    if callback_stats and callback_stats['dispatched']:
+        slowest = callback_stats['slowest']
+        message += f"• Button Presses: {callback_stats['dispatched']:,} routed, {callback_stats['errors']:,} errors, {callback_stats['unrouted']:,} unknown, slowest {slowest} (avg {callback_stats['by_route'][slowest]['avg_ms']} ms)\n"
+    broadcast_stats = stats.get('broadcast')
+    if broadcast_stats and (broadcast_stats['broadcasts'] or broadcast_stats['resumed']):
+        message += f"• Broadcasts: {broadcast_stats['active']} active, {broadcast_stats['sent']:,} sent, {broadcast_stats['flood_waits']} flood waits ({broadcast_stats['flood_wait_seconds']}s)\n"
+    message += "\n"
     
     # 6. Feature Status
     message += f"**{feature_header}**\n"
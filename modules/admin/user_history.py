@@ -5,7 +5,6 @@ from datetime import datetime, timedelta
 from pyrogram import Client
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from pyrogram.enums import ChatType
-from pymongo import MongoClient
 from config import DATABASE_URL, ADMINS, OWNER_ID
 from modules.chatlogs import channel_log, error_log
 from modules.core.database import get_history_collection, get_user_collection
@@ -0,0 +1,212 @@
+"""
+Callback query namespaces of the bot's modules
+
+Registers every button's callback data with the global callback router.
+Handlers are referenced as "module:function" strings and imported on the
+first press, as the old if/elif chain in run.py imported most of them.
+Callbacks that need their data parsed before the module's handler is
+called get a small adapter here.
+
+Routes that only one bot client can serve (pending image shares, snippets
+and announcements are kept on the client) are added per client in
+run.create_bot_instance.
+"""
+
+import logging
+
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from modules.core.callback_router import callback_router
+
+logger = logging.getLogger(__name__)
+
+# Filters the admin user list can be opened with
+USER_FILTERS = ["all", "recent", "active", "new", "inactive", "groups"]
+
+
+# --- Adapters ---
+
+async def admin_users_filter_callback(client, callback_query):
+    """admin_users_filter_TYPE_PAGE"""
+    from modules.admin import handle_user_management
+    # Extract filter type and page from callback data
+    try:
+        parts = callback_query.data.split("_")
+        if len(parts) >= 5:  # admin_users_filter_TYPE_PAGE
+            filter_type = parts[3]
+            page = int(parts[4])
+            # Default to recent if invalid filter
+            await handle_user_management(client, callback_query, page, filter_type if filter_type in USER_FILTERS else "recent")
+        else:
+            # Default to first page, recent filter
+            await handle_user_management(client, callback_query)
+    except Exception as e:
+        logger.error(f"Error in user filter handling: {str(e)}")
+        # Default to first page, recent filter
+        await handle_user_management(client, callback_query)
+
+
+async def dismiss_permissions_help_callback(client, callback_query):
+    # Just acknowledge and close the message
+    await callback_query.answer("Permissions help dismissed")
+    # Try to delete the message if possible
+    try:
+        await client.delete_messages(
+            chat_id=callback_query.message.chat.id,
+            message_ids=callback_query.message.id
+        )
+    except Exception:
+        # If can't delete, just edit to a simple confirmation
+        await callback_query.edit_message_text("✅ Thanks for reviewing the permissions info!")
+
+
+async def group_start_callback(client, callback_query):
+    from modules.user.group_start import group_start
+    # Create a simulated message object for group_start
+    simulated_message = callback_query.message
+    simulated_message.from_user = callback_query.from_user
+    await group_start(client, simulated_message)
+    await callback_query.answer("Starting bot in this group")
+
+
+async def header_callback(client, callback_query):
+    # Just acknowledge the click for the headers
+    await callback_query.answer()
+
+
+async def history_user_callback(client, callback_query):
+    """history_user_USERID"""
+    from modules.admin.user_history import handle_history_user_selection
+    await handle_history_user_selection(client, callback_query, int(callback_query.data.split("_")[2]))
+
+
+async def history_page_callback(client, callback_query):
+    """history_page_USERID_PAGE"""
+    from modules.admin.user_history import handle_history_pagination
+    parts = callback_query.data.split("_")
+    await handle_history_pagination(client, callback_query, int(parts[2]), int(parts[3]))
+
+
+async def history_download_callback(client, callback_query):
+    """history_download_USERID"""
+    from modules.admin.user_history import get_history_download
+    await get_history_download(client, callback_query, int(callback_query.data.split("_")[2]))
+
+
+async def command_category_callback(client, callback_query):
+    """cmd_CATEGORY[_start|_help], depending on where the commands menu was opened"""
+    from modules.user import commands
+    if callback_query.data.endswith("_start"):
+        await commands.handle_command_callbacks_start(client, callback_query)
+    elif callback_query.data.endswith("_help"):
+        await commands.handle_command_callbacks_help(client, callback_query)
+    else:
+        await commands.handle_command_callbacks(client, callback_query)
+
+
+async def back_to_image_callback(client, callback_query):
+    """back_to_image_USERID: image text back button"""
+    user_id = int(callback_query.data.split("_")[3])
+    # Create action buttons again
+    action_markup = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("📋 Show Extracted Text", callback_data=f"show_text_{user_id}")
+        ],
+        [
+            InlineKeyboardButton("❓ Ask Follow-up", callback_data=f"followup_{user_id}")
+        ]
+    ])
+    # Edit message back to original prompt
+    await callback_query.message.edit_text(
+        "**Need anything else with this image?**",
+        reply_markup=action_markup
+    )
+
+
+async def premium_info_callback(client, callback_query):
+    """Back to Benefits"""
+    from modules.user.start import premium_info_page
+    await premium_info_page(client, callback_query, is_callback=True)
+
+
+# --- Admin ---
+callback_router.exact("confirm_restart", "cancel_restart")("modules.admin.restart:handle_restart_callback")
+callback_router.exact("confirm_update", "cancel_update")("modules.admin.update:handle_update_callback")
+callback_router.exact("admin_panel")("modules.user.user_support:admin_panel_callback")
+callback_router.exact("admin_view_stats")("modules.admin:handle_stats_panel")
+callback_router.exact("admin_refresh_stats")("modules.admin:handle_refresh_stats")
+callback_router.exact("admin_export_stats")("modules.admin:handle_export_stats")
+callback_router.exact("admin_users")("modules.admin:handle_user_management")
+callback_router.prefix("admin_users_filter_")(admin_users_filter_callback)
+callback_router.exact("admin_header", "features_header", "admin_tools_header")(header_callback)
+callback_router.exact("admin_view_history", "history_search", "history_back")("modules.admin.user_history:show_history_search_panel")
+callback_router.prefix("history_user_")(history_user_callback)
+callback_router.prefix("history_page_")(history_page_callback)
+callback_router.prefix("history_download_")(history_download_callback)
+callback_router.exact("admin_search_user")("modules.admin.user_history:show_user_search_form")
+
+# --- Maintenance and feature toggles ---
+callback_router.prefix("toggle_", when=lambda data: data.count("_") >= 2)("modules.maintenance:handle_feature_toggle")
+callback_router.prefix("feature_info_")("modules.maintenance:handle_feature_info")
+callback_router.exact("support_donate")("modules.maintenance:handle_donation")
+callback_router.exact("settings_others")("modules.maintenance:settings_others_callback")
+callback_router.exact("settings_others_refresh")("modules.maintenance:settings_others_refresh_callback")
+
+# --- Groups ---
+callback_router.exact("group_permissions_help")("modules.group.group_permissions:handle_permissions_help")
+callback_router.exact("dismiss_permissions_help")(dismiss_permissions_help_callback)
+callback_router.exact("group_start")(group_start_callback)
+callback_router.exact("group_commands")("modules.user.group_start:handle_group_command_inline")
+callback_router.prefix("group_cmd_")("modules.user.group_start:handle_group_callbacks")
+callback_router.exact("about_bot", "group_support", "back_to_group_start")("modules.user.group_start:handle_group_callbacks")
+callback_router.prefix("uinfo_settings_")("modules.group.group_info:uinfo_settings_callback")
+callback_router.prefix("uinfo_history_")("modules.group.group_info:uinfo_history_callback")
+
+# --- Start, help and commands menus ---
+callback_router.exact("back")("modules.user.start:start_inline")
+callback_router.exact("help_start")("modules.user.help:help_inline_start")
+callback_router.exact("help_help", "help")("modules.user.help:help_inline_help")
+callback_router.prefix("help_")("modules.user.help:handle_help_category")
+callback_router.exact("commands_start")("modules.user.commands:command_inline_start")
+callback_router.exact("commands_help", "commands")("modules.user.commands:command_inline_help")
+callback_router.prefix("cmd_")(command_category_callback)
+
+# --- Settings ---
+callback_router.exact("settings", "settings_back")("modules.user.settings:settings_inline")
+callback_router.exact("settings_ai_models")("modules.user.ai_model:ai_model_settings_panel")
+callback_router.prefix("set_text_model_")("modules.user.ai_model:handle_set_text_model")
+callback_router.prefix("set_image_model_")("modules.user.ai_model:handle_set_image_model")
+callback_router.prefix("ai_model_heading_")("modules.user.ai_model:handle_ai_model_heading_click")
+callback_router.exact("settings_v")("modules.user.settings:settings_language_callback")
+callback_router.exact("settings_voice", "settings_text")("modules.user.settings:change_voice_setting")
+callback_router.exact("settings_voice_inlines")("modules.user.settings:settings_voice_inlines")
+callback_router.exact("settings_image_count")("modules.user.settings:settings_image_count_callback")
+callback_router.prefix("img_count_")("modules.user.settings:change_image_count_callback")
+callback_router.exact("settings_lans")("modules.user.lang_settings:settings_langs_callback")
+callback_router.prefix("language_")("modules.user.lang_settings:change_language_setting")
+callback_router.exact("settings_assistant")("modules.user.assistant:settings_assistant_callback")
+callback_router.prefix("mode_")("modules.user.assistant:change_mode_setting")
+callback_router.prefix("voice_toggle_")("modules.speech.voice_to_text:handle_voice_toggle")
+callback_router.prefix("user_settings_")("modules.user.user_settings_panel:handle_user_settings_callback")
+
+# --- Support ---
+callback_router.exact("settings_support", "support")("modules.user.user_support:settings_support_callback")
+callback_router.exact("support_developers")("modules.user.dev_support:support_developers_callback")
+callback_router.exact("support_admins")("modules.user.user_support:support_admins_callback")
+
+# --- Premium ---
+callback_router.exact("premium_info")(premium_info_callback)
+callback_router.exact("premium_plans")("modules.user.start:premium_plans_callback")
+callback_router.exact("premium_paid_notify")("modules.user.start:premium_paid_notify_callback")
+
+# --- Images, ratings and feedback ---
+callback_router.prefix("rate_")("modules.feedback_nd_rating:handle_rate_callback")
+callback_router.prefix("feedback_", "img_feedback_positive_", "img_feedback_negative_", "img_regenerate_", "img_style_")(
+    "modules.image.image_generation:handle_image_feedback")
+callback_router.prefix("back_to_image_")(back_to_image_callback)
+
+# --- Video (handled before the ban check, as their own handler used to be) ---
+callback_router.prefix("check_tokens_", "generate_similar_", "progress_check_", "progress_info_", name="video", guarded=False)(
+    "modules.video.video_handlers:video_callback_handler")
+callback_router.exact("show_plans", "video_help", "back_to_menu", name="video", guarded=False)(
+    "modules.video.video_handlers:video_callback_handler")
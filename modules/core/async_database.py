@@ -0,0 +1,213 @@
+"""
+Async access to the shared MongoDB connection pool
+
+pymongo is synchronous, so calling it from an `async def` handler blocks the
+event loop for a full database round-trip. This module wraps the collections
+of `db_service` in an executor-backed facade: every operation runs on a
+dedicated thread pool sized to the connection pool and is awaited by the
+handler, so the loop keeps serving other updates meanwhile.
+
+The collection helpers mirror those in `modules.core.database`:
+
+    from modules.core.async_database import get_user_collection
+
+    user = await get_user_collection().find_one({"user_id": user_id})
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from pymongo.collection import Collection
+
+from modules.core.database import db_service, DatabaseService
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCollection:
+    """
+    Awaitable wrapper around a pymongo Collection.
+
+    Method names and arguments follow pymongo. Cursor-returning calls
+    (find, aggregate, distinct) return materialised lists.
+    """
+
+    __slots__ = ("_collection", "_service")
+
+    def __init__(self, collection: Collection, service: "AsyncDatabaseService"):
+        self._collection = collection
+        self._service = service
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    @property
+    def sync(self) -> Collection:
+        """The underlying synchronous collection"""
+        return self._collection
+
+    async def find_one(self, *args: Any, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        return await self._service.run(self._collection.find_one, *args, **kwargs)
+
+    async def find(
+        self,
+        filter: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        def _find() -> List[Dict[str, Any]]:
+            cursor = self._collection.find(filter or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if skip:
+                cursor = cursor.skip(skip)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await self._service.run(_find)
+
+    async def count_documents(self, *args: Any, **kwargs: Any) -> int:
+        return await self._service.run(self._collection.count_documents, *args, **kwargs)
+
+    async def distinct(self, *args: Any, **kwargs: Any) -> List[Any]:
+        return await self._service.run(self._collection.distinct, *args, **kwargs)
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._service.run(lambda: list(self._collection.aggregate(pipeline, **kwargs)))
+
+    async def insert_one(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.insert_one, *args, **kwargs)
+
+    async def insert_many(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.insert_many, *args, **kwargs)
+
+    async def update_one(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.update_one, *args, **kwargs)
+
+    async def update_many(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.update_many, *args, **kwargs)
+
+    async def replace_one(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.replace_one, *args, **kwargs)
+
+    async def find_one_and_update(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.find_one_and_update, *args, **kwargs)
+
+    async def delete_one(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.delete_one, *args, **kwargs)
+
+    async def delete_many(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.delete_many, *args, **kwargs)
+
+    async def bulk_write(self, *args: Any, **kwargs: Any):
+        return await self._service.run(self._collection.bulk_write, *args, **kwargs)
+
+
+class AsyncDatabaseService:
+    """
+    Executor-backed async facade over a DatabaseService.
+
+    The executor has one worker per pooled connection: more threads would
+    only queue inside pymongo waiting for a connection, fewer would leave
+    connections idle while handlers wait.
+    """
+
+    def __init__(self, service: DatabaseService):
+        self._service = service
+        self._collections: Dict[str, AsyncCollection] = {}
+        self.max_workers = service.pool_options.get("maxPoolSize", 20)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mongo")
+        self._stats = {"calls": 0, "errors": 0, "in_flight": 0, "total_time": 0.0, "max_time": 0.0}
+
+    def get_collection(self, collection_name: str) -> AsyncCollection:
+        """Async wrapper for a collection, cached like DatabaseService.get_collection"""
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            collection = AsyncCollection(self._service.get_collection(collection_name), self)
+            self._collections[collection_name] = collection
+        return collection
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> List[Dict[str, Any]]:
+        """Database-level aggregation (e.g. pipelines starting with $documents)"""
+        database = self._service.get_database()
+        return await self.run(lambda: list(database.aggregate(pipeline, **kwargs)))
+
+    async def run(self, func, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking database call on the database executor"""
+        loop = asyncio.get_running_loop()
+        self._stats["calls"] += 1
+        self._stats["in_flight"] += 1
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stats["in_flight"] -= 1
+            self._stats["total_time"] += elapsed
+            self._stats["max_time"] = max(self._stats["max_time"], elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call counters and latency for monitoring"""
+        stats = dict(self._stats)
+        stats["workers"] = self.max_workers
+        stats["avg_time"] = round(stats["total_time"] / stats["calls"], 4) if stats["calls"] else 0.0
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop the executor threads"""
+        self._executor.shutdown(wait=False)
+
+
+# Create a global instance for import
+async_db_service = AsyncDatabaseService(db_service)
+
+# Helper functions for common collections
+def get_history_collection() -> AsyncCollection:
+    """Get the history collection"""
+    return async_db_service.get_collection('history')
+
+def get_user_collection() -> AsyncCollection:
+    """Get the user collection"""
+    return async_db_service.get_collection('users')
+
+def get_user_lang_collection() -> AsyncCollection:
+    """Get the user language collection"""
+    return async_db_service.get_collection('user_lang')
+
+def get_image_feedback_collection() -> AsyncCollection:
+    """Get the image feedback collection"""
+    return async_db_service.get_collection('image_feedback')
+
+def get_prompt_storage_collection() -> AsyncCollection:
+    """Get the prompt storage collection"""
+    return async_db_service.get_collection('prompt_storage')
+
+def get_creative_prompts_collection() -> AsyncCollection:
+    """Get the creative prompts collection for storing unique image prompts"""
+    return async_db_service.get_collection('creative_prompts')
+
+def get_user_images_collection() -> AsyncCollection:
+    """Get the user images collection"""
+    return async_db_service.get_collection('user_images')
+
+def get_feature_settings_collection() -> AsyncCollection:
+    """Get the feature settings collection"""
+    return async_db_service.get_collection('feature_settings')
+
+def get_session_collection() -> AsyncCollection:
+    """Get the session collection for storing temporary user session data"""
+    return async_db_service.get_collection('user_sessions')
+
+def get_user_interactions_collection() -> AsyncCollection:
+    """Get the user interactions collection for storing last interaction times and types."""
+    return async_db_service.get_collection('user_interactions')
@@ -0,0 +1,439 @@
+"""
+Broadcast engine for admin announcements
+
+Announcements, snippets and shared images used to be sent one user at a
+time with a fixed sleep between messages, over a list of every user id
+loaded up front. FloodWait errors were swallowed like any other failure,
+so a large broadcast took hours and silently skipped recipients.
+
+The engine instead:
+
+- streams recipients from the users collection in BATCH_SIZE pages ordered
+  by _id, so memory stays flat however many users there are;
+- sends with BROADCAST_CONCURRENCY workers that all draw from one token
+  bucket sized to Telegram's bulk limit (about 30 messages per second per
+  bot), so throughput is bounded by the bucket rather than by latency;
+- honors FloodWait by pausing the whole bucket for the requested time and
+  retrying the recipient;
+- checkpoints the last delivered page and the counters in the broadcasts
+  collection, so a broadcast interrupted by a restart is resumed by the
+  same bot instance (at most one page is sent twice);
+- edits a progress message for the admin with live throughput and ETA.
+
+Usage:
+    progress = await message.reply_text("📣 Preparing broadcast...")
+    await broadcast_engine.start(bot, text_payload(text), progress)
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait, InputUserDeactivated, PeerIdInvalid, UserIsBlocked
+
+from modules.core.async_database import async_db_service, get_user_collection
+from modules.core.telegram_governor import PRIORITY_BULK, outbound_priority
+
+logger = logging.getLogger(__name__)
+
+# Messages per second for one bot; Telegram allows about 30 for bulk sends
+BROADCAST_RATE = 25.0
+
+# Tokens the bucket can hold, i.e. the largest burst after an idle period
+BROADCAST_BURST = 25
+
+# Sends in flight at the same time
+BROADCAST_CONCURRENCY = 8
+
+# Recipients read per page; also the checkpoint granularity
+BATCH_SIZE = 200
+
+# Seconds between progress message edits
+PROGRESS_INTERVAL = 5.0
+
+# FloodWait retries for a single recipient before counting it as failed
+MAX_FLOOD_RETRIES = 3
+
+BROADCAST_COLLECTION = "broadcasts"
+
+# Recipients that will never accept a message from the bot
+UNREACHABLE_ERRORS = (UserIsBlocked, InputUserDeactivated, PeerIdInvalid)
+
+# Who receives a broadcast, as a filter on the users collection
+AUDIENCES = {
+    "all": {},
+    "usernames": {"username": {"$exists": True}},
+}
+
+
+def text_payload(text: str, parse_mode: Optional[ParseMode] = None) -> Dict[str, Any]:
+    """Payload for a text broadcast"""
+    return {"kind": "text", "text": text, "parse_mode": parse_mode.value if parse_mode else None}
+
+
+def photo_payload(photo: str, caption: str, parse_mode: Optional[ParseMode] = None) -> Dict[str, Any]:
+    """Payload for a photo broadcast; photo should be a file_id so it is uploaded only once"""
+    return {"kind": "photo", "photo": photo, "caption": caption, "parse_mode": parse_mode.value if parse_mode else None}
+
+
+def format_duration(seconds: float) -> str:
+    """Short human-readable duration, e.g. 1h 05m, 3m 20s, 12s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class TokenBucket:
+    """Async token bucket that can be paused, e.g. for a FloodWait"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, and restart empty afterwards"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    async def acquire(self) -> None:
+        """Wait for one token; waiters are served in arrival order"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastJob:
+    """A running broadcast and its counters"""
+    id: Any
+    bot_index: int
+    payload: Dict[str, Any]
+    audience: str
+    label: str
+    total: int
+    progress_chat_id: int
+    progress_message_id: int
+    progress_caption: bool
+    sent: int = 0
+    failed: int = 0
+    # Failures because the user blocked the bot or deleted their account
+    blocked: int = 0
+    # _id of the last user document of the last completed page
+    last_id: Any = None
+    started_at: float = field(default_factory=time.monotonic)
+    # Recipients already handled when this process picked the job up
+    done_at_start: int = 0
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return (self.done - self.done_at_start) / elapsed if elapsed > 0 else 0.0
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "BroadcastJob":
+        job = cls(
+            id=doc["_id"],
+            bot_index=doc.get("bot_index", 1),
+            payload=doc["payload"],
+            audience=doc.get("audience", "all"),
+            label=doc.get("label", "Message"),
+            total=doc.get("total", 0),
+            progress_chat_id=doc["progress_chat_id"],
+            progress_message_id=doc["progress_message_id"],
+            progress_caption=doc.get("progress_caption", False),
+            sent=doc.get("sent", 0),
+            failed=doc.get("failed", 0),
+            blocked=doc.get("blocked", 0),
+            last_id=doc.get("last_id"),
+        )
+        job.done_at_start = job.done
+        return job
+
+
+class BroadcastEngine:
+    """Rate-limited, resumable delivery of one message to many users"""
+
+    def __init__(self, rate: float = BROADCAST_RATE, burst: int = BROADCAST_BURST,
+                 concurrency: int = BROADCAST_CONCURRENCY, batch_size: int = BATCH_SIZE):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self._tasks: Dict[Any, asyncio.Task] = {}
+        self._stats = {
+            "broadcasts": 0,
+            "resumed": 0,
+            "sent": 0,
+            "failed": 0,
+            "flood_waits": 0,
+            "flood_wait_seconds": 0.0,
+        }
+
+    @staticmethod
+    def _collection():
+        return async_db_service.get_collection(BROADCAST_COLLECTION)
+
+    async def start(
+        self,
+        bot,
+        payload: Dict[str, Any],
+        progress_message,
+        label: str = "Message",
+        audience: str = "all",
+        bot_index: Optional[int] = None,
+        created_by: Optional[int] = None,
+    ) -> Any:
+        """
+        Start a broadcast in the background.
+
+        Args:
+            bot: Client the messages are sent with
+            payload: Built with text_payload() or photo_payload()
+            progress_message: Message (sent by the bot) that is edited with
+                progress; its caption is edited if it is a photo
+            label: What is being sent, for the progress text ("Snippet", ...)
+            audience: Key of AUDIENCES
+            bot_index: Bot instance that owns the broadcast and resumes it
+                after a restart (defaults to the client's _bot_index)
+            created_by: Admin user ID, stored for the record
+
+        Returns:
+            ID of the broadcast document
+        """
+        if audience not in AUDIENCES:
+            raise ValueError(f"Unknown broadcast audience: {audience}")
+        if bot_index is None:
+            bot_index = getattr(bot, "_bot_index", 1)
+        total = await get_user_collection().count_documents(AUDIENCES[audience])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        doc = {
+            "bot_index": bot_index,
+            "status": "running",
+            "payload": payload,
+            "audience": audience,
+            "label": label,
+            "total": total,
+            "progress_chat_id": progress_message.chat.id,
+            "progress_message_id": progress_message.id,
+            "progress_caption": bool(getattr(progress_message, "photo", None)),
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "last_id": None,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+        }
+        result = await self._collection().insert_one(doc)
+        doc["_id"] = result.inserted_id
+        job = BroadcastJob.from_document(doc)
+        self._stats["broadcasts"] += 1
+        logger.info(f"Broadcast {job.id} started for {total} recipients ({audience})")
+        self._launch(bot, job)
+        return job.id
+
+    async def resume_pending(self, bot, bot_index: int = 1) -> int:
+        """
+        Resume broadcasts of this bot instance that were interrupted by a restart.
+
+        Returns:
+            Number of broadcasts resumed
+        """
+        try:
+            docs = await self._collection().find({"status": "running", "bot_index": bot_index})
+        except Exception as e:
+            logger.error(f"Could not load pending broadcasts: {e}")
+            return 0
+        resumed = 0
+        for doc in docs:
+            if doc["_id"] in self._tasks:
+                continue
+            job = BroadcastJob.from_document(doc)
+            logger.info(f"Resuming broadcast {job.id} after {job.done} of {job.total} recipients")
+            self._stats["resumed"] += 1
+            self._launch(bot, job)
+            resumed += 1
+        return resumed
+
+    def _launch(self, bot, job: BroadcastJob) -> None:
+        task = asyncio.create_task(self._run(bot, job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+
+    async def _run(self, bot, job: BroadcastJob) -> None:
+        reporter = asyncio.create_task(self._report_loop(bot, job))
+        # Sends from this task yield to replies and edits for regular users
+        outbound_priority.set(PRIORITY_BULK)
+        seen = set()
+        status = "failed"
+        try:
+            users = get_user_collection()
+            audience_filter = AUDIENCES.get(job.audience, {})
+            while True:
+                page_filter = dict(audience_filter)
+                if job.last_id is not None:
+                    page_filter["_id"] = {"$gt": job.last_id}
+                page = await users.find(page_filter, {"user_id": 1}, sort=[("_id", 1)], limit=self.batch_size)
+                if not page:
+                    break
+                recipients = []
+                for doc in page:
+                    user_id = doc.get("user_id")
+                    # The users collection may hold duplicate documents for a user
+                    if user_id is None or user_id in seen:
+                        continue
+                    seen.add(user_id)
+                    recipients.append(user_id)
+                await self._send_page(bot, job, recipients)
+                job.last_id = page[-1]["_id"]
+                await self._checkpoint(job)
+            status = "completed"
+        except asyncio.CancelledError:
+            # Shutdown: keep the checkpoint of the last completed page, which
+            # the next start resumes from
+            reporter.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {job.id} failed: {e}")
+        reporter.cancel()
+        try:
+            await self._checkpoint(job, status=status)
+        except Exception as e:
+            logger.error(f"Could not save final state of broadcast {job.id}: {e}")
+        logger.info(f"Broadcast {job.id} {status}: {job.sent} sent, {job.failed} failed")
+        await self._edit_progress(bot, job, self._final_text(job, status))
+
+    async def _send_page(self, bot, job: BroadcastJob, recipients) -> None:
+        pending = iter(recipients)
+
+        async def worker():
+            # Workers share one iterator, so each recipient is taken exactly once
+            for user_id in pending:
+                await self._deliver(bot, job, user_id)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(recipients)))))
+
+    async def _deliver(self, bot, job: BroadcastJob, user_id: int) -> None:
+        for _ in range(MAX_FLOOD_RETRIES + 1):
+            await self.bucket.acquire()
+            try:
+                await self._send(bot, job.payload, user_id)
+            except FloodWait as e:
+                wait = float(e.value)
+                self.bucket.pause(wait)
+                self._stats["flood_waits"] += 1
+                self._stats["flood_wait_seconds"] += wait
+                logger.warning(f"Broadcast {job.id}: FloodWait of {wait:.0f}s, pausing all sends")
+                continue
+            except UNREACHABLE_ERRORS:
+                job.failed += 1
+                job.blocked += 1
+                self._stats["failed"] += 1
+                return
+            except Exception as e:
+                logger.debug(f"Broadcast {job.id}: could not send to {user_id}: {e}")
+                job.failed += 1
+                self._stats["failed"] += 1
+                return
+            job.sent += 1
+            self._stats["sent"] += 1
+            return
+        job.failed += 1
+        self._stats["failed"] += 1
+
+    @staticmethod
+    async def _send(bot, payload: Dict[str, Any], user_id: int) -> None:
+        parse_mode = ParseMode(payload["parse_mode"]) if payload.get("parse_mode") else None
+        if payload["kind"] == "photo":
+            await bot.send_photo(user_id, photo=payload["photo"], caption=payload.get("caption", ""), parse_mode=parse_mode)
+        else:
+            await bot.send_message(user_id, payload["text"], parse_mode=parse_mode)
+
+    async def _checkpoint(self, job: BroadcastJob, status: str = "running") -> None:
+        await self._collection().update_one(
+            {"_id": job.id},
+            {"$set": {
+                "status": status,
+                "sent": job.sent,
+                "failed": job.failed,
+                "blocked": job.blocked,
+                "last_id": job.last_id,
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            }},
+        )
+
+    async def _report_loop(self, bot, job: BroadcastJob) -> None:
+        while True:
+            await self._edit_progress(bot, job, self._progress_text(job))
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    @staticmethod
+    def _progress_text(job: BroadcastJob) -> str:
+        total = max(job.total, job.done)
+        rate = job.throughput()
+        percent = job.done * 100 // total if total else 100
+        eta = format_duration((total - job.done) / rate) if rate > 0 else "calculating..."
+        return (
+            f"🚀 Sending {job.label.lower()} to all users...\n\n"
+            f"✅ Success: {job.sent:,}\n"
+            f"❌ Failed: {job.failed:,} ({job.blocked:,} blocked the bot)\n"
+            f"📊 Progress: {job.done:,}/{total:,} ({percent}%)\n"
+            f"⚡ Speed: {rate:.1f} msg/s\n"
+            f"⏳ ETA: {eta}"
+        )
+
+    @staticmethod
+    def _final_text(job: BroadcastJob, status: str) -> str:
+        head = f"✅ {job.label} sent to {job.sent:,} users." if status == "completed" else (
+            f"⚠️ Broadcast stopped after {job.done:,} users because of an error.\n✅ Sent to {job.sent:,} users."
+        )
+        return (
+            f"{head}\n"
+            f"❌ Failed to send to {job.failed:,} users ({job.blocked:,} blocked the bot).\n"
+            f"⏱️ Took {format_duration(time.monotonic() - job.started_at)} at {job.throughput():.1f} msg/s."
+        )
+
+    @staticmethod
+    async def _edit_progress(bot, job: BroadcastJob, text: str) -> None:
+        try:
+            if job.progress_caption:
+                await bot.edit_message_caption(job.progress_chat_id, job.progress_message_id, caption=text)
+            else:
+                await bot.edit_message_text(job.progress_chat_id, job.progress_message_id, text)
+        except Exception as e:
+            # Includes MessageNotModified and FloodWait on the admin chat; the next update retries
+            logger.debug(f"Broadcast progress update failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        stats = dict(self._stats)
+        stats["active"] = len(self._tasks)
+        stats["flood_wait_seconds"] = round(stats["flood_wait_seconds"], 1)
+        return stats
+
+
+# Global broadcast engine instance
+broadcast_engine = BroadcastEngine()
@@ -0,0 +1,207 @@
+"""
+Dispatch table for callback queries (button presses)
+
+The callback query handler used to compare callback_query.data against
+every ==/startswith branch of one long if/elif chain, and a few more
+handlers with their own filters.create() predicates were evaluated before
+it on every update. CallbackRouter replaces both with a table:
+
+- exact routes are a dict lookup
+- prefix routes live in a character trie; the data is walked once and the
+  longest registered prefix that accepts it wins, so routing costs
+  O(len(data)) however many routes are registered
+
+Handlers can be given as "package.module:function" strings, imported on
+first use, so registering a route does not import the module behind it.
+
+Each route keeps call counts and latencies (get_stats()), shown in the
+admin statistics panel.
+"""
+
+import importlib
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per route for the percentiles
+LATENCY_SAMPLES = 256
+
+Handler = Callable[[Any, Any], Awaitable[Any]]
+
+
+@dataclass
+class CallbackRoute:
+    """A registered callback namespace and its handler"""
+    name: str
+    handler: Union[Handler, str]
+    prefix: bool = False
+    # Extra condition on the callback data (prefix routes)
+    when: Optional[Callable[[str], bool]] = None
+    # Run after the last-interaction update and ban check of the catch-all handler
+    guarded: bool = True
+
+    def resolve_handler(self) -> Handler:
+        if isinstance(self.handler, str):
+            module_name, function_name = self.handler.split(":")
+            self.handler = getattr(importlib.import_module(module_name), function_name)
+        return self.handler
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        self.samples.append(elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0,
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2) if ordered else 0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class CallbackRouter:
+    """
+    Exact-match and prefix-trie dispatch of callback data.
+
+    Usage:
+        @callback_router.exact("settings", "settings_back")
+        async def settings_inline(client, callback_query): ...
+
+        callback_router.prefix("language_")("modules.user.lang_settings:change_language_setting")
+
+        route = callback_router.resolve(callback_query.data)
+        if route is not None:
+            await callback_router.dispatch(route, client, callback_query)
+    """
+
+    # Trie node key holding the routes that end at a node (never a character)
+    _ROUTES = None
+
+    def __init__(self):
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._trie: Dict[Optional[str], Any] = {}
+        self._routes: List[CallbackRoute] = []
+        self._stats: Dict[str, RouteStats] = {}
+        self._counters = {"unrouted": 0}
+
+    def _add(self, route: CallbackRoute, patterns) -> None:
+        for pattern in patterns:
+            if route.prefix:
+                node = self._trie
+                for char in pattern:
+                    node = node.setdefault(char, {})
+                node.setdefault(self._ROUTES, []).append(route)
+            else:
+                if pattern in self._exact:
+                    logger.warning(f"Callback data '{pattern}' is routed twice, keeping {route.name}")
+                self._exact[pattern] = route
+        self._routes.append(route)
+        self._stats.setdefault(route.name, RouteStats())
+
+    def exact(self, *datas: str, name: Optional[str] = None, guarded: bool = True):
+        """Route callback data equal to one of the given values (decorator)"""
+        def register(handler: Union[Handler, str]):
+            self._add(CallbackRoute(name or datas[0], handler, guarded=guarded), datas)
+            return handler
+        return register
+
+    def prefix(self, *prefixes: str, when: Optional[Callable[[str], bool]] = None,
+               name: Optional[str] = None, guarded: bool = True):
+        """Route callback data starting with one of the given prefixes (decorator)"""
+        def register(handler: Union[Handler, str]):
+            self._add(CallbackRoute(name or prefixes[0] + "*", handler, prefix=True, when=when, guarded=guarded), prefixes)
+            return handler
+        return register
+
+    def copy(self) -> "CallbackRouter":
+        """A router with the same routes, for adding per-client routes; statistics are shared"""
+        router = CallbackRouter()
+        router._exact = dict(self._exact)
+        router._trie = self._copy_trie(self._trie)
+        router._routes = list(self._routes)
+        router._stats = self._stats
+        router._counters = self._counters
+        return router
+
+    @classmethod
+    def _copy_trie(cls, node):
+        return {key: (list(value) if key is cls._ROUTES else cls._copy_trie(value)) for key, value in node.items()}
+
+    def resolve(self, data: Optional[str]) -> Optional[CallbackRoute]:
+        """The route for some callback data, or None"""
+        if not data:
+            self._counters["unrouted"] += 1
+            return None
+        route = self._exact.get(data)
+        if route is not None:
+            return route
+
+        # Walk the trie once, remembering the routes of every prefix passed
+        matches = []
+        node = self._trie
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            routes = node.get(self._ROUTES)
+            if routes:
+                matches.append(routes)
+        # Longest prefix first
+        for routes in reversed(matches):
+            for route in routes:
+                if route.when is None or route.when(data):
+                    return route
+        self._counters["unrouted"] += 1
+        return None
+
+    async def dispatch(self, route: CallbackRoute, client, callback_query) -> Any:
+        """Run a route's handler, recording its latency"""
+        handler = route.resolve_handler()
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(client, callback_query)
+            failed = False
+            return result
+        finally:
+            self._stats[route.name].record(time.perf_counter() - start, failed)
+
+    @property
+    def routes(self) -> List[CallbackRoute]:
+        return list(self._routes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals and per-route latency of the routes that were used"""
+        routes = {name: stats.summary() for name, stats in self._stats.items() if stats.calls}
+        slowest = max(routes.items(), key=lambda item: item[1]["avg_ms"], default=(None, None))[0]
+        return {
+            "routes": len(self._stats),
+            "dispatched": sum(stats["calls"] for stats in routes.values()),
+            "errors": sum(stats["errors"] for stats in routes.values()),
+            "unrouted": self._counters["unrouted"],
+            "slowest": slowest,
+            "by_route": routes,
+        }
+
+
+# Global router instance
+callback_router = CallbackRouter()
@@ -0,0 +1,146 @@
+"""
+Pool of reusable g4f clients
+
+This module keeps a bounded set of idle g4f Client/AsyncClient objects per
+(client class, provider) and hands them out on lease, so repeated calls to
+the same provider reuse the same client object instead of building a new
+one (its chat, images and models namespaces and proxy settings) every time.
+
+It does not pool connections: g4f clients hold no HTTP session, and the
+providers open a new session inside each call. The reuse counters below
+therefore count reused client objects, not reused connections.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Idle clients kept per (client class, provider) key
+MAX_IDLE_PER_KEY = 8
+
+# Idle clients older than this are dropped instead of reused (seconds)
+IDLE_TIMEOUT = 300.0
+
+
+class ClientPool:
+    """
+    Bounded pool of client objects keyed by client class and constructor options.
+
+    Leases are exclusive: a client is never used by two calls at once. It is
+    safe to lease from event-loop code and from executor threads.
+    """
+
+    def __init__(self, name: str, max_idle_per_key: int = MAX_IDLE_PER_KEY, idle_timeout: float = IDLE_TIMEOUT):
+        self.name = name
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[Tuple, List[Tuple[Any, float]]] = {}
+        self._leased: Dict[int, Tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "leases": 0,
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "expired": 0,
+            "in_use": 0,
+        }
+        self._created_by_key: Dict[str, int] = {}
+
+    @staticmethod
+    def _make_key(client_cls: type, options: Dict[str, Any]) -> Tuple:
+        return (client_cls,) + tuple(sorted(options.items()))
+
+    @staticmethod
+    def _describe_key(key: Tuple) -> str:
+        client_cls, *options = key
+        parts = [f"{name}={getattr(value, '__name__', value)}" for name, value in options]
+        return f"{client_cls.__name__}({', '.join(parts)})"
+
+    def acquire(self, client_cls: type, **options: Any) -> Any:
+        """
+        Take a client out of the pool, creating one if none is idle.
+
+        Must be paired with release(); prefer the lease() context manager.
+        """
+        key = self._make_key(client_cls, options)
+        now = time.time()
+        with self._lock:
+            self._stats["leases"] += 1
+            self._stats["in_use"] += 1
+            idle = self._idle.get(key)
+            while idle:
+                client, released_at = idle.pop()
+                if now - released_at <= self.idle_timeout:
+                    self._stats["reused"] += 1
+                    self._leased[id(client)] = key
+                    return client
+                self._stats["expired"] += 1
+            self._stats["created"] += 1
+            label = self._describe_key(key)
+            self._created_by_key[label] = self._created_by_key.get(label, 0) + 1
+
+        # Construct outside the lock, client constructors may be slow
+        try:
+            client = client_cls(**options)
+        except Exception:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            raise
+        with self._lock:
+            self._leased[id(client)] = key
+        return client
+
+    def release(self, client: Any, discard: bool = False) -> None:
+        """
+        Return a leased client to the pool.
+
+        Args:
+            client: Client obtained from acquire()
+            discard: Drop the client instead of reusing it (e.g. after an error)
+        """
+        with self._lock:
+            key = self._leased.pop(id(client), None)
+            self._stats["in_use"] -= 1
+            if discard or key is None:
+                self._stats["discarded"] += 1
+                return
+            idle = self._idle.setdefault(key, [])
+            if len(idle) >= self.max_idle_per_key:
+                self._stats["discarded"] += 1
+                return
+            idle.append((client, time.time()))
+
+    @contextmanager
+    def lease(self, client_cls: type, **options: Any) -> Iterator[Any]:
+        """
+        Lease a client for the duration of a with-block.
+
+        If the block raises (including timeouts and cancellation) the client
+        is discarded rather than returned, since its session may be broken.
+        """
+        client = self.acquire(client_cls, **options)
+        try:
+            yield client
+        except BaseException:
+            self.release(client, discard=True)
+            raise
+        else:
+            self.release(client)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool counters including the share of leases served by an existing client object"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = sum(len(idle) for idle in self._idle.values())
+            stats["created_by_client"] = dict(self._created_by_key)
+        stats["object_reuse_rate"] = round(stats["reused"] / stats["leases"], 3) if stats["leases"] else 0.0
+        return stats
+
+
+# Shared by text, image, vision and image-edit providers
+g4f_client_pool = ClientPool("g4f")
@@ -1,14 +1,70 @@
 from typing import Optional, Dict, Any
 import os
+import threading
 from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.monitoring import ConnectionPoolListener
 import logging
-from config import DATABASE_URL
+from config import DATABASE_URL, DB_MAX_POOL_SIZE, DB_MIN_POOL_SIZE
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+class PoolConnectionCounter(ConnectionPoolListener):
+    """Counts connections opened and closed by a MongoClient's pools"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.peak_open = 0
+
+    @property
+    def open(self) -> int:
+        return self.created - self.closed
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.created += 1
+            self.peak_open = max(self.peak_open, self.created - self.closed)
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.closed += 1
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    # Events we do not track
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pass
+
+
 class DatabaseService:
     """
     Singleton database service with connection pooling for MongoDB.
@@ -31,6 +87,8 @@ class DatabaseService:
             self._db_client: Optional[MongoClient] = None
             self._db: Optional[Database] = None
             self._collections: Dict[str, Collection] = {}
+            self.pool_options: Dict[str, Any] = {}
+            self.pool_counter = PoolConnectionCounter()
             self._connect()
             self._initialized = True
     
@@ -43,14 +101,15 @@ class DatabaseService:
             # maxIdleTimeMS: How long a connection can remain idle before being closed
             # waitQueueTimeoutMS: How long a thread will wait for a connection
             connection_options = {
-                'maxPoolSize': 20,  # Adjust based on expected concurrent operations
-                'minPoolSize': 5,   # Keep minimum connections ready
+                'maxPoolSize': DB_MAX_POOL_SIZE,  # Sized per bot process in config
+                'minPoolSize': min(DB_MIN_POOL_SIZE, DB_MAX_POOL_SIZE),  # Keep minimum connections ready
                 'maxIdleTimeMS': 30000,  # Close idle connections after 30 seconds
                 'waitQueueTimeoutMS': 5000,  # Wait up to 5 seconds for a connection
             }
+            self.pool_options = connection_options
             
             # Connect to MongoDB with connection pooling
-            self._db_client = MongoClient(DATABASE_URL, **connection_options)
+            self._db_client = MongoClient(DATABASE_URL, event_listeners=[self.pool_counter], **connection_options)
             
             # Access the database
             self._db = self._db_client['aibotdb']
@@ -73,6 +132,29 @@ class DatabaseService:
             self._collections[collection_name] = self._db[collection_name]
         return self._collections[collection_name]
     
+    def get_database(self) -> Database:
+        """The bot database, for database-level commands and aggregations"""
+        return self._db
+
+    def get_pool_report(self) -> Dict[str, Any]:
+        """
+        Connection pool size and usage for this process.
+
+        This client is the only MongoClient in the bot process, so these
+        numbers are the process total. The pool limit applies per server,
+        so a replica set can hold up to max_pool_size connections per member.
+        """
+        return {
+            "pid": os.getpid(),
+            "clients": 1 if self._db_client else 0,
+            "max_pool_size": self.pool_options.get("maxPoolSize"),
+            "min_pool_size": self.pool_options.get("minPoolSize"),
+            "open_connections": self.pool_counter.open,
+            "peak_connections": self.pool_counter.peak_open,
+            "in_use": self.pool_counter.checked_out,
+            "collections": len(self._collections),
+        }
+
     def close(self) -> None:
         """Close database connection"""
         if self._db_client:
@@ -0,0 +1,259 @@
+"""
+Append-only conversation history storage
+
+Each user has one document in the history collection. The `history` array
+holds only the conversation turns; the system prompt is not copied into it.
+Instead the document records `system_prompt_version` and the prompt itself is
+resolved from the registered version at read time.
+
+Writes append turns with `$push` (capped with `$slice`) so the cost of saving
+a message does not grow with the conversation, and reads project only the
+last N turns with a `$slice` projection.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from modules.core.database import get_history_collection
+
+logger = logging.getLogger(__name__)
+
+# Turns kept in the stored document, older ones are dropped on append
+MAX_STORED_TURNS = 500
+
+# Turns loaded into the model context by default
+DEFAULT_CONTEXT_TURNS = 40
+
+# Reads of a turn range retried when appends shift the stored array in between
+RANGE_READ_ATTEMPTS = 3
+
+VERSION_FIELD = "system_prompt_version"
+
+
+@dataclass
+class HistoryWindow:
+    """The most recent turns of a conversation plus its rolling summary"""
+    turns: List[Dict[str, Any]] = field(default_factory=list)
+    # Position of turns[0] among all turns ever appended
+    start: int = 0
+    summary: Optional[str] = None
+    # Turns before this position are covered by the summary
+    summary_upto: int = 0
+
+
+class ConversationHistoryStore:
+    """
+    Reads and appends conversation turns for a user.
+
+    Documents written before this store existed contain a full copy of the
+    system prompt at the start of `history` and no version field. They are
+    migrated once, the first time they are read.
+    """
+
+    def __init__(self, max_stored_turns: int = MAX_STORED_TURNS, context_turns: int = DEFAULT_CONTEXT_TURNS):
+        self.max_stored_turns = max_stored_turns
+        self.context_turns = context_turns
+        self._prompts: Dict[str, List[Dict[str, str]]] = {}
+        self._current_version: Optional[str] = None
+        self._indexed = False
+
+    def _collection(self):
+        collection = get_history_collection()
+        if not self._indexed:
+            try:
+                collection.create_index("user_id")
+            except Exception as e:
+                logger.warning(f"Could not create history index: {e}")
+            self._indexed = True
+        return collection
+
+    # ------------------------------------------------------------------
+    # System prompt registry
+    # ------------------------------------------------------------------
+
+    def register_system_prompt(self, version: str, messages: List[Dict[str, str]], current: bool = True) -> None:
+        """
+        Register the system prompt messages for a version.
+
+        Args:
+            version: Prompt version string (e.g. SYSTEM_PROMPT_VERSION)
+            messages: System and training messages that open every context
+            current: Use this version for new and upgraded conversations
+        """
+        self._prompts[version] = list(messages)
+        if current:
+            self._current_version = version
+
+    def get_system_prompt(self) -> List[Dict[str, str]]:
+        """Copy of the current system prompt messages"""
+        if self._current_version is None:
+            return []
+        return list(self._prompts[self._current_version])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def load_window(self, user_id: int, limit: Optional[int] = None) -> HistoryWindow:
+        """
+        Load the last turns of a user's conversation together with its summary.
+
+        Args:
+            user_id: Telegram user ID
+            limit: Number of turns to load (defaults to context_turns)
+
+        Returns:
+            HistoryWindow, with turns oldest first and without the system prompt
+        """
+        limit = limit or self.context_turns
+        collection = self._collection()
+        doc = collection.find_one(
+            {"user_id": user_id},
+            {"history": {"$slice": -limit}, VERSION_FIELD: 1, "turn_count": 1, "summary": 1, "summary_upto": 1},
+        )
+        if not doc:
+            return HistoryWindow()
+
+        if VERSION_FIELD not in doc:
+            turns = self._migrate_legacy(collection, user_id)
+            return HistoryWindow(turns=turns[-limit:], start=max(0, len(turns) - limit))
+
+        turns = doc.get("history") or []
+        if doc[VERSION_FIELD] != self._current_version and self._current_version is not None:
+            # The prompt is looked up by version, so upgrading is just a field update
+            collection.update_one({"user_id": user_id}, {"$set": {VERSION_FIELD: self._current_version}})
+            print(f"[SYSTEM_PROMPT] Updated system prompt for user {user_id} to version {self._current_version}")
+        return HistoryWindow(
+            turns=turns,
+            start=max(0, doc.get("turn_count", len(turns)) - len(turns)),
+            summary=doc.get("summary"),
+            summary_upto=doc.get("summary_upto", 0),
+        )
+
+    def load_turns(self, user_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Load the last turns of a user's conversation, without the system prompt.
+
+        Args:
+            user_id: Telegram user ID
+            limit: Number of turns to load (defaults to context_turns)
+
+        Returns:
+            List of {"role", "content"} messages, oldest first
+        """
+        return self.load_window(user_id, limit).turns
+
+    def load_range(self, user_id: int, start: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Load the turns at positions start..end-1 of a user's conversation.
+
+        Positions count every turn ever appended, as in HistoryWindow.start.
+        Turns already dropped by the stored-turn cap are not returned.
+
+        Args:
+            user_id: Telegram user ID
+            start: Position of the first turn to load
+            end: Position after the last turn to load
+
+        Returns:
+            List of {"role", "content"} messages, oldest first
+        """
+        collection = self._collection()
+        doc = collection.find_one({"user_id": user_id}, {"turn_count": 1})
+        for _ in range(RANGE_READ_ATTEMPTS):
+            if not doc:
+                return []
+            total = doc.get("turn_count", 0)
+            first = max(start, total - min(total, self.max_stored_turns))
+            last = min(end, total)
+            if last <= first:
+                return []
+            # Skip counted from the end, the stored array is capped at the front
+            doc = collection.find_one(
+                {"user_id": user_id},
+                {"history": {"$slice": [first - total, last - first]}, "turn_count": 1},
+            )
+            if doc and doc.get("turn_count") == total:
+                return doc.get("history") or []
+        logger.warning(f"History of user {user_id} kept changing, range {start}-{end} not loaded")
+        return []
+
+    def _strip_prompt(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Remove a copied system prompt from the front of a legacy history"""
+        turns = [msg for msg in history if isinstance(msg, dict) and msg.get("role") != "system"]
+        for prompt in self._prompts.values():
+            examples = [msg for msg in prompt if msg.get("role") != "system"]
+            if examples and turns[:len(examples)] == examples:
+                return turns[len(examples):]
+        return turns
+
+    def _migrate_legacy(self, collection, user_id: int) -> List[Dict[str, Any]]:
+        """Rewrite a pre-versioning document once, dropping its copy of the prompt"""
+        doc = collection.find_one({"user_id": user_id}, {"history": 1})
+        history = (doc or {}).get("history") or []
+        if not isinstance(history, list):
+            history = [history]
+        turns = self._strip_prompt(history)[-self.max_stored_turns:]
+        collection.update_one(
+            {"user_id": user_id},
+            {"$set": {"history": turns, VERSION_FIELD: self._current_version, "turn_count": len(turns)}},
+        )
+        logger.info(f"Migrated history for user {user_id}: {len(history)} -> {len(turns)} messages")
+        return turns
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append_turns(
+        self,
+        user_id: int,
+        turns: List[Dict[str, Any]],
+        set_fields: Optional[Dict[str, Any]] = None,
+        unset_fields: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Append turns to a user's conversation.
+
+        Args:
+            user_id: Telegram user ID
+            turns: Messages to append, oldest first
+            set_fields: Extra top-level fields to set in the same update
+            unset_fields: Top-level fields to remove in the same update
+        """
+        update: Dict[str, Any] = {
+            "$push": {"history": {"$each": list(turns), "$slice": -self.max_stored_turns}},
+            # A legacy document keeps no version until it is migrated on read
+            "$setOnInsert": {VERSION_FIELD: self._current_version},
+            "$inc": {"turn_count": len(turns)},
+        }
+        if set_fields:
+            update["$set"] = dict(set_fields)
+        if unset_fields:
+            update["$unset"] = {field: "" for field in unset_fields}
+        self._collection().update_one({"user_id": user_id}, update, upsert=True)
+
+    def save_summary(self, user_id: int, summary: str, upto: int) -> None:
+        """
+        Store a rolling summary covering every turn before position `upto`.
+
+        A summary never replaces one that already covers more turns, so
+        overlapping summarisation runs cannot move it backwards.
+        """
+        self._collection().update_one(
+            {"user_id": user_id, "$or": [{"summary_upto": {"$exists": False}}, {"summary_upto": {"$lt": upto}}]},
+            {"$set": {"summary": summary, "summary_upto": upto}},
+        )
+
+    def reset(self, user_id: int) -> None:
+        """Clear a user's conversation, its summary and any per-conversation state"""
+        self._collection().replace_one(
+            {"user_id": user_id},
+            {"user_id": user_id, "history": [], VERSION_FIELD: self._current_version, "turn_count": 0},
+            upsert=True,
+        )
+
+
+# Global history store instance
+history_store = ConversationHistoryStore()
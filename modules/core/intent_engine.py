@@ -0,0 +1,256 @@
+"""
+Compiled keyword and pattern matching for intent detection
+
+The auto image generation heuristics in ai_res checked every message and
+response against long keyword lists (one substring search per keyword)
+and a series of regexes, recompiling nothing but looking each one up again
+on every call. IntentRules compiles such a rule set once:
+
+- All keywords go into one Aho-Corasick automaton, so a single pass over
+  the text finds every keyword of every group, overlapping ones included.
+- Regexes are compiled once and may name trigger literals that the
+  automaton looks for in the same pass; a regex whose triggers do not occur
+  in the text is never run. A regex that starts with one of its triggers
+  is only tried where a trigger occurs instead of at every position.
+
+Usage:
+    rules = IntentRules(
+        keywords={"verbs": ["create", "draw"], "subjects": ["cat", "dog"]},
+        patterns={"count": PatternRule(r'\\b(\\d+)\\s+images?', triggers="0123456789")},
+    )
+    match = rules.scan(message)
+    if match.count("verbs") and match.keywords("subjects"):
+        found = match.search("count")
+"""
+
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PatternRule:
+    """A regex of an IntentRules set"""
+    regex: str
+    flags: int = 0
+    # Literals (in the scanned case) that every match contains; none means always run
+    triggers: Sequence[str] = ()
+    # Every match starts with one of the triggers, so only try it there
+    anchored: bool = False
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of keywords.
+
+    Transitions are precomputed for every state and character that occurs
+    in a keyword (a DFA), so scanning costs one dictionary lookup per
+    character of text.
+    """
+
+    def __init__(self, keywords: Iterable[str], whole_words: bool = False):
+        """
+        Args:
+            keywords: Strings to look for
+            whole_words: Only report keywords that are not part of a
+                longer word (no letter or digit next to a keyword that
+                starts or ends with one)
+        """
+        self.whole_words = whole_words
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[str, ...]] = [()]
+        for keyword in dict.fromkeys(keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    outputs.append(())
+                state = following
+            outputs[state] += (keyword,)
+
+        # Breadth-first: a state's failure link points at a shallower state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                fail[following] = goto[link].get(char, 0) if state else 0
+                outputs[following] += outputs[fail[following]]
+
+        alphabet = {char for transitions in goto for char in transitions}
+        self._delta: List[Dict[str, int]] = []
+        for state in range(len(goto)):
+            transitions = {}
+            for char in alphabet:
+                link = state
+                while link and char not in goto[link]:
+                    link = fail[link]
+                following = goto[link].get(char, 0)
+                if following:
+                    transitions[char] = following
+            self._delta.append(transitions)
+        self._outputs = outputs
+
+    def __len__(self) -> int:
+        return len(self._delta)
+
+    def find(self, text: str) -> Set[str]:
+        """The keywords that occur in text"""
+        if self.whole_words:
+            return self._find_words(text)
+        delta, outputs = self._delta, self._outputs
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def _find_words(self, text: str) -> Set[str]:
+        delta, outputs = self._delta, self._outputs
+        found: Set[str] = set()
+        state = 0
+        length = len(text)
+        for end, char in enumerate(text, 1):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                joined_after = end < length and text[end].isalnum()
+                for keyword in outputs[state]:
+                    # Only letters and digits at the keyword's edges need a boundary
+                    if joined_after and keyword[-1].isalnum():
+                        continue
+                    start = end - len(keyword)
+                    if start and keyword[0].isalnum() and text[start - 1].isalnum():
+                        continue
+                    found.add(keyword)
+        return found
+
+
+class IntentMatch:
+    """The result of scanning one text with an IntentRules set"""
+
+    def __init__(self, rules: "IntentRules", text: str, found: Set[str]):
+        self.rules = rules
+        # The text as it was scanned (lowercased unless the rules are case sensitive)
+        self.text = text
+        self.found = found
+
+    def keywords(self, group: str) -> List[str]:
+        """Keywords of a group that occur in the text, in the group's order"""
+        found = self.found
+        if not found:
+            return []
+        return [keyword for keyword in self.rules.groups[group] if keyword in found]
+
+    def count(self, group: str) -> int:
+        """Number of distinct keywords of a group that occur in the text"""
+        found = self.found
+        if not found:
+            return 0
+        return sum(1 for keyword in self.rules.groups[group] if keyword in found)
+
+    def _candidates(self, name: str):
+        """The compiled pattern and, for anchored patterns, where it may start"""
+        pattern, rule, triggers = self.rules.patterns[name]
+        if triggers:
+            present = triggers & self.found
+            if not present:
+                return None, []
+            if rule.anchored:
+                text = self.text
+                starts = set()
+                for trigger in present:
+                    position = text.find(trigger)
+                    while position != -1:
+                        starts.add(position)
+                        position = text.find(trigger, position + 1)
+                return pattern, sorted(starts)
+        return pattern, None
+
+    def search(self, name: str) -> Optional[re.Match]:
+        """re.search with a named pattern, skipped when its triggers are absent"""
+        pattern, starts = self._candidates(name)
+        if pattern is None:
+            return None
+        if starts is None:
+            return pattern.search(self.text)
+        for start in starts:
+            found = pattern.match(self.text, start)
+            if found:
+                return found
+        return None
+
+    def findall(self, name: str) -> list:
+        """re.findall with a named pattern, skipped when its triggers are absent"""
+        pattern, starts = self._candidates(name)
+        if pattern is None:
+            return []
+        if starts is None:
+            return pattern.findall(self.text)
+        results = []
+        end = 0
+        for start in starts:
+            if start < end:
+                continue
+            found = pattern.match(self.text, start)
+            if found:
+                if pattern.groups == 0:
+                    results.append(found.group())
+                elif pattern.groups == 1:
+                    results.append(found.group(1))
+                else:
+                    results.append(found.groups(""))
+                end = found.end()
+        return results
+
+
+class IntentRules:
+    """Keyword groups and regexes compiled into one matcher"""
+
+    def __init__(self, keywords: Dict[str, Sequence[str]],
+                 patterns: Optional[Dict[str, PatternRule]] = None,
+                 lowercase: bool = True, whole_words: bool = False):
+        """
+        Args:
+            keywords: Group name -> keywords; a keyword may be in several groups
+            patterns: Pattern name -> rule. A pattern only runs if one of
+                its triggers occurs in the text; with no triggers it always runs.
+            lowercase: Lowercase the text before matching (keywords and
+                triggers are then expected in lowercase)
+            whole_words: Only match keywords as whole words (triggers too)
+        """
+        self.groups: Dict[str, Tuple[str, ...]] = {group: tuple(words) for group, words in keywords.items()}
+        self.patterns: Dict[str, Tuple[re.Pattern, PatternRule, frozenset]] = {}
+        triggers: List[str] = []
+        for name, rule in (patterns or {}).items():
+            self.patterns[name] = (re.compile(rule.regex, rule.flags), rule, frozenset(rule.triggers))
+            triggers.extend(rule.triggers)
+        self.lowercase = lowercase
+        self.automaton = KeywordAutomaton(
+            [keyword for words in self.groups.values() for keyword in words] + triggers,
+            whole_words=whole_words,
+        )
+        logger.debug(f"Compiled {len(self.groups)} keyword groups and {len(self.patterns)} patterns "
+                     f"into {len(self.automaton)} states")
+
+    def scan(self, text: str) -> IntentMatch:
+        """Find every keyword and trigger in text in one pass"""
+        if not isinstance(text, str):
+            text = str(text) if text else ""
+        if self.lowercase:
+            text = text.lower()
+        return IntentMatch(self, text, self.automaton.find(text))
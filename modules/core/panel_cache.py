@@ -0,0 +1,179 @@
+"""
+Cache of rendered menu panels
+
+The start menu, the settings menus, the AI model selector and the help
+pages used to translate every caption and button label and build a new
+InlineKeyboardMarkup on every callback, although the result only depends on
+the panel, the user's language and a few settings (voice mode, selected
+models, premium status). PanelCache keeps the rendered caption and keyboard
+keyed by (panel, language, state), so navigating back to a panel is a
+dictionary lookup followed by the one edit call to Telegram.
+
+Everything the rendering depends on must be part of the state. Per-user
+values that are not (mention, user ID) are left as {mention} / {user_id}
+placeholders in the cached caption and filled in with RenderedPanel.fill().
+A user changing a setting therefore selects a different entry instead of
+needing to invalidate one. Changes that affect every user of a panel, such
+as new UI translations, call invalidate_panels(); entries also expire after
+PANEL_CACHE_TTL so a caption rendered while the translator was failing
+does not stick.
+
+Panels are rendered on the event loop, but invalidate_panels() is also
+called from the UI bundle warm-up thread, so the entries are guarded by a
+lock.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rendered panels kept, least recently used are evicted first
+PANEL_CACHE_SIZE = 5000
+
+# Seconds a rendered panel stays valid
+PANEL_CACHE_TTL = 3600.0
+
+PanelKey = Tuple[str, str, Hashable]
+
+
+@dataclass(frozen=True)
+class RenderedPanel:
+    """Caption and keyboard of a panel; the caption may contain {placeholders}"""
+    text: str
+    reply_markup: Any = None
+
+    def fill(self, **values: Any) -> str:
+        """The caption with the given {placeholders} replaced (other braces are left alone)"""
+        text = self.text
+        for name, value in values.items():
+            text = text.replace("{" + name + "}", str(value))
+        return text
+
+
+class PanelCache:
+    """
+    LRU cache of rendered panels.
+
+    Usage:
+        panel = await panel_cache.get_or_render("settings_voice", lang, (voice_setting,),
+                                                lambda: render_voice_panel(lang, voice_setting))
+        await callback.message.edit(text=panel.fill(mention=mention), reply_markup=panel.reply_markup)
+    """
+
+    def __init__(self, maxsize: int = PANEL_CACHE_SIZE, ttl: float = PANEL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[PanelKey, Tuple[float, RenderedPanel]]" = OrderedDict()
+        self._rendering: Dict[PanelKey, asyncio.Future] = {}
+        # Held for every change to _data; invalidate() may run in another thread
+        self._lock = threading.Lock()
+        # Bumped by invalidate(), so a render that started before it is not cached
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "invalidations": 0}
+
+    def get(self, panel: str, lang: str, state: Hashable = ()) -> Optional[RenderedPanel]:
+        key = (panel, lang, state)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, rendered = entry
+            if time.monotonic() >= expires_at:
+                self._data.pop(key, None)
+                return None
+            self._data.move_to_end(key)
+            return rendered
+
+    def set(self, panel: str, lang: str, state: Hashable, rendered: RenderedPanel,
+            generation: Optional[int] = None) -> None:
+        """Cache a rendered panel, unless generation is given and invalidate() ran since"""
+        key = (panel, lang, state)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, rendered)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    async def get_or_render(self, panel: str, lang: str, state: Hashable,
+                            render: Callable[[], Awaitable[RenderedPanel]]) -> RenderedPanel:
+        """
+        The cached panel, rendering it if needed.
+
+        Args:
+            panel: Panel ID
+            lang: Language the panel is rendered in
+            state: Hashable value of every setting the rendering depends on
+            render: Coroutine function that renders the panel
+
+        Returns:
+            The rendered panel
+        """
+        rendered = self.get(panel, lang, state)
+        if rendered is not None:
+            self._stats["hits"] += 1
+            return rendered
+        self._stats["misses"] += 1
+
+        # Concurrent callbacks for the same panel share one render
+        key = (panel, lang, state)
+        pending = self._rendering.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._rendering[key] = future
+        generation = self._generation
+        try:
+            self._stats["renders"] += 1
+            rendered = await render()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as never retrieved
+            future.exception()
+            raise
+        else:
+            self.set(panel, lang, state, rendered, generation)
+            future.set_result(rendered)
+            return rendered
+        finally:
+            if self._rendering.get(key) is future:
+                del self._rendering[key]
+
+    def invalidate(self, panel: Optional[str] = None, lang: Optional[str] = None) -> None:
+        """Drop rendered panels (all of them, or those of one panel and/or language)"""
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            if panel is None and lang is None:
+                self._data.clear()
+                return
+            for key in [key for key in self._data
+                        if (panel is None or key[0] == panel) and (lang is None or key[1] == lang)]:
+                del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups * 100, 2) if lookups else 0
+        stats["entries"] = len(self._data)
+        return stats
+
+
+# Global panel cache instance
+panel_cache = PanelCache()
+
+
+def invalidate_panels(panel: Optional[str] = None, lang: Optional[str] = None) -> None:
+    """Invalidate rendered panels after a change that affects every user of them (e.g. new translations)"""
+    panel_cache.invalidate(panel, lang)
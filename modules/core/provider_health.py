@@ -0,0 +1,210 @@
+"""
+Provider health scoreboard shared by the text and image generation systems
+
+Keeps a decaying (EWMA) view of each provider's success rate and latency,
+uses it to order providers for a request, and trips a circuit breaker when a
+provider fails repeatedly so we stop paying its full timeout while it is down.
+"""
+
+import math
+import time
+import logging
+import statistics
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# EWMA smoothing factor applied on every recorded call
+EWMA_ALPHA = 0.2
+
+# Idle stats drift back to the neutral prior with this half-life (seconds)
+IDLE_HALF_LIFE = 1800.0
+
+# Neutral assumptions for providers we know nothing about
+PRIOR_SUCCESS_RATE = 0.5
+PRIOR_LATENCY = 20.0
+
+# Circuit breaker: open after this many consecutive failures ...
+FAILURE_THRESHOLD = 3
+# ... for this long, doubling on each failed half-open trial up to the max
+BASE_COOLDOWN = 120.0
+MAX_COOLDOWN = 900.0
+
+# Recent successful latencies kept for percentile estimates
+LATENCY_WINDOW_SIZE = 50
+MIN_LATENCY_SAMPLES = 5
+
+
+class ProviderStats:
+    """Health state for a single provider"""
+
+    __slots__ = (
+        "success_rate", "latency", "last_update", "calls", "failures",
+        "consecutive_failures", "open_until", "cooldown", "latencies",
+    )
+
+    def __init__(self) -> None:
+        self.success_rate = PRIOR_SUCCESS_RATE
+        self.latency = PRIOR_LATENCY
+        self.last_update = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.cooldown = BASE_COOLDOWN
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW_SIZE)
+
+
+class ProviderHealthTracker:
+    """
+    Tracks provider success/failure rates and latency for intelligent routing.
+
+    Providers that fail or respond slowly get ordered later, and providers
+    with an open circuit are skipped until their cool-down has passed.
+    """
+
+    def __init__(self, name: str = "providers"):
+        self.name = name
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def _get(self, provider_name: str) -> ProviderStats:
+        stats = self.stats.get(provider_name)
+        if stats is None:
+            stats = ProviderStats()
+            self.stats[provider_name] = stats
+        return stats
+
+    def _decayed(self, stats: ProviderStats, now: float) -> tuple:
+        """Success rate and latency pulled toward the prior by idle time"""
+        if not stats.last_update:
+            return PRIOR_SUCCESS_RATE, PRIOR_LATENCY
+        weight = math.pow(0.5, (now - stats.last_update) / IDLE_HALF_LIFE)
+        success = PRIOR_SUCCESS_RATE + (stats.success_rate - PRIOR_SUCCESS_RATE) * weight
+        latency = PRIOR_LATENCY + (stats.latency - PRIOR_LATENCY) * weight
+        return success, latency
+
+    def _update(self, stats: ProviderStats, outcome: float, latency: Optional[float], now: float) -> None:
+        success, avg_latency = self._decayed(stats, now)
+        stats.success_rate = success + EWMA_ALPHA * (outcome - success)
+        if latency is not None:
+            stats.latency = avg_latency + EWMA_ALPHA * (latency - avg_latency)
+        else:
+            stats.latency = avg_latency
+        stats.last_update = now
+        stats.calls += 1
+
+    def record_success(self, provider_name: str, latency: Optional[float] = None) -> None:
+        """Record a successful call and close the provider's circuit"""
+        now = time.time()
+        stats = self._get(provider_name)
+        self._update(stats, 1.0, latency, now)
+        if latency is not None:
+            stats.latencies.append(latency)
+        if stats.open_until:
+            logger.info(f"[{self.name}] Circuit closed for {provider_name}")
+        stats.consecutive_failures = 0
+        stats.open_until = 0.0
+        stats.cooldown = BASE_COOLDOWN
+
+    def record_failure(self, provider_name: str, latency: Optional[float] = None) -> None:
+        """Record a failed call, opening the circuit after repeated failures"""
+        now = time.time()
+        stats = self._get(provider_name)
+        self._update(stats, 0.0, latency, now)
+        stats.failures += 1
+        stats.consecutive_failures += 1
+
+        if stats.open_until:
+            if now >= stats.open_until:
+                # Half-open call failed, back off harder
+                stats.cooldown = min(stats.cooldown * 2, MAX_COOLDOWN)
+                stats.open_until = now + stats.cooldown
+                logger.warning(f"[{self.name}] {provider_name} still failing, circuit open for {stats.cooldown:.0f}s")
+        elif stats.consecutive_failures >= FAILURE_THRESHOLD:
+            stats.open_until = now + stats.cooldown
+            logger.warning(
+                f"[{self.name}] Circuit opened for {provider_name} after "
+                f"{stats.consecutive_failures} consecutive failures ({stats.cooldown:.0f}s cool-down)"
+            )
+
+    def is_available(self, provider_name: str) -> bool:
+        """
+        Check whether a provider may be called right now.
+
+        Once the cool-down has passed the circuit is half-open: calls go
+        through again, the next success closes it and the next failure
+        re-opens it with a doubled cool-down.
+        """
+        stats = self.stats.get(provider_name)
+        if stats is None:
+            return True
+        return time.time() >= stats.open_until
+
+    def get_success_rate(self, provider_name: str) -> float:
+        """Get the decayed success rate for a provider (0.0 to 1.0)"""
+        stats = self.stats.get(provider_name)
+        if stats is None:
+            return PRIOR_SUCCESS_RATE
+        return self._decayed(stats, time.time())[0]
+
+    def get_latency(self, provider_name: str) -> float:
+        """Get the decayed average latency for a provider in seconds"""
+        stats = self.stats.get(provider_name)
+        if stats is None:
+            return PRIOR_LATENCY
+        return self._decayed(stats, time.time())[1]
+
+    def get_p50_latency(self, provider_name: str) -> Optional[float]:
+        """Median latency of recent successful calls, or None without enough samples"""
+        stats = self.stats.get(provider_name)
+        if stats is None or len(stats.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        return statistics.median(stats.latencies)
+
+    def get_score(self, provider_name: str) -> float:
+        """
+        Expected cost of calling a provider, lower is better.
+
+        Latency divided by success rate approximates the time spent per
+        successful answer.
+        """
+        success, latency = (PRIOR_SUCCESS_RATE, PRIOR_LATENCY)
+        stats = self.stats.get(provider_name)
+        if stats is not None:
+            success, latency = self._decayed(stats, time.time())
+        return latency / max(success, 0.05)
+
+    def order_providers(self, providers: List[T], key: Callable[[T], str] = lambda p: p.name) -> List[T]:
+        """
+        Drop providers with an open circuit and sort the rest by score.
+
+        The sort is stable, so providers with equal scores keep their
+        configured priority order.
+        """
+        available = [p for p in providers if self.is_available(key(p))]
+        return sorted(available, key=lambda p: self.get_score(key(p)))
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of every tracked provider for monitoring"""
+        now = time.time()
+        snapshot = {}
+        for provider_name, stats in self.stats.items():
+            success, latency = self._decayed(stats, now)
+            snapshot[provider_name] = {
+                "success_rate": round(success, 3),
+                "latency": round(latency, 2),
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "consecutive_failures": stats.consecutive_failures,
+                "circuit_open": stats.open_until > now,
+                "open_for": max(0, int(stats.open_until - now)),
+            }
+        return snapshot
+
+
+# Separate scoreboards: some provider names (e.g. AnyProvider) exist in both systems
+text_provider_health = ProviderHealthTracker("text")
+image_provider_health = ProviderHealthTracker("image")
@@ -1,135 +1,286 @@
+"""
+Per-user request guard: one text and one image request at a time
+
+Running requests are tracked in user_request_states. Each started request
+also gets an entry in a min-heap ordered by its timeout, so the cleanup
+scheduler only touches requests that have actually expired instead of
+scanning every tracked user. Heap entries are not removed when a request
+finishes; they are recognised as stale (start time no longer matches)
+when they reach the top and dropped.
+"""
+
 import asyncio
+import heapq
 import time
 import logging
-from typing import Dict, Set, Optional, Tuple
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+from config import REQUEST_STATE_BACKEND
+from modules.core.request_state_backend import LEASE_TTL, create_backend
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Requests running longer than this are treated as stuck (seconds)
+IMAGE_REQUEST_TIMEOUT = 600.0
+TEXT_REQUEST_TIMEOUT = 300.0
+
+# Seconds between background expiry passes
+CLEANUP_INTERVAL = 60
+
+# A slot claimed by can_start_*_request but never started is freed after this (seconds)
+RESERVATION_TIMEOUT = LEASE_TTL
+
+# Lease store shared with the other bot processes (or local to this one)
+request_state_backend = create_backend(REQUEST_STATE_BACKEND)
+
+@dataclass(slots=True)
 class UserRequestState:
-    """Track a user's current request states"""
+    """Track a user's current request states (a start time of 0 means idle)"""
     user_id: int
-    image_processing: bool = False
-    text_processing: bool = False
-    image_start_time: float = field(default=0.0)
-    text_start_time: float = field(default=0.0)
-    image_task_info: str = field(default="")
-    text_task_info: str = field(default="")
-    
-    def is_image_expired(self, timeout: float = 600.0) -> bool:
+    image_start_time: float = 0.0
+    text_start_time: float = 0.0
+    image_task_info: str = ""
+    text_task_info: str = ""
+    # Generation of the backend lease held by the current request (0: none)
+    image_lease: int = 0
+    text_lease: int = 0
+    
+    @property
+    def image_processing(self) -> bool:
+        return self.image_start_time > 0.0
+    
+    @property
+    def text_processing(self) -> bool:
+        return self.text_start_time > 0.0
+    
+    @property
+    def is_idle(self) -> bool:
+        return not self.image_start_time and not self.text_start_time
+    
+    def is_image_expired(self, timeout: float = IMAGE_REQUEST_TIMEOUT) -> bool:
         """Check if image request has expired (default 10 minutes)"""
         if not self.image_processing:
             return False
         return time.time() - self.image_start_time > timeout
     
-    def is_text_expired(self, timeout: float = 300.0) -> bool:
+    def is_text_expired(self, timeout: float = TEXT_REQUEST_TIMEOUT) -> bool:
         """Check if text request has expired (default 5 minutes)"""
         if not self.text_processing:
             return False
         return time.time() - self.text_start_time > timeout
     
+    def reserve_image_request(self) -> None:
+        """Claim the image slot while the shared lease is being acquired"""
+        self.image_start_time = time.time()
+        self.image_task_info = ""
+        _schedule_expiry(self.image_start_time + RESERVATION_TIMEOUT, self.user_id, "image", self.image_start_time)
+    
+    def reserve_text_request(self) -> None:
+        """Claim the text slot while the shared lease is being acquired"""
+        self.text_start_time = time.time()
+        self.text_task_info = ""
+        _schedule_expiry(self.text_start_time + RESERVATION_TIMEOUT, self.user_id, "text", self.text_start_time)
+    
     def start_image_request(self, task_info: str = "") -> None:
         """Start an image request"""
-        self.image_processing = True
         self.image_start_time = time.time()
         self.image_task_info = task_info
+        _schedule_expiry(self.image_start_time + IMAGE_REQUEST_TIMEOUT, self.user_id, "image", self.image_start_time)
         logger.info(f"Started image request for user {self.user_id}: {task_info}")
     
     def start_text_request(self, task_info: str = "") -> None:
         """Start a text request"""
-        self.text_processing = True
         self.text_start_time = time.time()
         self.text_task_info = task_info
+        _schedule_expiry(self.text_start_time + TEXT_REQUEST_TIMEOUT, self.user_id, "text", self.text_start_time)
         logger.info(f"Started text request for user {self.user_id}: {task_info}")
     
     def finish_image_request(self) -> None:
         """Finish an image request"""
-        self.image_processing = False
         self.image_start_time = 0.0
         self.image_task_info = ""
+        self.image_lease = 0
         logger.info(f"Finished image request for user {self.user_id}")
     
     def finish_text_request(self) -> None:
         """Finish a text request"""
-        self.text_processing = False
         self.text_start_time = 0.0
         self.text_task_info = ""
+        self.text_lease = 0
         logger.info(f"Finished text request for user {self.user_id}")
 
-# Global request state tracker
+# Global request state tracker (only users with a running request are kept)
 user_request_states: Dict[int, UserRequestState] = {}
 
+# Expiry index: (deadline, user_id, kind, start_time), smallest deadline first
+_expiry_heap: List[Tuple[float, int, str, float]] = []
+
+def _schedule_expiry(deadline: float, user_id: int, kind: str, start_time: float) -> None:
+    heapq.heappush(_expiry_heap, (deadline, user_id, kind, start_time))
+    # Finished requests leave stale entries behind; rebuild once they dominate the heap
+    if len(_expiry_heap) > 1024 and len(_expiry_heap) > 4 * len(user_request_states):
+        _compact_expiry_heap()
+
+def _compact_expiry_heap() -> None:
+    live = []
+    for entry in _expiry_heap:
+        _, user_id, kind, start_time = entry
+        state = user_request_states.get(user_id)
+        if state is not None and getattr(state, f"{kind}_start_time") == start_time:
+            live.append(entry)
+    heapq.heapify(live)
+    _expiry_heap[:] = live
+
 def get_user_state(user_id: int) -> UserRequestState:
     """Get or create a user's request state"""
-    if user_id not in user_request_states:
-        user_request_states[user_id] = UserRequestState(user_id)
-    return user_request_states[user_id]
-
-def cleanup_expired_requests() -> None:
-    """Clean up expired requests"""
-    current_time = time.time()
-    for user_id, state in list(user_request_states.items()):
-        if state.is_image_expired():
-            logger.warning(f"Force cleaning expired image request for user {user_id}")
+    state = user_request_states.get(user_id)
+    if state is None:
+        state = user_request_states[user_id] = UserRequestState(user_id)
+    return state
+
+def _discard_if_idle(state: UserRequestState) -> None:
+    if state.is_idle and user_request_states.get(state.user_id) is state:
+        del user_request_states[state.user_id]
+
+def cleanup_expired_requests(now: Optional[float] = None) -> int:
+    """
+    Force-finish requests whose timeout has passed.
+    
+    Only heap entries that are due are examined, so the cost is proportional
+    to the number of expirations rather than the number of tracked users.
+    
+    Returns:
+        Number of requests force-finished
+    """
+    now = time.time() if now is None else now
+    expired = 0
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        _, user_id, kind, start_time = heapq.heappop(_expiry_heap)
+        state = user_request_states.get(user_id)
+        if state is None or getattr(state, f"{kind}_start_time") != start_time:
+            # Finished (or restarted) since this entry was scheduled
+            continue
+        logger.warning(f"Force cleaning expired {kind} request for user {user_id}")
+        lease = getattr(state, f"{kind}_lease")
+        if kind == "image":
             state.finish_image_request()
-        
-        if state.is_text_expired():
-            logger.warning(f"Force cleaning expired text request for user {user_id}")
+        else:
             state.finish_text_request()
-        
-        # Remove empty states
-        if not state.image_processing and not state.text_processing:
-            if current_time - max(state.image_start_time, state.text_start_time) > 300:  # 5 minutes
-                del user_request_states[user_id]
+        request_state_backend.release(user_id, kind, lease)
+        _discard_if_idle(state)
+        expired += 1
+    return expired
 
 async def can_start_image_request(user_id: int) -> Tuple[bool, str]:
-    """Check if user can start an image request"""
-    cleanup_expired_requests()
+    """
+    Check if user can start an image request, and claim the slot if so.
+    
+    When this returns True the caller must call start_image_request, or
+    finish_image_request if it decides not to run the request after all.
+    """
+    # O(1): expired requests are swept by the background scheduler, and a
+    # request of this user that expired since the last sweep is caught here
     state = get_user_state(user_id)
+    busy_message = "⏳ Your previous image request is being processed. Please wait for that to be complete."
     
     if state.image_processing:
         if not state.is_image_expired():
-            return False, "⏳ Your previous image request is being processed. Please wait for that to be complete."
+            return False, busy_message
         else:
             # Auto-cleanup expired request
             state.finish_image_request()
     
+    # Claim the slot before awaiting the backend, so another message from
+    # this user cannot pass the check above in the meantime
+    state.reserve_image_request()
+    reserved_at = state.image_start_time
+    
+    # Another bot process may be running a request for this user
+    lease = await request_state_backend.acquire(user_id, "image")
+    if state.image_start_time != reserved_at:
+        # The reservation was swept while waiting on the backend
+        if lease:
+            request_state_backend.release(user_id, "image", lease)
+        return False, busy_message
+    if not lease:
+        state.finish_image_request()
+        _discard_if_idle(state)
+        return False, busy_message
+    state.image_lease = lease
+    
     return True, ""
 
 async def can_start_text_request(user_id: int) -> Tuple[bool, str]:
-    """Check if user can start a text request"""
-    cleanup_expired_requests()
+    """
+    Check if user can start a text request, and claim the slot if so.
+    
+    When this returns True the caller must call start_text_request, or
+    finish_text_request if it decides not to run the request after all.
+    """
+    # O(1): expired requests are swept by the background scheduler, and a
+    # request of this user that expired since the last sweep is caught here
     state = get_user_state(user_id)
+    busy_message = "⏳ Your previous request is being processed. Please wait for that to be complete."
     
     if state.text_processing:
         if not state.is_text_expired():
-            return False, "⏳ Your previous request is being processed. Please wait for that to be complete."
+            return False, busy_message
         else:
             # Auto-cleanup expired request
             state.finish_text_request()
     
+    # Claim the slot before awaiting the backend, so another message from
+    # this user cannot pass the check above in the meantime
+    state.reserve_text_request()
+    reserved_at = state.text_start_time
+    
+    # Another bot process may be running a request for this user
+    lease = await request_state_backend.acquire(user_id, "text")
+    if state.text_start_time != reserved_at:
+        # The reservation was swept while waiting on the backend
+        if lease:
+            request_state_backend.release(user_id, "text", lease)
+        return False, busy_message
+    if not lease:
+        state.finish_text_request()
+        _discard_if_idle(state)
+        return False, busy_message
+    state.text_lease = lease
+    
     return True, ""
 
 def start_image_request(user_id: int, task_info: str = "") -> None:
     """Start an image request for a user"""
     state = get_user_state(user_id)
     state.start_image_request(task_info)
+    request_state_backend.started(user_id, "image", state.image_lease, task_info, IMAGE_REQUEST_TIMEOUT)
 
 def start_text_request(user_id: int, task_info: str = "") -> None:
     """Start a text request for a user"""
     state = get_user_state(user_id)
     state.start_text_request(task_info)
+    request_state_backend.started(user_id, "text", state.text_lease, task_info, TEXT_REQUEST_TIMEOUT)
 
 def finish_image_request(user_id: int) -> None:
     """Finish an image request for a user"""
-    if user_id in user_request_states:
-        user_request_states[user_id].finish_image_request()
+    state = user_request_states.get(user_id)
+    if state is None:
+        return
+    lease = state.image_lease
+    state.finish_image_request()
+    _discard_if_idle(state)
+    request_state_backend.release(user_id, "image", lease)
 
 def finish_text_request(user_id: int) -> None:
     """Finish a text request for a user"""
-    if user_id in user_request_states:
-        user_request_states[user_id].finish_text_request()
+    state = user_request_states.get(user_id)
+    if state is None:
+        return
+    lease = state.text_lease
+    state.finish_text_request()
+    _discard_if_idle(state)
+    request_state_backend.release(user_id, "text", lease)
 
 def get_user_request_status(user_id: int) -> Dict[str, any]:
     """Get current request status for a user"""
@@ -152,7 +303,7 @@ async def start_cleanup_scheduler():
     while True:
         try:
             cleanup_expired_requests()
-            await asyncio.sleep(60)  # Clean up every minute
+            await asyncio.sleep(CLEANUP_INTERVAL)
         except Exception as e:
             logger.error(f"Error in cleanup scheduler: {e}")
-            await asyncio.sleep(60) 
\ No newline at end of file
+            await asyncio.sleep(CLEANUP_INTERVAL) 
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Request lock backends for modules.core.request_queue
+
+request_queue allows one text and one image request per user at a time.
+Its state dict only covers the current process, so with MULTIPLE_BOTS a
+user talking to two bot instances could run jobs in parallel. A backend
+holds the same locks as leases that every bot process can see:
+
+- LocalRequestStateBackend: in-memory, for a single process. Acquire and
+  release never leave the process.
+- MongoLeaseBackend: one document per (user, kind) in the request_leases
+  collection. A lease is taken with a single conditional upsert, so two
+  processes can never both hold it, and it carries an expiry that the
+  owning process keeps pushing forward with a heartbeat while the request
+  runs. If that process dies, its leases lapse after LEASE_TTL seconds.
+
+Every acquired lease gets a generation number, which request_queue keeps
+with the request that holds it; heartbeats and releases only touch the
+lease of that generation, so a late release from a finished request
+cannot drop the lease of the request that followed it.
+
+The backend is chosen with config.REQUEST_STATE_BACKEND.
+"""
+
+import asyncio
+import datetime
+import itertools
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Seconds a lease stays valid without a heartbeat
+LEASE_TTL = 60.0
+
+# Seconds between heartbeats for running requests
+HEARTBEAT_INTERVAL = 20.0
+
+LEASE_COLLECTION = "request_leases"
+
+
+def make_owner_id() -> str:
+    """Identifier of this bot process, unique across hosts and restarts"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LocalRequestStateBackend:
+    """
+    In-process lease table.
+
+    Used in single-bot mode, and as the stand-in for the shared backend in
+    tests. All operations complete synchronously.
+    """
+
+    name = "local"
+
+    def __init__(self, owner: Optional[str] = None):
+        self.owner = owner or make_owner_id()
+        # (user_id, kind) -> (owner, expires_at monotonic, generation)
+        self._leases: Dict[Tuple[int, str], Tuple[str, float, int]] = {}
+        self._generation_counter = itertools.count(1)
+
+    async def acquire(self, user_id: int, kind: str, owner: Optional[str] = None) -> Optional[int]:
+        """Take the lease unless another owner holds an unexpired one; returns its generation"""
+        owner = owner or self.owner
+        key = (user_id, kind)
+        now = time.monotonic()
+        held = self._leases.get(key)
+        if held is not None and held[0] != owner and held[1] > now:
+            return None
+        generation = next(self._generation_counter)
+        self._leases[key] = (owner, now + LEASE_TTL, generation)
+        return generation
+
+    def started(self, user_id: int, kind: str, generation: int, task_info: str, max_duration: float) -> None:
+        """The request owning the lease has started; keep it alive for up to max_duration"""
+        key = (user_id, kind)
+        held = self._leases.get(key)
+        if held is not None and held[0] == self.owner and held[2] == generation:
+            self._leases[key] = (self.owner, time.monotonic() + max_duration, generation)
+
+    def release(self, user_id: int, kind: str, generation: Optional[int] = None, owner: Optional[str] = None) -> None:
+        """Drop the lease if it is held by owner (and is of the given generation)"""
+        owner = owner or self.owner
+        key = (user_id, kind)
+        held = self._leases.get(key)
+        if held is not None and held[0] == owner and generation in (None, held[2]):
+            del self._leases[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"backend": self.name, "leases": len(self._leases)}
+
+
+class MongoLeaseBackend:
+    """
+    Lease table in MongoDB, shared by every bot process.
+
+    A lease document is {_id: "<user_id>:<kind>", owner, generation,
+    expires_at, task}. Acquiring matches the document only when it is free
+    (expired or owned by us) and upserts it; if another owner holds it, the
+    upsert collides with the existing _id and fails with DuplicateKeyError.
+    A TTL index removes lapsed documents, but correctness only depends on
+    expires_at.
+    """
+
+    name = "mongo"
+
+    def __init__(self, owner: Optional[str] = None, lease_ttl: float = LEASE_TTL,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.owner = owner or make_owner_id()
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        # Leases this process is renewing: (user_id, kind) -> (deadline monotonic, generation)
+        self._running: Dict[Tuple[int, str], Tuple[float, int]] = {}
+        self._generation_counter = itertools.count(1)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._indexed = False
+        self._stats = {"acquired": 0, "contended": 0, "released": 0, "heartbeats": 0, "errors": 0}
+
+    def _collection(self):
+        from modules.core.async_database import async_db_service
+        collection = async_db_service.get_collection(LEASE_COLLECTION)
+        if not self._indexed:
+            try:
+                collection.sync.create_index("expires_at", expireAfterSeconds=0)
+            except Exception as e:
+                logger.warning(f"Could not create request lease TTL index: {e}")
+            self._indexed = True
+        return collection
+
+    @staticmethod
+    def _lease_id(user_id: int, kind: str) -> str:
+        return f"{user_id}:{kind}"
+
+    def _expiry(self, seconds: float) -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+
+    async def acquire(self, user_id: int, kind: str, owner: Optional[str] = None) -> Optional[int]:
+        """
+        Atomically take the lease for a user's request kind.
+
+        Returns:
+            The generation of the lease if this owner now holds it, else
+            None. If the database is unreachable the request is allowed, so
+            an outage does not lock every user out.
+        """
+        owner = owner or self.owner
+        now = datetime.datetime.now(datetime.timezone.utc)
+        generation = next(self._generation_counter)
+        try:
+            await self._collection().update_one(
+                {
+                    "_id": self._lease_id(user_id, kind),
+                    "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}],
+                },
+                {"$set": {"owner": owner, "generation": generation, "expires_at": self._expiry(self.lease_ttl), "task": ""}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            self._stats["contended"] += 1
+            return None
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"Request lease acquire failed for user {user_id}, allowing request: {e}")
+            return generation
+        self._stats["acquired"] += 1
+        return generation
+
+    def started(self, user_id: int, kind: str, generation: int, task_info: str, max_duration: float) -> None:
+        """Begin heartbeating the lease until the request finishes or max_duration passes"""
+        if not generation:
+            # Started without a lease of its own (e.g. a follow-up step of a request)
+            return
+        self._running[(user_id, kind)] = (time.monotonic() + max_duration, generation)
+        self._spawn(self._collection().update_one(
+            {"_id": self._lease_id(user_id, kind), "owner": self.owner, "generation": generation},
+            {"$set": {"task": task_info, "expires_at": self._expiry(self.lease_ttl)}},
+        ))
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            try:
+                self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+            except RuntimeError:
+                pass
+
+    def release(self, user_id: int, kind: str, generation: Optional[int] = None, owner: Optional[str] = None) -> None:
+        """Release the lease in the background; only the owner's lease of that generation is removed"""
+        owner = owner or self.owner
+        key = (user_id, kind)
+        running = self._running.get(key)
+        if running is not None and generation in (None, running[1]):
+            del self._running[key]
+        if generation == 0:
+            return
+        self._stats["released"] += 1
+        lease_filter = {"_id": self._lease_id(user_id, kind), "owner": owner}
+        if generation is not None:
+            lease_filter["generation"] = generation
+        self._spawn(self._collection().delete_one(lease_filter))
+
+    def _spawn(self, coro) -> None:
+        async def _run():
+            try:
+                await coro
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Request lease update failed: {e}")
+        try:
+            asyncio.get_running_loop().create_task(_run())
+        except RuntimeError:
+            # No event loop (shutdown, scripts): the lease will lapse on its own
+            coro.close()
+
+    async def heartbeat(self) -> None:
+        """Extend every lease whose request is still running"""
+        now = time.monotonic()
+        for key, (deadline, _) in list(self._running.items()):
+            if deadline <= now:
+                # Request outlived its timeout; stop renewing and let it lapse
+                del self._running[key]
+        if not self._running:
+            return
+        leases = [{"_id": self._lease_id(user_id, kind), "generation": generation}
+                  for (user_id, kind), (_, generation) in self._running.items()]
+        await self._collection().update_many(
+            {"$or": leases, "owner": self.owner},
+            {"$set": {"expires_at": self._expiry(self.lease_ttl)}},
+        )
+        self._stats["heartbeats"] += 1
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Request lease heartbeat failed: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["backend"] = self.name
+        stats["running"] = len(self._running)
+        return stats
+
+
+def create_backend(name: str):
+    """Build the backend named by config.REQUEST_STATE_BACKEND"""
+    if name == "mongo":
+        return MongoLeaseBackend()
+    if name != "local":
+        logger.warning(f"Unknown REQUEST_STATE_BACKEND '{name}', using local")
+    return LocalRequestStateBackend()
@@ -0,0 +1,345 @@
+"""
+Fair-share job scheduler for provider-bound work
+
+request_queue makes sure a user runs at most one text and one image request
+at a time, but nothing bounded how many provider jobs the whole process ran
+at once. This scheduler sits on top of it: every feature (text, image,
+vision, voice, video) has a global concurrency limit, and jobs that do not
+fit wait in a queue.
+
+Waiting jobs are ordered per feature in two lanes:
+
+- Priority lane: premium users and admins. Served first, except that a
+  standard job is let through after PRIORITY_BURST priority jobs in a row
+  so the standard lane never starves.
+- Standard lane: everyone else.
+
+Within a lane, jobs are ordered by weighted fair queuing: each job gets a
+virtual finish tag from a per-lane virtual clock. A user who submits
+several jobs gets their later jobs tagged further in the virtual future,
+so users are served alternately rather than first-come-first-served.
+
+While a job waits, the scheduler reports its queue position through an
+optional callback, which handlers use to update their waiting message:
+
+    async with job_scheduler.slot("text", user_id, on_position=report_queue_position(temp)):
+        response = await get_response_async(history, model=model)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import ADMINS
+
+logger = logging.getLogger(__name__)
+
+# Jobs per feature that may run at the same time in one bot process
+FEATURE_LIMITS = {
+    "text": 32,
+    "image": 6,
+    "vision": 6,
+    "voice": 8,
+    "video": 2,
+}
+
+# Priority jobs granted in a row before a waiting standard job gets a turn
+PRIORITY_BURST = 3
+
+# Seconds between queue position updates for a waiting job
+POSITION_UPDATE_INTERVAL = 3.0
+
+PositionCallback = Callable[[int], Awaitable[Any]]
+
+
+@dataclass(eq=False)
+class ScheduledJob:
+    """A job waiting for (or holding) a slot of a feature"""
+    feature: str
+    user_id: int
+    priority: bool
+    # Virtual start and finish times; lanes are ordered by finish tag
+    start: float
+    tag: float
+    seq: int
+    future: "asyncio.Future" = field(repr=False)
+    enqueued_at: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+
+class FeatureQueue:
+    """Concurrency limit plus two fair-queued lanes for one feature"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.running = 0
+        # lane (True = priority) -> heap of (tag, seq, job)
+        self._lanes: Dict[bool, List[Tuple[float, int, ScheduledJob]]] = {True: [], False: []}
+        self._waiting: Dict[bool, int] = {True: 0, False: 0}
+        self._virtual_time: Dict[bool, float] = {True: 0.0, False: 0.0}
+        # (lane, user_id) -> finish tag of the user's last queued job, and its pending count
+        self._user_tags: Dict[Tuple[bool, int], float] = {}
+        self._user_pending: Dict[Tuple[bool, int], int] = {}
+        self._priority_streak = 0
+        self._seq = itertools.count()
+        self._stats = {
+            "granted": 0,
+            "queued": 0,
+            "priority_granted": 0,
+            "cancelled": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting[True] + self._waiting[False]
+
+    def submit(self, user_id: int, priority: bool, weight: float = 1.0) -> ScheduledJob:
+        """Queue a job, granting it immediately if a slot is free and nobody is waiting"""
+        lane_key = (priority, user_id)
+        start = max(self._virtual_time[priority], self._user_tags.get(lane_key, 0.0))
+        job = ScheduledJob(
+            feature=self.name,
+            user_id=user_id,
+            priority=priority,
+            start=start,
+            tag=start + 1.0 / weight,
+            seq=next(self._seq),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        if self.running < self.limit and not self.waiting:
+            self._grant(job)
+            return job
+
+        self._user_tags[lane_key] = job.tag
+        self._user_pending[lane_key] = self._user_pending.get(lane_key, 0) + 1
+        heapq.heappush(self._lanes[priority], (job.tag, job.seq, job))
+        self._waiting[priority] += 1
+        self._stats["queued"] += 1
+        return job
+
+    def _grant(self, job: ScheduledJob) -> None:
+        self.running += 1
+        wait = time.monotonic() - job.enqueued_at
+        self._stats["granted"] += 1
+        self._stats["total_wait"] += wait
+        self._stats["max_wait"] = max(self._stats["max_wait"], wait)
+        if job.priority:
+            self._stats["priority_granted"] += 1
+        job.future.set_result(True)
+
+    def _pop(self, priority: bool) -> Optional[ScheduledJob]:
+        lane = self._lanes[priority]
+        while lane:
+            _, _, job = heapq.heappop(lane)
+            if job.cancelled:
+                continue
+            self._waiting[priority] -= 1
+            self._virtual_time[priority] = max(self._virtual_time[priority], job.start)
+            lane_key = (priority, job.user_id)
+            self._user_pending[lane_key] -= 1
+            if not self._user_pending[lane_key]:
+                del self._user_pending[lane_key]
+                self._user_tags.pop(lane_key, None)
+            return job
+        return None
+
+    def _next_lane(self) -> Optional[bool]:
+        has_priority, has_standard = self._waiting[True] > 0, self._waiting[False] > 0
+        if has_priority and (not has_standard or self._priority_streak < PRIORITY_BURST):
+            return True
+        if has_standard:
+            return False
+        return None
+
+    def dispatch(self) -> None:
+        """Grant free slots to the next jobs in line"""
+        while self.running < self.limit:
+            lane = self._next_lane()
+            if lane is None:
+                return
+            job = self._pop(lane)
+            if job is None:
+                continue
+            self._priority_streak = self._priority_streak + 1 if lane else 0
+            self._grant(job)
+
+    def release(self) -> None:
+        self.running -= 1
+        self.dispatch()
+
+    def cancel(self, job: ScheduledJob) -> None:
+        """Withdraw a job whose caller gave up, or release its slot if it was already granted"""
+        if job.cancelled:
+            return
+        job.cancelled = True
+        if job.future.done() and not job.future.cancelled():
+            self.release()
+            return
+        job.future.cancel()
+        self._waiting[job.priority] -= 1
+        lane_key = (job.priority, job.user_id)
+        self._user_pending[lane_key] -= 1
+        if not self._user_pending[lane_key]:
+            del self._user_pending[lane_key]
+            self._user_tags.pop(lane_key, None)
+        self._stats["cancelled"] += 1
+
+    def position(self, job: ScheduledJob) -> int:
+        """1-based place of a waiting job in the queue (0 once it is running)"""
+        if job.future.done():
+            return 0
+        ahead = sum(
+            1 for tag, seq, other in self._lanes[job.priority]
+            if not other.cancelled and (tag, seq) < (job.tag, job.seq)
+        )
+        if not job.priority:
+            # Priority jobs are served first (bursts aside)
+            ahead += self._waiting[True]
+        return ahead + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["limit"] = self.limit
+        stats["running"] = self.running
+        stats["waiting"] = self.waiting
+        stats["avg_wait"] = round(stats["total_wait"] / stats["granted"], 3) if stats["granted"] else 0.0
+        del stats["total_wait"]
+        return stats
+
+
+class JobScheduler:
+    """Per-feature fair queues with global concurrency limits"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(FEATURE_LIMITS if limits is None else limits)
+        self._queues: Dict[str, FeatureQueue] = {}
+
+    def _queue(self, feature: str) -> FeatureQueue:
+        queue = self._queues.get(feature)
+        if queue is None:
+            if feature not in self.limits:
+                raise ValueError(f"Unknown scheduler feature: {feature}")
+            queue = self._queues[feature] = FeatureQueue(feature, self.limits[feature])
+        return queue
+
+    @staticmethod
+    async def is_priority_user(user_id: int) -> bool:
+        """Premium users and admins use the priority lane"""
+        if user_id in ADMINS:
+            return True
+        from modules.core.user_context import get_user_context
+        try:
+            return (await get_user_context(user_id)).is_premium
+        except Exception as e:
+            logger.warning(f"Could not resolve priority for user {user_id}: {e}")
+            return False
+
+    async def acquire(
+        self,
+        feature: str,
+        user_id: int,
+        on_position: Optional[PositionCallback] = None,
+        priority: Optional[bool] = None,
+        weight: float = 1.0,
+    ) -> ScheduledJob:
+        """
+        Wait for a slot of a feature.
+
+        Args:
+            feature: One of FEATURE_LIMITS
+            user_id: Telegram user ID, used for fair sharing
+            on_position: Awaited with the queue position whenever it changes
+                while waiting, and with 0 once the job starts (only if it had
+                to wait)
+            priority: Force the lane; by default premium users and admins
+                get the priority lane
+            weight: Share of the lane relative to other users (default 1)
+
+        Returns:
+            The granted job, to be passed to release()
+        """
+        queue = self._queue(feature)
+        if priority is None:
+            priority = await self.is_priority_user(user_id)
+        job = queue.submit(user_id, priority, weight)
+        if job.future.done():
+            return job
+
+        last_position = None
+        try:
+            while True:
+                position = queue.position(job)
+                if on_position is not None and position != last_position:
+                    last_position = position
+                    await self._report(on_position, position)
+                try:
+                    await asyncio.wait_for(asyncio.shield(job.future), POSITION_UPDATE_INTERVAL)
+                    break
+                except asyncio.TimeoutError:
+                    continue
+        except BaseException:
+            queue.cancel(job)
+            raise
+
+        if on_position is not None and last_position is not None:
+            await self._report(on_position, 0)
+        return job
+
+    @staticmethod
+    async def _report(on_position: PositionCallback, position: int) -> None:
+        try:
+            await on_position(position)
+        except Exception as e:
+            logger.debug(f"Queue position callback failed: {e}")
+
+    def release(self, job: ScheduledJob) -> None:
+        """Free the slot held by a granted job"""
+        self._queue(job.feature).cancel(job)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        feature: str,
+        user_id: int,
+        on_position: Optional[PositionCallback] = None,
+        priority: Optional[bool] = None,
+    ):
+        """Hold a slot of a feature for the duration of the block"""
+        job = await self.acquire(feature, user_id, on_position=on_position, priority=priority)
+        try:
+            yield job
+        finally:
+            self.release(job)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-feature counters for monitoring"""
+        return {name: queue.get_stats() for name, queue in self._queues.items()}
+
+
+def report_queue_position(waiting_message) -> PositionCallback:
+    """
+    Position callback that shows the queue position in a waiting message.
+
+    The message is marked with `_queue_position` so the status cycling of
+    the waiting indicator service leaves it alone while the job waits.
+    """
+    async def report(position: int) -> None:
+        waiting_message._queue_position = position
+        if position:
+            text = f"⏳ Lots of requests right now. You're #{position} in the queue..."
+        else:
+            text = "✨ Your turn! Working on your request..."
+        await waiting_message.edit_text(text)
+    return report
+
+
+# Global scheduler instance
+job_scheduler = JobScheduler()
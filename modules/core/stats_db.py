@@ -9,6 +9,7 @@ import datetime
 import logging
 from typing import Dict, Any, Optional, List, Union
 from modules.core.database import db_service
+from modules.core.write_behind import write_behind
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -57,48 +58,37 @@ async def increment_stat(stat_type: str, user_id: Optional[int] = None,
         if group_id:
             metadata["group_id"] = group_id
         
+        # Counter updates are buffered and coalesced, see modules.core.write_behind
         # 1. Update global stats collection
-        stats_coll = db_service.get_collection(STATS_COLLECTION)
-        stats_coll.update_one(
+        write_behind.update(
+            STATS_COLLECTION,
             {"stats_id": "global"},
-            {"$inc": {f"total_{stat_type}": 1, "total_operations": 1}},
-            upsert=True
+            {"$inc": {f"total_{stat_type}": 1, "total_operations": 1}}
         )
         
         # 2. Update user stats if user_id provided
         if user_id:
-            user_stats_coll = db_service.get_collection(USER_STATS_COLLECTION)
-            user_stats_coll.update_one(
-                {"user_id": user_id},
-                {
-                    "$inc": {
-                        f"total_{stat_type}": 1,
-                        "total_operations": 1
-                    },
-                    "$set": {"last_activity": now}
+            user_stats_update = {
+                "$inc": {
+                    f"total_{stat_type}": 1,
+                    "total_operations": 1
                 },
-                upsert=True
-            )
-            
+                "$set": {"last_activity": now}
+            }
             # If this is a new user stat, update the user's created_at timestamp
             if stat_type == STAT_TYPE_NEW_USER:
-                user_stats_coll.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"created_at": now}},
-                    upsert=True
-                )
+                user_stats_update["$set"]["created_at"] = now
+            write_behind.update(USER_STATS_COLLECTION, {"user_id": user_id}, user_stats_update)
         
         # 3. Update daily stats
-        daily_stats_coll = db_service.get_collection(DAILY_STATS_COLLECTION)
-        daily_stats_coll.update_one(
+        write_behind.update(
+            DAILY_STATS_COLLECTION,
             {"date": today_date},
-            {"$inc": {f"{stat_type}_count": 1, "total_operations": 1}},
-            upsert=True
+            {"$inc": {f"{stat_type}_count": 1, "total_operations": 1}}
         )
         
         # 4. Store detailed stat record for analysis
-        detailed_stats_coll = db_service.get_collection(f"detailed_{stat_type}_stats")
-        detailed_stats_coll.insert_one(metadata)
+        write_behind.insert(f"detailed_{stat_type}_stats", metadata)
         
         return True
     except Exception as e:
@@ -122,10 +112,6 @@ async def update_user_activity(user_id: int, username: Optional[str] = None,
     try:
         now = datetime.datetime.now()
         
-        # Get user collection directly
-        from modules.core.database import get_user_collection
-        user_coll = get_user_collection()
-        
         # Build update document
         update_doc = {"$set": {"last_activity": now}}
         
@@ -138,18 +124,9 @@ async def update_user_activity(user_id: int, username: Optional[str] = None,
         if name:
             update_doc["$set"]["name"] = name
         
-        # Update the user document
-        user_coll.update_one(
-            {"user_id": user_id},
-            update_doc,
-            upsert=True
-        )
-        
-        # Also increment activity count
-        user_coll.update_one(
-            {"user_id": user_id},
-            {"$inc": {"activity_count": 1}}
-        )
+        # Update the user document and increment the activity count in one buffered write
+        update_doc["$inc"] = {"activity_count": 1}
+        write_behind.update("users", {"user_id": user_id}, update_doc)
         
         return True
     except Exception as e:
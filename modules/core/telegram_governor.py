@@ -0,0 +1,379 @@
+"""
+Outbound rate governor for Telegram API calls
+
+Flood limits used to be handled call by call: a try/except here, a fixed
+sleep there, and progress displays that edited as fast as their loops ran.
+The governor wraps the send and edit methods of the bot client, so every
+path (client.send_message, message.reply_text, callback_query.edit_message_text,
+...) is paced in one place:
+
+- Token buckets per chat (about one message per second in private chats,
+  twenty per minute in groups) and one global bucket for the bot (about
+  thirty per second).
+- Priorities: replies go before edits, edits before bulk sends
+  (broadcasts), and chat actions are cosmetic - they are dropped instead
+  of queued when the chat has no capacity to spare. Chat actions have
+  their own per-chat bucket, so typing indicators never use up the
+  chat's message allowance.
+- Edits of the same message that are still waiting are coalesced: the
+  waiting call takes the newest arguments, so only the latest text is
+  sent, and every superseded caller gets the result of that one call.
+- FloodWait pauses the chat's bucket and the call is retried, unless the
+  wait is too long or the call is a bulk send (the broadcast engine paces
+  itself).
+
+Usage:
+    outbound_governor.install(client)
+
+    # Mark calls made from a task as bulk traffic
+    outbound_priority.set(PRIORITY_BULK)
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pyrogram.errors import FloodWait
+
+logger = logging.getLogger(__name__)
+
+# Call priorities, lower is served first
+PRIORITY_REPLY = 0
+PRIORITY_EDIT = 1
+PRIORITY_BULK = 2
+PRIORITY_COSMETIC = 3
+
+# Global bucket: calls per second for the whole bot, and burst size
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+
+# Private chats: about one message per second, with a small burst
+PRIVATE_CHAT_RATE = 1.0
+PRIVATE_CHAT_BURST = 4
+
+# Groups and channels: about twenty messages per minute
+GROUP_CHAT_RATE = 20 / 60
+GROUP_CHAT_BURST = 5
+
+# Chat actions, per chat: one every few seconds (an action shows for about five)
+CHAT_ACTION_RATE = 1 / 4.0
+CHAT_ACTION_BURST = 1
+
+# FloodWait retries per call, and the longest wait that is retried rather than raised
+MAX_FLOOD_RETRIES = 2
+MAX_RETRY_WAIT = 30.0
+
+# Idle chat buckets are pruned once more than this many exist
+MAX_CHAT_BUCKETS = 5000
+
+# Governed client methods and their default priority
+GOVERNED_METHODS = {
+    "send_message": PRIORITY_REPLY,
+    "send_photo": PRIORITY_REPLY,
+    "send_document": PRIORITY_REPLY,
+    "send_video": PRIORITY_REPLY,
+    "send_audio": PRIORITY_REPLY,
+    "send_voice": PRIORITY_REPLY,
+    "send_animation": PRIORITY_REPLY,
+    "send_sticker": PRIORITY_REPLY,
+    "send_media_group": PRIORITY_REPLY,
+    "copy_message": PRIORITY_REPLY,
+    "forward_messages": PRIORITY_REPLY,
+    "edit_message_text": PRIORITY_EDIT,
+    "edit_message_caption": PRIORITY_EDIT,
+    "edit_message_reply_markup": PRIORITY_EDIT,
+    "edit_message_media": PRIORITY_EDIT,
+    "edit_inline_text": PRIORITY_EDIT,
+    "edit_inline_caption": PRIORITY_EDIT,
+    "edit_inline_reply_markup": PRIORITY_EDIT,
+    "edit_inline_media": PRIORITY_EDIT,
+    "send_chat_action": PRIORITY_COSMETIC,
+}
+
+# Inline message edits are addressed by inline_message_id instead of chat and message
+INLINE_METHODS = {"edit_inline_text", "edit_inline_caption", "edit_inline_reply_markup", "edit_inline_media"}
+
+# Priority floor for calls made in the current task (e.g. PRIORITY_BULK for broadcasts)
+outbound_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("outbound_priority", default=None)
+
+
+class PriorityBucket:
+    """
+    Token bucket whose waiters are served by (priority, arrival).
+
+    Waiters are woken by a single timer set for the moment the next token
+    is available, so a waiting call costs no polling.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return not self._waiters and self._tokens >= self.capacity
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_take(self) -> bool:
+        """Take a token if one is available right now"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def take(self, priority: int, seq: int) -> None:
+        """Wait for a token behind every waiter with a better (priority, seq)"""
+        if not self._waiters and self.try_take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, seq, future))
+        self._schedule()
+        await future
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, then start empty"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.0)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Waiter was cancelled
+                heapq.heappop(self._waiters)
+                continue
+            if not self.try_take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(True)
+        self._schedule()
+
+
+@dataclass(eq=False)
+class OutboundCall:
+    """A governed API call waiting for (or holding) its turn"""
+    method: str
+    chat: Any
+    priority: int
+    seq: int
+    args: tuple
+    kwargs: dict
+    # (method, chat, message) for edits that may be coalesced
+    key: Optional[Tuple] = None
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+class OutboundGovernor:
+    """Paces outbound calls of one bot client"""
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: int = GLOBAL_BURST):
+        self.global_bucket = PriorityBucket(global_rate, global_burst)
+        self._chat_buckets: Dict[Any, PriorityBucket] = {}
+        self._action_buckets: Dict[Any, PriorityBucket] = {}
+        self._pending_edits: Dict[Tuple, OutboundCall] = {}
+        self._seq = itertools.count()
+        self._queued = 0
+        self._stats = {
+            "calls": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flood_waits": 0,
+            "flood_retries": 0,
+            "flood_wait_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def install(self, client) -> None:
+        """Route the client's send and edit methods through the governor"""
+        for name, priority in GOVERNED_METHODS.items():
+            original = getattr(client, name, None)
+            if original is None:
+                continue
+            setattr(client, name, self._wrap(name, original, priority))
+        client._outbound_governor = self
+
+    def _wrap(self, name: str, original: Callable, priority: int) -> Callable:
+        @functools.wraps(original)
+        async def governed(*args, **kwargs):
+            return await self.call(name, original, priority, args, kwargs)
+        return governed
+
+    @staticmethod
+    def _target(method: str, args: tuple, kwargs: dict) -> Tuple[Any, Any]:
+        """(chat, message) a call is addressed to"""
+        if method in INLINE_METHODS:
+            inline_id = args[0] if args else kwargs.get("inline_message_id")
+            return ("inline", inline_id), inline_id
+        chat = args[0] if args else kwargs.get("chat_id")
+        message = args[1] if len(args) > 1 else kwargs.get("message_id")
+        return chat, message
+
+    @staticmethod
+    def _prune(buckets: Dict[Any, PriorityBucket]) -> None:
+        if len(buckets) >= MAX_CHAT_BUCKETS:
+            for other in [c for c, b in buckets.items() if b.idle]:
+                del buckets[other]
+
+    def _chat_bucket(self, chat: Any) -> PriorityBucket:
+        bucket = self._chat_buckets.get(chat)
+        if bucket is None:
+            self._prune(self._chat_buckets)
+            # Negative IDs and usernames are groups and channels
+            private = isinstance(chat, tuple) or (isinstance(chat, int) and chat > 0)
+            bucket = PriorityBucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST) if private else PriorityBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+            self._chat_buckets[chat] = bucket
+        return bucket
+
+    def _action_bucket(self, chat: Any) -> PriorityBucket:
+        bucket = self._action_buckets.get(chat)
+        if bucket is None:
+            self._prune(self._action_buckets)
+            bucket = self._action_buckets[chat] = PriorityBucket(CHAT_ACTION_RATE, CHAT_ACTION_BURST)
+        return bucket
+
+    async def call(self, method: str, original: Callable, priority: int, args: tuple, kwargs: dict) -> Any:
+        """
+        Run a client method once the chat and the bot have capacity for it.
+
+        Returns:
+            The method's result; False for a dropped chat action
+        """
+        floor = outbound_priority.get()
+        if floor is not None and priority < floor:
+            priority = floor
+        chat, message = self._target(method, args, kwargs)
+        key = (method, chat, message) if priority == PRIORITY_EDIT and message is not None else None
+        self._stats["calls"] += 1
+
+        while key is not None and key in self._pending_edits:
+            # An older edit of this message is still waiting: it sends our text instead
+            pending = self._pending_edits[key]
+            pending.args, pending.kwargs = args, kwargs
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending.future)
+            except asyncio.CancelledError:
+                if not pending.future.cancelled():
+                    raise
+                # The owner of the pending edit was cancelled; send it ourselves
+
+        call = OutboundCall(method, chat, priority, next(self._seq), args, kwargs, key,
+                            asyncio.get_running_loop().create_future())
+        try:
+            result = await self._execute(call, original)
+        except asyncio.CancelledError:
+            call.future.cancel()
+            raise
+        except BaseException as e:
+            call.future.set_exception(e)
+            # Retrieved here so coalesced-away futures never warn when nobody else awaits them
+            call.future.exception()
+            raise
+        finally:
+            if key is not None and self._pending_edits.get(key) is call:
+                del self._pending_edits[key]
+        call.future.set_result(result)
+        return result
+
+    async def _execute(self, call: OutboundCall, original: Callable) -> Any:
+        for attempt in range(MAX_FLOOD_RETRIES + 1):
+            if call.key is not None:
+                self._pending_edits[call.key] = call
+            if not await self._admit(call):
+                self._stats["dropped"] += 1
+                return False
+            if call.key is not None and self._pending_edits.get(call.key) is call:
+                # From here on, newer edits queue behind this one instead of replacing it
+                del self._pending_edits[call.key]
+            try:
+                return await original(*call.args, **call.kwargs)
+            except FloodWait as e:
+                wait = float(e.value)
+                self._stats["flood_waits"] += 1
+                self._stats["flood_wait_seconds"] += wait
+                self._chat_bucket(call.chat).pause(wait)
+                logger.warning(f"FloodWait of {wait:.0f}s on {call.method} to {call.chat}")
+                if call.priority == PRIORITY_COSMETIC:
+                    self._stats["dropped"] += 1
+                    return False
+                if call.priority == PRIORITY_BULK or wait > MAX_RETRY_WAIT or attempt == MAX_FLOOD_RETRIES:
+                    raise
+                self._stats["flood_retries"] += 1
+
+    async def _admit(self, call: OutboundCall) -> bool:
+        chat_bucket = self._chat_bucket(call.chat)
+        if call.priority == PRIORITY_COSMETIC:
+            # Never queue a chat action; skip it when the chat is busy, paused
+            # by a FloodWait or has had one too recently
+            if chat_bucket.waiting or chat_bucket.paused or self.global_bucket.waiting:
+                return False
+            return self._action_bucket(call.chat).try_take() and self.global_bucket.try_take()
+
+        self._queued += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+        try:
+            await chat_bucket.take(call.priority, call.seq)
+            await self.global_bucket.take(call.priority, call.seq)
+        finally:
+            self._queued -= 1
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls currently waiting for a token"""
+        return self._queued
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring, including the current queue depth"""
+        stats = dict(self._stats)
+        stats["queue_depth"] = self._queued
+        stats["pending_edits"] = len(self._pending_edits)
+        stats["chats"] = len(self._chat_buckets)
+        stats["flood_wait_seconds"] = round(stats["flood_wait_seconds"], 1)
+        return stats
+
+
+# Global outbound governor instance
+outbound_governor = OutboundGovernor()
@@ -5,11 +5,39 @@ Handles conversion between markdown and HTML for proper Telegram display
 
 import re
 import html
+from typing import List, Tuple
+
+# Telegram's maximum message length
+MESSAGE_LIMIT = 4096
+
+# One scan over the markdown finds every construct; text between matches is plain.
+# The leading lookahead lets the scan skip ahead to the next markdown character;
+# whether a header is at the start of a line is checked afterwards.
+# A code block runs to the end of the text if its closing fence has not arrived yet.
+_MARKDOWN_TOKEN = re.compile(
+    r'(?=[`\[#*_~])'
+    r'(?:(?P<fence>```\w*\n?(?P<code>[^`]*(?:`(?!``)[^`]*)*)(?:```|\Z))'
+    r'|`(?P<inline>[^`]+)`'
+    r'|(?P<link>\[(?P<label>[^\]]+)\]\((?P<url>[^)]+)\))'
+    r'|(?P<header>#{1,6}[ \t]*)(?=\S)'
+    r'|(?P<delim>\*\*|__|~~|\*|_))',
+)
+
+# Link text only needs a second pass if it contains formatting
+_LABEL_MARKUP = re.compile(r'[`*_~]')
+
+# Tags that each emphasis delimiter turns into
+_DELIMITER_TAGS = {'**': 'b', '__': 'b', '*': 'i', '_': 'i', '~~': 's'}
+
 
 def markdown_to_html(text: str) -> str:
     """
     Convert markdown formatting to Telegram-compatible HTML.
     Handles: code blocks, inline code, bold, italic, strikethrough, headers, links
+
+    The text is tokenized in a single pass. Emphasis is matched with a
+    delimiter stack per line, so the tags in the output are always balanced:
+    a delimiter that cannot be paired stays as literal text.
     
     Args:
         text: Text with markdown formatting
@@ -19,67 +47,174 @@ def markdown_to_html(text: str) -> str:
     """
     if not text or not isinstance(text, str):
         return text or ""
-    
-    # First, protect code blocks (triple backticks) by replacing with placeholders
-    # Use angle brackets that won't conflict with any markdown patterns
-    code_blocks = []
-    def save_code_block(match):
-        code_blocks.append(match.group(0))
-        return f"<<<CODEBLOCK{len(code_blocks) - 1}>>>"
-    
-    text = re.sub(r'```[\s\S]*?```', save_code_block, text)
-    
-    # Protect inline code (single backticks)
-    inline_codes = []
-    def save_inline_code(match):
-        inline_codes.append(match.group(0))
-        return f"<<<INLINECODE{len(inline_codes) - 1}>>>"
-    
-    text = re.sub(r'`[^`]+`', save_inline_code, text)
-    
-    # Escape HTML special characters in the main text
+
+    # Escaping first leaves the markdown characters alone, so code and URLs come out escaped too
     text = html.escape(text)
-    
-    # Convert headers (### Header -> <b>Header</b>)
-    text = re.sub(r'^#{1,6}\s*(.+)$', r'<b>\1</b>', text, flags=re.MULTILINE)
-    
-    # Convert bold (**text** or __text__ -> <b>text</b>)
-    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
-    text = re.sub(r'__(.+?)__', r'<b>\1</b>', text)
-    
-    # Convert italic (*text* or _text_ -> <i>text</i>) - be careful not to match bold
-    text = re.sub(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<i>\1</i>', text)
-    text = re.sub(r'(?<!_)_(?!_)(.+?)(?<!_)_(?!_)', r'<i>\1</i>', text)
-    
-    # Convert strikethrough (~~text~~ -> <s>text</s>)
-    text = re.sub(r'~~(.+?)~~', r'<s>\1</s>', text)
-    
-    # Convert links [text](url) -> <a href="url">text</a>
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
-    
-    # Restore inline code - need to handle both escaped and unescaped versions
-    for i, code in enumerate(inline_codes):
-        # Extract just the code (remove backticks)
-        code_content = code[1:-1]
-        html_code = f"<code>{html.escape(code_content)}</code>"
-        # Replace both escaped version (after html.escape) and original
-        text = text.replace(f"&lt;&lt;&lt;INLINECODE{i}&gt;&gt;&gt;", html_code)
-        text = text.replace(f"<<<INLINECODE{i}>>>", html_code)
-    
-    # Restore code blocks - need to handle both escaped and unescaped versions
-    for i, block in enumerate(code_blocks):
-        # Extract the code (remove triple backticks and optional language)
-        match = re.match(r'```(?:\w+)?\n?([\s\S]*?)```', block)
-        if match:
-            code_content = match.group(1).strip()
-        else:
-            code_content = block[3:-3].strip()
-        html_code = f"<pre><code>{html.escape(code_content)}</code></pre>"
-        # Replace both escaped version (after html.escape) and original
-        text = text.replace(f"&lt;&lt;&lt;CODEBLOCK{i}&gt;&gt;&gt;", html_code)
-        text = text.replace(f"<<<CODEBLOCK{i}>>>", html_code)
-    
-    return text
+    out: List[str] = []
+    # Open emphasis delimiters of the current line: (delimiter, index of its piece in out)
+    openers: List[Tuple[str, int]] = []
+    in_header = False
+    position = 0
+
+    for match in _MARKDOWN_TOKEN.finditer(text):
+        start, end = match.span()
+        if start > position:
+            # Emphasis and headers stop at the first line break of the plain text
+            if (openers or in_header) and '\n' in text[position:start]:
+                openers.clear()
+                if in_header:
+                    newline = text.index('\n', position, start)
+                    out.append(text[position:newline])
+                    out.append('</b>')
+                    position = newline
+                    in_header = False
+            out.append(text[position:start])
+        position = end
+        kind = match.lastgroup
+
+        if kind == 'delim':
+            delim = match.group()
+            closed = False
+            if openers and start and not text[start - 1].isspace():
+                for depth in range(len(openers) - 1, -1, -1):
+                    opener, index = openers[depth]
+                    if opener == delim and index < len(out) - 1:
+                        if delim[0] == '_' and end < len(text) and text[end].isalnum():
+                            break
+                        tag = _DELIMITER_TAGS[delim]
+                        out[index] = f'<{tag}>'
+                        out.append(f'</{tag}>')
+                        # Delimiters opened inside this one stay literal
+                        del openers[depth:]
+                        closed = True
+                        break
+            if not closed:
+                if (end < len(text) and not text[end].isspace()
+                        and (delim[0] != '_' or not (start and text[start - 1].isalnum()))):
+                    openers.append((delim, len(out)))
+                out.append(delim)
+        elif kind == 'fence':
+            if in_header:
+                out.append('</b>')
+                in_header = False
+            openers.clear()
+            out.append(f"<pre><code>{match.group('code').strip()}</code></pre>")
+        elif kind == 'inline':
+            out.append(f"<code>{match.group('inline')}</code>")
+        elif kind == 'link':
+            out.append(f'<a href="{match.group("url")}">{_render_label(match.group("label"))}</a>')
+        elif kind == 'header':
+            if start and text[start - 1] != '\n':
+                out.append(match.group())
+                continue
+            openers.clear()
+            out.append('<b>')
+            in_header = True
+
+    if position < len(text):
+        if in_header and '\n' in text[position:]:
+            newline = text.index('\n', position)
+            out.append(text[position:newline])
+            out.append('</b>')
+            position = newline
+            in_header = False
+        out.append(text[position:])
+    if in_header:
+        out.append('</b>')
+    return ''.join(out)
+
+
+def _render_label(label: str) -> str:
+    """Link text, already escaped, with its own formatting converted"""
+    if not _LABEL_MARKUP.search(label):
+        return label
+    return markdown_to_html(html.unescape(label))
+
+
+# Tags, entities, line breaks and runs of text in Telegram HTML
+_HTML_TOKEN = re.compile(r'<(?P<close>/?)(?P<tag>[a-zA-Z][a-zA-Z0-9-]*)[^>]*>|&#?\w+;|\n|[^<&\n]+|[<&]')
+
+
+def split_html(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Split Telegram HTML into messages of at most limit characters.
+
+    Messages are cut after a line break where possible, otherwise after a
+    space. Tags and entities are never cut: tags still open at a cut are
+    closed at the end of the message and reopened at the start of the next.
+
+    Args:
+        text: HTML as produced by markdown_to_html
+        limit: Maximum length of each message
+
+    Returns:
+        The messages, in order; empty if text is empty
+    """
+    chunks: List[str] = []
+    parts: List[str] = []
+    size = 0
+    # Open tags: (name, opening tag as written)
+    stack: List[Tuple[str, str]] = []
+    closers_size = 0
+    # Index in parts where the message content starts (after reopened tags)
+    content_start = 0
+    # Last line break: (index in parts after it, open tags there)
+    line_break = None
+
+    def closers(tags) -> str:
+        return ''.join(f'</{name}>' for name, _ in reversed(tags))
+
+    def flush(cut: int, tags) -> None:
+        """Emit parts[:cut] as a message and start the next one with the rest"""
+        nonlocal parts, size, content_start, line_break
+        content = ''.join(parts[content_start:cut])
+        if content.strip():
+            chunks.append(''.join(parts[:cut]) + closers(tags))
+        reopen = ''.join(opening for _, opening in tags)
+        parts = ([reopen] if reopen else []) + parts[cut:]
+        content_start = 1 if reopen else 0
+        size = sum(len(part) for part in parts)
+        line_break = None
+
+    for match in _HTML_TOKEN.finditer(text):
+        token = match.group(0)
+        tag = match.group('tag')
+        closing = bool(match.group('close'))
+        growth = len(tag) + 3 if tag and not closing else 0
+
+        while size + len(token) + closers_size + growth > limit:
+            if line_break is not None and line_break[0] > content_start:
+                flush(*line_break)
+                continue
+            room = limit - size - closers_size
+            if tag is None and token[0] not in '<&' and room > 0 and len(token) > 1:
+                # Cut a run of text, after its last space if there is one
+                cut = token.rfind(' ', 0, room) + 1 or room
+                parts.append(token[:cut])
+                token = token[cut:]
+            if len(parts) > content_start:
+                flush(len(parts), stack)
+            else:
+                # Nothing fits next to the reopened tags; accept an oversized message
+                break
+
+        parts.append(token)
+        size += len(token)
+        if tag:
+            if not closing:
+                stack.append((tag, token))
+                closers_size += growth
+            else:
+                for depth in range(len(stack) - 1, -1, -1):
+                    if stack[depth][0] == tag:
+                        closers_size -= sum(len(name) + 3 for name, _ in stack[depth:])
+                        del stack[depth:]
+                        break
+        elif token == '\n':
+            line_break = (len(parts), list(stack))
+
+    flush(len(parts), stack)
+    return chunks
 
 
 def strip_markdown(text: str) -> str:
@@ -0,0 +1,295 @@
+"""
+Per-user context shared by every handler that runs for an update
+
+A single private message used to trigger separate lookups for the ban
+record, premium status (twice), AI model settings and language. UserContext
+loads all of them in one batched query and keeps the result in a short-TTL
+LRU cache, so the handlers of one update (and of the next few updates from
+the same user) read them from memory.
+
+Writers of those settings call invalidate_user_context(). The cache is per
+process, so in multi-bot mode another process may serve a stale value until
+USER_CONTEXT_TTL expires.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from config import ADMINS
+from modules.core.async_database import async_db_service
+from modules.user.ai_model import (
+    DEFAULT_TEXT_MODEL,
+    DEFAULT_IMAGE_MODEL,
+    RESTRICTED_TEXT_MODELS,
+    RESTRICTED_IMAGE_MODELS,
+)
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar('V')
+
+# Seconds a loaded context stays valid
+USER_CONTEXT_TTL = 30.0
+
+# Users kept in the cache, least recently used are evicted first
+USER_CONTEXT_CACHE_SIZE = 10000
+
+DEFAULT_LANGUAGE = "en"
+
+
+class TTLCache(Generic[V]):
+    """Small LRU cache whose entries also expire after a fixed time"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+@dataclass
+class UserContext:
+    """Ban, premium, model and language settings of one user"""
+    user_id: int
+    is_admin: bool = False
+    is_banned: bool = False
+    ban_reason: Optional[str] = None
+    premium_flag: bool = False
+    premium_expires_at: Optional[datetime.datetime] = None
+    stored_text_model: str = DEFAULT_TEXT_MODEL
+    stored_image_model: str = DEFAULT_IMAGE_MODEL
+    language: str = DEFAULT_LANGUAGE
+
+    def premium_status(self) -> Tuple[bool, int, Optional[datetime.datetime]]:
+        """
+        Premium status as returned by is_user_premium.
+
+        Remaining days are computed at call time, so a cached context never
+        reports a stale count.
+        """
+        if not self.premium_flag:
+            return False, 0, None
+
+        expires_at = self.premium_expires_at
+        if not expires_at or not isinstance(expires_at, datetime.datetime):
+            # This case indicates bad data or an issue, log it and treat as not premium.
+            print(f"Error: User {self.user_id} has invalid premium_expires_at: {expires_at}")
+            return False, 0, None
+
+        # Ensure both datetimes are timezone-aware for comparison
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
+
+        if expires_at > now:
+            remaining_time = expires_at - now
+            # Calculate remaining_days, ensuring it's at least 1 if there's any positive time left.
+            remaining_days = remaining_time.days
+            if remaining_time.total_seconds() > 0 and remaining_days == 0:
+                remaining_days = 1
+            return True, remaining_days, expires_at
+
+        # Premium has expired, mark it in the DB (once per loaded context)
+        self.premium_flag = False
+        from modules.user.premium_management import remove_premium_status
+        asyncio.create_task(remove_premium_status(self.user_id))
+        return False, 0, expires_at
+
+    @property
+    def is_premium(self) -> bool:
+        return self.premium_status()[0]
+
+    def ai_models(self) -> Tuple[str, str]:
+        """Selected text and image models, with restricted models replaced for non-premium users"""
+        text_model, image_model = self.stored_text_model, self.stored_image_model
+        if not self.is_admin and not self.is_premium:
+            if text_model in RESTRICTED_TEXT_MODELS:
+                text_model = DEFAULT_TEXT_MODEL
+            if image_model in RESTRICTED_IMAGE_MODELS:
+                image_model = DEFAULT_IMAGE_MODEL
+        return text_model, image_model
+
+
+def _lookup(collection: str, match: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    pipeline = [{"$match": match}] if match else []
+    return {
+        "$lookup": {
+            "from": collection,
+            "localField": "user_id",
+            "foreignField": "user_id",
+            "pipeline": pipeline + [{"$limit": 1}],
+            "as": collection,
+        }
+    }
+
+
+def _build_context(user_id: int, docs: Dict[str, Optional[Dict[str, Any]]]) -> UserContext:
+    ban = docs.get("user_bans") or {}
+    premium = docs.get("premium_users") or {}
+    models = docs.get("user_ai_model_settings") or {}
+    lang = docs.get("user_lang") or {}
+    return UserContext(
+        user_id=user_id,
+        is_admin=user_id in ADMINS,
+        is_banned=bool(ban),
+        ban_reason=ban.get("reason", "No reason provided.") if ban else None,
+        premium_flag=bool(premium),
+        premium_expires_at=premium.get("premium_expires_at"),
+        stored_text_model=models.get("text_model", DEFAULT_TEXT_MODEL),
+        stored_image_model=models.get("image_model", DEFAULT_IMAGE_MODEL),
+        language=lang.get("language", DEFAULT_LANGUAGE),
+    )
+
+
+class UserContextLoader:
+    """
+    Loads and caches UserContext objects.
+
+    The load is a single aggregation ($documents plus one $lookup per
+    settings collection). Servers older than MongoDB 5.1 do not support
+    $documents; there the four lookups are issued concurrently instead.
+    """
+
+    COLLECTIONS = {
+        "user_bans": {"is_banned": True},
+        "premium_users": {"is_premium": True},
+        "user_ai_model_settings": None,
+        "user_lang": None,
+    }
+
+    def __init__(self, maxsize: int = USER_CONTEXT_CACHE_SIZE, ttl: float = USER_CONTEXT_TTL):
+        self.cache: TTLCache[UserContext] = TTLCache(maxsize, ttl)
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._use_aggregate = True
+        self.loads = 0
+
+    async def _fetch_aggregate(self, user_id: int) -> Dict[str, Optional[Dict[str, Any]]]:
+        pipeline = [{"$documents": [{"user_id": user_id}]}]
+        pipeline += [_lookup(name, match) for name, match in self.COLLECTIONS.items()]
+        results = await async_db_service.aggregate(pipeline)
+        row = results[0] if results else {}
+        return {name: (row.get(name) or [None])[0] for name in self.COLLECTIONS}
+
+    async def _fetch_parallel(self, user_id: int) -> Dict[str, Optional[Dict[str, Any]]]:
+        names = list(self.COLLECTIONS)
+        docs = await asyncio.gather(*[
+            async_db_service.get_collection(name).find_one({"user_id": user_id, **(self.COLLECTIONS[name] or {})})
+            for name in names
+        ])
+        return dict(zip(names, docs))
+
+    async def _load(self, user_id: int) -> UserContext:
+        self.loads += 1
+        docs = None
+        if self._use_aggregate:
+            try:
+                docs = await self._fetch_aggregate(user_id)
+            except Exception as e:
+                logger.info(f"Batched user context query unavailable, using parallel lookups: {e}")
+                self._use_aggregate = False
+        if docs is None:
+            docs = await self._fetch_parallel(user_id)
+        return _build_context(user_id, docs)
+
+    async def get(self, user_id: int) -> UserContext:
+        """Cached context for a user, loading it if needed"""
+        context = self.cache.get(user_id)
+        if context is not None:
+            return context
+
+        # Concurrent handlers for the same user share one load
+        pending = self._loading.get(user_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        try:
+            context = await self._load(user_id)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as never retrieved
+            future.exception()
+            raise
+        else:
+            # A setting may have changed while we were loading; only cache if still current
+            if self._loading.get(user_id) is future:
+                self.cache.set(user_id, context)
+            future.set_result(context)
+            return context
+        finally:
+            if self._loading.get(user_id) is future:
+                del self._loading[user_id]
+
+    def peek(self, user_id: int) -> Optional[UserContext]:
+        """Cached context without loading, for synchronous callers"""
+        return self.cache.get(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's cached context after one of its settings changed"""
+        self.cache.pop(user_id)
+        self._loading.pop(user_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.cache.get_stats()
+        stats["loads"] = self.loads
+        stats["batched"] = self._use_aggregate
+        return stats
+
+
+# Global loader instance
+user_context_loader = UserContextLoader()
+
+
+async def get_user_context(user_id: int) -> UserContext:
+    """Get the (cached) context for a user"""
+    return await user_context_loader.get(user_id)
+
+
+def invalidate_user_context(user_id: int) -> None:
+    """Invalidate a user's cached context after a ban, premium, model or language change"""
+    user_context_loader.invalidate(user_id)
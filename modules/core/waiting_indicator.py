@@ -0,0 +1,214 @@
+"""
+Shared typing indicator and waiting-message service
+
+send_interactive_waiting_message used to start a task per request that
+edited the waiting message every 1.5 seconds and sent a typing action every
+4 seconds until it was cancelled. With hundreds of requests in flight that
+is a steady stream of cosmetic API calls competing with real replies, and a
+request that failed before cancelling its task kept typing for good.
+
+This service holds every active wait and drives them from one timer:
+
+- Chat actions are refreshed per chat, not per request, shortly before
+  Telegram's five-second indicator runs out.
+- Status edits step through the waiting texts, but are skipped while the
+  outbound governor has a queue, while the scheduler shows a queue
+  position, and in the window just before a typical response is ready.
+- Waits are released in one place when the reply is sent (or after
+  MAX_WAIT seconds if a handler never released them).
+
+Usage:
+    temp = await waiting_indicators.start(message, STATUS_MESSAGES)
+    ...
+    waiting_indicators.release(temp)
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pyrogram.enums import ChatAction
+
+from modules.core.telegram_governor import outbound_governor
+
+logger = logging.getLogger(__name__)
+
+# Seconds between ticks of the shared timer
+TICK_INTERVAL = 1.5
+
+# Seconds between chat action refreshes for a chat (Telegram shows one for about 5)
+CHAT_ACTION_REFRESH = 4.5
+
+# Seconds between status edits of one waiting message
+STATUS_EDIT_INTERVAL = 1.5
+
+# Skip status edits this many seconds before a typical wait ends
+IMMINENT_WINDOW = 1.5
+
+# Status edits are skipped while this many outbound calls are queued
+BUSY_QUEUE_DEPTH = 20
+
+# Waits that were never released are dropped after this many seconds
+MAX_WAIT = 600.0
+
+# Weight of the newest wait in the running average of wait durations
+DURATION_SMOOTHING = 0.1
+
+
+@dataclass(eq=False)
+class ActiveWait:
+    """A waiting message and the chat whose typing indicator it keeps alive"""
+    message: Any
+    chat_id: int
+    statuses: List[str]
+    action: ChatAction
+    step: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_edit: float = field(default_factory=time.monotonic)
+    editing: bool = False
+
+
+class WaitingIndicatorService:
+    """Drives all waiting messages and typing indicators of the process"""
+
+    def __init__(self):
+        # (client id, chat id, message id) -> wait
+        self._waits: Dict[Tuple[int, int, int], ActiveWait] = {}
+        # (client id, chat id) -> last chat action
+        self._last_action: Dict[Tuple[int, int], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._avg_duration: Optional[float] = None
+        self._stats = {
+            "waits": 0,
+            "max_active": 0,
+            "chat_actions": 0,
+            "chat_actions_shared": 0,
+            "edits": 0,
+            "edits_skipped": 0,
+            "expired": 0,
+        }
+
+    @staticmethod
+    def _key(message) -> Tuple[int, int, int]:
+        chat_id = getattr(getattr(message, "chat", None), "id", None)
+        return id(getattr(message, "_client", None)), chat_id, getattr(message, "id", None)
+
+    async def start(self, message, statuses: List[str], action: ChatAction = ChatAction.TYPING):
+        """
+        Reply with the first status and keep the chat's indicator alive.
+
+        Args:
+            message: The user's message to reply to
+            statuses: Texts shown one after another while waiting
+            action: Chat action shown while waiting
+
+        Returns:
+            The waiting message, to be passed to release()
+        """
+        chat_key = (id(message._client), message.chat.id)
+        if time.monotonic() - self._last_action.get(chat_key, 0.0) >= CHAT_ACTION_REFRESH:
+            self._last_action[chat_key] = time.monotonic()
+            await self._send_action(message._client, message.chat.id, action)
+        else:
+            self._stats["chat_actions_shared"] += 1
+
+        waiting_message = await message.reply_text(statuses[0])
+        self._waits[self._key(waiting_message)] = ActiveWait(waiting_message, message.chat.id, statuses, action)
+        self._stats["waits"] += 1
+        self._stats["max_active"] = max(self._stats["max_active"], len(self._waits))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return waiting_message
+
+    def release(self, waiting_message) -> None:
+        """Stop updating a waiting message; safe to call more than once"""
+        wait = self._waits.pop(self._key(waiting_message), None)
+        if wait is None:
+            return
+        duration = time.monotonic() - wait.created_at
+        if self._avg_duration is None:
+            self._avg_duration = duration
+        else:
+            self._avg_duration += DURATION_SMOOTHING * (duration - self._avg_duration)
+
+    def _imminent(self, wait: ActiveWait, now: float) -> bool:
+        """Whether a typical response would arrive within IMMINENT_WINDOW"""
+        if self._avg_duration is None:
+            return False
+        elapsed = now - wait.created_at
+        return self._avg_duration - IMMINENT_WINDOW <= elapsed <= self._avg_duration
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(TICK_INTERVAL)
+                if not self._waits:
+                    break
+                self._tick(time.monotonic())
+        finally:
+            self._task = None
+
+    def _tick(self, now: float) -> None:
+        busy = outbound_governor.queue_depth >= BUSY_QUEUE_DEPTH
+        waiting_chats = set()
+        refreshed = set()
+        for key, wait in list(self._waits.items()):
+            if now - wait.created_at > MAX_WAIT:
+                del self._waits[key]
+                self._stats["expired"] += 1
+                continue
+
+            # One refresh covers every wait in the chat
+            chat_key = (key[0], wait.chat_id)
+            if chat_key in refreshed:
+                self._stats["chat_actions_shared"] += 1
+            elif chat_key not in waiting_chats and now - self._last_action.get(chat_key, 0.0) >= CHAT_ACTION_REFRESH:
+                self._last_action[chat_key] = now
+                refreshed.add(chat_key)
+                asyncio.create_task(self._send_action(wait.message._client, wait.chat_id, wait.action))
+            waiting_chats.add(chat_key)
+
+            if wait.editing or wait.step >= len(wait.statuses) - 1 or now - wait.last_edit < STATUS_EDIT_INTERVAL:
+                continue
+            if busy or getattr(wait.message, "_queue_position", 0) or self._imminent(wait, now):
+                self._stats["edits_skipped"] += 1
+                continue
+            wait.step += 1
+            wait.last_edit = now
+            wait.editing = True
+            asyncio.create_task(self._edit_status(key, wait))
+
+        for chat_key in [c for c in self._last_action if c not in waiting_chats]:
+            del self._last_action[chat_key]
+
+    async def _send_action(self, client, chat_id: int, action: ChatAction) -> None:
+        try:
+            await client.send_chat_action(chat_id, action)
+            self._stats["chat_actions"] += 1
+        except Exception as e:
+            logger.debug(f"Chat action for {chat_id} failed: {e}")
+
+    async def _edit_status(self, key, wait: ActiveWait) -> None:
+        try:
+            # The reply may have been sent while this edit was being scheduled
+            if self._waits.get(key) is wait:
+                await wait.message.edit_text(wait.statuses[wait.step])
+                self._stats["edits"] += 1
+        except Exception as e:
+            # Usually the waiting message was deleted because the response is ready
+            logger.debug(f"Waiting message edit failed: {e}")
+        finally:
+            wait.editing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        stats = dict(self._stats)
+        stats["active"] = len(self._waits)
+        stats["avg_wait"] = round(self._avg_duration, 2) if self._avg_duration is not None else 0.0
+        return stats
+
+
+# Global waiting indicator instance
+waiting_indicators = WaitingIndicatorService()
@@ -0,0 +1,234 @@
+"""
+Write-behind buffer for high-frequency counter and timestamp updates
+
+Every message and callback query used to upsert the user's last interaction
+and several statistics counters straight away, one round-trip each. This
+module collects those updates in memory instead. Updates that target the
+same document are merged ($inc amounts are summed, the latest $set wins),
+and the merged updates are written with one unordered bulk_write per
+collection, either every FLUSH_INTERVAL seconds or as soon as
+MAX_PENDING_UPDATES distinct documents are waiting.
+
+Anything still buffered when the process exits is written synchronously
+from an atexit hook. A hard kill loses at most one interval of updates,
+which is acceptable for activity timestamps and statistics.
+"""
+
+import asyncio
+import atexit
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from modules.core.async_database import async_db_service
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background flushes
+FLUSH_INTERVAL = 5.0
+
+# Distinct pending documents that trigger an early flush
+MAX_PENDING_UPDATES = 1000
+
+# Operators whose values are summed when two updates are merged
+_ADDITIVE_OPERATORS = ("$inc",)
+
+
+def _merge_update(target: Dict[str, Dict[str, Any]], update: Dict[str, Dict[str, Any]], overwrite: bool = True) -> None:
+    """
+    Merge an update document into a pending one, in place.
+
+    Args:
+        target: Pending update document
+        update: Update document to fold in
+        overwrite: Whether values in `update` replace those already in `target`
+            for non-additive operators ($set, $setOnInsert, ...)
+    """
+    for operator, fields in update.items():
+        pending = target.setdefault(operator, {})
+        for field, value in fields.items():
+            if operator in _ADDITIVE_OPERATORS:
+                pending[field] = pending.get(field, 0) + value
+            elif overwrite or field not in pending:
+                pending[field] = value
+
+
+class WriteBehindBuffer:
+    """
+    Coalescing buffer of upserts and inserts, flushed with bulk_write.
+
+    Documents are identified by (collection, filter). The buffer lives in a
+    single event loop, so no locking is needed around the pending maps.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING_UPDATES):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._updates: Dict[Tuple[str, Tuple], Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]] = {}
+        self._inserts: Dict[str, List[Dict[str, Any]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._stats = {
+            "events": 0,
+            "writes": 0,
+            "round_trips": 0,
+            "flushes": 0,
+            "errors": 0,
+        }
+        atexit.register(self.flush_sync)
+
+    @staticmethod
+    def _make_key(collection: str, filter: Dict[str, Any]) -> Tuple[str, Tuple]:
+        return collection, tuple(sorted(filter.items()))
+
+    def pending_count(self) -> int:
+        """Buffered writes not yet sent to the database"""
+        return len(self._updates) + sum(len(docs) for docs in self._inserts.values())
+
+    # ------------------------------------------------------------------
+    # Buffering
+    # ------------------------------------------------------------------
+
+    def update(self, collection: str, filter: Dict[str, Any], update: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Queue an upsert, merging it with pending updates of the same document.
+
+        Args:
+            collection: Collection name
+            filter: Equality filter identifying the document (e.g. {"user_id": 1})
+            update: Update document using $set, $inc, $setOnInsert, ...
+        """
+        key = self._make_key(collection, filter)
+        entry = self._updates.get(key)
+        if entry is None:
+            self._updates[key] = (dict(filter), {op: dict(fields) for op, fields in update.items()})
+        else:
+            _merge_update(entry[1], update)
+        self._stats["events"] += 1
+        self._after_add()
+
+    def insert(self, collection: str, document: Dict[str, Any]) -> None:
+        """Queue a document insert, written in the next batch"""
+        self._inserts.setdefault(collection, []).append(document)
+        self._stats["events"] += 1
+        self._after_add()
+
+    def _after_add(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the event loop (scripts, tests): write through
+            self.flush_sync()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self.pending_count() >= self.max_pending and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.create_task(self.flush())
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def _take_batches(self) -> Tuple[Dict[str, List[Any]], Dict[Tuple[str, Tuple], Tuple[Dict[str, Any], Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]:
+        """Swap out the pending writes and group them into per-collection operations"""
+        updates, self._updates = self._updates, {}
+        inserts, self._inserts = self._inserts, {}
+        batches: Dict[str, List[Any]] = {}
+        for (collection, _), (filter, update) in updates.items():
+            batches.setdefault(collection, []).append(UpdateOne(filter, update, upsert=True))
+        for collection, documents in inserts.items():
+            batches.setdefault(collection, []).extend(InsertOne(doc) for doc in documents)
+        return batches, updates, inserts
+
+    def _requeue(self, collection: str, updates: Dict, inserts: Dict) -> None:
+        """Put the writes of a failed batch back, behind any newer pending values"""
+        for key, (filter, update) in updates.items():
+            if key[0] != collection:
+                continue
+            entry = self._updates.get(key)
+            if entry is None:
+                self._updates[key] = (filter, update)
+            else:
+                _merge_update(entry[1], update, overwrite=False)
+        if collection in inserts:
+            self._inserts[collection] = inserts[collection] + self._inserts.get(collection, [])
+
+    def _record_flush(self, sent: int, batches: int) -> None:
+        self._stats["flushes"] += 1
+        self._stats["writes"] += sent
+        self._stats["round_trips"] += batches
+
+    async def flush(self) -> int:
+        """
+        Write all pending updates now.
+
+        Returns:
+            Number of write operations sent
+        """
+        batches, updates, inserts = self._take_batches()
+        if not batches:
+            return 0
+        sent = 0
+        for collection, operations in batches.items():
+            try:
+                await async_db_service.get_collection(collection).bulk_write(operations, ordered=False)
+                sent += len(operations)
+            except BulkWriteError as e:
+                # Unordered: everything except the reported errors was applied, so nothing is retried
+                failed = len(e.details.get("writeErrors", []))
+                sent += len(operations) - failed
+                self._stats["errors"] += 1
+                logger.error(f"Write-behind flush to {collection}: {failed} of {len(operations)} writes failed: {e}")
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Write-behind flush to {collection} failed, retrying next interval: {e}")
+                self._requeue(collection, updates, inserts)
+        self._record_flush(sent, len(batches))
+        return sent
+
+    def flush_sync(self) -> int:
+        """Write all pending updates from synchronous code (shutdown, scripts)"""
+        batches, _, _ = self._take_batches()
+        if not batches:
+            return 0
+        sent = 0
+        for collection, operations in batches.items():
+            try:
+                async_db_service.get_collection(collection).sync.bulk_write(operations, ordered=False)
+                sent += len(operations)
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Write-behind flush to {collection} failed, {len(operations)} writes lost: {e}")
+        self._record_flush(sent, len(batches))
+        return sent
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush loop error: {e}")
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Buffer counters for monitoring.
+
+        coalescing_ratio is buffered events per database write: 1.0 means no
+        saving, 10.0 means ten events were folded into each write. Writes are
+        further grouped into one bulk_write round trip per collection.
+        """
+        stats = dict(self._stats)
+        stats["pending"] = self.pending_count()
+        stats["coalescing_ratio"] = round(stats["events"] / stats["writes"], 2) if stats["writes"] else 0.0
+        return stats
+
+
+# Global write-behind buffer instance
+write_behind = WriteBehindBuffer()
@@ -1,14 +1,11 @@
-from pymongo import MongoClient
 from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 
-from config import DATABASE_URL, LOG_CHANNEL
+from config import LOG_CHANNEL
+from modules.core.database import db_service
 
-mongo_client = MongoClient(DATABASE_URL)
-
-# Access or create the database and collection
-db = mongo_client['aibotdb']
-user_ratings_collection = db['user_ratings']
+# Collection from the shared connection pool
+user_ratings_collection = db_service.get_collection('user_ratings')
 
 voted = []
 
@@ -98,12 +98,10 @@ async def uinfo_settings_callback(client: Client, callback_query: CallbackQuery)
 # Callback: Show user history (last 5 messages)
 async def uinfo_history_callback(client: Client, callback_query: CallbackQuery):
     try:
-        from modules.models.ai_res import get_history_collection
+        from modules.core.history_store import history_store
         user_id = int(callback_query.data.split("_")[-1])
-        history_collection = get_history_collection()
-        user_history = history_collection.find_one({"user_id": user_id})
-        if user_history and "history" in user_history:
-            history = user_history["history"][-5:]
+        history = history_store.load_turns(user_id, limit=5)
+        if history:
             text = "<b>Recent User History</b>\n\n"
             for entry in history:
                 role = entry.get("role", "user").capitalize()
@@ -2,18 +2,16 @@ import logging
 from pyrogram import Client
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 from pyrogram.enums import ChatMemberStatus, ChatType
-from config import LOG_CHANNEL as STCLOG, DATABASE_URL
-from pymongo import MongoClient
+from config import LOG_CHANNEL as STCLOG
+from modules.core.database import db_service
 from datetime import datetime
 import asyncio
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Connect to MongoDB
-client = MongoClient(DATABASE_URL)
-db = client['aibotdb']
-groups_collection = db.groups
+# Collection from the shared connection pool
+groups_collection = db_service.get_collection('groups')
 
 # Required bot permissions in groups
 REQUIRED_PERMISSIONS = {
@@ -3,9 +3,9 @@ import pyrogram.errors
 from pyrogram.enums import ChatType
 import asyncio
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
-from config import LOG_CHANNEL as STCLOG, DATABASE_URL, ADMINS, OWNER_ID
+from config import LOG_CHANNEL as STCLOG, ADMINS, OWNER_ID
 import logging
-from pymongo import MongoClient
+from modules.core.database import db_service
 from typing import List, Dict, Optional, Union
 from datetime import datetime
 from modules.maintenance import maintenance_check, maintenance_message, is_feature_enabled
@@ -13,10 +13,8 @@ from modules.maintenance import maintenance_check, maintenance_message, is_featu
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Connect to MongoDB
-client = MongoClient(DATABASE_URL)  
-db = client['aibotdb']  
-groups_collection = db.groups 
+# Collection from the shared connection pool
+groups_collection = db_service.get_collection('groups')
 
 async def leave_group(client: Client, message):
     chat_id = message.chat.id
@@ -11,8 +11,7 @@ import hashlib
 import urllib.parse
 from pyrogram.types import InputMediaPhoto, InlineKeyboardButton, InlineKeyboardMarkup, Message, CallbackQuery
 from pyrogram import Client, filters, enums
-from pymongo import MongoClient
-from config import DATABASE_URL, LOG_CHANNEL, ADMINS
+from config import LOG_CHANNEL, ADMINS
 from modules.maintenance import maintenance_check, maintenance_message, is_feature_enabled
 from modules.user.premium_management import is_user_premium
 from modules.user.ai_model import get_user_ai_models, DEFAULT_IMAGE_MODEL, IMAGE_MODELS, RESTRICTED_IMAGE_MODELS
@@ -22,6 +21,7 @@ from modules.image.multi_provider_image import (
     DEFAULT_IMAGE_MODEL as MULTI_PROVIDER_DEFAULT_MODEL,
 )
 from modules.core.database import db_service
+from modules.core.scheduler import job_scheduler, report_queue_position
 from modules.core.request_queue import (
     can_start_image_request, 
     start_image_request, 
@@ -33,10 +33,6 @@ from pyrogram.enums import ParseMode
 # Get the logger
 logger = logging.getLogger(__name__)
 
-# MongoDB setup
-mongo_client = MongoClient(DATABASE_URL)
-db = mongo_client['aibotdb']
-
 def get_user_images_collection():
     return db_service.get_collection('user_images')
 def get_image_feedback_collection():
@@ -718,29 +714,31 @@ async def process_style_selection(client: Client, callback_query: CallbackQuery)
             f"⏳ The AI is working its magic... {processing_text_detail}"
         )
         
-        # Start the progress updater
-        progress_task = asyncio.create_task(
-            update_generation_progress(
-                client, 
-                chat_id,  # Use the actual chat ID
-                processing_message.id, 
-                state.prompt, 
+        # Wait for a free image slot; the processing message shows the queue position meanwhile
+        async with job_scheduler.slot("image", clicked_user_id, on_position=report_queue_position(processing_message)):
+            # Start the progress updater
+            progress_task = asyncio.create_task(
+                update_generation_progress(
+                    client, 
+                    chat_id,  # Use the actual chat ID
+                    processing_message.id, 
+                    state.prompt, 
+                    style,
+                    num_images_to_generate, # Pass num_images here
+                    clicked_user_id # Pass user_id for model display
+                )
+            )
+            
+            # Start the actual image generation
+            await generate_and_send_images(
+                client,
+                processing_message,  # Pass the new processing message
+                state.prompt,
                 style,
-                num_images_to_generate, # Pass num_images here
-                clicked_user_id # Pass user_id for model display
+                progress_task,
+                callback_query.from_user,  # Pass the user object
+                num_images_to_generate # Pass the number of images
             )
-        )
-        
-        # Start the actual image generation
-        await generate_and_send_images(
-            client,
-            processing_message,  # Pass the new processing message
-            state.prompt,
-            style,
-            progress_task,
-            callback_query.from_user,  # Pass the user object
-            num_images_to_generate # Pass the number of images
-        )
         
     except Exception as e:
         logger.error(f"Error processing style selection: {str(e)}")
@@ -7,7 +7,8 @@ from pyrogram import enums
 from pyrogram.types import InputMediaPhoto
 from pyrogram.errors import MediaCaptionTooLong
 from config import LOG_CHANNEL
-from modules.models.ai_res import get_history_collection, check_and_update_system_prompt, DEFAULT_SYSTEM_MESSAGE
+from modules.models.ai_res import get_history_collection
+from modules.core.history_store import history_store
 from modules.chatlogs import user_log
 from modules.core.request_queue import (
     can_start_image_request, 
@@ -17,6 +18,9 @@ from modules.core.request_queue import (
 import g4f
 import g4f.Provider
 from g4f.client import Client as G4FClient
+from modules.core.client_pool import g4f_client_pool
+from modules.core.scheduler import job_scheduler, report_queue_position
+from modules.core.intent_engine import IntentRules
 import base64
 
 logger = logging.getLogger(__name__)
@@ -76,12 +80,12 @@ async def analyze_image_with_providers(images: list, user_question: str) -> tupl
             loop = asyncio.get_event_loop()
             
             def sync_vision():
-                g4f_client = G4FClient(provider=provider)
-                response = g4f_client.chat.completions.create(
-                    messages=[{"content": user_question, "role": "user"}],
-                    images=images,
-                    model=model
-                )
+                with g4f_client_pool.lease(G4FClient, provider=provider) as g4f_client:
+                    response = g4f_client.chat.completions.create(
+                        messages=[{"content": user_question, "role": "user"}],
+                        images=images,
+                        model=model
+                    )
                 return response.choices[0].message.content
             
             # Run with timeout
@@ -193,9 +197,46 @@ EDIT_PROMPT: [If IMAGE_EDIT, provide a clear, detailed prompt for image generati
 TEXT_RESPONSE: [If TEXT_RESPONSE, provide your helpful response to the user. If IMAGE_EDIT, write "N/A"]
 """
 
+# Words that mark a request as a question about the image or as an edit of it.
+# A message with question words and no edit words is answered without asking
+# the AI for its intent first; anything else still goes to the AI.
+IMAGE_REQUEST_RULES = IntentRules(
+    keywords={
+        "question": [
+            "what", "what's", "whats", "which", "who", "whose", "where", "when", "why", "how",
+            "describe", "explain", "identify", "analyze", "analyse", "read", "extract", "translate",
+            "solve", "answer", "tell me", "is this", "is there", "are there", "can you see", "?",
+        ],
+        "edit": [
+            "make", "add", "remove", "delete", "erase", "change", "replace", "swap", "put",
+            "turn", "convert", "transform", "edit", "modify", "restyle", "style", "cartoon",
+            "anime", "ghibli", "pixar", "vintage", "sketch", "painting", "filter", "colorize",
+            "colourize", "enhance", "upscale", "sharpen", "blur", "crop", "background", "into",
+            "look like", "looks like", "without", "instead",
+        ],
+    },
+    whole_words=True,
+)
+
+
+def detect_intent_locally(user_message: str):
+    """
+    Keyword check for requests that are plainly questions about the image.
+
+    Returns:
+        "TEXT_RESPONSE" for a question without any edit words, otherwise
+        None (the AI has to decide)
+    """
+    match = IMAGE_REQUEST_RULES.scan(user_message)
+    if match.count("question") and not match.count("edit"):
+        return "TEXT_RESPONSE"
+    return None
+
+
 async def detect_intent_with_ai(images: list, user_message: str) -> dict:
     """
     Use AI to analyze the image and user's message to determine intent.
+    Plain questions are recognized by detect_intent_locally and skip the AI call.
     
     Returns:
         dict with keys:
@@ -204,6 +245,15 @@ async def detect_intent_with_ai(images: list, user_message: str) -> dict:
         - text_response: Text response (if TEXT_RESPONSE)
         - provider: Which provider succeeded
     """
+    if detect_intent_locally(user_message) == "TEXT_RESPONSE":
+        logger.info("Intent detected: TEXT_RESPONSE by keywords")
+        return {
+            "intent": "TEXT_RESPONSE",
+            "edit_prompt": None,
+            "text_response": None,
+            "provider": "keywords",
+        }
+
     combined_prompt = f"{INTENT_DETECTION_PROMPT}\n\nUser's message: {user_message}"
     
     # Try vision providers to analyze intent
@@ -219,12 +269,12 @@ async def detect_intent_with_ai(images: list, user_message: str) -> dict:
             loop = asyncio.get_event_loop()
             
             def sync_intent():
-                g4f_client = G4FClient(provider=provider)
-                response = g4f_client.chat.completions.create(
-                    messages=[{"content": combined_prompt, "role": "user"}],
-                    images=images,
-                    model=model
-                )
+                with g4f_client_pool.lease(G4FClient, provider=provider) as g4f_client:
+                    response = g4f_client.chat.completions.create(
+                        messages=[{"content": combined_prompt, "role": "user"}],
+                        images=images,
+                        model=model
+                    )
                 return response.choices[0].message.content
             
             response = await asyncio.wait_for(
@@ -357,14 +407,14 @@ async def edit_image_with_providers(image_bytes: bytes, image_name: str, prompt:
             
             def sync_edit():
                 from urllib.parse import urlparse, parse_qs, unquote
-                g4f_client = G4FClient(provider=provider)
-                response = g4f_client.images.create_variation(
-                    image=image_bytes,
-                    image_name=image_name,
-                    prompt=prompt,
-                    model=model,
-                    response_format="b64_json"
-                )
+                with g4f_client_pool.lease(G4FClient, provider=provider) as g4f_client:
+                    response = g4f_client.images.create_variation(
+                        image=image_bytes,
+                        image_name=image_name,
+                        prompt=prompt,
+                        model=model,
+                        response_format="b64_json"
+                    )
                 # Response should contain the edited image
                 if hasattr(response, 'data') and response.data:
                     # Get base64 image data
@@ -445,7 +495,7 @@ async def schedule_image_cleanup(bot, user_id, chat_id, file_path):
             await asyncio.sleep(IMAGE_EXPIRY_SECONDS)
             # Remove image context from DB
             history_collection = get_history_collection()
-            user_history = history_collection.find_one({"user_id": user_id})
+            user_history = history_collection.find_one({"user_id": user_id}, {IMAGE_CONTEXT_KEY: 1})
             image_context = user_history.get(IMAGE_CONTEXT_KEY) if user_history else None
             if image_context and image_context.get("file_path") == file_path:
                 history_collection.update_one(
@@ -473,7 +523,7 @@ async def clear_previous_image_context(bot, user_id, chat_id):
     # Cancel and cleanup any previous image context for this user
     informed = False
     history_collection = get_history_collection()
-    user_history = history_collection.find_one({"user_id": user_id})
+    user_history = history_collection.find_one({"user_id": user_id}, {IMAGE_CONTEXT_KEY: 1})
     image_context = user_history.get(IMAGE_CONTEXT_KEY) if user_history else None
     if user_id in image_cleanup_tasks:
         image_cleanup_tasks[user_id]["task"].cancel()
@@ -504,12 +554,6 @@ async def extract_text_res(bot, update):
     try:
         user_id = update.from_user.id
         
-        # Check if user can start a new image request (rate limiting)
-        can_start, queue_message = await can_start_image_request(user_id)
-        if not can_start:
-            await update.reply_text(queue_message)
-            return
-        
         is_group_chat = update.chat.type in ["group", "supergroup"]
         # For group chats, require caption with AI or /ai
         if is_group_chat:
@@ -520,6 +564,12 @@ async def extract_text_res(bot, update):
             if not ("ai" in caption_lower or "/ai" in caption_lower):
                 await update.reply_text("❌ Please include 'AI' or '/ai' in your caption to trigger vision analysis.")
                 return
+        
+        # Check if user can start a new image request (rate limiting)
+        can_start, queue_message = await can_start_image_request(user_id)
+        if not can_start:
+            await update.reply_text(queue_message)
+            return
 
         # --- Clear previous image context if any ---
         previous_cleared = await clear_previous_image_context(bot, update.from_user.id, update.chat.id)
@@ -636,11 +686,12 @@ async def extract_text_res(bot, update):
             )
             
             # Try to edit the image with multiple providers
-            edited_image_bytes, provider_info = await edit_image_with_providers(
-                img_bytes, 
-                os.path.basename(file), 
-                edit_prompt
-            )
+            async with job_scheduler.slot("image", user_id, on_position=report_queue_position(processing_msg)):
+                edited_image_bytes, provider_info = await edit_image_with_providers(
+                    img_bytes, 
+                    os.path.basename(file), 
+                    edit_prompt
+                )
             
             if edited_image_bytes is None:
                 logger.error(f"All image edit providers failed: {provider_info}")
@@ -684,17 +735,6 @@ async def extract_text_res(bot, update):
                 logger.error(f"Failed to send edited image: {e}")
                 await update.reply_text(f"❌ Failed to send edited image: {str(e)}")
             
-            # Save to history
-            history_collection = get_history_collection()
-            user_history = history_collection.find_one({"user_id": user_id})
-            if user_history and 'history' in user_history:
-                history = user_history['history']
-                if not isinstance(history, list):
-                    history = [history]
-                history = check_and_update_system_prompt(history, user_id)
-            else:
-                history = DEFAULT_SYSTEM_MESSAGE.copy()
-            
             # Store image context for follow-up edits
             image_context = {
                 "file_path": edited_file,
@@ -703,13 +743,11 @@ async def extract_text_res(bot, update):
                 "message_id": update.id if hasattr(update, 'id') else None
             }
             
-            history.append({"role": "user", "content": f"[Image edit request] {user_question}"})
-            history.append({"role": "assistant", "content": f"[Edited image generated: {edit_prompt}]"})
-            history_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"history": history, IMAGE_CONTEXT_KEY: image_context}},
-                upsert=True
-            )
+            # Save to history
+            history_store.append_turns(user_id, [
+                {"role": "user", "content": f"[Image edit request] {user_question}"},
+                {"role": "assistant", "content": f"[Edited image generated: {edit_prompt}]"},
+            ], set_fields={IMAGE_CONTEXT_KEY: image_context})
             
             # Log to channel
             try:
@@ -739,7 +777,8 @@ async def extract_text_res(bot, update):
             provider_info = intent_result.get("provider", "unknown")
         else:
             # Analyze image with vision providers
-            ai_response, provider_info = await analyze_image_with_providers(images, user_question)
+            async with job_scheduler.slot("vision", user_id, on_position=report_queue_position(processing_msg)):
+                ai_response, provider_info = await analyze_image_with_providers(images, user_question)
         
         if ai_response is None:
             logger.error(f"All vision providers failed: {provider_info}")
@@ -749,35 +788,17 @@ async def extract_text_res(bot, update):
         
         logger.info(f"Vision analysis successful using provider: {provider_info}")
 
-        # Save image context for follow-up questions
-        history_collection = get_history_collection()
-        user_history = history_collection.find_one({"user_id": user_id})
-        if user_history and 'history' in user_history:
-            history = user_history['history']
-            if not isinstance(history, list):
-                history = [history]
-            history = check_and_update_system_prompt(history, user_id)
-        else:
-            history = DEFAULT_SYSTEM_MESSAGE.copy()
+        # Save image context for follow-up questions and add the turn to history
         image_context = {
             "file_path": file,
             "uses_left": MAX_IMAGE_USES,
             "prompt": user_question,
             "message_id": update.id if hasattr(update, 'id') else None
         }
-        history_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"history": history, IMAGE_CONTEXT_KEY: image_context}},
-            upsert=True
-        )
-        # Add to history
-        history.append({"role": "user", "content": f"[Image sent: {os.path.basename(file)}] {user_question}"})
-        history.append({"role": "assistant", "content": ai_response})
-        history_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"history": history}},
-            upsert=True
-        )
+        history_store.append_turns(user_id, [
+            {"role": "user", "content": f"[Image sent: {os.path.basename(file)}] {user_question}"},
+            {"role": "assistant", "content": ai_response},
+        ], set_fields={IMAGE_CONTEXT_KEY: image_context})
         # --- Schedule cleanup for this image ---
         await schedule_image_cleanup(bot, user_id, update.chat.id, file)
         # Send image preview with response
@@ -825,18 +846,17 @@ async def extract_text_res(bot, update):
 async def handle_vision_followup(client, message):
     user_id = message.from_user.id
     
+    history_collection = get_history_collection()
+    user_history = history_collection.find_one({"user_id": user_id}, {IMAGE_CONTEXT_KEY: 1})
+    image_context = user_history.get(IMAGE_CONTEXT_KEY) if user_history else None
+    if not image_context:
+        return False  # Not a vision followup
+    
     # Check if user can start a new image request (rate limiting for follow-ups)
     can_start, queue_message = await can_start_image_request(user_id)
     if not can_start:
         await message.reply_text(queue_message)
         return True  # Return True to indicate this was handled as a vision followup
-    
-    history_collection = get_history_collection()
-    user_history = history_collection.find_one({"user_id": user_id})
-    image_context = user_history.get(IMAGE_CONTEXT_KEY) if user_history else None
-    history = user_history['history'] if user_history and 'history' in user_history else None
-    if not image_context or not history:
-        return False  # Not a vision followup
     # Only use image for next MAX_IMAGE_USES responses
     if image_context['uses_left'] <= 0:
         # Remove image context
@@ -861,6 +881,7 @@ async def handle_vision_followup(client, message):
         except Exception:
             pass
         await message.reply_text("🗑️ The last image context has been cleared. If you want to analyze another image, please send a new one.")
+        finish_image_request(user_id)
         return True
     # Check for /endimage command
     if message.text and message.text.strip().lower() == "/endimage":
@@ -884,6 +905,7 @@ async def handle_vision_followup(client, message):
         except Exception:
             pass
         await message.reply_text("🗑️ The last image context has been cleared. If you want to analyze another image, please send a new one.")
+        finish_image_request(user_id)
         return True
     # Use image in this response
     prompt = message.text
@@ -898,6 +920,7 @@ async def handle_vision_followup(client, message):
             upsert=True
         )
         await message.reply_text("⚠️ The image file for your last context is no longer available. Please send a new image to continue vision analysis.")
+        finish_image_request(user_id)
         return True
     
     # Start the request
@@ -932,11 +955,12 @@ async def handle_vision_followup(client, message):
             await wat.edit_text(f"🎨 <b>Editing your image...</b>\n\n📝 _{edit_prompt[:60]}{'...' if len(edit_prompt) > 60 else ''}_", parse_mode=enums.ParseMode.HTML)
             
             # Try to edit the image with multiple providers
-            edited_image_bytes, provider_info = await edit_image_with_providers(
-                img_bytes, 
-                os.path.basename(image_context['file_path']), 
-                edit_prompt
-            )
+            async with job_scheduler.slot("image", user_id, on_position=report_queue_position(wat)):
+                edited_image_bytes, provider_info = await edit_image_with_providers(
+                    img_bytes, 
+                    os.path.basename(image_context['file_path']), 
+                    edit_prompt
+                )
             
             if edited_image_bytes is None:
                 raise Exception(f"All image edit providers failed: {provider_info}")
@@ -968,25 +992,19 @@ async def handle_vision_followup(client, message):
             image_context['file_path'] = edited_file
             uses_left = image_context['uses_left']
             
-            history.append({"role": "user", "content": f"[Image edit request] {prompt}"})
-            history.append({"role": "assistant", "content": f"[Edited image: {edit_prompt}]"})
+            turns = [
+                {"role": "user", "content": f"[Image edit request] {prompt}"},
+                {"role": "assistant", "content": f"[Edited image: {edit_prompt}]"},
+            ]
             
             if uses_left <= 0:
                 if user_id in image_cleanup_tasks:
                     image_cleanup_tasks[user_id]["task"].cancel()
                     del image_cleanup_tasks[user_id]
-                history_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"history": history}, "$unset": {IMAGE_CONTEXT_KEY: ""}},
-                    upsert=True
-                )
+                history_store.append_turns(user_id, turns, unset_fields=[IMAGE_CONTEXT_KEY])
                 await message.reply_text("🗑️ Image context cleared. Send a new image for more edits or questions.")
             else:
-                history_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"history": history, IMAGE_CONTEXT_KEY: image_context}},
-                    upsert=True
-                )
+                history_store.append_turns(user_id, turns, set_fields={IMAGE_CONTEXT_KEY: image_context})
                 await message.reply_text(f"✅ You have {uses_left} more follow-up(s) left. You can ask questions or request more edits!")
             
             try:
@@ -1006,7 +1024,8 @@ async def handle_vision_followup(client, message):
             provider_name = intent_result.get("provider", "unknown")
         else:
             # Analyze with vision providers
-            ai_response, provider_name = await analyze_image_with_providers(images, prompt)
+            async with job_scheduler.slot("vision", user_id, on_position=report_queue_position(wat)):
+                ai_response, provider_name = await analyze_image_with_providers(images, prompt)
         
         if not ai_response:
             raise Exception(f"All vision providers failed: {provider_name}")
@@ -1017,8 +1036,10 @@ async def handle_vision_followup(client, message):
         image_context['uses_left'] -= 1
         uses_left = image_context['uses_left']
         
-        history.append({"role": "user", "content": prompt})
-        history.append({"role": "assistant", "content": ai_response})
+        turns = [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": ai_response},
+        ]
         
         if uses_left <= 0:
             if user_id in image_cleanup_tasks:
@@ -1028,17 +1049,9 @@ async def handle_vision_followup(client, message):
                 os.remove(image_context['file_path'])
             except Exception:
                 pass
-            history_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"history": history}, "$unset": {IMAGE_CONTEXT_KEY: ""}},
-                upsert=True
-            )
+            history_store.append_turns(user_id, turns, unset_fields=[IMAGE_CONTEXT_KEY])
         else:
-            history_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"history": history, IMAGE_CONTEXT_KEY: image_context}},
-                upsert=True
-            )
+            history_store.append_turns(user_id, turns, set_fields={IMAGE_CONTEXT_KEY: image_context})
         
         await message.reply_text(
             f"📝 **AI Vision Response**\n\n{ai_response}\n\n__You can ask {uses_left} more follow-up question(s) about the last image, or type /endimage to clear the context.__",
@@ -24,6 +24,7 @@ from pyrogram.errors import QueryIdInvalid, MessageNotModified
 
 from modules.image.multi_provider_image import generate_with_fallback, DEFAULT_IMAGE_MODEL
 from config import LOG_CHANNEL
+from modules.core.scheduler import job_scheduler
 from modules.core.request_queue import (
     can_start_image_request, 
     start_image_request, 
@@ -532,6 +533,8 @@ async def handle_image_generation_query(client: Client, inline_query: InlineQuer
                 logger.warning(f"Query ID invalid for ongoing generation message from user {user_id}")
             except Exception as e:
                 logger.error(f"Error answering ongoing generation message: {str(e)}")
+            # The request is not run, so give back the slot claimed above
+            finish_image_request(user_id)
             return
     
     # Generate a unique task ID for this request
@@ -570,7 +573,8 @@ async def handle_image_generation_query(client: Client, inline_query: InlineQuer
         )
         
         # Generate the image - this returns local file paths directly
-        local_paths = await generate_inline_image(prompt)
+        async with job_scheduler.slot("image", user_id):
+            local_paths = await generate_inline_image(prompt)
         
         # If no images were generated, show error
         if not local_paths:
@@ -784,7 +788,8 @@ async def generate_and_cache_image(client: Client, user_id: int, prompt: str, ta
     local_paths = []
     try:
         # Generate the image
-        local_paths = await generate_inline_image(prompt)
+        async with job_scheduler.slot("image", user_id):
+            local_paths = await generate_inline_image(prompt)
         
         if not local_paths:
             logger.warning(f"No images generated for cache refresh, user {user_id}")
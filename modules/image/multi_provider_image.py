@@ -24,8 +24,14 @@ from g4f.Provider import (
     AnyProvider,
 )
 
+from modules.core.client_pool import g4f_client_pool
+from modules.core.provider_health import image_provider_health
+
 logger = logging.getLogger(__name__)
 
+# Kept for callers that imported the old per-module tracker
+provider_health = image_provider_health
+
 
 class ProviderPriority(Enum):
     """Priority levels for providers"""
@@ -204,9 +210,26 @@ async def generate_with_provider(
     
     logger.info(f"Attempting generation with {provider.name} using model {model}")
     
+    started = time.time()
+    urls, error = await _generate_with_provider_call(provider, prompt, model, width, height, num_images)
+    elapsed = time.time() - started
+    if urls:
+        image_provider_health.record_success(provider.name, elapsed)
+    else:
+        image_provider_health.record_failure(provider.name, elapsed)
+    return urls, error
+
+
+async def _generate_with_provider_call(
+    provider: ImageProvider,
+    prompt: str,
+    model: str,
+    width: int,
+    height: int,
+    num_images: int,
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """Single provider call used by generate_with_provider"""
     try:
-        client = AsyncClient(image_provider=provider.provider_class)
-        
         # Build generation kwargs
         kwargs = {
             "prompt": prompt,
@@ -224,10 +247,11 @@ async def generate_with_provider(
             kwargs["n"] = num_images
         
         # Generate with timeout
-        response = await asyncio.wait_for(
-            client.images.generate(**kwargs),
-            timeout=provider.timeout
-        )
+        with g4f_client_pool.lease(AsyncClient, image_provider=provider.provider_class) as client:
+            response = await asyncio.wait_for(
+                client.images.generate(**kwargs),
+                timeout=provider.timeout
+            )
         
         if not response or not response.data:
             logger.warning(f"{provider.name} returned empty response")
@@ -372,11 +396,22 @@ async def generate_with_fallback(
     
     all_errors = []
     
+    # Order each model's providers by live health, skipping open circuits
+    providers_by_model = {}
+    for try_model in models_to_try:
+        providers = get_providers_for_model(try_model)
+        providers.sort(key=lambda p: p.priority.value)
+        providers_by_model[try_model] = image_provider_health.order_providers(providers)
+    
+    if not any(providers_by_model.values()):
+        # Everything is tripped; trying something beats failing outright
+        logger.warning("All image providers have open circuits, trying them anyway")
+        providers_by_model = {m: get_providers_for_model(m) for m in models_to_try}
+    
     for try_model in models_to_try:
         logger.info(f"Trying model: {try_model}")
         
-        # Get providers for this model
-        providers = get_providers_for_model(try_model)
+        providers = providers_by_model[try_model]
         
         if not providers:
             logger.warning(f"No providers available for model {try_model}")
@@ -388,8 +423,7 @@ async def generate_with_fallback(
                 providers, prompt, try_model, width, height, num_images
             )
         else:
-            # Try providers sequentially (in priority order)
-            providers.sort(key=lambda p: p.priority.value)
+            # Try providers sequentially (in health order)
             urls = None
             error = None
             
@@ -466,55 +500,3 @@ async def generate_images_multi_provider(
         logger.error(f"Image generation failed for user {user_id}: {error}")
     
     return urls, error
-
-
-# ============================================================================
-# PROVIDER HEALTH TRACKING (Optional - for future enhancement)
-# ============================================================================
-
-class ProviderHealthTracker:
-    """
-    Tracks provider success/failure rates for intelligent routing.
-    Providers that fail frequently get lower priority.
-    """
-    
-    def __init__(self):
-        self.stats: Dict[str, Dict[str, int]] = {}
-        self.last_reset = time.time()
-        self.reset_interval = 3600  # Reset stats every hour
-    
-    def record_success(self, provider_name: str):
-        """Record a successful generation"""
-        self._ensure_provider(provider_name)
-        self.stats[provider_name]["success"] += 1
-        self._maybe_reset()
-    
-    def record_failure(self, provider_name: str):
-        """Record a failed generation"""
-        self._ensure_provider(provider_name)
-        self.stats[provider_name]["failure"] += 1
-        self._maybe_reset()
-    
-    def get_success_rate(self, provider_name: str) -> float:
-        """Get the success rate for a provider (0.0 to 1.0)"""
-        if provider_name not in self.stats:
-            return 0.5  # Unknown provider, assume 50%
-        
-        s = self.stats[provider_name]
-        total = s["success"] + s["failure"]
-        if total == 0:
-            return 0.5
-        return s["success"] / total
-    
-    def _ensure_provider(self, provider_name: str):
-        if provider_name not in self.stats:
-            self.stats[provider_name] = {"success": 0, "failure": 0}
-    
-    def _maybe_reset(self):
-        if time.time() - self.last_reset > self.reset_interval:
-            self.stats = {}
-            self.last_reset = time.time()
-
-
-# Global health tracker instance
-provider_health = ProviderHealthTracker()
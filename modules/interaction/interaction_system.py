@@ -4,6 +4,7 @@ from datetime import datetime, timedelta, timezone
 from pyrogram import Client
 from pymongo.collection import Collection
 from modules.core.database import get_user_interactions_collection, get_history_collection, get_creative_prompts_collection
+from modules.core.write_behind import write_behind
 from modules.models.ai_res import get_response
 from config import LOG_CHANNEL
 from pyrogram.enums import ParseMode
@@ -24,18 +25,19 @@ def get_last_interaction(user_id: int, interactions_col: Collection):
         return doc.get("last_interaction_time"), doc.get("last_type")
     return None, None
 
-def set_last_interaction(user_id: int, interaction_type: str, interactions_col: Collection):
-    interactions_col.update_one(
+async def set_last_interaction(user_id: int, interaction_type: str):
+    # Buffered: repeated interactions of a user within one flush interval become one write
+    write_behind.update(
+        "user_interactions",
         {"user_id": user_id},
         {"$set": {"last_interaction_time": datetime.now(timezone.utc), "last_type": interaction_type}},
-        upsert=True
     )
 
 async def generate_engagement_message(user_id: int, history_col: Collection) -> str:
-    user_history = history_col.find_one({"user_id": user_id})
+    # Use last 5 messages for context
+    user_history = history_col.find_one({"user_id": user_id}, {"history": {"$slice": -5}})
     if user_history and user_history.get("history"):
-        # Use last 5 messages for context
-        history = user_history["history"][-5:]
+        history = user_history["history"]
         prompt = (
             "You are an engaging human like assistant. Based on the user's recent chat history, "
             "generate a unique, interesting question or message to re-engage the user. "
@@ -105,7 +107,7 @@ async def interaction_worker(client: Client):
             msg = await generate_engagement_message(user_id, history_col)
             sent = await send_interaction_message(client, user_id, msg)
             if sent:
-                set_last_interaction(user_id, "interaction_system", interactions_col)
+                await set_last_interaction(user_id, "interaction_system")
         await asyncio.sleep(INTERACTION_CHECK_INTERVAL_SECONDS)
 
 async def generate_unique_image_prompt(existing_prompts=None):
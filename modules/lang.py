@@ -1,25 +1,22 @@
 from deep_translator import GoogleTranslator
-from pymongo import MongoClient
-from config import DATABASE_URL
 import time
 import asyncio
 import re
-import functools
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, List, Tuple, Any, Set
+from pymongo import UpdateOne
 from modules.lang_resources.translation_cache import (
     get_cached_translation,
     add_to_translation_cache,
     preload_all_caches,
     batch_cache_translations
 )
+from modules.lang_resources.ui_bundle import get_bundled_translation
 from modules.core.database import get_user_lang_collection, db_service
 
-# Initialize MongoDB client
-mongo_client = MongoClient(DATABASE_URL)
-db = mongo_client['aibotdb']
-user_lang_collection = db['user_lang']
-translation_cache = db['translation_cache']  # Keep for backward compatibility
+# Collections from the shared connection pool
+user_lang_collection = get_user_lang_collection()
+translation_cache = db_service.get_collection('translation_cache')  # Keep for backward compatibility
 
 # Thread pool for parallel processing of translations
 _translation_executor = ThreadPoolExecutor(max_workers=4)
@@ -44,6 +41,40 @@ MAX_RETRIES = 3
 # Special tokens that should not be translated
 SPECIAL_TOKENS = ['@', 'http://', 'https://', '.com', '.org', '.net', '(', ')', '[', ']']
 
+# Seconds to collect cache misses before sending them as one batch
+BATCH_WINDOW = 0.05
+
+# Strings and characters per translator request (Google rejects requests over 5000 characters)
+MAX_BATCH_SIZE = 40
+MAX_BATCH_CHARS = 4500
+
+# Seconds before a string that came back untranslated is sent to the translator again
+NEGATIVE_CACHE_TTL = 6 * 3600
+
+# Seconds before a string whose translation failed is tried again
+FAILURE_CACHE_TTL = 60
+
+# Translations on their way: (working text, lang) -> future shared by everyone waiting for it
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+# Misses collected for the next batch, per language
+_pending_batches: Dict[str, List[str]] = {}
+
+# (working text, lang) -> time until which it is not sent to the translator again
+_negative_cache: Dict[Tuple[str, str], float] = {}
+
+_network_stats = {
+    "misses": 0,
+    "coalesced": 0,
+    "negative_hits": 0,
+    "database_hits": 0,
+    "batches": 0,
+    "requests": 0,
+    "strings_translated": 0,
+    "untranslated": 0,
+    "failed": 0,
+}
+
 # Preload translation caches during module initialization
 try:
     preload_all_caches()
@@ -52,6 +83,11 @@ except Exception as e:
 
 def get_user_language(user_id):
     """Get user's preferred language from database"""
+    # Reuse the context loaded for this update when there is one
+    from modules.core.user_context import user_context_loader
+    context = user_context_loader.peek(user_id)
+    if context is not None:
+        return context.language
     user_lang_collection = get_user_lang_collection()
     user_lang_doc = user_lang_collection.find_one({"user_id": user_id})
     if user_lang_doc:
@@ -78,6 +114,11 @@ def translate_sync(text, lang):
     """
     if lang == 'en' or not text.strip():
         return text
+
+    # Static UI strings are precompiled
+    bundled = get_bundled_translation(text, lang)
+    if bundled is not None:
+        return bundled
         
     # Extract and preserve placeholders
     placeholders = extract_placeholders(text)
@@ -138,6 +179,11 @@ async def async_translate_to_lang(text, user_id=None, lang=None) -> str:
         # Skip translation for English or empty strings
         if lang == 'en' or not text.strip():
             return text
+
+        # Static UI strings are precompiled
+        bundled = get_bundled_translation(text, lang)
+        if bundled is not None:
+            return bundled
             
         # Special fast path for mentions
         if text.startswith('@') or '{mention}' in text:
@@ -190,49 +236,14 @@ async def async_translate_to_lang(text, user_id=None, lang=None) -> str:
                 
             return result
             
-        # Then check database cache (for backward compatibility)
-        cached = get_translation_cache().find_one({"key": cache_key})
-        if cached:
-            _translation_cache[cache_key] = cached["translation"]
-            result = cached["translation"]
-            # Add to the JSON cache for future use
-            add_to_translation_cache(working_text, result, lang)
-            # Restore placeholders
-            for token, placeholder in replacement_map.items():
-                result = result.replace(token, placeholder)
-                
-            # Add to mention cache if it's a mention
-            if text.startswith('@') or '{mention}' in text:
-                if lang not in _mention_cache:
-                    _mention_cache[lang] = {}
-                _mention_cache[lang][text] = result
-                
-            return result
-            
-        # Use direct translation with placeholders removed
-        target_lang = get_target_language_code(lang)
-        
-        # Run translation in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        translate_func = functools.partial(
-            _translate_with_retries, working_text, target_lang
-        )
-        translated_text = await loop.run_in_executor(_translation_executor, translate_func)
-            
-        # Cache the translation of working text
-        if translated_text and translated_text != working_text:
-            # Add to in-memory cache
-            _translation_cache[cache_key] = translated_text
-            
-            # Add to MongoDB cache (will be phased out)
-            get_translation_cache().update_one(
-                {"key": cache_key},
-                {"$set": {"translation": translated_text, "timestamp": time.time()}},
-                upsert=True
-            )
-            
-            # Add to JSON file cache
-            add_to_translation_cache(working_text, translated_text, lang)
+        # Strings the translator recently returned unchanged (or failed on) are not sent again
+        if _is_negatively_cached(working_text, lang):
+            _network_stats["negative_hits"] += 1
+            return text
+
+        # Then the database cache and the translator, batched with other misses
+        # (the batch caches the result in memory, in the database and in the JSON cache)
+        translated_text = await _translate_missing(working_text, lang)
         
         # Restore placeholders for the final result
         for token, placeholder in replacement_map.items():
@@ -254,8 +265,13 @@ async def async_translate_to_lang(text, user_id=None, lang=None) -> str:
 
 def _translate_with_retries(text, target_lang):
     """Helper function for translating with retries in a thread"""
+    return _request_translation(text, target_lang) or text  # Return original text if all attempts fail
+
+def _request_translation(text, target_lang):
+    """Translate with retries in a thread; returns None if all attempts fail"""
     for attempt in range(MAX_RETRIES):
         try:
+            _network_stats["requests"] += 1
             translator = GoogleTranslator(source='en', target=target_lang)
             result = translator.translate(text)
             if result:
@@ -264,7 +280,201 @@ def _translate_with_retries(text, target_lang):
             print(f"Translation attempt {attempt + 1} failed: {e}")
             time.sleep(0.5)  # Small delay before retry
     
-    return text  # Return original text if all attempts fail
+    return None
+
+def _is_negatively_cached(working_text, lang):
+    """Whether a string is known to come back untranslated (or to fail) for a while"""
+    until = _negative_cache.get((working_text, lang))
+    if until is None:
+        return False
+    if until < time.time():
+        _negative_cache.pop((working_text, lang), None)
+        return False
+    return True
+
+async def _translate_missing(working_text, lang):
+    """
+    Translate a string that is in none of the in-memory caches.
+
+    Identical requests share one translation (single flight), and strings
+    requested within BATCH_WINDOW seconds of each other are looked up in the
+    database and sent to the translator together.
+    """
+    _network_stats["misses"] += 1
+    key = (working_text, lang)
+    future = _inflight.get(key)
+    if future is not None:
+        _network_stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _inflight[key] = future
+    batch = _pending_batches.setdefault(lang, [])
+    batch.append(working_text)
+    if len(batch) >= MAX_BATCH_SIZE:
+        loop.create_task(_run_batch(lang, _pending_batches.pop(lang)))
+    elif len(batch) == 1:
+        loop.create_task(_flush_batch_later(lang))
+    # Shielded so that one waiter being cancelled does not cancel the others
+    return await asyncio.shield(future)
+
+async def _flush_batch_later(lang):
+    await asyncio.sleep(BATCH_WINDOW)
+    texts = _pending_batches.pop(lang, None)
+    if texts:
+        await _run_batch(lang, texts)
+
+async def _run_batch(lang, texts):
+    """Translate a batch in the thread pool and hand each waiter its result"""
+    _network_stats["batches"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(_translation_executor, _translate_batch, texts, lang)
+    except Exception as e:
+        print(f"Batch translation error: {e}")
+        results = {}
+    for text in texts:
+        future = _inflight.pop((text, lang), None)
+        if future is not None and not future.done():
+            future.set_result(results.get(text, text))
+
+def _pack_batches(texts):
+    """
+    Group texts into translator requests of one text per line.
+    Texts with line breaks of their own, or too long to share a request, go alone.
+    """
+    batches, current, size = [], [], 0
+    for text in texts:
+        if '\n' in text or len(text) >= MAX_BATCH_CHARS:
+            batches.append([text])
+            continue
+        if current and (len(current) >= MAX_BATCH_SIZE or size + len(text) + 1 > MAX_BATCH_CHARS):
+            batches.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+def _translate_lines(texts, target_lang):
+    """
+    Translate several single-line texts with one request.
+
+    Returns:
+        One translation per text (None where translation failed)
+    """
+    if len(texts) == 1:
+        return [_request_translation(texts[0], target_lang)]
+    joined = _request_translation('\n'.join(texts), target_lang)
+    if joined is not None:
+        lines = joined.split('\n')
+        if len(lines) == len(texts):
+            return [line.strip() if text == text.strip() else line for line, text in zip(lines, texts)]
+        print(f"Batched translation returned {len(lines)} lines for {len(texts)} strings, translating them one by one")
+    return [_request_translation(text, target_lang) for text in texts]
+
+def _translate_batch(texts, lang):
+    """
+    Look up and translate a batch of working texts (runs in the thread pool).
+    Caches what it finds and returns working text -> translation.
+    """
+    results = {}
+    keys = {f"{text}_{lang}": text for text in texts}
+
+    # One database query for the whole batch (for backward compatibility)
+    try:
+        for doc in get_translation_cache().find({"key": {"$in": list(keys)}}, {"key": 1, "translation": 1}):
+            text = keys.get(doc.get("key"))
+            if text is not None and doc.get("translation"):
+                results[text] = doc["translation"]
+                _translation_cache[doc["key"]] = doc["translation"]
+                add_to_translation_cache(text, doc["translation"], lang)
+                _network_stats["database_hits"] += 1
+    except Exception as e:
+        print(f"Translation cache lookup failed: {e}")
+
+    missing = [text for text in texts if text not in results]
+    target_lang = get_target_language_code(lang)
+    updates = []
+    now = time.time()
+    for batch in _pack_batches(missing):
+        for text, translated in zip(batch, _translate_lines(batch, target_lang)):
+            if translated is None:
+                _network_stats["failed"] += 1
+                _negative_cache[(text, lang)] = now + FAILURE_CACHE_TTL
+                results[text] = text
+            elif translated == text:
+                _network_stats["untranslated"] += 1
+                _negative_cache[(text, lang)] = now + NEGATIVE_CACHE_TTL
+                results[text] = text
+            else:
+                _network_stats["strings_translated"] += 1
+                results[text] = translated
+                cache_key = f"{text}_{lang}"
+                # Add to in-memory cache
+                _translation_cache[cache_key] = translated
+                # Add to JSON file cache
+                add_to_translation_cache(text, translated, lang)
+                # Add to MongoDB cache (will be phased out)
+                updates.append(UpdateOne(
+                    {"key": cache_key},
+                    {"$set": {"translation": translated, "timestamp": now}},
+                    upsert=True
+                ))
+
+    if updates:
+        try:
+            get_translation_cache().bulk_write(updates, ordered=False)
+        except Exception as e:
+            print(f"Translation cache update failed: {e}")
+    return results
+
+def translate_static_strings(texts, lang):
+    """
+    Translate static UI strings outside the event loop (UI bundle builds).
+    Uses the caches first and batches the rest; returns text -> translation.
+    """
+    if lang == 'en':
+        return {text: text for text in texts}
+
+    replacement_maps = {}
+    results = {}
+    missing = []
+    for text in texts:
+        # Replace placeholders with tokens, as the runtime path does
+        working_text = text
+        replacement_map = {}
+        for i, (name, placeholder) in enumerate(extract_placeholders(text)):
+            token = f"__PLH_{i}__"
+            replacement_map[token] = placeholder
+            working_text = working_text.replace(placeholder, token)
+        replacement_maps[text] = (working_text, replacement_map)
+
+        cached = get_cached_translation(working_text, lang) or _translation_cache.get(f"{working_text}_{lang}")
+        if cached:
+            results[text] = cached
+        elif not text.strip():
+            results[text] = text
+        else:
+            missing.append(working_text)
+
+    translated = _translate_batch(list(dict.fromkeys(missing)), lang) if missing else {}
+    for text, (working_text, replacement_map) in replacement_maps.items():
+        result = results.get(text) or translated.get(working_text, working_text)
+        for token, placeholder in replacement_map.items():
+            result = result.replace(token, placeholder)
+        results[text] = result
+    return results
+
+def get_translation_network_stats():
+    """Counters of translations that missed the in-memory caches"""
+    stats = dict(_network_stats)
+    stats["inflight"] = len(_inflight)
+    stats["negative_entries"] = len(_negative_cache)
+    stats["strings_per_request"] = round(stats["strings_translated"] / stats["requests"], 1) if stats["requests"] else 0
+    return stats
 
 # Legacy function for backward compatibility
 def translate_to_lang(text, user_id=None, lang=None):
@@ -280,6 +490,11 @@ def translate_to_lang(text, user_id=None, lang=None):
         # Skip translation for English or empty strings
         if lang == 'en' or not text.strip():
             return text
+
+        # Static UI strings are precompiled
+        bundled = get_bundled_translation(text, lang)
+        if bundled is not None:
+            return bundled
             
         # Special fast path for mentions
         if text.startswith('@') or '{mention}' in text:
@@ -401,8 +616,16 @@ async def batch_translate(texts, user_id=None, lang=None):
     if lang == 'en':
         return texts.copy()  # Return copy of original texts
     
+    # Static UI strings are precompiled
+    bundled = [get_bundled_translation(text, lang) for text in texts]
+    if None not in bundled:
+        return bundled
+
     # First check cache for all texts
     cache_hits = batch_cache_translations(texts, lang)
+    for text, translation in zip(texts, bundled):
+        if translation is not None:
+            cache_hits[text] = translation
     
     # If all texts were in cache, return immediately
     if len(cache_hits) == len(texts):
@@ -449,6 +672,11 @@ async def translate_ui_element(text, user_id=None, lang=None):
     if lang == 'en':
         return text
         
+    # Static UI strings are precompiled
+    bundled = get_bundled_translation(text, lang)
+    if bundled is not None:
+        return bundled
+
     # Create cache key
     cache_key = f"ui_{text}_{lang}"
     
@@ -494,6 +722,13 @@ async def format_with_mention(text, mention, user_id=None, lang=None):
     if lang == 'en' or (lang is None and user_id is not None and get_user_language(user_id) == 'en'):
         return text.replace("{mention}", mention)
     
+    # Static UI strings are precompiled with the {mention} placeholder intact
+    if lang is None and user_id is not None:
+        lang = get_user_language(user_id)
+    bundled = get_bundled_translation(text, lang)
+    if bundled is not None:
+        return bundled.replace("{mention}", mention)
+
     # First, preserve the mention by tokenizing it
     tokenized_text, mention_token, _ = preserve_mention(text, "{mention}")
     
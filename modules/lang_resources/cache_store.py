@@ -0,0 +1,454 @@
+"""
+On-disk store for one language of the translation cache
+
+The cache used to be one JSON file per language, parsed completely at
+startup by every bot process and rewritten completely (indented) whenever
+50 new translations had accumulated. TranslationStore keeps each language
+in two files instead:
+
+- <name>.snap: an immutable snapshot, memory-mapped. A small header is
+  followed by an open-addressing hash table of (crc32, offset) slots and
+  the records themselves, so a lookup touches a few pages and opening the
+  store does not read the entries at all.
+- <name>.log: new translations appended as CRC-checked records. Only the
+  log is read into memory, and compaction keeps it short.
+
+Compaction merges the log into a new snapshot, written to a temporary file,
+fsynced and renamed over the old one, and then empties the log. A crash at
+any point leaves either the old snapshot and the full log or the new
+snapshot and a log whose entries it already contains. A record torn by a
+crash fails its CRC and is cut off by the next writer. Lookups keep using
+the old mapping while the new snapshot is written; they only wait for the
+swap to the new one.
+
+Bot processes share the files. Writers hold an exclusive flock on
+<name>.lock while appending or compacting, readers a shared one while
+catching up with the log, and a process notices another one's compaction
+by the snapshot's changed inode. Without fcntl (Windows) the store still
+works but must only be used by one process.
+
+A legacy JSON cache file is imported into the first snapshot and not
+touched afterwards.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Snapshot header: magic, format version, entry count, hash table slots
+_SNAPSHOT_HEADER = struct.Struct("<4sIII")
+_SNAPSHOT_MAGIC = b"TRCS"
+_SNAPSHOT_VERSION = 1
+
+# Hash table slot: crc32 of the key, offset of the record (0 = empty)
+_SLOT = struct.Struct("<II")
+
+# Snapshot record header: key length, value length (UTF-8 bytes)
+_RECORD = struct.Struct("<II")
+
+# Log record header: crc32 of lengths and payload, key length, value length
+_LOG_RECORD = struct.Struct("<III")
+
+# Compact once the log is this large...
+COMPACT_LOG_BYTES = 1 << 20
+
+# ...or holds more than this fraction of the snapshot's entries (and at least COMPACT_MIN_ENTRIES)
+COMPACT_LOG_RATIO = 0.25
+COMPACT_MIN_ENTRIES = 2000
+
+# Minimum seconds between checks for entries appended by other processes
+REFRESH_INTERVAL = 1.0
+
+
+def _log_record(key: bytes, value: bytes) -> bytes:
+    lengths = _RECORD.pack(len(key), len(value))
+    return _LOG_RECORD.pack(zlib.crc32(lengths + key + value), len(key), len(value)) + key + value
+
+
+def _parse_log(data: bytes) -> Tuple[Dict[str, str], int]:
+    """
+    Decode log records.
+
+    Returns:
+        The entries, and the length of the valid prefix of data; anything
+        after it is a record that is incomplete or failed its CRC.
+    """
+    entries: Dict[str, str] = {}
+    position = 0
+    size = len(data)
+    header_size = _LOG_RECORD.size
+    while position + header_size <= size:
+        crc, key_length, value_length = _LOG_RECORD.unpack_from(data, position)
+        start = position + header_size
+        end = start + key_length + value_length
+        if end > size:
+            break
+        payload = data[start:end]
+        if zlib.crc32(_RECORD.pack(key_length, value_length) + payload) != crc:
+            break
+        try:
+            entries[payload[:key_length].decode("utf-8")] = payload[key_length:].decode("utf-8")
+        except UnicodeDecodeError:
+            break
+        position = end
+    return entries, position
+
+
+def write_snapshot(path: str, entries: Dict[str, str]) -> None:
+    """Write entries as a snapshot file, atomically replacing path"""
+    encoded = [(key.encode("utf-8"), value.encode("utf-8")) for key, value in entries.items()]
+    slots = 1
+    while slots < len(encoded) * 2:
+        slots *= 2
+    mask = slots - 1
+    table = bytearray(_SLOT.size * slots)
+    data = bytearray()
+    offset = _SNAPSHOT_HEADER.size + len(table)
+    for key, value in encoded:
+        checksum = zlib.crc32(key)
+        slot = checksum & mask
+        while _SLOT.unpack_from(table, slot * _SLOT.size)[1]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(table, slot * _SLOT.size, checksum, offset + len(data))
+        data += _RECORD.pack(len(key), len(value))
+        data += key
+        data += value
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, len(encoded), slots))
+        f.write(table)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class _Snapshot:
+    """A memory-mapped snapshot file"""
+
+    def __init__(self, path: str):
+        self.count = 0
+        self.identity = None
+        self._map = None
+        self._mask = 0
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size < _SNAPSHOT_HEADER.size:
+                    return
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.identity = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            return
+        magic, version, count, slots = _SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring translation snapshot {path} with unknown format")
+            self.close()
+            return
+        self.count = count
+        self._mask = slots - 1
+
+    def get(self, key: bytes) -> Optional[str]:
+        snapshot = self._map
+        if snapshot is None or not self.count:
+            return None
+        checksum = zlib.crc32(key)
+        mask = self._mask
+        slot = checksum & mask
+        table = _SNAPSHOT_HEADER.size
+        while True:
+            slot_checksum, offset = _SLOT.unpack_from(snapshot, table + slot * _SLOT.size)
+            if not offset:
+                return None
+            if slot_checksum == checksum:
+                key_length, value_length = _RECORD.unpack_from(snapshot, offset)
+                start = offset + _RECORD.size
+                if key_length == len(key) and snapshot[start:start + key_length] == key:
+                    start += key_length
+                    return snapshot[start:start + value_length].decode("utf-8")
+            slot = (slot + 1) & mask
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        snapshot = self._map
+        if snapshot is None:
+            return
+        position = _SNAPSHOT_HEADER.size + (self._mask + 1) * _SLOT.size
+        for _ in range(self.count):
+            key_length, value_length = _RECORD.unpack_from(snapshot, position)
+            position += _RECORD.size
+            key = snapshot[position:position + key_length].decode("utf-8")
+            position += key_length
+            yield key, snapshot[position:position + value_length].decode("utf-8")
+            position += value_length
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.count = 0
+
+
+class TranslationStore:
+    """
+    Translations of one language, shared by all bot processes.
+
+    Usage:
+        store = TranslationStore(CACHE_DIR, "hindi_cache", legacy_json=path)
+        store.get("Settings")
+        store.append({"Settings": "सेटिंग्स"})
+        store.compact_if_needed()
+    """
+
+    def __init__(self, directory: str, name: str, legacy_json: Optional[str] = None):
+        """
+        Args:
+            directory: Where the store's files live
+            name: File name stem, e.g. "hindi_cache"
+            legacy_json: JSON cache file to import when no snapshot exists yet
+        """
+        base = os.path.join(directory, name)
+        self.snapshot_path = f"{base}.snap"
+        self.log_path = f"{base}.log"
+        self._lock_file = open(f"{base}.lock", "a+b")
+        self._log_fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # Serialises this process's writers, log catch-ups and compactions
+        self._write_lock = threading.RLock()
+        # Held by lookups, and by writers only while swapping the snapshot
+        self._lock = threading.RLock()
+        self._snapshot = _Snapshot(self.snapshot_path)
+        # Log entries read so far, and how far the log has been read
+        self._recent: Dict[str, str] = {}
+        self._log_offset = 0
+        # Log entries whose key is not in the snapshot
+        self._new_keys = 0
+        self._last_refresh = 0.0
+        self._stats = {"appended": 0, "compactions": 0, "torn_records": 0}
+
+        if self._snapshot.identity is None:
+            self._create_snapshot(legacy_json)
+        with self._file_lock(exclusive=False):
+            self._catch_up()
+
+    # ------------------------------------------------------------------
+    # Locking
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool, blocking: bool = True):
+        """Hold this process's write lock and the cross-process flock; yields False if not blocking and busy"""
+        if not self._write_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(self._lock_file.fileno(), operation if blocking else operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._write_lock.release()
+
+    def _install_snapshot(self, snapshot: _Snapshot) -> None:
+        """Switch lookups to snapshot, which holds every log entry read so far (must hold the file lock)"""
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+            self._recent = {}
+            # Closed under the lock: no lookup can still be reading it
+            if previous is not snapshot:
+                previous.close()
+        self._log_offset = 0
+        self._new_keys = 0
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _create_snapshot(self, legacy_json: Optional[str]) -> None:
+        """First use of the store: import the legacy JSON file, if any, as the snapshot"""
+        with self._file_lock(exclusive=True):
+            # Another process may have created it meanwhile
+            self._install_snapshot(_Snapshot(self.snapshot_path))
+            if self._snapshot.identity is not None:
+                return
+            entries = {}
+            if legacy_json and os.path.exists(legacy_json):
+                try:
+                    with open(legacy_json, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                except Exception as e:
+                    logger.error(f"Could not import legacy translation cache {legacy_json}: {e}")
+            write_snapshot(self.snapshot_path, entries)
+            self._install_snapshot(_Snapshot(self.snapshot_path))
+            if entries:
+                logger.info(f"Imported {len(entries)} translations from {legacy_json}")
+
+    def _catch_up(self, repair: bool = False) -> None:
+        """
+        Pick up a new snapshot and log records written by other processes.
+        Must hold the file lock; repair (exclusive lock only) cuts off a torn record.
+        """
+        try:
+            identity = os.stat(self.snapshot_path)
+            identity = (identity.st_ino, identity.st_mtime_ns)
+        except FileNotFoundError:
+            identity = None
+        log_size = os.fstat(self._log_fd).st_size
+        if identity != self._snapshot.identity or log_size < self._log_offset:
+            # Compacted by another process: its snapshot already holds the old log
+            self._install_snapshot(_Snapshot(self.snapshot_path))
+        if log_size > self._log_offset:
+            os.lseek(self._log_fd, self._log_offset, os.SEEK_SET)
+            data = os.read(self._log_fd, log_size - self._log_offset)
+            entries, valid = _parse_log(data)
+            for key, value in entries.items():
+                if key not in self._recent and self._snapshot.get(key.encode("utf-8")) is None:
+                    self._new_keys += 1
+                self._recent[key] = value
+            self._log_offset += valid
+            if valid < len(data) and repair:
+                # Nobody else is writing, so this is what a crashed writer left behind
+                logger.warning(f"Discarding {len(data) - valid} bytes of a torn record in {self.log_path}")
+                os.ftruncate(self._log_fd, self._log_offset)
+                self._stats["torn_records"] += 1
+        self._last_refresh = time.monotonic()
+
+    def refresh(self, force: bool = False) -> None:
+        """Pick up entries written by other processes (at most every REFRESH_INTERVAL unless forced)"""
+        if not force and time.monotonic() - self._last_refresh < REFRESH_INTERVAL:
+            return
+        with self._file_lock(exclusive=False, blocking=force) as locked:
+            if locked:
+                self._catch_up()
+
+    def get(self, key: str) -> Optional[str]:
+        """The stored translation of key, or None"""
+        with self._lock:
+            value = self._recent.get(key)
+            if value is None:
+                value = self._snapshot.get(key.encode("utf-8"))
+            return value
+
+    def __len__(self) -> int:
+        return self._snapshot.count + self._new_keys
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """All entries; a key updated in the log is yielded with its latest value only"""
+        with self._lock:
+            recent = dict(self._recent)
+            for key, value in self._snapshot.items():
+                if key not in recent:
+                    yield key, value
+            yield from recent.items()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, entries: Dict[str, str], blocking: bool = True) -> bool:
+        """
+        Append entries to the log in one write.
+
+        Args:
+            entries: Key -> translation
+            blocking: Wait for other processes' writes and compactions; if
+                False, give up when the store is busy
+
+        Returns:
+            Whether the entries were written
+        """
+        if not entries:
+            return True
+        record = b"".join(_log_record(key.encode("utf-8"), value.encode("utf-8"))
+                          for key, value in entries.items())
+        with self._file_lock(exclusive=True, blocking=blocking) as locked:
+            if not locked:
+                return False
+            self._catch_up(repair=True)
+            os.write(self._log_fd, record)
+            self._log_offset += len(record)
+            for key, value in entries.items():
+                if key not in self._recent and self._snapshot.get(key.encode("utf-8")) is None:
+                    self._new_keys += 1
+                self._recent[key] = value
+            self._stats["appended"] += len(entries)
+        return True
+
+    def needs_compaction(self) -> bool:
+        recent = len(self._recent)
+        return (self._log_offset >= COMPACT_LOG_BYTES
+                or recent >= max(COMPACT_MIN_ENTRIES, self._snapshot.count * COMPACT_LOG_RATIO))
+
+    def compact_if_needed(self) -> bool:
+        """Compact if the log has grown enough; returns whether it did"""
+        with self._write_lock:
+            if not self.needs_compaction():
+                return False
+        return self.compact()
+
+    def compact(self) -> bool:
+        """Merge the log into a new snapshot and empty the log"""
+        start = time.monotonic()
+        with self._file_lock(exclusive=True) as locked:
+            if not locked:
+                return False
+            self._catch_up(repair=True)
+            if not self._recent:
+                return False
+            # Lookups keep reading the current snapshot and log entries meanwhile
+            merged = dict(self._snapshot.items())
+            merged.update(self._recent)
+            if os.name == "nt":
+                # Windows cannot replace a mapped file, so lookups wait for the whole rewrite there
+                with self._lock:
+                    self._snapshot.close()
+                    try:
+                        write_snapshot(self.snapshot_path, merged)
+                    finally:
+                        self._install_snapshot(_Snapshot(self.snapshot_path))
+            else:
+                write_snapshot(self.snapshot_path, merged)
+                self._install_snapshot(_Snapshot(self.snapshot_path))
+            # Only empty the log once the snapshot holding its entries is durable
+            os.ftruncate(self._log_fd, 0)
+            self._stats["compactions"] += 1
+        logger.info(f"Compacted {self.log_path} into {len(merged)} entries in {time.monotonic() - start:.2f}s")
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self),
+                "snapshot_entries": self._snapshot.count,
+                "log_entries": len(self._recent),
+                "log_bytes": self._log_offset,
+                **self._stats,
+            }
+
+    def close(self) -> None:
+        with self._write_lock, self._lock:
+            self._snapshot.close()
+            os.close(self._log_fd)
+            self._lock_file.close()
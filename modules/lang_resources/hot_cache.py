@@ -0,0 +1,282 @@
+"""
+Frequency-aware in-memory tier of the translation cache
+
+The hot tier used to be "the first N entries" of each language's cache file
+and never evicted anything. HotCache is a W-TinyLFU cache instead:
+
+- New entries go into a small LRU window (WINDOW_FRACTION of the budget).
+- Entries leaving the window compete for a place in the main area, a
+  segmented LRU (probation and protected). An entry is only admitted if a
+  count-min sketch of recent lookups says it is used more often than the
+  entry it would evict, so a burst of one-off strings cannot flush the
+  translations that every menu uses.
+- The budget is in bytes, estimated per entry, not an entry count.
+
+Lookups do not take a lock: the value is read from a plain dict (atomic
+under the GIL) and the access is recorded in a bounded deque. Every miss is
+recorded, hits only one in HIT_SAMPLE_RATE: popular entries are hit so
+often that a sample still ranks them correctly, and recording every hit
+would cost more than the lookup itself. Recorded accesses are applied to
+the sketch and the LRU order by whoever next holds the lock, i.e. the next
+insert or a lookup that finds the buffer full. If the buffer overflows
+between drains, the oldest accesses are dropped, which only makes the
+frequency estimate a little less exact. Hit and miss counters are updated
+without a lock as well and may lose the odd increment under heavy thread
+contention.
+"""
+
+import logging
+import sys
+import threading
+from collections import OrderedDict, deque
+from itertools import chain
+from typing import Dict, Generic, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Default budget per cache (bytes)
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+# Share of the budget for the admission window
+WINDOW_FRACTION = 0.01
+
+# Share of the main area for entries that were hit again after admission
+PROTECTED_FRACTION = 0.8
+
+# Estimated bookkeeping per entry (dict slots, LRU links) on top of key and value
+ENTRY_OVERHEAD = 200
+
+# Entry size used to size the frequency sketch
+AVERAGE_ENTRY_BYTES = 400
+
+# Accesses recorded between drains
+READ_BUFFER_SIZE = 256
+
+# One in this many hits is recorded (a power of two)
+HIT_SAMPLE_RATE = 8
+
+# The sketch halves its counters after this many increments per counter column
+SKETCH_SAMPLE_FACTOR = 10
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class FrequencySketch:
+    """Count-min sketch with 4 rows of 4-bit (saturating) counters and periodic halving"""
+
+    DEPTH = 4
+
+    def __init__(self, expected_entries: int):
+        width = 64
+        while width < expected_entries:
+            width *= 2
+        self._mask = width - 1
+        self._rows = [bytearray(width) for _ in range(self.DEPTH)]
+        self._sample_size = width * SKETCH_SAMPLE_FACTOR
+        self._additions = 0
+
+    def increment(self, key: Hashable) -> None:
+        hashed = hash(key) & 0xFFFFFFFFFFFFFFFF
+        step = (hashed >> 32) | 1
+        mask = self._mask
+        incremented = False
+        for row in self._rows:
+            index = hashed & mask
+            if row[index] < 15:
+                row[index] += 1
+                incremented = True
+            hashed += step
+        if incremented:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._age()
+
+    def frequency(self, key: Hashable) -> int:
+        hashed = hash(key) & 0xFFFFFFFFFFFFFFFF
+        step = (hashed >> 32) | 1
+        mask = self._mask
+        count = 15
+        for row in self._rows:
+            value = row[hashed & mask]
+            if value < count:
+                count = value
+            hashed += step
+        return count
+
+    def _age(self) -> None:
+        """Halve every counter, so the sketch follows changes in popularity"""
+        self._rows = [bytearray(count >> 1 for count in row) for row in self._rows]
+        self._additions //= 2
+
+
+class HotCache(Generic[K, V]):
+    """
+    W-TinyLFU cache bounded by estimated memory.
+
+    Usage:
+        cache = HotCache(max_bytes=2 * 1024 * 1024)
+        value = cache.get(key)
+        if value is None:
+            value = load(key)
+            cache.put(key, value)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._window_max = max(int(max_bytes * WINDOW_FRACTION), ENTRY_OVERHEAD * 4)
+        main_max = max_bytes - self._window_max
+        self._protected_max = int(main_max * PROTECTED_FRACTION)
+        self._main_max = main_max
+
+        # Every cached entry, read without locking
+        self._data: Dict[K, V] = {}
+        # Segments in LRU order (oldest first): key -> estimated size
+        self._window: "OrderedDict[K, int]" = OrderedDict()
+        self._probation: "OrderedDict[K, int]" = OrderedDict()
+        self._protected: "OrderedDict[K, int]" = OrderedDict()
+        self._window_bytes = 0
+        self._probation_bytes = 0
+        self._protected_bytes = 0
+
+        self._sketch = FrequencySketch(max(max_bytes // AVERAGE_ENTRY_BYTES, 64))
+        self._reads: deque = deque(maxlen=READ_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "rejections": 0}
+
+    @staticmethod
+    def _size(key, value) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    @property
+    def size_bytes(self) -> int:
+        return self._window_bytes + self._probation_bytes + self._protected_bytes
+
+    # ------------------------------------------------------------------
+    # Reading (no lock)
+    # ------------------------------------------------------------------
+
+    def get(self, key: K) -> Optional[V]:
+        """The cached value, or None; records the access either way"""
+        reads = self._reads
+        value = self._data.get(key)
+        stats = self._stats
+        if value is None:
+            stats["misses"] += 1
+            reads.append(key)
+        else:
+            hits = stats["hits"] + 1
+            stats["hits"] = hits
+            if hits & (HIT_SAMPLE_RATE - 1):
+                return value
+            reads.append(key)
+        if len(reads) >= READ_BUFFER_SIZE and self._lock.acquire(False):
+            try:
+                self._drain()
+            finally:
+                self._lock.release()
+        return value
+
+    # ------------------------------------------------------------------
+    # Maintenance (lock held)
+    # ------------------------------------------------------------------
+
+    def _drain(self) -> None:
+        """Apply recorded accesses to the sketch and the LRU order"""
+        reads = self._reads
+        sketch = self._sketch
+        while True:
+            try:
+                key = reads.popleft()
+            except IndexError:
+                return
+            sketch.increment(key)
+            if key in self._window:
+                self._window.move_to_end(key)
+            elif key in self._protected:
+                self._protected.move_to_end(key)
+            elif key in self._probation:
+                # Used again after admission: promote, demoting the oldest protected entries
+                size = self._probation.pop(key)
+                self._probation_bytes -= size
+                self._protected[key] = size
+                self._protected_bytes += size
+                while self._protected_bytes > self._protected_max and len(self._protected) > 1:
+                    demoted, demoted_size = self._protected.popitem(last=False)
+                    self._protected_bytes -= demoted_size
+                    self._probation[demoted] = demoted_size
+                    self._probation_bytes += demoted_size
+
+    def _remove(self, key: K) -> None:
+        if key in self._window:
+            self._window_bytes -= self._window.pop(key)
+        elif key in self._probation:
+            self._probation_bytes -= self._probation.pop(key)
+        elif key in self._protected:
+            self._protected_bytes -= self._protected.pop(key)
+        self._data.pop(key, None)
+
+    def _admit(self, candidate: K, size: int) -> None:
+        """Move an entry leaving the window into the main area if it is worth more than what it displaces"""
+        if size > self._main_max:
+            self._stats["rejections"] += 1
+            self._data.pop(candidate, None)
+            return
+        frequency = self._sketch.frequency(candidate)
+        victims = []
+        freed = self._main_max - self._probation_bytes - self._protected_bytes
+        # Least recently used first, probation before protected
+        iterator = chain(self._probation.items(), self._protected.items())
+        while freed < size:
+            victim, victim_size = next(iterator)
+            if self._sketch.frequency(victim) >= frequency:
+                self._stats["rejections"] += 1
+                self._data.pop(candidate, None)
+                return
+            victims.append(victim)
+            freed += victim_size
+        for victim in victims:
+            self._remove(victim)
+            self._stats["evictions"] += 1
+        self._probation[candidate] = size
+        self._probation_bytes += size
+
+    def put(self, key: K, value: V) -> None:
+        """Cache a value; it may be evicted again straight away if it is rarely used"""
+        if value is None:
+            return
+        size = self._size(key, value)
+        with self._lock:
+            self._drain()
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = value
+            self._window[key] = size
+            self._window_bytes += size
+            while self._window_bytes > self._window_max and len(self._window) > 1:
+                candidate, candidate_size = self._window.popitem(last=False)
+                self._window_bytes -= candidate_size
+                self._admit(candidate, candidate_size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._window.clear()
+            self._probation.clear()
+            self._protected.clear()
+            self._window_bytes = self._probation_bytes = self._protected_bytes = 0
+            self._reads.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups * 100, 2) if lookups else 0
+        stats["entries"] = len(self._data)
+        stats["bytes"] = self.size_bytes
+        return stats
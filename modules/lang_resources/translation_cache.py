@@ -1,8 +1,11 @@
 import os
-import json
+import atexit
 import time
 import threading
-from typing import Dict, Optional, Set, List
+from typing import Any, Dict, Optional, Set, List
+
+from modules.lang_resources.cache_store import TranslationStore
+from modules.lang_resources.hot_cache import HotCache
 
 # Define constants
 RESOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,7 +14,7 @@ CACHE_DIR = os.path.join(RESOURCES_DIR, "cache")
 # Ensure cache directory exists
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-# Cache file paths for different languages
+# Legacy JSON cache files for different languages, imported into each language's store on first use
 CACHE_FILES = {
     'hi': os.path.join(CACHE_DIR, 'hindi_cache.json'),
     'zh': os.path.join(CACHE_DIR, 'chinese_cache.json'),
@@ -20,119 +23,88 @@ CACHE_FILES = {
     'ru': os.path.join(CACHE_DIR, 'russian_cache.json')
 }
 
-# In-memory cache to avoid repeated file reads
-_file_cache: Dict[str, Dict[str, str]] = {}
-_last_file_read: Dict[str, float] = {}
+# On-disk stores (snapshot + append-only log), shared by all bot processes
+_stores: Dict[str, TranslationStore] = {}
 _pending_writes: Dict[str, Dict[str, str]] = {}
 _dirty_languages: Set[str] = set()
 _cache_lock = threading.RLock()  # Reentrant lock for thread safety
-_write_interval = 60  # seconds between batch writes (1 minute)
+_write_interval = 5  # seconds between batch appends; appending costs the same however big the cache is
 _last_write_time = 0
-_cache_stats = {"hits": 0, "misses": 0}
+# Lookups per language that missed the hot cache but found a translation, or found none
+_cache_stats: Dict[str, Dict[str, int]] = {lang: {"hits": 0, "misses": 0} for lang in CACHE_FILES}
 _cache_initialized = False
 
-# Additional in-memory cache for frequently used translations
-_hot_cache: Dict[str, Dict[str, str]] = {}
-_hot_cache_size = 1000  # Number of most frequent translations to keep per language
+# In-memory tier for frequently used translations (W-TinyLFU), read without locking
+_hot_cache_bytes = 2 * 1024 * 1024  # Memory budget per language
+_hot_cache: Dict[str, HotCache] = {lang: HotCache(_hot_cache_bytes) for lang in CACHE_FILES}
 
-def _load_cache_file(lang: str) -> Dict[str, str]:
-    """Load the cache file for the specified language"""
+def _get_store(lang: str) -> Optional[TranslationStore]:
+    """Open the store for the specified language"""
+    store = _stores.get(lang)
+    if store is not None:
+        return store
     with _cache_lock:
         if lang == 'en':
-            return {}  # No translation needed for English
-        
-        # Create empty file if it doesn't exist
+            return None  # No translation needed for English
+
         cache_file = CACHE_FILES.get(lang)
         if not cache_file:
-            return {}
-        
-        # Check if we've already loaded this file recently
-        current_time = time.time()
-        if lang in _file_cache:
-            _last_file_read[lang] = current_time  # Update access time
-            return _file_cache[lang]
-    
-        # Load from file
+            return None
+
+        if lang in _stores:
+            return _stores[lang]
+
         try:
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    _file_cache[lang] = json.load(f)
-                    _last_file_read[lang] = current_time
-                    
-                    # Initialize hot cache for this language
-                    _hot_cache[lang] = {}
-                    
-                    # Fill hot cache with most common translations
-                    if len(_file_cache[lang]) > _hot_cache_size:
-                        # Simple approach: just take the first N items
-                        # A more advanced approach would track frequency
-                        items = list(_file_cache[lang].items())[:_hot_cache_size]
-                        _hot_cache[lang] = dict(items)
-                    else:
-                        _hot_cache[lang] = _file_cache[lang].copy()
-                        
-                    return _file_cache[lang]
-            else:
-                # Create empty cache file
-                _file_cache[lang] = {}
-                _hot_cache[lang] = {}
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump({}, f, ensure_ascii=False, indent=2)
-                _last_file_read[lang] = current_time
-                return {}
+            name = os.path.splitext(os.path.basename(cache_file))[0]
+            store = TranslationStore(CACHE_DIR, name, legacy_json=cache_file)
+            _stores[lang] = store
+            return store
         except Exception as e:
-            print(f"Error loading translation cache file for {lang}: {e}")
-            # Initialize empty caches to prevent repeated attempts to load
-            _file_cache[lang] = {}
-            _hot_cache[lang] = {}
-            return {}
-
-def _save_pending_writes():
-    """Save all pending writes to disk in a batch operation"""
+            print(f"Error opening translation cache store for {lang}: {e}")
+            return None
+
+def _save_pending_writes(force: bool = False, blocking: bool = True):
+    """Append all pending writes to the stores in a batch operation"""
     global _last_write_time
-    
+
     with _cache_lock:
         current_time = time.time()
         # Only write if enough time has passed or there are many pending writes
-        if (current_time - _last_write_time < _write_interval and 
+        if (not force and current_time - _last_write_time < _write_interval and
             sum(len(v) for v in _pending_writes.values()) < 50):
             return
-            
+
         _last_write_time = current_time
         languages_to_save = list(_dirty_languages)
         _dirty_languages.clear()
-        
-    # Save each dirty language file
+
+    # Append each dirty language's batch to its log
     for lang in languages_to_save:
         try:
-            cache_file = CACHE_FILES.get(lang)
-            if not cache_file:
+            store = _get_store(lang)
+            if store is None:
                 continue
-                
+
             with _cache_lock:
-                # Merge pending writes with existing cache
-                if lang not in _file_cache:
-                    _load_cache_file(lang)
-                
-                # Get cached entries
-                cache = _file_cache.get(lang, {})
-                
-                # Get pending writes for this language
-                pending = _pending_writes.get(lang, {})
+                pending = dict(_pending_writes.get(lang, {}))
                 if not pending:
                     continue
-                    
-                # Merge pending writes into cache
-                cache.update(pending)
-                _file_cache[lang] = cache
-                _pending_writes[lang] = {}
-            
-            # Write to file outside the lock
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
-                
+
+            # Append outside the lock; a busy store (another process compacting) is retried next time
+            if not store.append(pending, blocking=blocking):
+                with _cache_lock:
+                    _dirty_languages.add(lang)
+                continue
+
+            # Lookups find them in the store now, unless they were changed meanwhile
+            with _cache_lock:
+                current = _pending_writes.get(lang, {})
+                for text, translation in pending.items():
+                    if current.get(text) == translation:
+                        del current[text]
+
             print(f"Batch saved {len(pending)} translations to {lang} cache")
-                
+
         except Exception as e:
             print(f"Error saving batch translations for {lang}: {e}")
 
@@ -140,125 +112,140 @@ def _queue_for_write(lang: str, text: str, translation: str) -> None:
     """Queue a translation to be written to disk in the next batch operation"""
     if lang == 'en' or not CACHE_FILES.get(lang):
         return
-        
+
     with _cache_lock:
         # Initialize pending writes for this language if needed
         if lang not in _pending_writes:
             _pending_writes[lang] = {}
-            
-        # Add to pending writes
+
+        # Add to pending writes (lookups check them until they are in the store)
         _pending_writes[lang][text] = translation
         _dirty_languages.add(lang)
-        
-        # Update in-memory cache immediately
-        if lang in _file_cache:
-            _file_cache[lang][text] = translation
-            
-        # Update hot cache for frequently accessed items
-        if lang in _hot_cache:
-            _hot_cache[lang][text] = translation
-            
-    # Try to save pending writes if we have accumulated enough
+
+    # Update hot cache for frequently accessed items
+    _hot_cache[lang].put(text, translation)
+
+    # Try to save pending writes if we have accumulated enough, without waiting for other processes
     if sum(len(v) for v in _pending_writes.values()) >= 50:
-        _save_pending_writes()
+        _save_pending_writes(blocking=False)
 
 def get_cached_translation(text: str, lang: str) -> Optional[str]:
-    """Get a translation from the cache if it exists"""
-    global _cache_stats
-    
+    """Get a translation from the cache if it exists (does not take _cache_lock)"""
     if lang == 'en':
         return text
-        
+
     # Check if language is supported
-    if lang not in CACHE_FILES:
+    hot = _hot_cache.get(lang)
+    if hot is None:
         return None
-    
-    with _cache_lock:
-        # Check hot cache first (fastest)
-        if lang in _hot_cache and text in _hot_cache[lang]:
-            _cache_stats["hits"] += 1
-            return _hot_cache[lang][text]
-            
-        # Check in-memory cache next (includes pending writes)
-        if lang in _file_cache and text in _file_cache[lang]:
-            _cache_stats["hits"] += 1
-            # Add to hot cache for future fast access
-            if lang in _hot_cache and len(_hot_cache[lang]) < _hot_cache_size:
-                _hot_cache[lang][text] = _file_cache[lang][text]
-            return _file_cache[lang][text]
-            
-        # Load cache and check again
-        cache = _load_cache_file(lang)
-        if text in cache:
-            _cache_stats["hits"] += 1
-            return cache.get(text)
-            
-        _cache_stats["misses"] += 1
+
+    # Check hot cache first (fastest; it counts its own hits)
+    translation = hot.get(text)
+    if translation is not None:
+        return translation
+    stats = _cache_stats[lang]
+
+    # Then translations not yet written, and the store, after picking up what other processes have added
+    translation = _pending_writes.get(lang, {}).get(text)
+    if translation is None:
+        store = _get_store(lang)
+        if store is not None:
+            translation = store.get(text)
+            if translation is None:
+                store.refresh()
+                translation = store.get(text)
+
+    if translation is None:
+        stats["misses"] += 1
         return None
+    stats["hits"] += 1
+    # Offer it to the hot cache, which keeps it if it is used often enough
+    hot.put(text, translation)
+    return translation
 
 def add_to_translation_cache(text: str, translation: str, lang: str) -> None:
     """Add a new translation to the cache"""
     if lang == 'en' or not text or not translation:
         return
-        
+
     # Queue the translation for batch writing
     _queue_for_write(lang, text, translation)
 
-def get_translation_stats() -> Dict[str, int]:
+def get_translation_stats() -> Dict[str, Any]:
     """Get statistics about the translation cache"""
     stats = {}
     with _cache_lock:
         stats = {
             "cache_entries": {},
             "hit_rate": 0,
-            "memory_usage": 0
+            "memory_usage": 0,
+            "languages": {}
         }
-        
-        # Get entries per language
+
+        # Get entries per language (opening stores that are not open yet)
+        memory_bytes = 0
+        total_hits = total_misses = 0
         for lang in CACHE_FILES:
-            if lang in _file_cache:
-                stats["cache_entries"][lang] = len(_file_cache[lang])
-            else:
-                # Load cache if not loaded
-                cache = _load_cache_file(lang)
-                stats["cache_entries"][lang] = len(cache)
-                
+            hot_stats = _hot_cache[lang].get_stats()
+            hits = hot_stats["hits"] + _cache_stats[lang]["hits"]
+            misses = _cache_stats[lang]["misses"]
+            total_hits += hits
+            total_misses += misses
+            stats["languages"][lang] = {
+                "hits": hits,
+                "misses": misses,
+                "hot_hits": hot_stats["hits"],
+                "hot_hit_rate": hot_stats["hit_rate"],
+                "hot_entries": hot_stats["entries"],
+                "hot_bytes": hot_stats["bytes"],
+                "evictions": hot_stats["evictions"],
+                "rejections": hot_stats["rejections"],
+            }
+            memory_bytes += hot_stats["bytes"]
+
+            store = _get_store(lang)
+            if store is None:
+                stats["cache_entries"][lang] = 0
+                continue
+            store_stats = store.get_stats()
+            stats["cache_entries"][lang] = store_stats["entries"] + len(_pending_writes.get(lang, {}))
+            # Assuming average of 100 bytes per log entry (key + value)
+            memory_bytes += store_stats["log_entries"] * 100
+
         # Calculate hit rate
-        total_lookups = _cache_stats["hits"] + _cache_stats["misses"]
+        total_lookups = total_hits + total_misses
         if total_lookups > 0:
-            stats["hit_rate"] = round((_cache_stats["hits"] / total_lookups) * 100, 2)
-            
-        # Rough estimate of memory usage in MB
-        total_entries = sum(len(cache) for cache in _file_cache.values())
-        # Assuming average of 100 bytes per entry (key + value)
-        stats["memory_usage"] = round((total_entries * 100) / (1024 * 1024), 2)
-            
+            stats["hit_rate"] = round((total_hits / total_lookups) * 100, 2)
+
+        # Rough estimate of memory usage in MB; snapshots are memory-mapped and paged in by the OS
+        stats["memory_usage"] = round(memory_bytes / (1024 * 1024), 2)
+
     return stats
 
 def preload_all_caches() -> None:
-    """Preload all translation caches into memory for faster access"""
+    """Open all translation caches for faster access"""
     global _cache_initialized
-    
+
     if _cache_initialized:
         return
-        
+
     start_time = time.time()
     for lang in CACHE_FILES:
-        _load_cache_file(lang)
-    
+        _get_store(lang)
+
     # Print statistics for debugging
     stats = get_translation_stats()
     load_time = time.time() - start_time
     print(f"Preloaded translation caches in {load_time:.2f} seconds: {stats}")
-    
+
     # Start a background thread to periodically save pending writes
     save_thread = threading.Thread(
-        target=_periodic_save_thread, 
+        target=_periodic_save_thread,
         daemon=True,
         name="TranslationCacheSaver"
     )
     save_thread.start()
-    
+
     _cache_initialized = True
 
 def batch_cache_translations(texts: List[str], lang: str) -> Dict[str, str]:
@@ -268,23 +255,30 @@ def batch_cache_translations(texts: List[str], lang: str) -> Dict[str, str]:
     """
     if lang == 'en':
         return {text: text for text in texts}
-        
+
     result = {}
-    with _cache_lock:
-        for text in texts:
-            cached = get_cached_translation(text, lang)
-            if cached:
-                result[text] = cached
-                
+    for text in texts:
+        cached = get_cached_translation(text, lang)
+        if cached:
+            result[text] = cached
+
     return result
 
+def flush_translation_cache() -> None:
+    """Write all pending translations now (at shutdown)"""
+    _save_pending_writes(force=True)
+
+atexit.register(flush_translation_cache)
+
 def _periodic_save_thread():
-    """Background thread that periodically saves pending translations"""
+    """Background thread that periodically saves pending translations and compacts the stores"""
     while True:
         try:
             _save_pending_writes()
+            for store in list(_stores.values()):
+                store.compact_if_needed()
         except Exception as e:
             print(f"Error in periodic translation save: {e}")
-        
+
         # Sleep for the write interval
-        time.sleep(_write_interval) 
\ No newline at end of file
+        time.sleep(_write_interval)
@@ -0,0 +1,245 @@
+"""
+Precompiled translations of the bot's static UI strings
+
+Panels used to translate every label at request time, one
+async_translate_to_lang call per string, so the first render of a panel in
+a language could wait on the translator several times in a row. The static
+strings are known ahead of time, though:
+
+- every string constant in modules/user/ui_strings.py
+- every string literal passed directly to a translation helper
+  (async_translate_to_lang, translate_ui_element, batch_translate([...]), ...)
+  anywhere in the modules package
+
+extract_static_strings() finds them by parsing the source. build_bundles()
+translates them for every supported language and writes one immutable
+bundle per language (cache/ui_bundle_<lang>.json). The bundles are loaded
+at startup, and the translation functions in modules.lang answer from them
+before any other cache. Only dynamic strings (f-strings, .format() results,
+user content) still take the runtime path.
+
+warm_ui_bundles() runs at startup in the background: it loads the bundles
+and translates only the strings that are new since they were built, so a
+deploy with new UI text needs no separate build step. The bundles can also
+be rebuilt from scratch:
+
+    python -m modules.lang_resources.ui_bundle
+"""
+
+import ast
+import json
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from modules.core.panel_cache import invalidate_panels
+from modules.lang_resources.translation_cache import CACHE_DIR, CACHE_FILES
+
+logger = logging.getLogger(__name__)
+
+# Root of the source tree that is scanned for UI strings
+MODULES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module whose string constants are all UI strings
+UI_STRINGS_FILE = os.path.join(MODULES_DIR, "user", "ui_strings.py")
+
+# Helpers whose first argument is a string to translate
+TRANSLATION_HELPERS = {
+    "async_translate_to_lang",
+    "async_translate",
+    "translate_to_lang",
+    "translate_sync",
+    "translate_ui_element",
+    "format_with_mention",
+}
+
+# Helpers whose first argument is a list of strings to translate
+BATCH_TRANSLATION_HELPERS = {"batch_translate"}
+
+# Language -> read-only mapping of source string to translation
+_bundles: Dict[str, Mapping[str, str]] = {}
+
+_bundle_stats = {"hits": 0, "strings": 0, "built": 0, "warm_seconds": 0.0}
+
+
+def _bundle_path(lang: str) -> str:
+    return os.path.join(CACHE_DIR, f"ui_bundle_{lang}.json")
+
+
+def _helper_name(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _string_constant(node) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.strip():
+        return node.value
+    return None
+
+
+def extract_static_strings(root: str = MODULES_DIR) -> List[str]:
+    """
+    Find the static UI strings in the source tree.
+
+    Args:
+        root: Directory to scan recursively
+
+    Returns:
+        The strings, sorted, without duplicates
+    """
+    strings: Set[str] = set()
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith((".", "__pycache__"))]
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    tree = ast.parse(f.read(), filename=path)
+            except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                logger.warning(f"Skipping {path} while collecting UI strings: {e}")
+                continue
+
+            if os.path.abspath(path) == UI_STRINGS_FILE:
+                for statement in tree.body:
+                    if isinstance(statement, ast.Assign):
+                        value = _string_constant(statement.value)
+                        if value:
+                            strings.add(value)
+
+            for node in ast.walk(tree):
+                if not isinstance(node, ast.Call) or not node.args:
+                    continue
+                helper = _helper_name(node)
+                if helper in TRANSLATION_HELPERS:
+                    value = _string_constant(node.args[0])
+                    if value:
+                        strings.add(value)
+                elif helper in BATCH_TRANSLATION_HELPERS and isinstance(node.args[0], (ast.List, ast.Tuple)):
+                    for element in node.args[0].elts:
+                        value = _string_constant(element)
+                        if value:
+                            strings.add(value)
+    return sorted(strings)
+
+
+def _load_bundle(lang: str) -> Dict[str, str]:
+    try:
+        with open(_bundle_path(lang), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Could not load UI bundle for {lang}: {e}")
+        return {}
+
+
+def _install_bundle(lang: str, bundle: Dict[str, str]) -> None:
+    _bundles[lang] = MappingProxyType(dict(bundle))
+    _bundle_stats["strings"] = sum(len(strings) for strings in _bundles.values())
+
+
+def _write_bundle(lang: str, bundle: Dict[str, str]) -> None:
+    path = _bundle_path(lang)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def load_ui_bundles() -> None:
+    """Load the bundles built so far (startup)"""
+    for lang in CACHE_FILES:
+        _install_bundle(lang, _load_bundle(lang))
+
+
+def build_bundles(strings: Optional[Iterable[str]] = None, languages: Optional[Iterable[str]] = None,
+                  rebuild: bool = False) -> Dict[str, int]:
+    """
+    Translate the static UI strings and write the bundles.
+
+    Blocking (translator and database calls); run it in a thread or from
+    the command line.
+
+    Args:
+        strings: Strings to bundle; extracted from the source by default
+        languages: Languages to build; all supported ones by default
+        rebuild: Translate every string again instead of only new ones
+
+    Returns:
+        Language -> number of strings translated in this run
+    """
+    # Imported here: modules.lang imports this module
+    from modules.lang import translate_static_strings
+
+    strings = list(strings) if strings is not None else extract_static_strings()
+    translated_counts = {}
+    for lang in languages or CACHE_FILES:
+        current = {} if rebuild else _load_bundle(lang)
+        # Strings that are no longer in the source are dropped
+        bundle = {text: current[text] for text in strings if text in current}
+        missing = [text for text in strings if text not in bundle]
+        if missing:
+            translations = translate_static_strings(missing, lang)
+            # A string that came back unchanged is left to the runtime path and its negative cache
+            bundle.update({text: translation for text, translation in translations.items() if translation != text})
+        if missing or len(bundle) != len(current):
+            _write_bundle(lang, bundle)
+            # Panels rendered before may show the strings that were missing untranslated
+            invalidate_panels(lang=lang)
+        _install_bundle(lang, bundle)
+        translated_counts[lang] = len(missing)
+        _bundle_stats["built"] += len(missing)
+    return translated_counts
+
+
+def warm_ui_bundles(extra_strings: Iterable[str] = ()) -> None:
+    """
+    Translate the UI strings added since the bundles were built (startup, in a thread).
+
+    Args:
+        extra_strings: Strings to bundle that the source scan does not find
+    """
+    start = time.time()
+    if not _bundles:
+        load_ui_bundles()
+    try:
+        strings = extract_static_strings()
+        translated = build_bundles(strings + sorted(set(extra_strings) - set(strings)))
+    except Exception as e:
+        print(f"⚠ Warning: Failed to warm UI translation bundles: {e}")
+        return
+    _bundle_stats["warm_seconds"] = round(time.time() - start, 2)
+    print(f"✓ UI translation bundles ready: {_bundle_stats['strings']} strings, "
+          f"{sum(translated.values())} newly translated in {_bundle_stats['warm_seconds']}s")
+
+
+def get_bundled_translation(text: str, lang: str) -> Optional[str]:
+    """Translation of a static UI string, or None if it is not bundled"""
+    bundle = _bundles.get(lang)
+    if bundle is None:
+        return None
+    translation = bundle.get(text)
+    if translation is not None:
+        _bundle_stats["hits"] += 1
+    return translation
+
+
+def get_bundle_stats() -> Dict[str, float]:
+    stats = dict(_bundle_stats)
+    stats["languages"] = len(_bundles)
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(MODULES_DIR))
+    found = extract_static_strings()
+    print(f"Found {len(found)} static UI strings")
+    print(build_bundles(found, rebuild="--rebuild" in sys.argv))
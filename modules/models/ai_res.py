@@ -3,8 +3,9 @@ import asyncio
 import time
 import re
 import html
+from functools import lru_cache
 
-from typing import List, Dict, Any, Optional, Generator, Union, Tuple
+from typing import List, Dict, Any, Optional, Generator, AsyncGenerator, Union, Tuple
 from pyrogram import Client, filters, enums
 from pyrogram.types import Message
 
@@ -12,35 +13,57 @@ from pyrogram.types import Message
 from modules.models.multi_provider_text import (
     generate_text_sync,
     generate_text_multi_provider,
+    generate_text_async,
     get_streaming_response_multi_provider,
+    get_stream_timeouts,
     normalize_model_name,
+    text_dispatch_slot,
     DEFAULT_TEXT_MODEL as MULTI_PROVIDER_DEFAULT_MODEL,
 )
 
 from modules.core.database import get_history_collection
+from modules.core.history_store import history_store, HistoryWindow
 from modules.chatlogs import user_log, error_log
 from modules.maintenance import maintenance_check, maintenance_message, is_feature_enabled
 from modules.user.ai_model import get_user_ai_models, DEFAULT_TEXT_MODEL, RESTRICTED_TEXT_MODELS
 from modules.user.premium_management import is_user_premium
-from config import ADMINS
-from pyrogram.errors import MessageTooLong
+from config import ADMINS, STREAM_RESPONSES
 from modules.image.image_generation import generate_images
 from pyrogram.types import InputMediaPhoto
+from modules.core.scheduler import job_scheduler, report_queue_position, FEATURE_LIMITS
 from modules.core.request_queue import (
     can_start_text_request, 
     start_text_request, 
     finish_text_request,
     get_user_request_status
 )
+from modules.models.streaming_reply import StreamingReply, markdown_closers
+from modules.core.waiting_indicator import waiting_indicators
+from modules.core.text_formatter import markdown_to_html, split_html
+from modules.core.intent_engine import IntentRules, IntentMatch, PatternRule
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import uuid
 import random
 
 
+# Statuses the waiting message steps through while the response is generated
+WAITING_STATUSES = [
+    "🔍 Reading your message...",
+    "🧠 Understanding your request...",
+    "💭 Thinking about the best response...",
+    "✨ Crafting something helpful...",
+    "📝 Putting thoughts into words...",
+    "🎯 Almost ready with your answer..."
+]
+
+
 async def send_interactive_waiting_message(message: Message) -> Message:
     """
     Send an engaging, interactive waiting message that cycles through different statuses
     to show what's happening in the backend while processing the AI response.
-    Also continuously shows "typing" action to indicate active processing.
+    The status edits and the "typing" action are driven by the shared
+    waiting_indicators service; release the message there once the reply is sent.
     
     Args:
         message: The user's message to reply to
@@ -48,60 +71,7 @@ async def send_interactive_waiting_message(message: Message) -> Message:
     Returns:
         The waiting message object that can be edited/deleted later
     """
-    from pyrogram.enums import ChatAction
-    
-    # Creative status messages that explain what's happening
-    status_messages = [
-        "🔍 Reading your message...",
-        "🧠 Understanding your request...",
-        "💭 Thinking about the best response...",
-        "✨ Crafting something helpful...",
-        "📝 Putting thoughts into words...",
-        "🎯 Almost ready with your answer..."
-    ]
-    
-    # Send initial typing action
-    try:
-        await message._client.send_chat_action(message.chat.id, ChatAction.TYPING)
-    except Exception:
-        pass
-    
-    # Send initial message
-    temp_msg = await message.reply_text(status_messages[0])
-    
-    # Create background task to cycle through messages and keep typing action
-    async def cycle_messages():
-        try:
-            for i in range(1, len(status_messages)):
-                await asyncio.sleep(1.5)  # Wait 1.5 seconds between each update
-                try:
-                    # Send typing action to keep it visible
-                    await message._client.send_chat_action(message.chat.id, ChatAction.TYPING)
-                    await temp_msg.edit_text(status_messages[i])
-                except Exception:
-                    # Message might be deleted if response is ready
-                    break
-            
-            # Continue sending typing action every 4 seconds until response is ready
-            while True:
-                await asyncio.sleep(4)
-                try:
-                    await message._client.send_chat_action(message.chat.id, ChatAction.TYPING)
-                except Exception:
-                    break
-        except asyncio.CancelledError:
-            pass
-        except Exception:
-            # Silently handle any errors (message might be deleted)
-            pass
-    
-    # Start the cycling task in background (non-blocking)
-    typing_task = asyncio.create_task(cycle_messages())
-    
-    # Store the task reference on the message for later cancellation
-    temp_msg._typing_task = typing_task
-    
-    return temp_msg
+    return await waiting_indicators.start(message, WAITING_STATUSES)
 
 
 def get_response(history: List[Dict[str, str]], model: str = "gpt-4o") -> str:
@@ -144,6 +114,47 @@ def get_response(history: List[Dict[str, str]], model: str = "gpt-4o") -> str:
         raise
 
 
+async def get_response_async(history: List[Dict[str, str]], model: str = "gpt-4o") -> str:
+    """
+    Get a non-streaming response without blocking the event loop
+    
+    Same contract as get_response, but goes through the async multi-provider
+    path with the process-wide concurrency limit applied.
+    
+    Args:
+        history: Conversation history in the format expected by the AI model
+        model: The user's selected model
+        
+    Returns:
+        String response from the AI model
+    """
+    try:
+        # Validate and prepare history
+        if not isinstance(history, list):
+            history = [history]
+        if not history:
+            history = DEFAULT_SYSTEM_MESSAGE.copy()
+        for i, msg in enumerate(history):
+            if not isinstance(msg, dict):
+                history[i] = {"role": "user", "content": str(msg)}
+        
+        response, error = await generate_text_async(
+            messages=history,
+            model=model,
+            temperature=0.7,
+            max_tokens=4096,
+        )
+        
+        if error:
+            raise Exception(error)
+        
+        return response
+            
+    except Exception as e:
+        print(f"Error generating response with model {model}: {e}")
+        raise
+
+
 def get_streaming_response(history: List[Dict[str, str]], model: str = "gpt-4o") -> Optional[Generator]:
     """
     Get a streaming response from the AI model using multi-provider system
@@ -184,6 +195,99 @@ def get_streaming_response(history: List[Dict[str, str]], model: str = "gpt-4o")
         return None
 
 
+# Threads that consume provider streams; a stream holds its thread until it ends
+_stream_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_stream_executor() -> ThreadPoolExecutor:
+    global _stream_executor
+    if _stream_executor is None:
+        _stream_executor = ThreadPoolExecutor(max_workers=FEATURE_LIMITS["text"], thread_name_prefix="text-stream")
+    return _stream_executor
+
+
+def _stream_chunk_text(chunk) -> str:
+    """Text delta of a streamed completion chunk"""
+    if isinstance(chunk, str):
+        return chunk
+    try:
+        return chunk.choices[0].delta.content or ""
+    except (AttributeError, IndexError, TypeError):
+        return ""
+
+
+async def stream_response_async(history: List[Dict[str, str]], model: str = "gpt-4o") -> AsyncGenerator[str, None]:
+    """
+    Stream a response without blocking the event loop
+    
+    The provider stream is consumed in a worker thread and its text deltas
+    are handed to the event loop as they arrive. Closing the generator early
+    stops the worker at the next chunk.
+    
+    A stream that sends nothing within its provider's timeout, or goes
+    quiet for too long once started, is given up on, so a stalled provider
+    cannot hold the request (and its scheduler and dispatch slots) forever.
+    
+    Args:
+        history: Conversation history in the format expected by the AI model
+        model: The user's selected model
+        
+    Yields:
+        Text chunks of the response
+        
+    Raises:
+        RuntimeError: If no provider could start a stream, or the stream failed or stalled
+    """
+    first_chunk_timeout, idle_timeout = get_stream_timeouts(model)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def hand_over(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop closed while the stream was still running
+            stop.set()
+
+    def consume() -> None:
+        try:
+            stream = get_streaming_response(history, model=model)
+            if stream is None:
+                raise RuntimeError(f"No provider could stream model {model}")
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    text = _stream_chunk_text(chunk)
+                    if text:
+                        hand_over(text)
+            finally:
+                stream.close()
+            hand_over(finished)
+        except Exception as e:
+            hand_over(e)
+
+    async with text_dispatch_slot():
+        loop.run_in_executor(_get_stream_executor(), consume)
+        timeout = first_chunk_timeout
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    raise RuntimeError(f"Streaming stalled: no text for {timeout:g}s") from None
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise RuntimeError(f"Streaming failed: {item}") from item
+                timeout = idle_timeout
+                yield item
+        finally:
+            stop.set()
+
+
 def sanitize_markdown(text: str) -> str:
     """
     Ensures proper markdown formatting in streaming responses
@@ -194,98 +298,16 @@ def sanitize_markdown(text: str) -> str:
     Returns:
         Text with proper markdown formatting
     """
-    # Count opening and closing backticks to handle code blocks
-    backticks_opened = text.count('```')
-    if backticks_opened % 2 != 0:
-        text += '\n```'  # Close incomplete code block
-    
-    # Handle inline code (single backtick)
-    single_backticks = text.count('`') - (backticks_opened * 3)
-    if single_backticks % 2 != 0:
-        text += '`'  # Close incomplete inline code
-    
-    # Handle markdown bold/italic
-    asterisks_count = text.count('*')
-    if asterisks_count % 2 != 0:
-        text += '*'  # Close incomplete bold/italic
-    
-    # Handle incomplete links or formatting
-    if text.count('[') > text.count(']'):
-        text += ']'
-    
-    if text.count('(') > text.count(')'):
-        text += ')'
-    
-    return text
-
-def markdown_to_html(text):
-    """
-    Convert markdown formatting to Telegram-compatible HTML.
-    Handles: code blocks, inline code, bold, italic, strikethrough, headers, links
-    """
-    if not text or not isinstance(text, str):
-        return text or ""
-    
-    # First, protect code blocks (triple backticks) by replacing with placeholders
-    # Use angle brackets that won't conflict with any markdown patterns
-    code_blocks = []
-    def save_code_block(match):
-        code_blocks.append(match.group(0))
-        return f"<<<CODEBLOCK{len(code_blocks) - 1}>>>"
-    
-    text = re.sub(r'```[\s\S]*?```', save_code_block, text)
-    
-    # Protect inline code (single backticks)
-    inline_codes = []
-    def save_inline_code(match):
-        inline_codes.append(match.group(0))
-        return f"<<<INLINECODE{len(inline_codes) - 1}>>>"
-    
-    text = re.sub(r'`[^`]+`', save_inline_code, text)
-    
-    # Escape HTML special characters in the main text
-    text = html.escape(text)
-    
-    # Convert headers (### Header -> <b>Header</b>)
-    text = re.sub(r'^#{1,6}\s*(.+)$', r'<b>\1</b>', text, flags=re.MULTILINE)
-    
-    # Convert bold (**text** or __text__ -> <b>text</b>)
-    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
-    text = re.sub(r'__(.+?)__', r'<b>\1</b>', text)
-    
-    # Convert italic (*text* or _text_ -> <i>text</i>) - be careful not to match bold
-    text = re.sub(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<i>\1</i>', text)
-    text = re.sub(r'(?<!_)_(?!_)(.+?)(?<!_)_(?!_)', r'<i>\1</i>', text)
-    
-    # Convert strikethrough (~~text~~ -> <s>text</s>)
-    text = re.sub(r'~~(.+?)~~', r'<s>\1</s>', text)
-    
-    # Convert links [text](url) -> <a href="url">text</a>
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
-    
-    # Restore inline code - need to handle both escaped and unescaped versions
-    for i, code in enumerate(inline_codes):
-        # Extract just the code (remove backticks)
-        code_content = code[1:-1]
-        html_code = f"<code>{html.escape(code_content)}</code>"
-        # Replace both escaped version (after html.escape) and original
-        text = text.replace(f"&lt;&lt;&lt;INLINECODE{i}&gt;&gt;&gt;", html_code)
-        text = text.replace(f"<<<INLINECODE{i}>>>", html_code)
-    
-    # Restore code blocks - need to handle both escaped and unescaped versions
-    for i, block in enumerate(code_blocks):
-        # Extract the code (remove triple backticks and optional language)
-        match = re.match(r'```(?:\w+)?\n?([\s\S]*?)```', block)
-        if match:
-            code_content = match.group(1).strip()
-        else:
-            code_content = block[3:-3].strip()
-        html_code = f"<pre><code>{html.escape(code_content)}</code></pre>"
-        # Replace both escaped version (after html.escape) and original
-        text = text.replace(f"&lt;&lt;&lt;CODEBLOCK{i}&gt;&gt;&gt;", html_code)
-        text = text.replace(f"<<<CODEBLOCK{i}>>>", html_code)
-    
-    return text
+    triple = text.count('```')
+    return text + markdown_closers(
+        triple,
+        text.count('`') - triple * 3,
+        text.count('*'),
+        text.count('['),
+        text.count(']'),
+        text.count('('),
+        text.count(')'),
+    )
 
 def markdown_code_to_html(text):
     """Legacy function - now calls the full markdown_to_html converter"""
@@ -297,6 +319,109 @@ def validate_image_url(url: str) -> bool:
         return False
     return url.startswith(('http://', 'https://')) or url.startswith('/')
 
+# Strong image intent indicators (high confidence) - Enhanced
+STRONG_IMAGE_INDICATORS = [
+    "create image", "generate image", "make image", "draw image", "create picture",
+    "generate picture", "make picture", "draw picture", "show me image", "show me picture",
+    "i want image", "i want picture", "i need image", "i need picture",
+    "can you create", "can you generate", "can you make", "can you draw", "can you show",
+    "please create", "please generate", "please make", "please draw", "please show",
+    "create for me", "generate for me", "make for me", "draw for me", "show for me",
+    # Enhanced patterns for better detection
+    "create such", "generate such", "make such", "draw such", "show such",
+    "create some", "generate some", "make some", "show some",
+    "create a few", "generate a few", "make a few", "show a few"
+]
+
+# Medium image intent indicators
+MEDIUM_IMAGE_INDICATORS = [
+    "show me", "let me see", "i want to see", "i would like to see", "display",
+    "visualize", "illustrate", "design", "artwork", "sketch", "paint", "render",
+    "how does", "what does", "what would", "how would", "imagine", "picture this"
+]
+
+# Visual subject keywords (things that are typically visualized)
+VISUAL_SUBJECTS = [
+    "cat", "dog", "animal", "flower", "tree", "house", "car", "landscape", "sunset",
+    "dragon", "robot", "castle", "forest", "mountain", "ocean", "space", "planet",
+    "character", "person", "food", "building", "city", "nature", "art", "painting",
+    "drawing", "scene", "view", "background", "wallpaper", "design", "logo", "icon",
+    "image", "images", "picture", "pictures", "photo", "photos"
+]
+
+# Multiple image indicators
+MULTIPLE_IMAGE_INDICATORS = [
+    "multiple", "several", "few", "some", "many", "different", "various", "bunch of",
+    "collection of", "set of", "group of", "types of", "kinds of", "examples of"
+]
+
+# Words in a response that suggest it describes something visual
+VISUAL_RESPONSE_INDICATORS = [
+    "beautiful", "stunning", "amazing", "gorgeous", "magnificent", "spectacular",
+    "breathtaking", "majestic", "elegant", "graceful", "colorful", "vibrant",
+    "imagine", "picture", "visualize", "looks like", "appears", "resembles"
+]
+
+# Number patterns (2, 3, 4, etc.) - Enhanced, tried in this order
+REQUESTED_COUNT_PATTERNS = ["count_qualified", "count_images", "count_after_verb", "count_of"]
+
+USER_INTENT_RULES = IntentRules(
+    keywords={
+        "strong": STRONG_IMAGE_INDICATORS,
+        "medium": MEDIUM_IMAGE_INDICATORS,
+        "visual": VISUAL_SUBJECTS,
+        "multiple": MULTIPLE_IMAGE_INDICATORS,
+    },
+    patterns={
+        "count_qualified": PatternRule(r'\b(\d+)\s+(?:different|various|multiple|types?|kinds?|examples?)', triggers="0123456789"),
+        "count_images": PatternRule(r'\b(\d+)\s+(?:image|images|picture|pictures|photo|photos)', triggers="0123456789"),
+        "count_after_verb": PatternRule(r'(?:create|generate|make|draw|show)\s+(?:such\s+)?(\d+)', triggers="0123456789"),
+        "count_of": PatternRule(r'(\d+)\s+(?:of|such)', triggers="0123456789"),
+    },
+)
+
+# Descriptive phrases in a response that could be images, tried in this order
+DESCRIPTIVE_PATTERNS = ["adjective", "imagine", "example", "scene"]
+
+RESPONSE_RULES = IntentRules(
+    keywords={"visual_response": VISUAL_RESPONSE_INDICATORS},
+    patterns={
+        "adjective": PatternRule(
+            r'(?:beautiful|stunning|amazing|gorgeous|magnificent|spectacular|breathtaking|majestic|elegant|graceful)\s+([^.!?]*?)(?:\.|!|\?|$)',
+            re.IGNORECASE,
+            triggers=("beautiful", "stunning", "amazing", "gorgeous", "magnificent", "spectacular", "breathtaking", "majestic", "elegant", "graceful"),
+            anchored=True,
+        ),
+        "imagine": PatternRule(
+            r'(?:imagine|picture|visualize|think of|envision)\s+([^.!?]*?)(?:\.|!|\?|$)',
+            re.IGNORECASE,
+            triggers=("imagine", "picture", "visualize", "think of", "envision"),
+            anchored=True,
+        ),
+        "example": PatternRule(
+            r'(?:like|such as|for example|including)\s+([^.!?]*?)(?:\.|!|\?|$)',
+            re.IGNORECASE,
+            triggers=("like", "such as", "for example", "including"),
+            anchored=True,
+        ),
+        "scene": PatternRule(
+            r'(?:a|an|the)\s+([^.!?]*?(?:landscape|scene|view|sight|image|picture|photo))(?:\.|!|\?|$)',
+            re.IGNORECASE,
+            triggers=("landscape", "scene", "view", "sight", "image", "picture", "photo"),
+        ),
+    },
+)
+
+# Generation markers the AI may already have put in its response
+EXISTING_IMAGE_MARKERS = re.compile(
+    r'\[(?:GENERATE_IMAGES?|IMAGES?|CREATE_IMAGES?|DRAW|DRAW_IMAGES):', re.IGNORECASE
+)
+
+_FILLER_WORDS = re.compile(r'\b(?:the|a|an|is|are|was|were|will|would|could|should|might|may)\b')
+_PRONOUNS = re.compile(r'\b(?:it|this|that|there|here|they|them|these|those)\b', re.IGNORECASE)
+_SENTENCE_END = re.compile(r'[.!?]+')
+_WHITESPACE = re.compile(r'\s+')
+
 def analyze_user_intent_for_images(user_message: str) -> dict:
     """
     Advanced intent analysis to determine if user wants image generation
@@ -307,72 +432,24 @@ def analyze_user_intent_for_images(user_message: str) -> dict:
     Returns:
         Dictionary with intent analysis results
     """
-    # Ensure we have a string to work with
-    if not user_message or not isinstance(user_message, str):
-        user_message = str(user_message) if user_message else ""
-    
-    user_msg_lower = user_message.lower()
-    
-    # Strong image intent indicators (high confidence) - Enhanced
-    strong_indicators = [
-        "create image", "generate image", "make image", "draw image", "create picture",
-        "generate picture", "make picture", "draw picture", "show me image", "show me picture",
-        "i want image", "i want picture", "i need image", "i need picture",
-        "can you create", "can you generate", "can you make", "can you draw", "can you show",
-        "please create", "please generate", "please make", "please draw", "please show",
-        "create for me", "generate for me", "make for me", "draw for me", "show for me",
-        # Enhanced patterns for better detection
-        "create such", "generate such", "make such", "draw such", "show such",
-        "create some", "generate some", "make some", "show some",
-        "create a few", "generate a few", "make a few", "show a few"
-    ]
-    
-    # Medium image intent indicators
-    medium_indicators = [
-        "show me", "let me see", "i want to see", "i would like to see", "display",
-        "visualize", "illustrate", "design", "artwork", "sketch", "paint", "render",
-        "how does", "what does", "what would", "how would", "imagine", "picture this"
-    ]
-    
-    # Visual subject keywords (things that are typically visualized)
-    visual_subjects = [
-        "cat", "dog", "animal", "flower", "tree", "house", "car", "landscape", "sunset",
-        "dragon", "robot", "castle", "forest", "mountain", "ocean", "space", "planet",
-        "character", "person", "food", "building", "city", "nature", "art", "painting",
-        "drawing", "scene", "view", "background", "wallpaper", "design", "logo", "icon",
-        "image", "images", "picture", "pictures", "photo", "photos"
-    ]
-    
-    # Multiple image indicators
-    multiple_indicators = [
-        "multiple", "several", "few", "some", "many", "different", "various", "bunch of",
-        "collection of", "set of", "group of", "types of", "kinds of", "examples of"
-    ]
-    
-    # Number patterns (2, 3, 4, etc.) - Enhanced
-    import re
-    number_patterns = [
-        r'\b(\d+)\s+(?:different|various|multiple|types?|kinds?|examples?)',
-        r'\b(\d+)\s+(?:image|images|picture|pictures|photo|photos)',
-        r'(?:create|generate|make|draw|show)\s+(?:such\s+)?(\d+)',
-        r'(\d+)\s+(?:of|such)'
-    ]
+    match = USER_INTENT_RULES.scan(user_message)
     
     requested_count = 1
-    for pattern in number_patterns:
-        match = re.search(pattern, user_msg_lower)
-        if match:
+    for name in REQUESTED_COUNT_PATTERNS:
+        found = match.search(name)
+        if found:
             try:
-                requested_count = int(match.group(1))
+                requested_count = int(found.group(1))
                 break
             except (ValueError, IndexError):
                 continue
     
     # Calculate confidence scores
-    strong_score = sum(1 for indicator in strong_indicators if indicator in user_msg_lower)
-    medium_score = sum(1 for indicator in medium_indicators if indicator in user_msg_lower) * 0.7
-    visual_score = sum(1 for subject in visual_subjects if subject in user_msg_lower) * 0.8
-    multiple_score = sum(1 for indicator in multiple_indicators if indicator in user_msg_lower) * 0.6
+    strong_score = match.count("strong")
+    medium_score = match.count("medium") * 0.7
+    detected_subjects = match.keywords("visual")
+    visual_score = len(detected_subjects) * 0.8
+    multiple_score = match.count("multiple") * 0.6
     
     total_score = strong_score + medium_score + visual_score + multiple_score
     
@@ -397,38 +474,31 @@ def analyze_user_intent_for_images(user_message: str) -> dict:
         "requested_count": min(requested_count, 4),  # Cap at 4
         "has_visual_subjects": visual_score > 0,
         "wants_multiple": multiple_score > 0 or requested_count > 1,
-        "detected_subjects": [subject for subject in visual_subjects if subject in user_msg_lower]
+        "detected_subjects": detected_subjects
     }
 
-def extract_visual_concepts_from_response(ai_response: str, user_intent: dict) -> list:
+def extract_visual_concepts_from_response(ai_response: str, user_intent: dict, match: Optional[IntentMatch] = None) -> list:
     """
     Extract visual concepts from AI response for fallback image generation
     
     Args:
         ai_response: AI's response text
         user_intent: Intent analysis from user message
+        match: RESPONSE_RULES scan of ai_response, if the caller already has one
         
     Returns:
         List of potential image prompts
     """
-    response_lower = ai_response.lower()
+    if match is None:
+        match = RESPONSE_RULES.scan(ai_response)
+    response_lower = match.text
     extracted_concepts = []
     
     # Look for descriptive phrases that could be images
-    descriptive_patterns = [
-        r'(?:beautiful|stunning|amazing|gorgeous|magnificent|spectacular|breathtaking|majestic|elegant|graceful)\s+([^.!?]*?)(?:\.|!|\?|$)',
-        r'(?:imagine|picture|visualize|think of|envision)\s+([^.!?]*?)(?:\.|!|\?|$)',
-        r'(?:like|such as|for example|including)\s+([^.!?]*?)(?:\.|!|\?|$)',
-        r'(?:a|an|the)\s+([^.!?]*?(?:landscape|scene|view|sight|image|picture|photo))(?:\.|!|\?|$)'
-    ]
-    
-    import re
-    for pattern in descriptive_patterns:
-        matches = re.findall(pattern, response_lower, re.IGNORECASE)
-        for match in matches:
+    for name in DESCRIPTIVE_PATTERNS:
+        for found in match.findall(name):
             # Clean and validate the concept
-            concept = match.strip()
-            concept = re.sub(r'\s+', ' ', concept)
+            concept = _WHITESPACE.sub(' ', found.strip())
             if len(concept) > 10 and len(concept) < 100:  # Reasonable length
                 extracted_concepts.append(concept)
     
@@ -441,8 +511,8 @@ def extract_visual_concepts_from_response(ai_response: str, user_intent: dict) -
                 if context_match:
                     context = context_match.group().strip()
                     # Clean up the context to make a good prompt
-                    context = re.sub(r'\b(?:the|a|an|is|are|was|were|will|would|could|should|might|may)\b', '', context)
-                    context = re.sub(r'\s+', ' ', context).strip()
+                    context = _FILLER_WORDS.sub('', context)
+                    context = _WHITESPACE.sub(' ', context).strip()
                     if len(context) > 5:
                         extracted_concepts.append(context)
     
@@ -465,17 +535,10 @@ def smart_response_analysis(ai_response: str, user_intent: dict) -> tuple:
     suggested_count = 1
     
     # Check if AI response already has generation patterns
-    existing_patterns = [
-        r'\[GENERATE_IMAGE:', r'\[GENERATE_IMAGES:', r'\[IMAGE:', r'\[IMAGES:',
-        r'\[CREATE_IMAGE:', r'\[CREATE_IMAGES:', r'\[DRAW:', r'\[DRAW_IMAGES:'
-    ]
-    
-    import re
-    has_existing_patterns = any(re.search(pattern, ai_response, re.IGNORECASE) for pattern in existing_patterns)
-    
-    if has_existing_patterns:
+    if EXISTING_IMAGE_MARKERS.search(ai_response):
         return False, [], 1  # AI already handled it
     
+    match = None
     # Determine if we should generate based on user intent
     if user_intent["intent"] == "definite_image_request":
         should_generate = True
@@ -485,19 +548,13 @@ def smart_response_analysis(ai_response: str, user_intent: dict) -> tuple:
         suggested_count = user_intent["requested_count"]
     elif user_intent["intent"] == "possible_image_request" and user_intent["confidence"] != "none":
         # Check if AI response seems to be describing something visual
-        visual_response_indicators = [
-            "beautiful", "stunning", "amazing", "gorgeous", "magnificent", "spectacular",
-            "breathtaking", "majestic", "elegant", "graceful", "colorful", "vibrant",
-            "imagine", "picture", "visualize", "looks like", "appears", "resembles"
-        ]
-        
-        response_visual_score = sum(1 for indicator in visual_response_indicators if indicator in ai_response.lower())
-        if response_visual_score >= 2:
+        match = RESPONSE_RULES.scan(ai_response)
+        if match.count("visual_response") >= 2:
             should_generate = True
     
     # Extract potential prompts from the response
     if should_generate:
-        extracted_concepts = extract_visual_concepts_from_response(ai_response, user_intent)
+        extracted_concepts = extract_visual_concepts_from_response(ai_response, user_intent, match)
         
         if extracted_concepts:
             suggested_prompts = extracted_concepts
@@ -507,7 +564,7 @@ def smart_response_analysis(ai_response: str, user_intent: dict) -> tuple:
         else:
             # Fallback: try to extract any descriptive content
             # Look for sentences that might describe something visual
-            sentences = re.split(r'[.!?]+', ai_response)
+            sentences = _SENTENCE_END.split(ai_response)
             descriptive_sentences = []
             
             for sentence in sentences:
@@ -517,8 +574,8 @@ def smart_response_analysis(ai_response: str, user_intent: dict) -> tuple:
                     descriptive_words = ["beautiful", "amazing", "stunning", "colorful", "bright", "dark", "large", "small", "tall", "short"]
                     if any(word in sentence.lower() for word in descriptive_words):
                         # Clean sentence to make it a good prompt
-                        clean_sentence = re.sub(r'\b(?:it|this|that|there|here|they|them|these|those)\b', '', sentence, flags=re.IGNORECASE)
-                        clean_sentence = re.sub(r'\s+', ' ', clean_sentence).strip()
+                        clean_sentence = _PRONOUNS.sub('', sentence)
+                        clean_sentence = _WHITESPACE.sub(' ', clean_sentence).strip()
                         if len(clean_sentence) > 10:
                             descriptive_sentences.append(clean_sentence)
             
@@ -1039,15 +1096,17 @@ def get_system_prompt_version_marker() -> str:
 
 def check_and_update_system_prompt(history: List[Dict[str, str]], user_id: int = None) -> List[Dict[str, str]]:
     """
-    Check if the user's history has an outdated system prompt and update it.
-    This ensures all users always use the latest system prompt.
+    Check if a message list has an outdated system prompt and replace it.
+    
+    Stored histories no longer carry a copy of the prompt (see
+    modules.core.history_store), so this only rewrites the list it is given.
     
     Args:
-        history: User's conversation history
-        user_id: User ID for database update (optional)
+        history: Conversation messages, possibly starting with a system prompt
+        user_id: Unused, kept for backwards compatibility
         
     Returns:
-        Updated history with latest system prompt
+        Messages with the latest system prompt
     """
     if not history or not isinstance(history, list):
         return DEFAULT_SYSTEM_MESSAGE.copy()
@@ -1073,22 +1132,7 @@ def check_and_update_system_prompt(history: List[Dict[str, str]], user_id: int =
         user_messages = [msg for msg in history if msg.get('role') != 'system']
         
         # Combine new system message with user's conversation history
-        updated_history = DEFAULT_SYSTEM_MESSAGE.copy() + user_messages
-        
-        # Update in database if user_id provided
-        if user_id:
-            try:
-                history_collection = get_history_collection()
-                history_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"history": updated_history}},
-                    upsert=True
-                )
-                print(f"[SYSTEM_PROMPT] Updated system prompt for user {user_id} to version {SYSTEM_PROMPT_VERSION}")
-            except Exception as e:
-                print(f"[SYSTEM_PROMPT] Error updating database for user {user_id}: {e}")
-        
-        return updated_history
+        return DEFAULT_SYSTEM_MESSAGE.copy() + user_messages
     
     return history
 
@@ -1442,6 +1486,192 @@ DEFAULT_SYSTEM_MESSAGE: List[Dict[str, str]] = [
     }
 ]
 
+# Conversations reference the prompt by version instead of storing a copy
+history_store.register_system_prompt(SYSTEM_PROMPT_VERSION, DEFAULT_SYSTEM_MESSAGE)
+
+
+# ============================================================================
+# CONTEXT WINDOW
+# ============================================================================
+
+# Input token budget per model: system prompt, summary, recent turns and the
+# new message together. Replies get their own max_tokens on top of this.
+CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {
+    "gpt-4o": 16000,
+    "qwen3": 16000,
+    "llama-70b": 12000,
+    "command-r": 12000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 8000
+
+# Per-message framing cost (role, separators) in the chat format
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Rolling summary of turns that fell out of the context window
+ROLLING_SUMMARY_ENABLED = True
+SUMMARY_MIN_TURNS = 12  # Unsummarized dropped turns needed before summarizing again
+SUMMARY_MAX_TURNS = 80  # Turns folded in per run, a longer backlog catches up over several runs
+SUMMARY_MAX_TOKENS = 400
+
+_summary_tasks: Dict[int, asyncio.Task] = {}
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token count estimate for a piece of text.
+
+    BPE tokenizers average roughly four bytes of UTF-8 per token: about four
+    characters of English, fewer for accented or CJK text.
+    """
+    if not text:
+        return 0
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimated tokens for one chat message including framing overhead"""
+    content = message.get("content", "")
+    if not isinstance(content, str):
+        content = str(content)
+    return estimate_tokens(content) + MESSAGE_TOKEN_OVERHEAD
+
+
+def get_context_budget(model: str) -> int:
+    """Input token budget for a model"""
+    return CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+def build_context_window(
+    prompt: List[Dict[str, str]],
+    turns: List[Dict[str, Any]],
+    pending: List[Dict[str, Any]],
+    model: str,
+    summary: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Assemble the messages for a model call within the model's token budget.
+
+    The system prompt, the summary and the pending messages are always sent.
+    Stored turns are added newest first until the budget is used up.
+
+    Args:
+        prompt: System prompt messages
+        turns: Stored conversation turns, oldest first
+        pending: Messages for this request (e.g. the new user message)
+        model: User model name, selects the budget
+        summary: Rolling summary of older turns, if any
+
+    Returns:
+        Tuple of (messages, number of most recent turns included)
+    """
+    head = list(prompt)
+    if summary:
+        head.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+
+    remaining = get_context_budget(model)
+    remaining -= sum(estimate_message_tokens(msg) for msg in head)
+    remaining -= sum(estimate_message_tokens(msg) for msg in pending)
+
+    kept = 0
+    for msg in reversed(turns):
+        cost = estimate_message_tokens(msg)
+        if cost > remaining:
+            break
+        remaining -= cost
+        kept += 1
+
+    recent = turns[len(turns) - kept:] if kept else []
+    return head + recent + list(pending), kept
+
+
+async def _update_rolling_summary(user_id: int, window: HistoryWindow, upto: int) -> None:
+    """Fold turns that left the context window into the user's rolling summary"""
+    try:
+        start = window.summary_upto
+        turns = window.turns[max(start, window.start) - window.start:max(upto - window.start, 0)]
+        if start < window.start:
+            # Turns between the summary and the loaded window were never in context
+            turns = history_store.load_range(user_id, start, min(window.start, upto)) + turns
+        if not turns:
+            # The range was dropped by the stored-turn cap, move past it
+            history_store.save_summary(user_id, window.summary or "", upto)
+            return
+        transcript = "\n".join(f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in turns)
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You maintain a running summary of a chat between a user and an assistant. "
+                    "Merge the new messages into the existing summary. Keep facts about the user, "
+                    "their preferences, names, decisions and unfinished tasks. Reply with the "
+                    "summary only, in under 150 words."
+                ),
+            },
+            {"role": "user", "content": f"Existing summary:\n{window.summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ]
+        summary, error = await generate_text_async(messages, model=DEFAULT_TEXT_MODEL, max_tokens=SUMMARY_MAX_TOKENS)
+        if error or not summary:
+            print(f"[DEBUG] Rolling summary failed for user {user_id}: {error}")
+            return
+        history_store.save_summary(user_id, summary.strip(), upto)
+    except Exception as e:
+        print(f"[DEBUG] Rolling summary failed for user {user_id}: {e}")
+    finally:
+        _summary_tasks.pop(user_id, None)
+
+
+def _schedule_rolling_summary(user_id: int, window: HistoryWindow, dropped: int) -> None:
+    """Summarize dropped turns in the background once enough have piled up"""
+    if not ROLLING_SUMMARY_ENABLED or user_id in _summary_tasks:
+        return
+    upto = window.start + dropped
+    if upto - window.summary_upto < SUMMARY_MIN_TURNS:
+        return
+    upto = min(upto, window.summary_upto + SUMMARY_MAX_TURNS)
+    try:
+        _summary_tasks[user_id] = asyncio.get_running_loop().create_task(
+            _update_rolling_summary(user_id, window, upto)
+        )
+    except RuntimeError:
+        # No running loop (sync caller), summarize on a later async request
+        pass
+
+
+def assemble_context(
+    user_id: int,
+    pending: List[Dict[str, Any]],
+    model: str,
+    prompt: Optional[List[Dict[str, str]]] = None,
+    max_turns: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build a token-budgeted message list for a user's next model call.
+
+    Args:
+        user_id: Telegram user ID
+        pending: Messages for this request, appended after the history
+        model: User model name, selects the token budget
+        prompt: System prompt messages (defaults to DEFAULT_SYSTEM_MESSAGE)
+        max_turns: Cap on stored turns considered, before the token budget
+
+    Returns:
+        Messages ready to pass to get_response_async
+    """
+    window = history_store.load_window(user_id)
+    turns = window.turns[-max_turns:] if max_turns else window.turns
+    messages, kept = build_context_window(
+        DEFAULT_SYSTEM_MESSAGE if prompt is None else prompt,
+        turns,
+        pending,
+        model,
+        summary=window.summary,
+    )
+    dropped = len(window.turns) - kept
+    if dropped:
+        _schedule_rolling_summary(user_id, window, dropped)
+    return messages
+
 def post_process_ai_response_for_missing_patterns(ai_response: str, user_intent: dict, user_message: str) -> str:
     """
     Post-process AI response to inject missing generation patterns when they should be there
@@ -1465,15 +1695,7 @@ def post_process_ai_response_for_missing_patterns(ai_response: str, user_intent:
         return ai_response
     
     # Check if AI already has generation patterns
-    existing_patterns = [
-        r'\[GENERATE_IMAGE:', r'\[GENERATE_IMAGES:', r'\[IMAGE:', r'\[IMAGES:',
-        r'\[CREATE_IMAGE:', r'\[CREATE_IMAGES:', r'\[DRAW:', r'\[DRAW_IMAGES:'
-    ]
-    
-    import re
-    has_existing_patterns = any(re.search(pattern, ai_response, re.IGNORECASE) for pattern in existing_patterns)
-    
-    if has_existing_patterns:
+    if EXISTING_IMAGE_MARKERS.search(ai_response):
         return ai_response  # AI already handled it correctly
     
     # Analyze if we should inject patterns
@@ -1587,7 +1809,6 @@ async def aires(client: Client, message: Message) -> None:
         # Start the text request in queue system
         start_text_request(user_id, f"Processing message: {(message.text or 'media')[:30]}...")
         
-        await client.send_chat_action(chat_id=message.chat.id, action=enums.ChatAction.TYPING)
         temp = await send_interactive_waiting_message(message)
         
         # Safely extract the message text
@@ -1602,44 +1823,30 @@ async def aires(client: Client, message: Message) -> None:
         # Pre-analyze user intent for better processing
         user_intent_analysis = analyze_user_intent_for_images(ask)
         
-        # Access MongoDB collection through the DatabaseService
-        history_collection = get_history_collection()
-        
-        # Fetch user history from MongoDB
-        user_history = history_collection.find_one({"user_id": user_id})
-        if user_history and 'history' in user_history:
-            # Ensure history is a list
-            history = user_history['history']
-            if not isinstance(history, list):
-                history = [history]
-            # Check and update system prompt if outdated
-            history = check_and_update_system_prompt(history, user_id)
-        else: 
-            # Use a copy of the default system message
-            history = DEFAULT_SYSTEM_MESSAGE.copy()
-
         # Context management for auto image generation
         # Check if user is asking for image generation
         user_message_lower = ask.lower()
         is_image_request = user_intent_analysis["intent"] != "no_image_request"
+
+        # --- Get user model ---
+        user_model, _ = await get_user_ai_models(user_id)
+        is_premium, _, _ = await is_user_premium(user_id)
+        is_admin = user_id in ADMINS
+        if not is_premium and not is_admin and user_model in RESTRICTED_TEXT_MODELS:
+            user_model = DEFAULT_TEXT_MODEL
+
+        pending = []
+        prompt = None
+        max_turns = None
         
         # Enhanced context management for better auto-generation
         if is_image_request:
-            # If it's an image request, ensure we have recent training examples in context
-            # Count recent messages (exclude system messages)
-            recent_messages = [msg for msg in history if msg.get('role') != 'system']
-            
-            # If conversation is getting long, trim older messages but keep system training
-            if len(recent_messages) > 15:
-                # Keep system messages and recent training examples
-                system_messages = [msg for msg in history if msg.get('role') == 'system']
-                recent_training = [msg for msg in DEFAULT_SYSTEM_MESSAGE[:15] if msg.get('role') in ['user', 'assistant']]
-                recent_conversation = recent_messages[-10:]  # Keep last 10 messages
-                
-                # Rebuild history with system + training + recent conversation
-                history = system_messages + recent_training + recent_conversation
-                
-                print(f"[DEBUG] Context management: Trimmed history for user {user_id} due to image request")
+            # Keep system messages and the early training examples, and only the
+            # last 10 turns, so the generation patterns dominate the context
+            system_messages = [msg for msg in DEFAULT_SYSTEM_MESSAGE if msg.get('role') == 'system']
+            recent_training = [msg for msg in DEFAULT_SYSTEM_MESSAGE[:15] if msg.get('role') in ['user', 'assistant']]
+            prompt = system_messages + recent_training
+            max_turns = 10
             
             # Add enhanced contextual reminder for image generation
             context_reminder = {
@@ -1653,20 +1860,14 @@ async def aires(client: Client, message: Message) -> None:
                     f"ALWAYS include the exact brackets and format. Be creative with descriptions."
                 )
             }
-            history.append(context_reminder)
+            pending.append(context_reminder)
 
-        # Add the new user query to the history
-        history.append({"role": "user", "content": ask})
+        # Add the new user query after the history
+        pending.append({"role": "user", "content": ask})
+
+        # System prompt, rolling summary and as many recent turns as the model's budget allows
+        history = assemble_context(user_id, pending, user_model, prompt=prompt, max_turns=max_turns)
 
-        # Use non-streaming approach for all chats to avoid flood control
-        await client.send_chat_action(chat_id=message.chat.id, action=enums.ChatAction.TYPING)
-        
-        # --- Get user model ---
-        user_model, _ = await get_user_ai_models(user_id)
-        is_premium, _, _ = await is_user_premium(user_id)
-        is_admin = user_id in ADMINS
-        if not is_premium and not is_admin and user_model in RESTRICTED_TEXT_MODELS:
-            user_model = DEFAULT_TEXT_MODEL
         model_to_use = user_model
         fallback_used = False
         
@@ -1678,13 +1879,31 @@ async def aires(client: Client, message: Message) -> None:
             else:
                 print(f"[DEBUG] Image request detected, using model: {user_model}")
         
-        try:
-            ai_response = get_response(history, model=model_to_use)
-        except Exception as e:
-            # fallback to default Groq model
-            fallback_used = True
-            print(f"[DEBUG] Primary model failed, using fallback: {e}")
-            ai_response = get_response(history, model="default")
+        # Image requests are answered in one piece, since their generation markers are rewritten before sending
+        streamed_reply = StreamingReply(message, temp, render=markdown_code_to_html) if STREAM_RESPONSES and not is_image_request else None
+        ai_response = None
+        async with job_scheduler.slot("text", user_id, on_position=report_queue_position(temp)):
+            if streamed_reply is not None:
+                try:
+                    async for chunk in stream_response_async(history, model=model_to_use):
+                        await streamed_reply.feed(chunk)
+                    # A stream that produced no text falls through to the non-streaming path below
+                    if streamed_reply.started:
+                        ai_response = streamed_reply.text
+                except Exception as e:
+                    print(f"[DEBUG] Streaming failed after {len(streamed_reply.text)} characters: {e}")
+                    if streamed_reply.started:
+                        ai_response = streamed_reply.text + "\n\n⚠️ The response was interrupted."
+                if streamed_reply.started:
+                    print(f"[DEBUG] First token for user {user_id} after {streamed_reply.first_token_latency:.2f}s")
+            if ai_response is None:
+                try:
+                    ai_response = await get_response_async(history, model=model_to_use)
+                except Exception as e:
+                    # fallback to default Groq model
+                    fallback_used = True
+                    print(f"[DEBUG] Primary model failed, using fallback: {e}")
+                    ai_response = await get_response_async(history, model="default")
         
         # Ensure ai_response is a string
         if not isinstance(ai_response, str):
@@ -1711,33 +1930,12 @@ async def aires(client: Client, message: Message) -> None:
             print(f"[WARNING] AI response: '{ai_response[:200]}...'")
             print(f"[WARNING] User intent: {user_intent_analysis}")
         
-        # Add the AI response to the history (use original response for context)
-        history.append({"role": "assistant", "content": ai_response})
-        
-        # Context cleanup - remove temporary system reminders
-        history = [msg for msg in history if not (msg.get('role') == 'system' and 'REMINDER:' in msg.get('content', ''))]
-        
-        # Update the user's history in MongoDB
-        history_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"history": history}},
-            upsert=True
-        )
-
-        # --- Fix: Always send the full response, including code blocks ---
-        def split_by_limit(text, limit=4096):
-            # Split text into chunks by line, never breaking inside a line
-            lines = text.splitlines(keepends=True)
-            chunks = []
-            current = ""
-            for line in lines:
-                if len(current) + len(line) > limit:
-                    chunks.append(current)
-                    current = ""
-                current += line
-            if current:
-                chunks.append(current)
-            return chunks
+        # Append this turn to the stored history (use original response for context).
+        # Temporary system reminders are never persisted.
+        history_store.append_turns(user_id, [
+            {"role": "user", "content": ask},
+            {"role": "assistant", "content": ai_response},
+        ])
 
         try:
             # Prepare the response text
@@ -1745,20 +1943,18 @@ async def aires(client: Client, message: Message) -> None:
                 full_response = processed_response + "\n\n<b>Note: The selected model is currently unavailable. Using <b>Qwen-3</b> as fallback till it's fixed.</b>"
             else:
                 full_response = processed_response
-            html_response = markdown_code_to_html(full_response)
-            
-            # Cancel typing task and delete the temporary message
-            if hasattr(temp, '_typing_task'):
-                temp._typing_task.cancel()
-            await temp.delete()
-            
-            # Send text response immediately
-            try:
-                await message.reply_text(html_response, disable_web_page_preview=True, parse_mode=enums.ParseMode.HTML)
-            except MessageTooLong:
-                # If too long, split into chunks by line, never breaking inside a line
-                chunks = split_by_limit(html_response)
-                for chunk in chunks:
+            if streamed_reply is not None and streamed_reply.started:
+                # The waiting message already shows the streamed reply; bring it to its final text
+                await streamed_reply.finish(full_response)
+            else:
+                html_response = markdown_code_to_html(full_response)
+                
+                # Stop the waiting indicator and delete the temporary message
+                waiting_indicators.release(temp)
+                await temp.delete()
+                
+                # Send text response immediately, split into messages Telegram accepts
+                for chunk in split_html(html_response):
                     await message.reply_text(chunk, disable_web_page_preview=True, parse_mode=enums.ParseMode.HTML)
             
             # Start background image generation if there are image tasks
@@ -1771,9 +1967,8 @@ async def aires(client: Client, message: Message) -> None:
             await error_log(client, "MESSAGE_SEND", str(e), f"Failed to send text response, falling back to plain text", user_id)
             # Fallback: send as plain text (still try markdown conversion)
             try:
-                # Cancel typing task and delete temp message
-                if hasattr(temp, '_typing_task'):
-                    temp._typing_task.cancel()
+                # Stop the waiting indicator and delete temp message
+                waiting_indicators.release(temp)
                 await temp.delete()
                 # Try with markdown to HTML conversion, fallback to truly plain text if needed
                 try:
@@ -1809,6 +2004,8 @@ async def aires(client: Client, message: Message) -> None:
     finally:
         # Always finish the text request in queue system
         finish_text_request(user_id)
+        if 'temp' in locals():
+            waiting_indicators.release(temp)
 
 async def new_chat(client: Client, message: Message) -> None:
     """
@@ -1821,17 +2018,8 @@ async def new_chat(client: Client, message: Message) -> None:
     try:
         user_id = message.from_user.id
         
-        # Access MongoDB collection through the DatabaseService
-        history_collection = get_history_collection()
-        
-        # Delete user history from MongoDB
-        history_collection.delete_one({"user_id": user_id})
-        
-        # Create a new history entry with the default system message list
-        history_collection.insert_one({
-            "user_id": user_id,
-            "history": DEFAULT_SYSTEM_MESSAGE
-        })
+        # Start an empty conversation on the current system prompt
+        history_store.reset(user_id)
 
         # Send confirmation message with modern UI
         await message.reply_text("🔄 <b>Conversation Reset</b>\n\nYour chat history has been cleared. Ready for a fresh conversation!", parse_mode=enums.ParseMode.HTML)
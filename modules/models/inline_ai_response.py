@@ -14,8 +14,9 @@ from pyrogram.types import (
 )
 from pyrogram.errors import QueryIdInvalid
 
-from modules.models.ai_res import get_response
+from modules.models.ai_res import get_response_async
 from config import LOG_CHANNEL
+from modules.core.scheduler import job_scheduler
 from modules.core.request_queue import (
     can_start_text_request, 
     start_text_request, 
@@ -279,7 +280,7 @@ async def generate_ai_response(prompt: str) -> str:
         ]
         
         # Get response from AI model
-        response = get_response(history)
+        response = await get_response_async(history)
         
         if not response:
             return "Sorry, I couldn't generate a response. Please try again."
@@ -431,6 +432,8 @@ async def handle_inline_ai_query(client: Client, inline_query: InlineQuery, prom
                 logger.warning(f"Query ID invalid for ongoing generation message from user {user_id}")
             except Exception as e:
                 logger.error(f"Error answering ongoing generation message: {str(e)}")
+            # The request is not run, so give back the slot claimed above
+            finish_text_request(user_id)
             return
     
     # Generate a unique task ID for this request
@@ -465,8 +468,9 @@ async def handle_inline_ai_query(client: Client, inline_query: InlineQuery, prom
             cache_time=1
         )
         
-        # Generate the AI response
-        response = await generate_ai_response(prompt)
+        # Generate the AI response (inline results cannot show a queue position)
+        async with job_scheduler.slot("text", user_id):
+            response = await generate_ai_response(prompt)
         
         # Format response with question included and username
         formatted_response = format_ai_response(response, prompt, username)
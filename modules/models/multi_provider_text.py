@@ -9,7 +9,8 @@ All providers used here are authentication-free (no API keys, cookies, or sessio
 
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any, Generator
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, Generator, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import time
@@ -25,6 +26,9 @@ from g4f.Provider import (
     AnyProvider,
 )
 
+from modules.core.client_pool import g4f_client_pool
+from modules.core.provider_health import text_provider_health
+
 logger = logging.getLogger(__name__)
 
 
@@ -232,18 +236,17 @@ async def generate_with_provider(
     logger.info(f"Attempting text generation with {provider.name} using model {model}")
     
     try:
-        client = AsyncClient(provider=provider.provider_class)
-        
-        # Generate with timeout
-        response = await asyncio.wait_for(
-            client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            ),
-            timeout=provider.timeout
-        )
+        with g4f_client_pool.lease(AsyncClient, provider=provider.provider_class) as client:
+            # Generate with timeout
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ),
+                timeout=provider.timeout
+            )
         
         if not response or not response.choices:
             logger.warning(f"{provider.name} returned empty response")
@@ -277,14 +280,13 @@ def generate_with_provider_sync(
     logger.info(f"Attempting text generation with {provider.name} using model {model}")
     
     try:
-        client = Client(provider=provider.provider_class)
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
+        with g4f_client_pool.lease(Client, provider=provider.provider_class) as client:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
         
         if not response or not response.choices:
             logger.warning(f"{provider.name} returned empty response")
@@ -308,31 +310,192 @@ def generate_streaming_with_provider(
     model: str,
     temperature: float = 0.7,
     max_tokens: int = 4096,
-) -> Optional[Generator]:
+) -> Generator:
     """
     Generate streaming text using a specific provider.
     
+    Nothing happens until the first chunk is requested: the client is
+    leased and the request sent then, so errors (including connection
+    errors) are raised from the first next(). A generator that is never
+    started holds no lease.
+    
     Returns:
-        Generator yielding response chunks or None if error
+        Generator yielding response chunks
     """
     logger.info(f"Streaming with {provider.name} using model {model}")
     
-    try:
-        client = Client(provider=provider.provider_class)
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=True,
-        )
-        
-        return response
-            
-    except Exception as e:
-        logger.error(f"{provider.name} streaming failed: {str(e)}")
-        return None
+    def pooled_stream():
+        # The stream keeps using the client, so hand it back only once consumed
+        client = g4f_client_pool.acquire(Client, provider=provider.provider_class)
+        try:
+            yield from client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        except BaseException:
+            g4f_client_pool.release(client, discard=True)
+            raise
+        else:
+            g4f_client_pool.release(client)
+    
+    return pooled_stream()
+
+
+# ============================================================================
+# HEDGED REQUESTS
+# ============================================================================
+# A hedged request starts the primary provider and, if it has not answered
+# within the hedge delay, fires the next candidate in the fallback chain as a
+# backup. The first valid completion wins and the losers are cancelled.
+# Each model has a hedge budget so only a fraction of requests pay double cost.
+
+@dataclass
+class HedgePolicy:
+    """Hedging configuration for a model"""
+    delay: float = 12.0        # Seconds to wait before hedging when no latency data exists
+    min_delay: float = 3.0     # Never hedge earlier than this
+    budget: float = 0.2        # Share of requests allowed to hedge (0.2 = at most ~20%)
+    max_parallel: int = 2      # Max provider calls racing for one request
+
+
+HEDGING_ENABLED = True
+
+# Keyed by actual model name (after normalize_model_name)
+HEDGE_POLICIES: Dict[str, HedgePolicy] = {
+    "qwen3-235b-a22b": HedgePolicy(delay=15.0, budget=0.2),
+    "gpt-4o": HedgePolicy(delay=12.0, budget=0.2),
+    "deepseek-llama3.3-70b": HedgePolicy(delay=10.0, budget=0.15),
+    "command-a-03-2025": HedgePolicy(delay=12.0, budget=0.15),
+}
+
+# Cap on saved-up hedges so a quiet period can't fund a burst of double calls
+MAX_HEDGE_TOKENS = 10.0
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting how often a model may hedge.
+    
+    Every request deposits `budget` tokens and every hedge spends one, so over
+    time at most `budget` of the requests fire a backup provider.
+    """
+    
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.tokens = 1.0
+        self.requests = 0
+        self.hedges = 0
+    
+    def deposit(self) -> None:
+        """Record a new request"""
+        self.requests += 1
+        self.tokens = min(MAX_HEDGE_TOKENS, self.tokens + self.budget)
+    
+    def try_spend(self) -> bool:
+        """Spend a token for a hedge if one is available"""
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.hedges += 1
+            return True
+        return False
+
+
+_hedge_budgets: Dict[str, HedgeBudget] = {}
+
+
+def get_hedge_delay(provider_name: str, policy: HedgePolicy) -> float:
+    """Delay before hedging a call to provider_name"""
+    p50 = text_provider_health.get_p50_latency(provider_name)
+    if p50 is None:
+        return policy.delay
+    return max(policy.min_delay, p50)
+
+
+def _get_hedge_budget(model: str, policy: HedgePolicy) -> HedgeBudget:
+    budget = _hedge_budgets.get(model)
+    if budget is None:
+        budget = HedgeBudget(policy.budget)
+        _hedge_budgets[model] = budget
+    return budget
+
+
+def get_hedge_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-model hedge counters for monitoring"""
+    return {
+        model: {"requests": b.requests, "hedges": b.hedges, "tokens": round(b.tokens, 2)}
+        for model, b in _hedge_budgets.items()
+    }
+
+
+def build_provider_candidates(model: str) -> List[tuple]:
+    """
+    Build the ordered (provider, model) list for a request: the requested
+    model's providers first, then the providers of its fallback models.
+    Within each model, providers are ordered by the health scoreboard.
+    
+    Args:
+        model: Actual model name (already normalized)
+    """
+    models_to_try = [model]
+    
+    # Get user-facing model name for fallback lookup
+    user_model = None
+    for um, actual in USER_MODEL_TO_ACTUAL.items():
+        if actual == model:
+            user_model = um
+            break
+    
+    if user_model:
+        for fb in MODEL_FALLBACK_CHAIN.get(user_model, []):
+            actual_fb = USER_MODEL_TO_ACTUAL.get(fb, fb)
+            if actual_fb not in models_to_try:
+                models_to_try.append(actual_fb)
+    
+    candidates = []
+    tripped = []
+    for try_model in models_to_try:
+        providers = get_providers_for_model(try_model)
+        if not providers:
+            logger.warning(f"No providers available for model {try_model}")
+            continue
+        providers.sort(key=lambda p: p.priority.value)
+        # Reorder by live health and skip providers whose circuit is open
+        healthy = text_provider_health.order_providers(providers)
+        for provider in providers:
+            use_model = try_model if try_model in provider.models else provider.models[0]
+            if provider not in healthy:
+                tripped.append((provider, use_model))
+        for provider in healthy:
+            use_model = try_model if try_model in provider.models else provider.models[0]
+            candidates.append((provider, use_model))
+    
+    if tripped:
+        logger.info(f"Skipping providers with open circuits: {[p.name for p, _ in tripped]}")
+    if not candidates:
+        # Everything is tripped; trying something beats failing outright
+        return tripped
+    return candidates
+
+
+async def _timed_generate(
+    provider: TextProvider,
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+) -> tuple:
+    """Run generate_with_provider and feed the outcome to the health scoreboard"""
+    started = time.time()
+    response, error = await generate_with_provider(provider, messages, model, temperature, max_tokens)
+    elapsed = time.time() - started
+    if response:
+        text_provider_health.record_success(provider.name, elapsed)
+    else:
+        text_provider_health.record_failure(provider.name, elapsed)
+    return response, error
 
 
 async def generate_text_multi_provider(
@@ -340,15 +503,21 @@ async def generate_text_multi_provider(
     model: str = DEFAULT_TEXT_MODEL,
     temperature: float = 0.7,
     max_tokens: int = 4096,
+    hedge: bool = HEDGING_ENABLED,
 ) -> tuple:
     """
     Main function to generate text with automatic fallback.
     
+    Candidates are tried in fallback-chain order. When the model has a hedge
+    policy and budget is available, a slow call is raced against the next
+    candidate instead of waiting for its full timeout.
+    
     Args:
         messages: Conversation history
         model: The preferred model (defaults to DEFAULT_TEXT_MODEL)
         temperature: Sampling temperature
         max_tokens: Maximum tokens to generate
+        hedge: Whether hedged requests are allowed for this call
         
     Returns:
         Tuple of (response text or None, error message or None)
@@ -358,51 +527,74 @@ async def generate_text_multi_provider(
     # Normalize model name
     model = normalize_model_name(model)
     
-    # Build the list of models to try (requested model + fallbacks)
-    models_to_try = [model]
+    candidates = build_provider_candidates(model)
     
-    # Get user-facing model name for fallback lookup
-    user_model = None
-    for um, actual in USER_MODEL_TO_ACTUAL.items():
-        if actual == model:
-            user_model = um
-            break
-    
-    if user_model:
-        fallbacks = MODEL_FALLBACK_CHAIN.get(user_model, [])
-        for fb in fallbacks:
-            actual_fb = USER_MODEL_TO_ACTUAL.get(fb, fb)
-            if actual_fb not in models_to_try:
-                models_to_try.append(actual_fb)
+    policy = HEDGE_POLICIES.get(model) if hedge else None
+    budget = _get_hedge_budget(model, policy) if policy else None
+    if budget:
+        budget.deposit()
     
     all_errors = []
+    running: Dict[asyncio.Task, str] = {}
+    next_index = 0
+    hedging_allowed = policy is not None
     
-    for try_model in models_to_try:
-        logger.info(f"Trying model: {try_model}")
-        
-        # Get providers for this model
-        providers = get_providers_for_model(try_model)
-        
-        if not providers:
-            logger.warning(f"No providers available for model {try_model}")
-            continue
-        
-        # Sort by priority and try each
-        providers.sort(key=lambda p: p.priority.value)
+    def launch_next() -> None:
+        nonlocal next_index
+        provider, use_model = candidates[next_index]
+        next_index += 1
+        task = asyncio.create_task(
+            _timed_generate(provider, messages, use_model, temperature, max_tokens)
+        )
+        running[task] = provider.name
+    
+    try:
+        if candidates:
+            launch_next()
         
-        for provider in providers:
-            use_model = try_model if try_model in provider.models else provider.models[0]
-            response, error = await generate_with_provider(
-                provider, messages, use_model, temperature, max_tokens
+        while running:
+            wait_timeout = None
+            if hedging_allowed and next_index < len(candidates) and len(running) < policy.max_parallel:
+                # Hedge against the most recently launched provider
+                newest_provider = list(running.values())[-1]
+                wait_timeout = get_hedge_delay(newest_provider, policy)
+            
+            done, _ = await asyncio.wait(
+                running.keys(), timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
             )
             
-            if response:
-                elapsed = time.time() - start_time
-                logger.info(f"Text generation succeeded in {elapsed:.2f}s with {provider.name}")
-                return response, None
+            if not done:
+                # Hedge timer fired, the running call is slower than usual
+                if budget.try_spend():
+                    logger.info(f"Hedging {model}: {list(running.values())} slow, firing {candidates[next_index][0].name}")
+                    launch_next()
+                else:
+                    logger.info(f"Hedge budget exhausted for {model}, waiting for {list(running.values())}")
+                    hedging_allowed = False
+                continue
             
-            if error:
-                all_errors.append(f"{provider.name}: {error}")
+            for task in done:
+                provider_name = running.pop(task)
+                try:
+                    response, error = task.result()
+                except Exception as e:
+                    response, error = None, str(e)
+                
+                if response:
+                    elapsed = time.time() - start_time
+                    logger.info(f"Text generation succeeded in {elapsed:.2f}s with {provider_name}")
+                    return response, None
+                
+                if error:
+                    all_errors.append(f"{provider_name}: {error}")
+            
+            # Plain fallback once nothing is left running
+            if not running and next_index < len(candidates):
+                launch_next()
+    finally:
+        # Cancel any losers still racing
+        for task in running:
+            task.cancel()
     
     # All providers failed
     elapsed = time.time() - start_time
@@ -411,6 +603,79 @@ async def generate_text_multi_provider(
     return None, error_msg
 
 
+# ============================================================================
+# CONCURRENCY-LIMITED DISPATCH
+# ============================================================================
+# Handlers go through generate_text_async so a single bot process never has
+# more than MAX_CONCURRENT_TEXT_REQUESTS provider chains in flight. Extra
+# requests wait on the semaphore instead of piling up sockets on g4f providers.
+
+MAX_CONCURRENT_TEXT_REQUESTS = 64
+
+_text_dispatch_semaphore: Optional[asyncio.Semaphore] = None
+_text_dispatch_stats = {"in_flight": 0, "waiting": 0, "completed": 0, "failed": 0}
+
+
+def _get_text_dispatch_semaphore() -> asyncio.Semaphore:
+    """Lazily create the dispatch semaphore inside the running bot process"""
+    global _text_dispatch_semaphore
+    if _text_dispatch_semaphore is None:
+        _text_dispatch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TEXT_REQUESTS)
+    return _text_dispatch_semaphore
+
+
+@asynccontextmanager
+async def text_dispatch_slot():
+    """Hold one of the MAX_CONCURRENT_TEXT_REQUESTS provider slots (generation or stream)"""
+    semaphore = _get_text_dispatch_semaphore()
+    _text_dispatch_stats["waiting"] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _text_dispatch_stats["waiting"] -= 1
+
+    _text_dispatch_stats["in_flight"] += 1
+    try:
+        yield
+    finally:
+        _text_dispatch_stats["in_flight"] -= 1
+        semaphore.release()
+
+
+async def generate_text_async(
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_TEXT_MODEL,
+    temperature: float = 0.7,
+    max_tokens: int = 4096,
+) -> tuple:
+    """
+    Non-blocking text generation entry point for bot handlers.
+
+    Runs generate_text_multi_provider under a process-wide concurrency limit
+    so the event loop stays free while providers are answering.
+
+    Returns:
+        Tuple of (response text or None, error message or None)
+    """
+    async with text_dispatch_slot():
+        response, error = await generate_text_multi_provider(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        if response:
+            _text_dispatch_stats["completed"] += 1
+        else:
+            _text_dispatch_stats["failed"] += 1
+        return response, error
+
+
+def get_text_dispatch_stats() -> Dict[str, int]:
+    """Get a snapshot of the text dispatch counters"""
+    return dict(_text_dispatch_stats, limit=MAX_CONCURRENT_TEXT_REQUESTS)
+
+
 def generate_text_sync(
     messages: List[Dict[str, str]],
     model: str = DEFAULT_TEXT_MODEL,
@@ -474,6 +739,33 @@ def generate_text_sync(
     return None, error_msg
 
 
+def get_stream_timeouts(model: str = DEFAULT_TEXT_MODEL) -> Tuple[float, float]:
+    """
+    Deadlines for a streamed reply, from the timeout of the provider it will start with.
+
+    Returns:
+        (seconds until the first chunk, longest gap between chunks)
+    """
+    candidates = build_provider_candidates(normalize_model_name(model))
+    timeout = candidates[0][0].timeout if candidates else TextProvider.timeout
+    # Once text is flowing, a provider that stays quiet this long has stalled
+    return float(timeout), timeout / 3
+
+
+def _health_recorded_stream(provider: TextProvider, stream, first_chunk, started: float) -> Generator:
+    """Yield a started stream, recording its outcome on the health scoreboard when it ends"""
+    try:
+        yield first_chunk
+        yield from stream
+    except Exception:
+        text_provider_health.record_failure(provider.name, time.time() - started)
+        raise
+    else:
+        text_provider_health.record_success(provider.name, time.time() - started)
+    finally:
+        stream.close()
+
+
 def get_streaming_response_multi_provider(
     messages: List[Dict[str, str]],
     model: str = DEFAULT_TEXT_MODEL,
@@ -483,50 +775,43 @@ def get_streaming_response_multi_provider(
     """
     Get streaming response with multi-provider fallback.
     
+    Candidates come from build_provider_candidates, so they are ordered by
+    the health scoreboard and providers with an open circuit are skipped.
+    A provider counts as started once its first chunk has arrived; one that
+    fails before that falls through to the next candidate.
+    
+    Blocking; run it in a worker thread.
+    
     Returns:
         Generator yielding response chunks or None if all providers fail
     """
     # Normalize model name
     model = normalize_model_name(model)
     
-    # Build the list of models to try
-    models_to_try = [model]
-    
-    user_model = None
-    for um, actual in USER_MODEL_TO_ACTUAL.items():
-        if actual == model:
-            user_model = um
-            break
-    
-    if user_model:
-        fallbacks = MODEL_FALLBACK_CHAIN.get(user_model, [])
-        for fb in fallbacks:
-            actual_fb = USER_MODEL_TO_ACTUAL.get(fb, fb)
-            if actual_fb not in models_to_try:
-                models_to_try.append(actual_fb)
-    
-    for try_model in models_to_try:
-        logger.info(f"Trying streaming with model: {try_model}")
+    for provider, use_model in build_provider_candidates(model):
+        if not provider.supports_streaming:
+            continue
         
-        providers = get_providers_for_model(try_model)
+        started = time.time()
+        stream = generate_streaming_with_provider(
+            provider, messages, use_model, temperature, max_tokens
+        )
         
-        if not providers:
+        # The stream is lazy: connection errors only show up on the first chunk
+        try:
+            first_chunk = next(stream)
+        except StopIteration:
+            logger.warning(f"{provider.name} ended its stream without any chunk")
+            text_provider_health.record_failure(provider.name, time.time() - started)
+            continue
+        except Exception as e:
+            logger.error(f"{provider.name} streaming failed before the first chunk: {str(e)}")
+            text_provider_health.record_failure(provider.name, time.time() - started)
+            stream.close()
             continue
         
-        providers.sort(key=lambda p: p.priority.value)
-        
-        for provider in providers:
-            if not provider.supports_streaming:
-                continue
-                
-            use_model = try_model if try_model in provider.models else provider.models[0]
-            stream = generate_streaming_with_provider(
-                provider, messages, use_model, temperature, max_tokens
-            )
-            
-            if stream:
-                logger.info(f"Streaming started with {provider.name}")
-                return stream
+        logger.info(f"Streaming started with {provider.name} after {time.time() - started:.2f}s")
+        return _health_recorded_stream(provider, stream, first_chunk, started)
     
     logger.error("All streaming providers failed")
     return None
@@ -0,0 +1,341 @@
+"""
+Progressive delivery of streamed AI replies
+
+aires used to wait for the complete answer before sending anything, so the
+user only saw the cycling waiting message until the last token arrived.
+StreamingReply shows the answer while it is generated instead:
+
+- Chunks are accumulated and the reply is edited at an adaptive cadence:
+  at most every STREAM_EDIT_INTERVAL seconds in private chats and
+  GROUP_EDIT_INTERVAL seconds in groups, more slowly as the message grows
+  (every edit re-sends the whole text), and backing off after a FloodWait.
+- Partial markdown is closed before every edit with MarkdownStreamState,
+  which keeps the counts that sanitize_markdown would compute and updates
+  them per chunk instead of rescanning the whole reply.
+- When the rendered reply would exceed Telegram's MESSAGE_LIMIT, the text
+  up to the last line break is frozen into its own message and streaming
+  continues in a new one; a code block cut this way is reopened in the
+  next message with the same language.
+
+The waiting message becomes the first message of the reply, so the time to
+the first token is the latency the user sees.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from pyrogram.enums import ChatType, ParseMode
+from pyrogram.errors import FloodWait, MessageNotModified
+
+from modules.core.text_formatter import MESSAGE_LIMIT
+from modules.core.waiting_indicator import waiting_indicators
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between edits of a reply in a private chat
+STREAM_EDIT_INTERVAL = 1.0
+
+# Minimum seconds between edits in groups, where bots may send about 20 messages a minute
+GROUP_EDIT_INTERVAL = 3.0
+
+# Extra seconds between edits per 1000 characters already in the message
+INTERVAL_PER_1000_CHARS = 0.5
+
+# Upper bound for the edit interval, including FloodWait back-off
+MAX_EDIT_INTERVAL = 10.0
+
+# New characters needed before an edit is worth sending
+MIN_EDIT_CHARS = 20
+
+# Shown at the end of the reply while more text is coming
+CURSOR = " ▍"
+
+_stream_stats = {
+    "replies": 0,
+    "edits": 0,
+    "rollovers": 0,
+    "flood_waits": 0,
+    "total_first_token": 0.0,
+}
+
+
+def markdown_closers(triple: int, single: int, asterisks: int,
+                     open_brackets: int, close_brackets: int, open_parens: int, close_parens: int) -> str:
+    """
+    Suffix that closes the markdown left open in a text, given its character counts.
+
+    Args:
+        triple: Occurrences of ``` (non-overlapping)
+        single: Backticks that are not part of a ```
+        asterisks, open_brackets, close_brackets, open_parens, close_parens:
+            Occurrences of *, [, ], ( and )
+
+    Returns:
+        The characters to append
+    """
+    suffix = ""
+    if triple % 2 != 0:
+        suffix += '\n```'  # Close incomplete code block
+    if single % 2 != 0:
+        suffix += '`'  # Close incomplete inline code
+    if asterisks % 2 != 0:
+        suffix += '*'  # Close incomplete bold/italic
+    if open_brackets > close_brackets:
+        suffix += ']'
+    if open_parens > close_parens:
+        suffix += ')'
+    return suffix
+
+
+class MarkdownStreamState:
+    """
+    Running markdown counts of a growing text.
+
+    Counting ``` is only additive across pieces that do not split a run of
+    backticks, so a trailing run is held back until the next chunk shows
+    where it ends.
+    """
+
+    def __init__(self, text: str = ""):
+        self.text = ""
+        self._counted = 0
+        self._counts = [0, 0, 0, 0, 0, 0, 0]
+        self.feed(text)
+
+    def _count(self, piece: str) -> None:
+        triple = piece.count('```')
+        counts = self._counts
+        counts[0] += triple
+        counts[1] += piece.count('`') - triple * 3
+        counts[2] += piece.count('*')
+        counts[3] += piece.count('[')
+        counts[4] += piece.count(']')
+        counts[5] += piece.count('(')
+        counts[6] += piece.count(')')
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        settled = len(self.text.rstrip('`'))
+        if settled > self._counted:
+            self._count(self.text[self._counted:settled])
+            self._counted = settled
+
+    def closers(self) -> str:
+        """Same suffix as sanitize_markdown(self.text)[len(self.text):]"""
+        tail = self.text[self._counted:]
+        if not tail:
+            return markdown_closers(*self._counts)
+        triple = tail.count('```')
+        counts = list(self._counts)
+        counts[0] += triple
+        counts[1] += len(tail) - triple * 3
+        return markdown_closers(*counts)
+
+    def sanitized(self) -> str:
+        return self.text + self.closers()
+
+
+def code_block_language(text: str) -> Optional[str]:
+    """Language of the code block left open at the end of text, or None if all are closed"""
+    fences = re.findall(r'```(\w*)', text)
+    if len(fences) % 2 == 0:
+        return None
+    return fences[-1]
+
+
+class StreamingReply:
+    """
+    A reply that is edited as the AI response streams in.
+
+    Usage:
+        reply = StreamingReply(message, waiting_message, render=markdown_code_to_html)
+        async for chunk in stream:
+            await reply.feed(chunk)
+        await reply.finish(final_text)
+    """
+
+    def __init__(self, message, placeholder=None, render: Callable[[str], str] = lambda text: text):
+        """
+        Args:
+            message: The user's message being answered
+            placeholder: Message already sent by the bot (the waiting
+                message) that becomes the first part of the reply
+            render: Converts sanitized markdown to Telegram HTML
+        """
+        self.message = message
+        self.render = render
+        self.messages: List = [placeholder] if placeholder is not None else []
+        self.text = ""
+        self.started = False
+        self.created_at = time.monotonic()
+        self.first_token_latency: Optional[float] = None
+        # Markdown of the messages that are complete; the live part follows them
+        self._frozen: List[str] = []
+        # Frozen messages already edited into their final form
+        self._finalized = 0
+        self._live = MarkdownStreamState()
+        self._last_rendered: Dict[int, str] = {}
+        self._last_edit = 0.0
+        self._edited_length = 0
+        chat_type = getattr(getattr(message, "chat", None), "type", None)
+        self._base_interval = GROUP_EDIT_INTERVAL if chat_type in (ChatType.GROUP, ChatType.SUPERGROUP) else STREAM_EDIT_INTERVAL
+        self._backoff = 1.0
+        self._blocked_until = 0.0
+
+    def _interval(self) -> float:
+        length = len(self._live.text)
+        interval = (self._base_interval + INTERVAL_PER_1000_CHARS * length / 1000) * self._backoff
+        return min(interval, MAX_EDIT_INTERVAL)
+
+    async def feed(self, chunk: str) -> None:
+        """Add a streamed chunk and edit the reply if it is due"""
+        if not chunk:
+            return
+        if not self.started:
+            self.started = True
+            self.first_token_latency = time.monotonic() - self.created_at
+            _stream_stats["replies"] += 1
+            _stream_stats["total_first_token"] += self.first_token_latency
+            # The waiting message stops cycling and turns into the reply
+            if self.messages:
+                waiting_indicators.release(self.messages[0])
+        self.text += chunk
+        self._live.feed(chunk)
+
+        now = time.monotonic()
+        first_edit = self._edited_length == 0
+        if now < self._blocked_until:
+            return
+        if not first_edit and (now - self._last_edit < self._interval()
+                               or len(self.text) - self._edited_length < MIN_EDIT_CHARS):
+            return
+        await self._flush(cursor=True)
+
+    async def _flush(self, cursor: bool) -> None:
+        html = self.render(self._live.sanitized())
+        if len(html) + len(CURSOR) > MESSAGE_LIMIT:
+            self._roll_over()
+            await self._finalize_frozen()
+            html = self.render(self._live.sanitized())
+        if cursor:
+            html += CURSOR
+        self._last_edit = time.monotonic()
+        self._edited_length = len(self.text)
+        await self._show(len(self._frozen), html)
+
+    def _fits(self, markdown: str) -> bool:
+        return len(self.render(markdown)) + len(CURSOR) <= MESSAGE_LIMIT
+
+    def _roll_over(self) -> None:
+        """Freeze complete messages off the front of the live text while it is too long"""
+        while not self._fits(self._live.sanitized()):
+            head, tail = self._split(self._live.text)
+            language = code_block_language(head)
+            self._frozen.append(head)
+            self._live = MarkdownStreamState(f"```{language}\n{tail}" if language is not None else tail)
+            _stream_stats["rollovers"] += 1
+
+    def _split(self, text: str):
+        """Longest head ending at a line break (or space, or anywhere) that renders within the limit"""
+        for separator in ("\n", " ", None):
+            cut = len(text)
+            while cut > 0:
+                cut = text.rfind(separator, 0, cut) if separator else cut - max(1, cut // 10)
+                if cut <= 0:
+                    break
+                if self._fits(text[:cut] + MarkdownStreamState(text[:cut]).closers()):
+                    head = text[:cut]
+                    return head, text[cut:].lstrip("\n") if separator == "\n" else text[cut:]
+        return text[:1], text[1:]
+
+    async def _finalize_frozen(self) -> None:
+        while self._finalized < len(self._frozen):
+            await self._show(self._finalized, self.render(self._sanitized_frozen(self._finalized)), final=True)
+            self._finalized += 1
+
+    async def _show(self, index: int, html: str, final: bool = False) -> None:
+        """Put html into the index-th message of the reply, sending it if it is the next new one"""
+        if self._last_rendered.get(index) == html:
+            return
+        try:
+            if index < len(self.messages):
+                await self.messages[index].edit_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+            else:
+                sent = await self.message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+                self.messages.append(sent)
+            self._last_rendered[index] = html
+            _stream_stats["edits"] += 1
+            self._backoff = max(1.0, self._backoff * 0.8)
+        except MessageNotModified:
+            self._last_rendered[index] = html
+        except FloodWait as e:
+            _stream_stats["flood_waits"] += 1
+            self._backoff = min(self._backoff * 2, MAX_EDIT_INTERVAL)
+            self._blocked_until = time.monotonic() + float(e.value)
+            if final:
+                await asyncio.sleep(float(e.value))
+                await self._show(index, html, final=True)
+        except Exception as e:
+            if not final:
+                logger.debug(f"Streaming edit failed, will retry: {e}")
+                return
+            # Last resort for the final text: no formatting
+            logger.warning(f"Could not send formatted reply part, sending plain text: {e}")
+            plain = self._plain(index)
+            if index < len(self.messages):
+                await self.messages[index].edit_text(plain, disable_web_page_preview=True)
+            else:
+                self.messages.append(await self.message.reply_text(plain, disable_web_page_preview=True))
+            self._last_rendered[index] = html
+
+    def _sanitized_frozen(self, index: int) -> str:
+        markdown = self._frozen[index]
+        return markdown + MarkdownStreamState(markdown).closers()
+
+    def _plain(self, index: int) -> str:
+        if index < len(self._frozen):
+            return self._frozen[index][:MESSAGE_LIMIT]
+        return self._live.text[:MESSAGE_LIMIT]
+
+    async def finish(self, final_text: Optional[str] = None) -> List:
+        """
+        Deliver the complete reply.
+
+        Args:
+            final_text: The reply as it should finally read, if it differs
+                from the streamed text (e.g. after image markers were
+                removed). Messages are re-laid out and edited to match.
+
+        Returns:
+            The messages that make up the reply
+        """
+        if final_text is not None and final_text != self.text:
+            self._frozen, self._finalized = [], 0
+            self._live = MarkdownStreamState(final_text)
+            self.text = final_text
+        self._roll_over()
+        delay = self._blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._finalize_frozen()
+        last = len(self._frozen)
+        await self._show(last, self.render(self._live.sanitized()), final=True)
+        # A re-layout can need fewer messages than were streamed
+        for extra in self.messages[last + 1:]:
+            try:
+                await extra.delete()
+            except Exception as e:
+                logger.debug(f"Could not delete surplus reply message: {e}")
+        del self.messages[last + 1:]
+        return self.messages
+
+
+def get_streaming_stats() -> Dict[str, float]:
+    """Counters for monitoring, including the average time to first token"""
+    stats = dict(_stream_stats)
+    total = stats.pop("total_first_token")
+    stats["avg_first_token"] = round(total / stats["replies"], 2) if stats["replies"] else 0.0
+    return stats
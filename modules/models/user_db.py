@@ -98,53 +98,36 @@ def check_and_add_blocked_user(user_id: int) -> None:
         block_users_collection.insert_one({"user_id": user_id})
         print(f"User ID {user_id} was added to the blocked users collection.")
 
-async def get_user_ids_message(bot, update, text: str) -> None:
+async def get_user_ids_message(bot, update, text: str, parse_mode=None) -> None:
     """
     Send a message to all users
     
+    The broadcast runs in the background through the broadcast engine,
+    which edits a progress message with throughput and ETA.
+    
     Args:
         bot: Telegram bot instance
         update: Message update
         text: Message text to send
+        parse_mode: Telegram parse mode (e.g., 'markdown', 'html')
     """
-    users_collection = get_user_collection()
-    user_ids = users_collection.distinct("user_id")
-    total = 0
-    
-    await update.reply_text(f"Sending message to {len(user_ids)} users...")
-    
-    for user_id in user_ids:
-        try:
-            await bot.send_message(user_id, text)
-            await asyncio.sleep(0.05)
-            total += 1
-        except Exception as e:
-            print(f"Error sending message to user ID {user_id}: {e}")
-    
-    await update.reply_text(f"Message sent to {total} users.")
+    from modules.core.broadcast import broadcast_engine, text_payload
+    progress = await update.reply_text("📣 Preparing broadcast...")
+    await broadcast_engine.start(bot, text_payload(text, parse_mode), progress)
 
 async def get_usernames_message(bot, update, text: str, parse_mode=None) -> None:
     """
     Send a message to all users with usernames
     
+    Messages are addressed by user ID rather than username, which saves a
+    username resolution per recipient.
+    
     Args:
         bot: Telegram bot instance
         update: Message update
         text: Message text to send
         parse_mode: Telegram parse mode (e.g., 'markdown', 'html')
     """
-    users_collection = get_user_collection()
-    users = users_collection.find({"username": {"$exists": True}})
-    total = 0
-    
-    await update.reply_text(f"Sending message to users with usernames...")
-    
-    for user in users:
-        try:
-            await bot.send_message(user["username"], text, parse_mode=parse_mode)
-            await asyncio.sleep(0.05)
-            total += 1
-        except Exception as e:
-            print(f"Error sending message to user ID {user['user_id']}: {e}")
-    
-    await update.reply_text(f"Message sent to {total} users.") 
\ No newline at end of file
+    from modules.core.broadcast import broadcast_engine, text_payload
+    progress = await update.reply_text("📣 Preparing broadcast to users with usernames...")
+    await broadcast_engine.start(bot, text_payload(text, parse_mode), progress, audience="usernames")
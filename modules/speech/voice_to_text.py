@@ -8,9 +8,11 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from config import LOG_CHANNEL
 
 from modules.speech.text_to_voice import handle_text_message 
-from modules.models.ai_res import get_response, get_streaming_response, check_and_update_system_prompt, DEFAULT_SYSTEM_MESSAGE
+from modules.models.ai_res import get_response_async, get_streaming_response, assemble_context
 from modules.chatlogs import user_log
 from modules.core.database import db_service
+from modules.core.history_store import history_store
+from modules.core.scheduler import job_scheduler, report_queue_position
 from modules.core.request_queue import (
     can_start_text_request, 
     start_text_request, 
@@ -19,11 +21,16 @@ from modules.core.request_queue import (
 
 # Get collections from the database service
 user_voice_setting_collection = db_service.get_collection('user_voice_setting')
-history_collection = db_service.get_collection('history')
 
 # Enhanced audio processing to support multiple formats and languages
 async def process_audio_file(input_path, output_path=None, language="en-US"):
     """Process audio file to extract text with enhanced language support"""
+    # Decoding and the recognizer call are blocking, keep them off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _process_audio_file_sync, input_path, output_path, language)
+
+def _process_audio_file_sync(input_path, output_path=None, language="en-US"):
+    """Blocking part of process_audio_file, runs in the default executor"""
     try:
         if not output_path:
             output_path = f"{input_path}.wav"
@@ -87,17 +94,13 @@ async def handle_voice_message(client, message):
             
             user_settings = user_voice_setting_collection.find_one({"user_id": user_id})
             response_mode = user_settings.get("voice", "text") if user_settings else "text"
-            user_history = history_collection.find_one({"user_id": user_id})
-            if user_history and 'history' in user_history:
-                history = user_history['history']
-                # Check and update system prompt if outdated
-                history = check_and_update_system_prompt(history, user_id)
-            else:
-                history = DEFAULT_SYSTEM_MESSAGE.copy()
-            history.append({"role": "user", "content": recognized_text})
-            ai_response = get_response(history)
-            history.append({"role": "assistant", "content": ai_response})
-            history_collection.update_one({"user_id": user_id}, {"$set": {"history": history}}, upsert=True)
+            history = assemble_context(user_id, [{"role": "user", "content": recognized_text}], "gpt-4o")
+            async with job_scheduler.slot("voice", user_id, on_position=report_queue_position(processing_msg)):
+                ai_response = await get_response_async(history, model="gpt-4o")
+            history_store.append_turns(user_id, [
+                {"role": "user", "content": recognized_text},
+                {"role": "assistant", "content": ai_response},
+            ])
             log_text = f"[Voice2Text] User: {user_id}\nRecognized: {recognized_text}\nAI: {ai_response}"
             await client.send_message(LOG_CHANNEL, log_text)
             clean_response = ai_response.replace("*", "").replace("_", "").replace("`", "").replace("\n", " ").strip()
@@ -1,9 +1,10 @@
 import pyrogram
 from pyrogram import filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
-from pymongo import MongoClient
-from config import DATABASE_URL, ADMINS
+from config import ADMINS
+from modules.core.async_database import async_db_service
 from modules.lang import async_translate_to_lang, batch_translate
+from modules.core.panel_cache import RenderedPanel, panel_cache
 from typing import Tuple
 import asyncio
 
@@ -33,41 +34,30 @@ RESTRICTED_TEXT_MODELS = {"gpt-4o"}  # GPT-4o is premium only
 RESTRICTED_IMAGE_MODELS = set()  # No restricted image models currently
 
 # --- Database Setup ---
-client = MongoClient(DATABASE_URL)
-db = client["aibotdb"]
-user_ai_model_settings_collection = db["user_ai_model_settings"]
-user_lang_collection = db['user_lang'] # Assuming this is used for language preference
+user_ai_model_settings_collection = async_db_service.get_collection("user_ai_model_settings")
 
 # --- Helper Functions ---
 async def get_user_ai_models(user_id: int) -> Tuple[str, str]:
     """Fetches the user's selected AI models, returning defaults if not set. Enforces fallback for restricted models if user is not premium/admin."""
-    settings = user_ai_model_settings_collection.find_one({"user_id": user_id})
-    text_model = settings.get("text_model", DEFAULT_TEXT_MODEL) if settings else DEFAULT_TEXT_MODEL
-    image_model = settings.get("image_model", DEFAULT_IMAGE_MODEL) if settings else DEFAULT_IMAGE_MODEL
-
-    # Enforce fallback for restricted models at runtime
-    from modules.user.premium_management import is_user_premium
-    is_premium, _, _ = await is_user_premium(user_id)
-    is_admin = user_id in ADMINS
-    if not is_premium and not is_admin:
-        if text_model in RESTRICTED_TEXT_MODELS:
-            text_model = DEFAULT_TEXT_MODEL
-        if image_model in RESTRICTED_IMAGE_MODELS:
-            image_model = DEFAULT_IMAGE_MODEL
-    return text_model, image_model
+    from modules.core.user_context import get_user_context
+    context = await get_user_context(user_id)
+    return context.ai_models()
 
 async def set_user_ai_model(user_id: int, model_type: str, model_name: str):
     """Sets the user's selected AI model for a given type (text or image)."""
-    user_ai_model_settings_collection.update_one(
+    await user_ai_model_settings_collection.update_one(
         {"user_id": user_id},
         {"$set": {f"{model_type}_model": model_name}},
         upsert=True
     )
+    from modules.core.user_context import invalidate_user_context
+    invalidate_user_context(user_id)
 
 async def get_current_lang(user_id: int) -> str:
     """Gets the user's current language preference."""
-    lang_doc = user_lang_collection.find_one({"user_id": user_id})
-    return lang_doc["language"] if lang_doc else "en"
+    from modules.core.user_context import get_user_context
+    context = await get_user_context(user_id)
+    return context.language
 
 async def revert_restricted_models_if_needed(user_id: int):
     from modules.user.premium_management import is_user_premium
@@ -92,17 +82,31 @@ async def ai_model_settings_panel(client_obj, callback: CallbackQuery):
     current_lang = await get_current_lang(user_id)
     current_text_model, current_image_model = await get_user_ai_models(user_id)
 
+    panel = await panel_cache.get_or_render(
+        "ai_models", current_lang, (current_text_model, current_image_model),
+        lambda: _render_ai_model_panel(current_lang, current_text_model, current_image_model)
+    )
+
+    await callback.message.edit_text(
+        text=panel.fill(mention=user_mention),
+        reply_markup=panel.reply_markup,
+        parse_mode=pyrogram.enums.ParseMode.HTML
+    )
+    await callback.answer()
+
+async def _render_ai_model_panel(current_lang, current_text_model, current_image_model):
+    """AI model selector with {mention} left for the caller to fill in"""
     # --- Translations ---
-    panel_title_text = await async_translate_to_lang("🧠 AI Model Settings", current_lang)
+    panel_title_text = await async_translate_to_lang("🧠 AI Model Settings", lang=current_lang)
     
-    text_model_heading_display = await async_translate_to_lang(TEXT_MODEL_HEADING, current_lang)
-    image_model_heading_display = await async_translate_to_lang(IMAGE_MODEL_HEADING, current_lang)
+    text_model_heading_display = await async_translate_to_lang(TEXT_MODEL_HEADING, lang=current_lang)
+    image_model_heading_display = await async_translate_to_lang(IMAGE_MODEL_HEADING, lang=current_lang)
     
-    back_button_text = await async_translate_to_lang("🔙 Back to Settings", current_lang)
+    back_button_text = await async_translate_to_lang("🔙 Back to Settings", lang=current_lang)
     
     # Translate model display names
-    translated_text_models = {k: await async_translate_to_lang(v, current_lang) for k, v in TEXT_MODELS.items()}
-    translated_image_models = {k: await async_translate_to_lang(v, current_lang) for k, v in IMAGE_MODELS.items()}
+    translated_text_models = {k: await async_translate_to_lang(v, lang=current_lang) for k, v in TEXT_MODELS.items()}
+    translated_image_models = {k: await async_translate_to_lang(v, lang=current_lang) for k, v in IMAGE_MODELS.items()}
 
     # --- Keyboard Construction ---
     keyboard = []
@@ -141,20 +145,14 @@ async def ai_model_settings_panel(client_obj, callback: CallbackQuery):
     # Show user's current models at the top
     current_text_model_label = translated_text_models.get(current_text_model, current_text_model)
     current_image_model_label = translated_image_models.get(current_image_model, current_image_model)
-    current_models_text = f"👤 {user_mention}\n" \
+    current_models_text = "👤 {mention}\n" \
                         f"Current Text Model: <b>{current_text_model_label}</b>\n" \
                         f"Current Image Model: <b>{current_image_model_label}</b>\n\n"
 
     panel_text = current_models_text
     panel_text += f"<b>{panel_title_text}</b>\n\n"
-    panel_text += await async_translate_to_lang("Please select your preferred AI models for text and image generation.", current_lang)
-
-    await callback.message.edit_text(
-        text=panel_text,
-        reply_markup=reply_markup,
-        parse_mode=pyrogram.enums.ParseMode.HTML
-    )
-    await callback.answer()
+    panel_text += await async_translate_to_lang("Please select your preferred AI models for text and image generation.", lang=current_lang)
+    return RenderedPanel(panel_text, reply_markup)
 
 # --- Callback Handlers for Model Changes ---
 async def handle_set_text_model(client_obj, callback: CallbackQuery):
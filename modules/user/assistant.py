@@ -1,16 +1,10 @@
-from pymongo import MongoClient
 from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from modules.lang import async_translate_to_lang
+from modules.core.database import db_service
 
-from config import DATABASE_URL
-
-# Initialize the MongoDB client
-mongo_client = MongoClient(DATABASE_URL)
-
-# Access or create the database and collection
-db = mongo_client['aibotdb']
-ai_mode_collection = db['ai_mode']
+# Collection from the shared connection pool
+ai_mode_collection = db_service.get_collection('ai_mode')
 
 # Dictionary of modes with labels
 modes = {
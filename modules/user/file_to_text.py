@@ -4,11 +4,12 @@ import pdfplumber
 import json
 import csv
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from modules.models.ai_res import DEFAULT_SYSTEM_MESSAGE, check_and_update_system_prompt
-from modules.core.database import get_history_collection
+from modules.models.ai_res import get_response_async
+from modules.core.history_store import history_store
 from modules.user.premium_management import is_user_premium
 from config import ADMINS
 from pyrogram.enums import ParseMode
+from modules.core.scheduler import job_scheduler
 from modules.core.request_queue import (
     can_start_text_request, 
     start_text_request, 
@@ -84,24 +85,11 @@ async def handle_file_upload(client, message: Message):
         await wait_msg.edit_text("❌ Could not extract any text from this file.")
         return
     # Save to user history (like ai_res)
-    history_collection = get_history_collection()
-    user_history = history_collection.find_one({"user_id": user_id})
-    if user_history and 'history' in user_history:
-        history = user_history['history']
-        if not isinstance(history, list):
-            history = [history]
-        # Check and update system prompt if outdated
-        history = check_and_update_system_prompt(history, user_id)
-    else:
-        history = DEFAULT_SYSTEM_MESSAGE.copy()
     prompt = f"A file was uploaded: {filename}. Extracted text is below."
-    history.append({"role": "user", "content": prompt})
-    history.append({"role": "user", "content": text[:4000]})
-    history_collection.update_one(
-        {"user_id": user_id},
-        {"$set": {"history": history}},
-        upsert=True
-    )
+    history_store.append_turns(user_id, [
+        {"role": "user", "content": prompt},
+        {"role": "user", "content": text[:4000]},
+    ])
     # Show preview if text is long
     preview = text[:2000]
     if len(text) > 2000:
@@ -125,51 +113,30 @@ async def handle_file_question(client, message: Message):
         start_text_request(user_id, f"File question: {message.text[:30]}...")
         
         # Find the most recent file text from user history
-        history_collection = get_history_collection()
-        user_history = history_collection.find_one({"user_id": user_id})
         file_text = None
-        if user_history and 'history' in user_history:
-            for entry in reversed(user_history['history']):
-                if isinstance(entry.get("content"), str) and len(entry["content"]) > 20:
-                    file_text = entry["content"]
-                    break
+        for entry in reversed(history_store.load_turns(user_id)):
+            if isinstance(entry.get("content"), str) and len(entry["content"]) > 20:
+                file_text = entry["content"]
+                break
         if not file_text:
             await message.reply_text("No uploaded file found in your recent history. Please upload a file first.")
             return
         # Compose the message for AI
         user_question = message.text
-        from g4f.client import Client
-        import g4f.debug
-        g4f.debug.logging = True
-        client_g4f = Client()
         g4f_messages = [
-            {"role": "user", "content": [
-                {"type": "text", "text": f"{user_question}\n\n[file content follows]\n{file_text[:4000]}"}
-            ]}
+            {"role": "user", "content": f"{user_question}\n\n[file content follows]\n{file_text[:4000]}"}
         ]
         try:
-            response = client_g4f.chat.completions.create(g4f_messages)
-            ai_response = response.choices[0].message.content
+            async with job_scheduler.slot("text", user_id):
+                ai_response = await get_response_async(g4f_messages)
         except Exception as e:
             await message.reply_text(f"Error processing file with AI: {e}")
             return
         # Save to history
-        user_history = history_collection.find_one({"user_id": user_id})
-        if user_history and 'history' in user_history:
-            history = user_history['history']
-            if not isinstance(history, list):
-                history = [history]
-            # Check and update system prompt if outdated
-            history = check_and_update_system_prompt(history, user_id)
-        else:
-            history = DEFAULT_SYSTEM_MESSAGE.copy()
-        history.append({"role": "user", "content": user_question})
-        history.append({"role": "assistant", "content": ai_response})
-        history_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"history": history}},
-            upsert=True
-        )
+        history_store.append_turns(user_id, [
+            {"role": "user", "content": user_question},
+            {"role": "assistant", "content": ai_response},
+        ])
         await message.reply_text(ai_response)
     finally:
         # Always finish the text request in queue system
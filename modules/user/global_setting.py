@@ -1,17 +1,14 @@
 from pyrogram import Client, filters
-from config import DATABASE_URL, LOG_CHANNEL
-from pymongo import MongoClient
+from config import LOG_CHANNEL
 from pyrogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from modules.lang import async_translate_to_lang
 
-# Initialize the MongoDB client
-mongo_client = MongoClient(DATABASE_URL)
+from modules.core.database import db_service
 
-# Access or create the database and collection
-db = mongo_client['aibotdb']
-user_lang_collection = db['user_lang']
-user_voice_collection = db["user_voice_setting"]
-ai_mode_collection = db['ai_mode']
+# Collections from the shared connection pool
+user_lang_collection = db_service.get_collection('user_lang')
+user_voice_collection = db_service.get_collection("user_voice_setting")
+ai_mode_collection = db_service.get_collection('ai_mode')
 
 modes = {
     "chatbot": "Chatbot",
@@ -1,5 +1,6 @@
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from modules.lang import async_translate_to_lang, batch_translate, translate_ui_element
+from modules.lang import async_translate_to_lang, batch_translate, translate_ui_element, get_user_language
+from modules.core.panel_cache import RenderedPanel, panel_cache
 
 
 help_text = """
@@ -189,46 +190,38 @@ async def help(client, message):
     )
 
 async def help_inline_start(bot, callback):
-    user_id = callback.from_user.id
-    texts_to_translate = [
-        help_text, "🧠 AI Chat", "🖼️ Image Generation", "🎙️ Voice Features",
-        "🔍 Image Analysis", "🚀 Quick Start", "📋 Commands", "🔙 Back"
-    ]
-    translated_texts = await batch_translate(texts_to_translate, user_id)
-    translated_help = translated_texts[0]
-    ai_btn = translated_texts[1]
-    img_btn = translated_texts[2]
-    voice_btn = translated_texts[3]
-    analysis_btn = translated_texts[4]
-    quickstart_btn = translated_texts[5]
-    cmd_btn = translated_texts[6]
-    back_btn = translated_texts[7]
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(ai_btn, callback_data="help_ai_start")],
-        [InlineKeyboardButton(img_btn, callback_data="help_img_start")],
-        [InlineKeyboardButton(voice_btn, callback_data="help_voice_start")],
-        [InlineKeyboardButton(analysis_btn, callback_data="help_analysis_start")],
-        [InlineKeyboardButton(quickstart_btn, callback_data="help_quickstart_start")],
-        [InlineKeyboardButton(cmd_btn, callback_data="commands_start")],
-        [InlineKeyboardButton(back_btn, callback_data="back")]
-    ])
+    user_lang = get_user_language(callback.from_user.id)
+    panel = await panel_cache.get_or_render("help_start", user_lang, (), lambda: _render_help_panel(user_lang, "start"))
     await bot.edit_message_text(
         chat_id=callback.message.chat.id,
         message_id=callback.message.id,
-        text=translated_help,
-        reply_markup=keyboard,
+        text=panel.text,
+        reply_markup=panel.reply_markup,
         disable_web_page_preview=True
     )
     await callback.answer()
     return
 
 async def help_inline_help(bot, callback):
-    user_id = callback.from_user.id
+    user_lang = get_user_language(callback.from_user.id)
+    panel = await panel_cache.get_or_render("help_help", user_lang, (), lambda: _render_help_panel(user_lang, "help"))
+    await bot.edit_message_text(
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.id,
+        text=panel.text,
+        reply_markup=panel.reply_markup,
+        disable_web_page_preview=True
+    )
+    await callback.answer()
+    return
+
+async def _render_help_panel(user_lang, entry_point):
+    """Help center opened from the start menu ("start", with a back button) or from /help ("help")"""
     texts_to_translate = [
         help_text, "🧠 AI Chat", "🖼️ Image Generation", "🎙️ Voice Features",
-        "🔍 Image Analysis", "🚀 Quick Start", "📋 Commands"
+        "🔍 Image Analysis", "🚀 Quick Start", "📋 Commands", "🔙 Back"
     ]
-    translated_texts = await batch_translate(texts_to_translate, user_id)
+    translated_texts = await batch_translate(texts_to_translate, lang=user_lang)
     translated_help = translated_texts[0]
     ai_btn = translated_texts[1]
     img_btn = translated_texts[2]
@@ -236,23 +229,18 @@ async def help_inline_help(bot, callback):
     analysis_btn = translated_texts[4]
     quickstart_btn = translated_texts[5]
     cmd_btn = translated_texts[6]
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(ai_btn, callback_data="help_ai_help")],
-        [InlineKeyboardButton(img_btn, callback_data="help_img_help")],
-        [InlineKeyboardButton(voice_btn, callback_data="help_voice_help")],
-        [InlineKeyboardButton(analysis_btn, callback_data="help_analysis_help")],
-        [InlineKeyboardButton(quickstart_btn, callback_data="help_quickstart_help")],
-        [InlineKeyboardButton(cmd_btn, callback_data="commands_help")]
-    ])
-    await bot.edit_message_text(
-        chat_id=callback.message.chat.id,
-        message_id=callback.message.id,
-        text=translated_help,
-        reply_markup=keyboard,
-        disable_web_page_preview=True
-    )
-    await callback.answer()
-    return
+    back_btn = translated_texts[7]
+    keyboard_layout = [
+        [InlineKeyboardButton(ai_btn, callback_data=f"help_ai_{entry_point}")],
+        [InlineKeyboardButton(img_btn, callback_data=f"help_img_{entry_point}")],
+        [InlineKeyboardButton(voice_btn, callback_data=f"help_voice_{entry_point}")],
+        [InlineKeyboardButton(analysis_btn, callback_data=f"help_analysis_{entry_point}")],
+        [InlineKeyboardButton(quickstart_btn, callback_data=f"help_quickstart_{entry_point}")],
+        [InlineKeyboardButton(cmd_btn, callback_data=f"commands_{entry_point}")]
+    ]
+    if entry_point == "start":
+        keyboard_layout.append([InlineKeyboardButton(back_btn, callback_data="back")])
+    return RenderedPanel(translated_help, InlineKeyboardMarkup(keyboard_layout))
     
 async def handle_help_category(client, callback):
     user_id = callback.from_user.id
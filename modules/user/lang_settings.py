@@ -1,14 +1,10 @@
-from pymongo import MongoClient
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from config import DATABASE_URL
 from modules.lang import async_translate_to_lang
+from modules.core.database import get_user_lang_collection
+from modules.core.user_context import invalidate_user_context
 
-# Initialize the MongoDB client
-mongo_client = MongoClient(DATABASE_URL)
-
-# Access or create the database and collection
-db = mongo_client['aibotdb']
-user_lang_collection = db['user_lang']
+# Collection from the shared connection pool
+user_lang_collection = get_user_lang_collection()
 
 # Dictionary of languages with flags
 languages = {
@@ -79,6 +75,7 @@ async def change_language_setting(client, callback):
         {"$set": {"language": new_language}},
         upsert=True
     )
+    invalidate_user_context(user_id)
 
     current_language_label = languages[new_language]
     
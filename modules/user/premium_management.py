@@ -1,18 +1,16 @@
 import datetime
-from pymongo import MongoClient
-from config import DATABASE_URL
 from typing import Tuple, Optional
-import asyncio
 from modules.user.ai_model import revert_restricted_models_if_needed
 from modules.core.database import db_service
-
-# Initialize MongoDB client and collection
-mongo_client = MongoClient(DATABASE_URL)
-db = mongo_client['aibotdb']
+from modules.core.async_database import async_db_service
+from modules.core.user_context import get_user_context, invalidate_user_context
 
 def get_premium_users_collection():
     return db_service.get_collection('premium_users')
 
+def get_async_premium_users_collection():
+    return async_db_service.get_collection('premium_users')
+
 async def add_premium_status(user_id: int, admin_id: int, days: int) -> bool:
     """Adds or updates a user's premium status."""
     if not isinstance(user_id, int) or not isinstance(admin_id, int) or not isinstance(days, int):
@@ -33,7 +31,8 @@ async def add_premium_status(user_id: int, admin_id: int, days: int) -> bool:
         "last_updated": now
     }
     
-    get_premium_users_collection().update_one({"user_id": user_id}, {"$set": premium_record}, upsert=True)
+    await get_async_premium_users_collection().update_one({"user_id": user_id}, {"$set": premium_record}, upsert=True)
+    invalidate_user_context(user_id)
     return True
 
 async def remove_premium_status(user_id: int, revoked_by_admin: bool = False) -> bool:
@@ -48,10 +47,11 @@ async def remove_premium_status(user_id: int, revoked_by_admin: bool = False) ->
     if revoked_by_admin:
         update_fields["reason_for_removal"] = "Revoked by admin"
 
-    result = get_premium_users_collection().update_one(
+    result = await get_async_premium_users_collection().update_one(
         {"user_id": user_id, "is_premium": True},
         {"$set": update_fields}
     )
+    invalidate_user_context(user_id)
     # Revert restricted models if needed
     await revert_restricted_models_if_needed(user_id)
     return result.modified_count > 0
@@ -61,37 +61,9 @@ async def is_user_premium(user_id: int) -> Tuple[bool, int, Optional[datetime.da
     if not isinstance(user_id, int):
         return False, 0, None
         
-    user_record = get_premium_users_collection().find_one({"user_id": user_id, "is_premium": True})
-    if not user_record:
-        return False, 0, None
-
-    expires_at = user_record.get("premium_expires_at")
-    if not expires_at or not isinstance(expires_at, datetime.datetime):
-        # This case indicates bad data or an issue, log it and treat as not premium.
-        print(f"Error: User {user_id} has invalid premium_expires_at: {expires_at}")
-        return False, 0, None
-
-    # Ensure both datetimes are timezone-aware for comparison
-    now = datetime.datetime.now(datetime.timezone.utc)
-    
-    # If expires_at is naive (no timezone), assume it's UTC
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=datetime.timezone.utc)
-    
-    if expires_at > now:
-        remaining_time = expires_at - now
-        # Calculate remaining_days, ensuring it's at least 1 if there's any positive time left.
-        remaining_days = remaining_time.days
-        if remaining_time.total_seconds() > 0 and remaining_days == 0:
-            remaining_days = 1 # If less than a day but positive, count as 1 day remaining.
-        elif remaining_time.days < 0: # Should be caught by expires_at > now, but as a safeguard
-             remaining_days = 0
-        return True, remaining_days, expires_at
-    else:
-        # Premium has expired, ensure it's marked in DB if not already
-        if user_record.get("is_premium", False):
-             asyncio.create_task(remove_premium_status(user_id))
-        return False, 0, expires_at
+    # Expiry is evaluated on every call, so a cached context stays accurate
+    context = await get_user_context(user_id)
+    return context.premium_status()
 
 async def get_premium_status_message(user_id: int) -> Optional[str]:
     """Generates a message about the user's premium status if they are premium."""
@@ -4,25 +4,20 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram.types import Message
 from pyrogram.types import InlineQuery
 from pyrogram.types import CallbackQuery
-from modules.lang import async_translate_to_lang, translate_ui_element, batch_translate, format_with_mention
+from modules.lang import async_translate_to_lang, translate_ui_element, batch_translate, format_with_mention, get_user_language
 from modules.chatlogs import channel_log
-from config import DATABASE_URL, ADMINS
+from config import ADMINS
 from modules.user.premium_management import is_user_premium
 from modules.user.ai_model import get_user_ai_models
 
-from pymongo import MongoClient
+from modules.core.database import db_service
+from modules.core.panel_cache import RenderedPanel, panel_cache
 
-# Replace with your MongoDB connection string
-client = MongoClient(DATABASE_URL)
-
-# Access your database and collection
-db = client["aibotdb"]
-user_voice_collection = db["user_voice_setting"]
-
-# Access or create the database and collection
-user_lang_collection = db['user_lang']
-ai_mode_collection = db['ai_mode']
-user_image_gen_settings_collection = db['user_image_gen_settings']
+# Collections from the shared connection pool
+user_voice_collection = db_service.get_collection("user_voice_setting")
+user_lang_collection = db_service.get_collection('user_lang')
+ai_mode_collection = db_service.get_collection('ai_mode')
+user_image_gen_settings_collection = db_service.get_collection('user_image_gen_settings')
 
 modes = {
     "chatbot": "Chatbot",
@@ -79,37 +74,52 @@ async def settings_inline(client_obj, callback: CallbackQuery):
 
     # Get premium status
     is_premium, remaining_days, _ = await is_user_premium(user_id)
+
+    # Fetch user AI models
+    ai_text_model, ai_image_model = await get_user_ai_models(user_id)
+
+    state = (is_premium, remaining_days, current_mode, voice_setting, ai_text_model, ai_image_model)
+    panel = await panel_cache.get_or_render(
+        "settings", current_language, state,
+        lambda: _render_settings_panel(current_language, *state)
+    )
+
+    await callback.message.edit_text(
+        text=panel.fill(mention=callback.from_user.mention, user_id=user_id),
+        reply_markup=panel.reply_markup,
+        disable_web_page_preview=True
+    )
+
+async def _render_settings_panel(current_language, is_premium, remaining_days, current_mode, voice_setting,
+                                 ai_text_model, ai_image_model):
+    """Settings menu with {mention} and {user_id} left for the caller to fill in"""
     if is_premium:
         premium_status_text_key = "✨ Premium User ({days} days left)"
-        premium_status_val = await async_translate_to_lang(premium_status_text_key.format(days=remaining_days), current_language)
+        premium_status_val = await async_translate_to_lang(premium_status_text_key.format(days=remaining_days), lang=current_language)
     else:
         premium_status_text_key = "👤 Standard User"
-        premium_status_val = await async_translate_to_lang(premium_status_text_key, current_language)
-    
-    current_mode_label = await async_translate_to_lang(modes.get(current_mode, current_mode), current_language)
-    current_language_label = await async_translate_to_lang(languages.get(current_language, current_language), current_language)
-    mention = callback.from_user.mention
+        premium_status_val = await async_translate_to_lang(premium_status_text_key, lang=current_language)
     
-    # Fetch user AI models
-    ai_text_model, ai_image_model = await get_user_ai_models(user_id)
+    current_mode_label = await async_translate_to_lang(modes.get(current_mode, current_mode), lang=current_language)
+    current_language_label = await async_translate_to_lang(languages.get(current_language, current_language), lang=current_language)
 
-    translated_template = await async_translate_to_lang(settings_text_template, current_language)
+    translated_template = await async_translate_to_lang(settings_text_template, lang=current_language)
     formatted_text = translated_template.format(
-        mention=mention,
-        user_id=user_id,
+        mention="{mention}",
+        user_id="{user_id}",
         premium_status=premium_status_val,
         language=current_language_label,
-        voice_setting=await async_translate_to_lang(voice_setting.capitalize(), current_language),
+        voice_setting=await async_translate_to_lang(voice_setting.capitalize(), lang=current_language),
         mode=current_mode_label,
         ai_text_model=ai_text_model,
         ai_image_model=ai_image_model,
     )
 
     button_labels = ["🌐 Language", "🎙️ Voice", "🤖 Assistant", "🖼️ Image Count", "🔙 Back"]
-    translated_labels = await batch_translate(button_labels, user_id)
+    translated_labels = await batch_translate(button_labels, lang=current_language)
     
     # Add the new AI Models button
-    ai_models_button_label = await async_translate_to_lang("🧠 AI Models", current_language)
+    ai_models_button_label = await async_translate_to_lang("🧠 AI Models", lang=current_language)
 
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton(ai_models_button_label, callback_data="settings_ai_models")],  # New button
@@ -119,12 +129,7 @@ async def settings_inline(client_obj, callback: CallbackQuery):
          InlineKeyboardButton(translated_labels[3], callback_data="settings_image_count")],
         [InlineKeyboardButton(translated_labels[4], callback_data="back")]
     ])
-
-    await callback.message.edit_text(
-        text=formatted_text,
-        reply_markup=keyboard,
-        disable_web_page_preview=True
-    )
+    return RenderedPanel(formatted_text, keyboard)
 
 
 async def settings_language_callback(client, callback):
@@ -141,10 +146,24 @@ async def settings_language_callback(client, callback):
         user_voice_collection.insert_one({"user_id": user_id, "voice": "voice"})
 
     print(f"Voice setting for {user_id}: {voice_setting}")
-    
+
+    current_language = get_user_language(user_id)
+    panel = await panel_cache.get_or_render(
+        "settings_voice", current_language, voice_setting,
+        lambda: _render_voice_panel(current_language, voice_setting)
+    )
+
+    await callback.message.edit(
+        text=panel.text,
+        reply_markup=panel.reply_markup,
+        disable_web_page_preview=True
+    )
+
+async def _render_voice_panel(current_language, voice_setting):
+    """Voice/text answer mode panel"""
     # Efficiently translate all text at once
     texts_to_translate = ["Voice", "Text", "Current setting: Answering in", "queries only.", "🔙 Back"]
-    translated_texts = await batch_translate(texts_to_translate, user_id)
+    translated_texts = await batch_translate(texts_to_translate, lang=current_language)
     
     voice_text = translated_texts[0]
     text_option = translated_texts[1]
@@ -170,12 +189,7 @@ async def settings_language_callback(client, callback):
             ]
         ]
     )
-
-    await callback.message.edit(
-        text=message_text,
-        reply_markup=keyboard,
-        disable_web_page_preview=True
-    )
+    return RenderedPanel(message_text, keyboard)
 
 async def change_voice_setting(client, callback):
     user_id = callback.from_user.id
@@ -190,39 +204,17 @@ async def change_voice_setting(client, callback):
         upsert=True
     )
 
-    # Efficiently translate all text at once
-    texts_to_translate = ["Voice", "Text", "Current setting: Answering in", "queries only.", "🔙 Back"]
-    translated_texts = await batch_translate(texts_to_translate, user_id)
-    
-    voice_text = translated_texts[0]
-    text_option = translated_texts[1]
-    current_setting = translated_texts[2]
-    queries_only = translated_texts[3]
-    back_btn = translated_texts[4]
-
-    # Create the message text with translated components
-    message_text = f"{current_setting} {voice_text if new_voice_setting == 'voice' else text_option} {queries_only}"
-
-    # Update the button texts with checkmarks
-    voice_button_text = f"🎙️ {voice_text} ✅" if new_voice_setting == "voice" else f"🎙️ {voice_text}"
-    text_button_text = f"💬 {text_option} ✅" if new_voice_setting == "text" else f"💬 {text_option}"
-
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(voice_button_text, callback_data="settings_voice"),
-                InlineKeyboardButton(text_button_text, callback_data="settings_text")
-            ],
-            [
-                InlineKeyboardButton(back_btn, callback_data="settings_back")
-            ]
-        ]
+    # Same panel as settings_language_callback, now showing the new setting
+    current_language = get_user_language(user_id)
+    panel = await panel_cache.get_or_render(
+        "settings_voice", current_language, new_voice_setting,
+        lambda: _render_voice_panel(current_language, new_voice_setting)
     )
 
     # Edit the message to reflect the new settings
     await callback.message.edit(
-        text=message_text,
-        reply_markup=keyboard,
+        text=panel.text,
+        reply_markup=panel.reply_markup,
         disable_web_page_preview=True
     )
 
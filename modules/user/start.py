@@ -4,6 +4,7 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message,
 from pyrogram.types import InlineQuery
 from typing import Union
 from modules.lang import async_translate_to_lang, batch_translate, format_with_mention
+from modules.core.panel_cache import RenderedPanel, panel_cache
 from modules.chatlogs import channel_log
 import database.user_db as user_db
 from pyrogram.enums import ParseMode
@@ -120,12 +121,22 @@ async def start_inline(bot, callback: CallbackQuery):
     user_id = callback.from_user.id
     mention = callback.from_user.mention
     user_lang = user_db.get_user_language(user_id)
-    translated_welcome = await format_with_mention(welcome_text.replace("{user_mention}", "{mention}"), mention, user_id, user_lang)
-    translated_buttons = await batch_translate(button_list, user_id)
 
     # Get bot username from cache (for multi-bot support) or fallback to API call
     bot_username = await get_bot_username(bot)
 
+    panel = await panel_cache.get_or_render(
+        "start", user_lang, bot_username,
+        lambda: _render_start_panel(user_lang, bot_username)
+    )
+
+    await bot.edit_message_caption(chat_id=callback.message.chat.id, message_id=callback.message.id, caption=panel.fill(mention=mention), reply_markup=panel.reply_markup)
+
+async def _render_start_panel(user_lang, bot_username):
+    """Start menu with {mention} left for the caller to fill in"""
+    translated_welcome = await format_with_mention(welcome_text.replace("{user_mention}", "{mention}"), "{mention}", lang=user_lang)
+    translated_buttons = await batch_translate(button_list, lang=user_lang)
+
     keyboard_layout = [
         [InlineKeyboardButton(translated_buttons[0], url=f"https://t.me/{bot_username}?startgroup=true")],
         [InlineKeyboardButton(translated_buttons[1], callback_data="commands_start"),
@@ -134,16 +145,13 @@ async def start_inline(bot, callback: CallbackQuery):
          InlineKeyboardButton(translated_buttons[4], callback_data="support")],
         [InlineKeyboardButton(translated_buttons[5], url="https://t.me/AdvChatGptbot/ImageGenerator")]
     ]
-    keyboard = InlineKeyboardMarkup(keyboard_layout)
-
-    await bot.edit_message_caption(chat_id=callback.message.chat.id, message_id=callback.message.id, caption=translated_welcome, reply_markup=keyboard)
+    return RenderedPanel(translated_welcome, InlineKeyboardMarkup(keyboard_layout))
 
 async def premium_info_page(client_or_bot, update_obj: Union[Message, CallbackQuery], is_callback: bool = False):
     """Sends or edits message to show premium benefits. Can be called by command or callback."""
     user_id = update_obj.from_user.id
     benefits_text = await get_premium_benefits_message(user_id)
-    btn_get_sub_text = await async_translate_to_lang("💳 Get Subscription", user_id)
-    btn_back_text = await async_translate_to_lang("🔙 Back to Start", user_id)
+    btn_get_sub_text, btn_back_text = await batch_translate(["💳 Get Subscription", "🔙 Back to Start"], user_id)
 
     keyboard_buttons = [
         [InlineKeyboardButton(btn_get_sub_text, callback_data="premium_plans")],
@@ -224,14 +232,20 @@ async def premium_info_page(client_or_bot, update_obj: Union[Message, CallbackQu
 
 async def premium_plans_callback(client: pyrogram.Client, callback_query: CallbackQuery):
     user_id = callback_query.from_user.id
-    plans_title = await async_translate_to_lang("💎 **Premium Subscription Plans** 💎", user_id)
-    plan1_text = await async_translate_to_lang("₹249 - Weekly Access(~2.9 USD)", user_id)
-    plan2_text = await async_translate_to_lang("₹899 - Monthly Access(~10.5 USD) (Best Value!)", user_id)
-    plan3_text = await async_translate_to_lang("₹9499 - Yearly Access(~111.7 USD) (Ultimate Savings!)", user_id)
-    payment_instructions_upi = await async_translate_to_lang("Scan the **Above QR** or use UPI ID: `csr.info.in@oksbi`", user_id)
-    payment_instructions_usdt = await async_translate_to_lang("For **USDT (TRC20)** payment, use the address: `TUUWniGShkxb8Bg5tj6ZiA9UzHzxxbwi6i`", user_id)
-    paid_button_text = await async_translate_to_lang("✅ I've Paid (Notify Admin)", user_id)
-    back_button_text = await async_translate_to_lang("🔙 Back to Benefits", user_id)
+    # One lookup for the whole panel; every string is static, so it comes from the UI bundle
+    (plans_title, plan1_text, plan2_text, plan3_text, payment_instructions_upi, payment_instructions_usdt,
+     notify_text, paid_button_text, back_button_text) = await batch_translate([
+        "💎 **Premium Subscription Plans** 💎",
+        "₹249 - Weekly Access(~2.9 USD)",
+        "₹899 - Monthly Access(~10.5 USD) (Best Value!)",
+        "₹9499 - Yearly Access(~111.7 USD) (Ultimate Savings!)",
+        "Scan the **Above QR** or use UPI ID: `csr.info.in@oksbi`",
+        "For **USDT (TRC20)** payment, use the address: `TUUWniGShkxb8Bg5tj6ZiA9UzHzxxbwi6i`",
+        "After payment, click below to notify admin and **send a screenshot of your payment to {admin_contact} **for faster verification.",
+        "✅ I've Paid (Notify Admin)",
+        "🔙 Back to Benefits",
+    ], user_id)
+    admin_contact = ADMIN_CONTACT_MENTION if ADMIN_CONTACT_MENTION else f"the bot owner (ID: {OWNER_ID})"
 
     text = f"{plans_title}\n\n"
     text += f"🔹 {plan1_text}\n"
@@ -239,7 +253,7 @@ async def premium_plans_callback(client: pyrogram.Client, callback_query: Callba
     text += f"🔹 {plan3_text}\n\n"
     text += f"{payment_instructions_upi}\n\n"
     text += f"{payment_instructions_usdt}\n\n"
-    text += await async_translate_to_lang("After payment, click below to notify admin and **send a screenshot of your payment to {admin_contact} **for faster verification.\n\n".replace("{admin_contact}", ADMIN_CONTACT_MENTION if ADMIN_CONTACT_MENTION else f"the bot owner (ID: {OWNER_ID})"), user_id)
+    text += notify_text.replace("{admin_contact}", admin_contact) + "\n\n"
     
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton(paid_button_text, callback_data="premium_paid_notify")],
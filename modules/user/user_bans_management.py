@@ -1,21 +1,19 @@
 import datetime
-from pymongo import MongoClient
-from config import DATABASE_URL
 from typing import Optional, Tuple
 from modules.core.database import db_service
+from modules.core.async_database import async_db_service
+from modules.core.user_context import get_user_context, invalidate_user_context
 
 
 
-# Initialize MongoDB client and collection
-mongo_client = MongoClient(DATABASE_URL)
-db = mongo_client['aibotdb']
-user_bans_collection = db['user_bans']
+# Shared connection pool
+user_bans_collection = db_service.get_collection('user_bans')
 
 async def ban_user(user_id: int, admin_id: int, reason: str = "No reason provided.") -> bool:
     """Bans a user, storing their ID, reason, and ban timestamp."""
     if not isinstance(user_id, int) or not isinstance(admin_id, int):
         return False
-    user_bans_collection = db_service.get_collection('user_bans')
+    user_bans_collection = async_db_service.get_collection('user_bans')
     ban_record = {
         "user_id": user_id,
         "is_banned": True,
@@ -23,26 +21,25 @@ async def ban_user(user_id: int, admin_id: int, reason: str = "No reason provide
         "banned_at": datetime.datetime.now(datetime.timezone.utc),
         "banned_by": admin_id
     }
-    user_bans_collection.update_one({"user_id": user_id}, {"$set": ban_record}, upsert=True)
+    await user_bans_collection.update_one({"user_id": user_id}, {"$set": ban_record}, upsert=True)
+    invalidate_user_context(user_id)
     return True
 
 async def unban_user(user_id: int) -> bool:
     """Unbans a user by removing their record or marking as not banned."""
     if not isinstance(user_id, int):
         return False
-    user_bans_collection = db_service.get_collection('user_bans')
-    result = user_bans_collection.update_one({"user_id": user_id}, {"$set": {"is_banned": False, "unbanned_at": datetime.datetime.now(datetime.timezone.utc)}})
+    user_bans_collection = async_db_service.get_collection('user_bans')
+    result = await user_bans_collection.update_one({"user_id": user_id}, {"$set": {"is_banned": False, "unbanned_at": datetime.datetime.now(datetime.timezone.utc)}})
+    invalidate_user_context(user_id)
     return result.modified_count > 0
 
 async def is_user_banned(user_id: int) -> Tuple[bool, Optional[str]]:
     """Checks if a user is banned. Returns (True, reason) if banned, else (False, None)."""
     if not isinstance(user_id, int):
         return False, None # Or raise an error
-    user_bans_collection = db_service.get_collection('user_bans')
-    ban_record = user_bans_collection.find_one({"user_id": user_id, "is_banned": True})
-    if ban_record:
-        return True, ban_record.get("reason", "No reason provided.")
-    return False, None
+    context = await get_user_context(user_id)
+    return context.is_banned, context.ban_reason
 
 async def get_banned_message(reason: str) -> str:
     """Returns the formatted message to show to a banned user."""
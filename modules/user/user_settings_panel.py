@@ -1,7 +1,7 @@
 import asyncio
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from modules.user.global_setting import user_lang_collection, user_voice_collection, ai_mode_collection, languages, modes
-from modules.models.ai_res import get_history_collection, DEFAULT_SYSTEM_MESSAGE
+from modules.core.history_store import history_store
 from modules.lang import batch_translate, format_with_mention, async_translate_to_lang
 from modules.user.settings import settings_language_callback, change_voice_setting, settings_inline
 from modules.user.assistant import settings_assistant_callback
@@ -122,9 +122,7 @@ async def handle_user_settings_callback(client, callback_query):
     current_language = user_lang_collection.find_one({"user_id": user_id}).get('language', 'en')
 
     if data == "user_settings_reset":
-        history_collection = get_history_collection()
-        history_collection.delete_one({"user_id": user_id})
-        history_collection.insert_one({"user_id": user_id, "history": DEFAULT_SYSTEM_MESSAGE})
+        history_store.reset(user_id)
         reset_msg = await async_translate_to_lang("🔄 Conversation reset! Your chat history has been cleared.", current_language)
         await callback_query.answer(reset_msg, show_alert=True)
         return
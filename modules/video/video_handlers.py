@@ -15,6 +15,7 @@ from modules.video.video_generation import (
     get_user_active_requests, VideoQuality, QUALITY_TOKEN_COSTS,
     TOKENS_PER_VIDEO, enhance_prompt_with_ai
 )
+from modules.core.scheduler import job_scheduler
 # Removed video progress imports since we're using direct generation
 from config import LOG_CHANNEL, ADMINS
 import logging
@@ -221,9 +222,17 @@ async def process_video_generation(client, message: Message, prompt: str, qualit
         try:
             # Start generation in background and track progress
             import asyncio
-            generation_task = asyncio.create_task(
-                generate_video_direct(user_id, prompt, quality, aspect_ratio)
-            )
+            queue_state = {"position": 0}
+            
+            async def record_position(position):
+                queue_state["position"] = position
+            
+            async def generate_in_slot():
+                # Video generation is the most expensive job; the scheduler caps how many run at once
+                async with job_scheduler.slot("video", user_id, on_position=record_position):
+                    return await generate_video_direct(user_id, prompt, quality, aspect_ratio)
+            
+            generation_task = asyncio.create_task(generate_in_slot())
             
             # Create a temporary request ID for progress tracking
             temp_request_id = f"temp_{user_id}_{int(time.time())}"
@@ -232,11 +241,15 @@ async def process_video_generation(client, message: Message, prompt: str, qualit
             progress = 0
             while not generation_task.done():
                 try:
-                    # Update progress display
-                    progress = min(progress + 5, 95)
+                    # Update progress display (progress does not advance while queued)
+                    if not queue_state["position"]:
+                        progress = min(progress + 5, 95)
                     
                     # Determine current stage
-                    if progress < 20:
+                    if queue_state["position"]:
+                        stage = f"Waiting in queue (#{queue_state['position']})"
+                        emoji = "⏳"
+                    elif progress < 20:
                         stage = "Initializing AI systems"
                         emoji = "🚀"
                     elif progress < 40:
@@ -25,7 +25,7 @@ from modules.image.img_to_text import extract_text_res, handle_vision_followup
 from modules.maintenance import settings_others_callback, handle_feature_toggle, handle_feature_info, maintenance_check, maintenance_message, handle_donation
 from modules.group.group_settings import leave_group, invite_command
 from modules.feedback_nd_rating import rate_command, handle_rate_callback
-from modules.group.group_info import info_command, uinfo_settings_callback, uinfo_history_callback
+from modules.group.group_info import info_command
 from modules.models.ai_res import aires, new_chat
 from modules.image.image_generation import generate_command, handle_image_feedback, start_cleanup_scheduler as start_image_cleanup_scheduler, handle_generate_command
 from modules.image.inline_image_generation import handle_inline_query, cleanup_ongoing_generations
@@ -33,7 +33,7 @@ from modules.models.inline_ai_response import cleanup_ongoing_generations as ai_
 from modules.core.request_queue import start_cleanup_scheduler as start_request_queue_cleanup_scheduler
 from modules.chatlogs import channel_log, user_log, error_log
 from modules.user.user_settings_panel import user_settings_panel_command, handle_user_settings_callback
-from modules.speech.voice_to_text import handle_voice_message, handle_voice_toggle
+from modules.speech.voice_to_text import handle_voice_message
 from modules.admin.restart import restart_command, handle_restart_callback, check_restart_marker
 from modules.admin.update import update_command, handle_update_callback, check_update_marker
 import modules.models.user_db as user_db
@@ -43,7 +43,13 @@ from modules.user.user_bans_management import ban_user, unban_user, is_user_bann
 from modules.user.premium_management import add_premium_status, remove_premium_status, is_user_premium, get_premium_status_message, daily_premium_check, get_premium_benefits_message, get_all_premium_users, format_premium_users_list
 from modules.user.file_to_text import handle_file_upload, handle_file_question
 from modules.interaction.interaction_system import start_interaction_system, set_last_interaction
-from modules.core.database import get_user_interactions_collection
+from modules.core.database import db_service
+from modules.core.write_behind import write_behind
+from modules.lang_resources.translation_cache import flush_translation_cache
+from modules.core.broadcast import broadcast_engine, text_payload, photo_payload
+from modules.core.telegram_governor import outbound_governor
+from modules.core.callback_router import callback_router
+import modules.callback_routes  # registers the modules' callback namespaces
 import re
 from modules.video.video_handlers import video_command_handler, addt_command_handler, removet_command_handler, token_command_handler, video_callback_handler, vtoken_command_handler
 from modules.video.video_generation import start_queue_processor
@@ -85,6 +91,11 @@ def create_bot_instance(bot_token, bot_index=1):
         api_hash=config.API_HASH,
         workdir=session_dir
     )
+    # Pace every send and edit of this client against Telegram's flood limits
+    outbound_governor.install(advAiBot)
+
+    # Callback data routes, plus the ones below that use this client's pending state
+    router = callback_router.copy()
     
     # Make bot stats instance-specific instead of global
     bot_stats = {
@@ -177,7 +188,7 @@ def create_bot_instance(bot_token, bot_index=1):
         }
 
     # --- SHARE IMAGE CALLBACK HANDLER (ADMIN ONLY) ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, query: query.data in ["shareimg_confirm", "shareimg_cancel"]))
+    @router.exact("shareimg_confirm", "shareimg_cancel", name="shareimg", guarded=False)
     async def share_image_callback_handler(bot, callback_query):
         user_id = callback_query.from_user.id
         if not hasattr(bot, "_shareimg_pending") or user_id not in bot._shareimg_pending:
@@ -201,30 +212,11 @@ def create_bot_instance(bot_token, bot_index=1):
             f"🚀 Sending image to all users...\n\nSuccess: 0\nFailed: 0",
             parse_mode=ParseMode.MARKDOWN
         )
-        from modules.core.database import get_user_collection
-        users_collection = get_user_collection()
-        user_ids = users_collection.distinct("user_id")
-        success = 0
-        fail = 0
-        update_every = 10
-        for idx, uid in enumerate(user_ids, 1):
-            try:
-                await bot.send_photo(uid, photo=file, caption=share_text, parse_mode=ParseMode.MARKDOWN)
-                await asyncio.sleep(0.05)
-                success += 1
-            except Exception as e:
-                fail += 1
-            if idx % update_every == 0 or idx == len(user_ids):
-                try:
-                    await progress_msg.edit_caption(
-                        f"🚀 Sending image to all users...\n\nSuccess: {success}\nFailed: {fail}",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                except Exception:
-                    pass
-        await progress_msg.edit_caption(
-            f"✅ Image sent to {success} users.\n❌ Failed to send to {fail} users.",
-            parse_mode=ParseMode.MARKDOWN
+        # Send the preview's file_id so the photo is not uploaded again for every user
+        photo = callback_query.message.photo.file_id if callback_query.message.photo else file
+        await broadcast_engine.start(
+            bot, photo_payload(photo, share_text, ParseMode.MARKDOWN), progress_msg,
+            label="Image", bot_index=bot_index, created_by=user_id
         )
         del bot._shareimg_pending[user_id]
 
@@ -263,7 +255,7 @@ def create_bot_instance(bot_token, bot_index=1):
             )
 
     # --- SNIPPET CALLBACK HANDLER (ADMIN ONLY) ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, query: query.data in ["snippet_confirm", "snippet_cancel"]))
+    @router.exact("snippet_confirm", "snippet_cancel", name="snippet", guarded=False)
     async def snippet_callback_handler(bot, callback_query):
         user_id = callback_query.from_user.id
         if not hasattr(bot, "_snippet_pending") or user_id not in bot._snippet_pending:
@@ -285,32 +277,9 @@ def create_bot_instance(bot_token, bot_index=1):
             f"🚀 Sending snippet to all users...\n\nSuccess: 0\nFailed: 0",
             parse_mode=ParseMode.MARKDOWN
         )
-        # Send to all users and collect results
-        from modules.core.database import get_user_collection
-        users_collection = get_user_collection()
-        user_ids = users_collection.distinct("user_id")
-        success = 0
-        fail = 0
-        update_every = 10
-        for idx, uid in enumerate(user_ids, 1):
-            try:
-                await bot.send_message(uid, snippet_text, parse_mode=ParseMode.MARKDOWN)
-                await asyncio.sleep(0.05)
-                success += 1
-            except Exception as e:
-                fail += 1
-            # Update progress every 20 users
-            if idx % update_every == 0 or idx == len(user_ids):
-                try:
-                    await progress_msg.edit_text(
-                        f"🚀 Sending snippet to all users...\n\nSuccess: {success}\nFailed: {fail}",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                except Exception:
-                    pass
-        await progress_msg.edit_text(
-            f"✅ Snippet sent to {success} users.\n❌ Failed to send to {fail} users.",
-            parse_mode=ParseMode.MARKDOWN
+        await broadcast_engine.start(
+            bot, text_payload(snippet_text, ParseMode.MARKDOWN), progress_msg,
+            label="Snippet", bot_index=bot_index, created_by=user_id
         )
         del bot._snippet_pending[user_id]
 
@@ -428,7 +397,7 @@ def create_bot_instance(bot_token, bot_index=1):
     # --- START COMMAND ---
     @advAiBot.on_message(filters.command("start"))
     async def start_command(bot, update):
-        # set_last_interaction(update.from_user.id, "command_start", get_user_interactions_collection())
+        # await set_last_interaction(update.from_user.id, "command_start")
         if await check_if_banned_and_reply(bot, update): # BAN CHECK
             return
 
@@ -459,6 +428,7 @@ def create_bot_instance(bot_token, bot_index=1):
             logger.info(f"Bot {bot_index}: Checking for restart and update markers on first command")
             await check_restart_marker(bot)
             await check_update_marker(bot)
+            await broadcast_engine.resume_pending(bot, bot_index)
             setattr(advAiBot, "_restart_checked", True)
             
         # Cache bot info on first use and store in client for easy access
@@ -519,22 +489,10 @@ def create_bot_instance(bot_token, bot_index=1):
     async def handle_vtoken_command(client, message):
         await vtoken_command_handler(client, message)
 
-    @advAiBot.on_callback_query(filters.create(lambda _, __, query: 
-        query.data.startswith("check_tokens_") or 
-        query.data == "show_plans" or
-        query.data.startswith("generate_similar_") or
-        query.data.startswith("progress_check_") or
-        query.data.startswith("progress_info_") or
-        query.data == "video_help" or
-        query.data == "back_to_menu"
-    ))
-    async def handle_video_callbacks(client, callback_query):
-        await video_callback_handler(client, callback_query)
-
     # --- HELP COMMAND ---
     @advAiBot.on_message(filters.command("help"))
     async def help_command(bot, update):
-        set_last_interaction(update.from_user.id, "command_help", get_user_interactions_collection())
+        await set_last_interaction(update.from_user.id, "command_help")
         if await check_if_banned_and_reply(bot, update): # BAN CHECK
             return
         logger.info(f"User {update.from_user.id} requested help")
@@ -573,7 +531,7 @@ def create_bot_instance(bot_token, bot_index=1):
         # Ignore messages from the bot itself
         if message.from_user and message.from_user.is_bot:
             return
-        set_last_interaction(message.from_user.id, "text", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "text")
         if await check_if_banned_and_reply(client, message): # BAN CHECK
             return
         # Check for maintenance mode
@@ -609,7 +567,7 @@ def create_bot_instance(bot_token, bot_index=1):
     
 
     # --- ANNOUNCEMENT CALLBACK HANDLER (ADMIN ONLY) ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, query: query.data in ["announce_confirm", "announce_cancel"])) 
+    @router.exact("announce_confirm", "announce_cancel", name="announce", guarded=False)
     async def announce_callback_handler(bot, callback_query):
         user_id = callback_query.from_user.id
         if not hasattr(bot, "_announce_pending") or user_id not in bot._announce_pending:
@@ -633,7 +591,12 @@ def create_bot_instance(bot_token, bot_index=1):
 
     @advAiBot.on_callback_query()
     async def callback_query(client, callback_query):
-        set_last_interaction(callback_query.from_user.id, "callback_query", get_user_interactions_collection())
+        # One dict lookup or trie walk; see modules/callback_routes.py for the table
+        route = router.resolve(callback_query.data)
+        if route is not None and not route.guarded:
+            await router.dispatch(route, client, callback_query)
+            return
+        await set_last_interaction(callback_query.from_user.id, "callback_query")
         if await check_if_banned_and_reply(client, callback_query):
             try:
                 banned_msg_text = await get_banned_message((await is_user_banned(callback_query.from_user.id))[1])
@@ -642,304 +605,11 @@ def create_bot_instance(bot_token, bot_index=1):
                 await callback_query.answer("You are banned from using this bot.", show_alert=True)
             return
         try:
-            # Handle restart callbacks
-            if callback_query.data == "confirm_restart" or callback_query.data == "cancel_restart":
-                await handle_restart_callback(client, callback_query)
-                return
-            
-            # Handle update callbacks
-            if callback_query.data == "confirm_update" or callback_query.data == "cancel_update":
-                await handle_update_callback(client, callback_query)
-                return
-            
-            # Handle maintenance mode toggle and feature callbacks
-            if callback_query.data.startswith("toggle_") and callback_query.data.count("_") >= 2:
-                await handle_feature_toggle(client, callback_query)
-                return
-            elif callback_query.data.startswith("feature_info_"):
-                await handle_feature_info(client, callback_query)
-                return
-            elif callback_query.data == "admin_panel":
-                from modules.user.user_support import admin_panel_callback
-                await admin_panel_callback(client, callback_query)
-                return
-            elif callback_query.data == "support_donate":
-                from modules.maintenance import handle_donation
-                await handle_donation(client, callback_query)
-                return
-            # Advanced statistics panel
-            elif callback_query.data == "admin_view_stats":
-                from modules.admin import handle_stats_panel
-                await handle_stats_panel(client, callback_query)
-                return
-            elif callback_query.data == "admin_refresh_stats":
-                from modules.admin import handle_refresh_stats
-                await handle_refresh_stats(client, callback_query)
-                return
-            elif callback_query.data == "admin_export_stats":
-                from modules.admin import handle_export_stats
-                await handle_export_stats(client, callback_query)
-                return
-            # User management panel
-            elif callback_query.data == "admin_users":
-                from modules.admin import handle_user_management
-                await handle_user_management(client, callback_query)
-                return
-            elif callback_query.data.startswith("admin_users_filter_"):
-                from modules.admin import handle_user_management
-                # Extract filter type and page from callback data
-                try:
-                    parts = callback_query.data.split("_")
-                    if len(parts) >= 5:  # admin_users_filter_TYPE_PAGE
-                        filter_type = parts[3]
-                        page = int(parts[4])
-                        # Support all filter types
-                        valid_filters = ["all", "recent", "active", "new", "inactive", "groups"]
-                        if filter_type in valid_filters:
-                            await handle_user_management(client, callback_query, page, filter_type)
-                        else:
-                            # Default to recent if invalid filter
-                            await handle_user_management(client, callback_query, page, "recent")
-                    else:
-                        # Default to first page, recent filter
-                        await handle_user_management(client, callback_query)
-                except Exception as e:
-                    logger.error(f"Error in user filter handling: {str(e)}")
-                    # Default to first page, recent filter
-                    await handle_user_management(client, callback_query)
-                return
-            # Group permissions help callback
-            elif callback_query.data == "group_permissions_help":
-                from modules.group.group_permissions import handle_permissions_help
-                await handle_permissions_help(client, callback_query)
-                return
-            elif callback_query.data == "dismiss_permissions_help":
-                # Just acknowledge and close the message
-                await callback_query.answer("Permissions help dismissed")
-                # Try to delete the message if possible
-                try:
-                    await client.delete_messages(
-                        chat_id=callback_query.message.chat.id,
-                        message_ids=callback_query.message.id
-                    )
-                except Exception:
-                    # If can't delete, just edit to a simple confirmation
-                    await callback_query.edit_message_text("✅ Thanks for reviewing the permissions info!")
-                return
-            elif callback_query.data == "group_start":
-                # Import the group_start function from user directory
-                from modules.user.group_start import group_start
-                # Create a simulated message object for group_start
-                simulated_message = callback_query.message
-                simulated_message.from_user = callback_query.from_user
-                # Call group_start with the simulated message
-                await group_start(client, simulated_message)
-                # Answer the callback query
-                await callback_query.answer("Starting bot in this group")
-                return
-            elif callback_query.data == "admin_header" or callback_query.data == "features_header" or callback_query.data == "admin_tools_header":
-                # Just acknowledge the click for the headers
-                await callback_query.answer()
-                return
-            
-            # Standard menu callbacks
-            if callback_query.data == "help_start":
-                from modules.user.help import help_inline_start
-                await help_inline_start(client, callback_query)
-            elif callback_query.data == "help_help" or callback_query.data == "help":
-                from modules.user.help import help_inline_help
-                await help_inline_help(client, callback_query)
-            elif callback_query.data == "back":
-                await start_inline(client, callback_query)
-            elif callback_query.data == "commands_start":
-                from modules.user.commands import command_inline_start
-                await command_inline_start(client, callback_query)
-            elif callback_query.data == "commands_help":
-                from modules.user.commands import command_inline_help
-                await command_inline_help(client, callback_query)
-            elif callback_query.data == "settings":
-                from modules.user.settings import settings_inline
-                await settings_inline(client, callback_query)
-            elif callback_query.data == "settings_ai_models":
-                await ai_model_settings_panel(client, callback_query)
-            elif callback_query.data == "settings_v":
-                await settings_language_callback(client, callback_query)
-            elif callback_query.data in ["settings_voice", "settings_text"]:
-                await change_voice_setting(client, callback_query)
-            elif callback_query.data == "settings_lans":
-                await settings_langs_callback(client, callback_query)
-            elif callback_query.data.startswith("language_"):
-                await change_language_setting(client, callback_query)
-            elif callback_query.data == "settings_voice_inlines":
-                await settings_voice_inlines(client, callback_query)
-            elif callback_query.data == "settings_back":
-                from modules.user.settings import settings_inline
-                await settings_inline(client, callback_query)
-            elif callback_query.data == "settings_assistant":
-                await settings_assistant_callback(client, callback_query)
-            elif callback_query.data == "settings_support":
-                await settings_support_callback(client, callback_query)
-            elif callback_query.data == "support_developers":
-                await support_developers_callback(client, callback_query)
-            elif callback_query.data == "support_admins":
-                await support_admins_callback(client, callback_query)
-            elif callback_query.data == "settings_others":
-                await settings_others_callback(client, callback_query)
-            elif callback_query.data.startswith("voice_toggle_"):
-                await handle_voice_toggle(client, callback_query)
-            elif callback_query.data.startswith("mode_"):
-                await change_mode_setting(client, callback_query)
-            # elif callback_query.data.startswith("show_text_"):
-            #     await handle_show_text_callback(client, callback_query)
-            # elif callback_query.data.startswith("followup_"):
-            #     await handle_followup_callback(client, callback_query)
-            elif callback_query.data.startswith("rate_"):
-                await handle_rate_callback(client, callback_query)
-            elif callback_query.data.startswith("feedback_") or \
-                 callback_query.data.startswith("img_feedback_positive_") or \
-                 callback_query.data.startswith("img_feedback_negative_") or \
-                 callback_query.data.startswith("img_regenerate_") or \
-                 callback_query.data.startswith("img_style_"):
-                await handle_image_feedback(client, callback_query)
-            elif callback_query.data == "group_commands":
-                # Handle group command menu
-                from modules.user.group_start import handle_group_command_inline
-                await handle_group_command_inline(client, callback_query)
-            elif callback_query.data.startswith("group_cmd_"):
-                # Handle specific group command sections
-                from modules.user.group_start import handle_group_callbacks
-                await handle_group_callbacks(client, callback_query)
-            elif callback_query.data == "about_bot" or callback_query.data == "group_support":
-                # Handle other group menu buttons
-                from modules.user.group_start import handle_group_callbacks
-                await handle_group_callbacks(client, callback_query)
-            elif callback_query.data == "admin_view_history":
-                from modules.admin.user_history import show_history_search_panel
-                await show_history_search_panel(client, callback_query)
-                return
-            elif callback_query.data.startswith("history_user_"):
-                from modules.admin.user_history import handle_history_user_selection
-                user_id = int(callback_query.data.split("_")[2])
-                await handle_history_user_selection(client, callback_query, user_id)
-                return
-            elif callback_query.data.startswith("history_page_"):
-                from modules.admin.user_history import handle_history_pagination
-                parts = callback_query.data.split("_")
-                user_id = int(parts[2])
-                page = int(parts[3])
-                await handle_history_pagination(client, callback_query, user_id, page)
-                return
-            elif callback_query.data == "history_search":
-                from modules.admin.user_history import show_history_search_panel
-                await show_history_search_panel(client, callback_query)
-                return
-            elif callback_query.data == "history_back":
-                from modules.admin.user_history import show_history_search_panel
-                await show_history_search_panel(client, callback_query)
-                return
-            elif callback_query.data.startswith("history_download_"):
-                from modules.admin.user_history import get_history_download
-                user_id = int(callback_query.data.split("_")[2])
-                await get_history_download(client, callback_query, user_id)
-                return
-            elif callback_query.data == "admin_search_user":
-                from modules.admin.user_history import show_user_search_form
-                await show_user_search_form(client, callback_query)
-                return
-            elif callback_query.data == "support":
-                # Handle the support callback
-                from modules.user.user_support import settings_support_callback
-                await settings_support_callback(client, callback_query)
-                return
-            # Help menu category callbacks
-            elif (callback_query.data.startswith("help_") and callback_query.data != "help"):
-                from modules.user.help import handle_help_category
-                await handle_help_category(client, callback_query)
-                return
-            # Command menu category callbacks
-            elif callback_query.data.startswith("cmd_"):
-                if callback_query.data.endswith("_start"):
-                    from modules.user.commands import handle_command_callbacks_start
-                    await handle_command_callbacks_start(client, callback_query)
-                elif callback_query.data.endswith("_help"):
-                    from modules.user.commands import handle_command_callbacks_help
-                    await handle_command_callbacks_help(client, callback_query)
-                else:
-                    from modules.user.commands import handle_command_callbacks
-                    await handle_command_callbacks(client, callback_query)
-                return
-            # Image text back button handler
-            elif callback_query.data.startswith("back_to_image_"):
-                # Get the user ID from the callback data
-                user_id = int(callback_query.data.split("_")[3])
-                # Create action buttons again
-                action_markup = InlineKeyboardMarkup([
-                    [
-                        InlineKeyboardButton("📋 Show Extracted Text", callback_data=f"show_text_{user_id}")
-                    ],
-                    [
-                        InlineKeyboardButton("❓ Ask Follow-up", callback_data=f"followup_{user_id}")
-                    ]
-                ])
-                # Edit message back to original prompt
-                await callback_query.message.edit_text(
-                    "**Need anything else with this image?**",
-                    reply_markup=action_markup
-                )
-                return
-            # Group start back button handler
-            elif callback_query.data == "back_to_group_start":
-                from modules.user.group_start import handle_group_callbacks
-                await handle_group_callbacks(client, callback_query)
-                return
-            elif callback_query.data == "settings_others_refresh":
-                from modules.maintenance import settings_others_refresh_callback
-                await settings_others_refresh_callback(client, callback_query)
-                return
-            elif callback_query.data == "commands":
-                from modules.user.commands import command_inline_help
-                await command_inline_help(client, callback_query)
-            # User settings panel callbacks
-            elif callback_query.data.startswith("user_settings_"):
-                await handle_user_settings_callback(client, callback_query)
-                return
-            elif callback_query.data.startswith("uinfo_settings_"):
-                await uinfo_settings_callback(client, callback_query)
-                return
-            elif callback_query.data.startswith("uinfo_history_"):
-                await uinfo_history_callback(client, callback_query)
-                return
-            # Premium flow callbacks
-            elif callback_query.data == "premium_info": # This is hit when user clicks "Back to Benefits"
-                await premium_info_page(client, callback_query, is_callback=True)
-                return
-            elif callback_query.data == "premium_plans":
-                await premium_plans_callback(client, callback_query)
-                return
-            elif callback_query.data == "premium_paid_notify":
-                await premium_paid_notify_callback(client, callback_query)
-                return
-            # Image generation count settings
-            elif callback_query.data == "settings_image_count":
-                await settings_image_count_callback(client, callback_query)
-                return
-            elif callback_query.data.startswith("img_count_"):
-                await change_image_count_callback(client, callback_query)
-                return
-            # AI Model Panel Callbacks
-            elif callback_query.data.startswith("set_text_model_"):
-                await handle_set_text_model(client, callback_query)
-                return
-            elif callback_query.data.startswith("set_image_model_"):
-                await handle_set_image_model(client, callback_query)
-                return
-            elif callback_query.data.startswith("ai_model_heading_"):
-                await handle_ai_model_heading_click(client, callback_query)
-                return
-            else:
+            if route is None:
                 # Unknown callback, just acknowledge it
                 await callback_query.answer("Unknown command")
-            
+                return
+            await router.dispatch(route, client, callback_query)
         except Exception as e:
             logger.error(f"Error in callback query handler: {e}")
             await error_log(client, "Callback Query Error", str(e))
@@ -954,7 +624,7 @@ def create_bot_instance(bot_token, bot_index=1):
         # Ignore messages from the bot itself
         if message.from_user and message.from_user.is_bot:
             return
-        set_last_interaction(message.from_user.id, "voice", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "voice")
         if await check_if_banned_and_reply(bot, message): # BAN CHECK
             return
         # Check for maintenance mode and voice feature toggle
@@ -967,18 +637,13 @@ def create_bot_instance(bot_token, bot_index=1):
         bot_stats["active_users"].add(message.from_user.id)
         await handle_voice_message(bot, message)
 
-    # --- VOICE TOGGLE CALLBACK HANDLER ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, query: query.data.startswith("toggle_voice_")))
-    async def voice_toggle_callback(client, callback_query):
-        await handle_voice_toggle(client, callback_query)
-
     # --- REPLY TO BOT MESSAGE HANDLER (GROUP) ---
     @advAiBot.on_message(is_reply_to_bot_filter() & filters.group & filters.text & is_not_command_filter())
     async def handle_reply_to_bot(bot, message):
         # Ignore messages from the bot itself
         if message.from_user and message.from_user.is_bot:
             return
-        set_last_interaction(message.from_user.id, "reply_to_bot", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "reply_to_bot")
         if await check_if_banned_and_reply(bot, message): # BAN CHECK
             return
         # Check for maintenance mode and AI response toggle
@@ -1045,20 +710,10 @@ def create_bot_instance(bot_token, bot_index=1):
             await update.reply_text("⛔ You are not authorized to use this command.")
             await channel_log(bot, update, "/uinfo", f"Unauthorized access attempt", level="WARNING")
 
-    # --- UINFO SETTINGS CALLBACK HANDLER ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, q: q.data.startswith("uinfo_settings_")))
-    async def uinfo_settings_cb(client, callback_query):
-        await uinfo_settings_callback(client, callback_query)
-
-    # --- UINFO HISTORY CALLBACK HANDLER ---
-    @advAiBot.on_callback_query(filters.create(lambda _, __, q: q.data.startswith("uinfo_history_")))
-    async def uinfo_history_cb(client, callback_query):
-        await uinfo_history_callback(client, callback_query)
-
     # --- GROUP COMMAND HANDLER ---
     @advAiBot.on_message(filters.text & filters.command(["ai", "ask", "say"]) & filters.group)
     async def handle_group_message(bot, update):
-        set_last_interaction(update.from_user.id, "command_ai_group", get_user_interactions_collection())
+        await set_last_interaction(update.from_user.id, "command_ai_group")
         if await check_if_banned_and_reply(bot, update): # BAN CHECK
             return
         # Check for maintenance mode and AI response feature
@@ -1086,7 +741,7 @@ def create_bot_instance(bot_token, bot_index=1):
     # --- NEW CHAT COMMAND ---  
     @advAiBot.on_message(filters.command(["newchat", "reset", "new_conversation", "clear_chat", "new"]))
     async def handle_new_chat(client, message):
-        set_last_interaction(message.from_user.id, "command_newchat", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "command_newchat")
         if await check_if_banned_and_reply(client, message): # BAN CHECK
             return
         bot_stats["active_users"].add(message.from_user.id)
@@ -1096,7 +751,7 @@ def create_bot_instance(bot_token, bot_index=1):
     # --- GENERATE COMMAND ---
     @advAiBot.on_message(filters.command(["generate", "gen", "image", "img"]))
     async def handle_generate(client, message):
-        set_last_interaction(message.from_user.id, "command_generate", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "command_generate")
         if await check_if_banned_and_reply(client, message): # BAN CHECK
             return
         
@@ -1108,19 +763,19 @@ def create_bot_instance(bot_token, bot_index=1):
     # --- PRIVATE IMAGE HANDLER ---
     @advAiBot.on_message(filters.photo & filters.private)
     async def handle_private_image(bot, update):
-        set_last_interaction(update.from_user.id, "photo_private", get_user_interactions_collection())
+        await set_last_interaction(update.from_user.id, "photo_private")
         await extract_text_res(bot, update)
 
     # --- GROUP IMAGE HANDLER ---
     @advAiBot.on_message(filters.photo & filters.group)
     async def handle_group_image(bot, update):
-        set_last_interaction(update.from_user.id, "photo_group", get_user_interactions_collection())
+        await set_last_interaction(update.from_user.id, "photo_group")
         await extract_text_res(bot, update)
 
     # --- SETTINGS COMMAND ---
     @advAiBot.on_message(filters.command("settings"))
     async def settings_command(bot, update):
-        set_last_interaction(update.from_user.id, "command_settings", get_user_interactions_collection())
+        await set_last_interaction(update.from_user.id, "command_settings")
         if await check_if_banned_and_reply(bot, update): # BAN CHECK
             return
         logger.info(f"User {update.from_user.id} accessed settings")
@@ -1480,7 +1135,7 @@ def create_bot_instance(bot_token, bot_index=1):
     # --- DOCUMENT HANDLER ---
     @advAiBot.on_message(filters.document & (filters.private | filters.group))
     async def document_handler(client, message):
-        set_last_interaction(message.from_user.id, "document", get_user_interactions_collection())
+        await set_last_interaction(message.from_user.id, "document")
         # Check extension to decide if image or file-to-text
         ext = os.path.splitext(message.document.file_name)[1].lower()
         from modules.image.img_to_text import SUPPORTED_IMAGE_EXTENSIONS
@@ -1503,10 +1158,25 @@ def create_bot_instance(bot_token, bot_index=1):
     return advAiBot
 
 # --- RUN BOT ---
+def log_db_pool_report(bot_index=1):
+    """Print this process's MongoDB pool size so multi-bot totals are visible at startup"""
+    report = db_service.get_pool_report()
+    print(
+        f"🗄️ Bot #{bot_index} (PID {report['pid']}): {report['clients']} MongoClient, "
+        f"pool {report['min_pool_size']}-{report['max_pool_size']} connections, "
+        f"{report['open_connections']} open"
+    )
+
 def run_bot(bot_token, bot_index=1):
     # No need to set event loop, .run() will handle it in the main thread of the process
     bot = create_bot_instance(bot_token, bot_index)
-    bot.run()
+    log_db_pool_report(bot_index)
+    try:
+        bot.run()
+    finally:
+        # atexit hooks do not run in multiprocessing children, flush buffered stats and translations here
+        write_behind.flush_sync()
+        flush_translation_cache()
 
 # --- MAIN FUNCTION ---
 if __name__ == "__main__":
@@ -1553,6 +1223,7 @@ if __name__ == "__main__":
         try:
             advAiBot = create_bot_instance(config.BOT_TOKEN)
             print("✅ Single bot instance created successfully")
+            log_db_pool_report()
             print("🚀 Starting bot...")
             advAiBot.run()
         except Exception as e:
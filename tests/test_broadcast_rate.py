@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Broadcast Rate Limit Test Script
+
+Drives the token bucket of modules.core.broadcast with many concurrent
+senders and checks that the sustained rate stays at the configured limit,
+and that a FloodWait pause holds back every sender for its full duration.
+
+Usage:
+    python tests/test_broadcast_rate.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.core.broadcast import TokenBucket, BROADCAST_CONCURRENCY
+
+
+async def send_through(bucket, messages, pause_after=None, pause_for=0.0):
+    sent_at = []
+    pending = iter(range(messages))
+
+    async def worker():
+        for n in pending:
+            await bucket.acquire()
+            sent_at.append(time.monotonic())
+            if n == pause_after:
+                bucket.pause(pause_for)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(BROADCAST_CONCURRENCY)))
+    return started, sent_at
+
+
+def test_sustained_rate():
+    print("🧪 Testing sustained broadcast rate...")
+    rate, burst, messages = 100.0, 10, 310
+    started, sent_at = asyncio.run(send_through(TokenBucket(rate, burst), messages))
+    elapsed = sent_at[-1] - started
+    # The first `burst` messages go out at once, the rest at `rate`
+    expected = (messages - burst) / rate
+    print(f"  {messages} messages in {elapsed:.2f}s (expected ~{expected:.2f}s)")
+    passed = expected * 0.9 <= elapsed <= expected * 1.2
+    print("✅ Sustained rate test PASSED" if passed else "❌ Sustained rate test FAILED")
+    return passed
+
+
+def test_flood_wait_pause():
+    print("🧪 Testing FloodWait pause...")
+    pause_for = 0.5
+    _, sent_at = asyncio.run(send_through(TokenBucket(100.0, 10), 40, pause_after=20, pause_for=pause_for))
+    gap = max(b - a for a, b in zip(sent_at, sent_at[1:]))
+    print(f"  longest gap between sends: {gap:.2f}s")
+    passed = gap >= pause_for * 0.95
+    print("✅ FloodWait pause test PASSED" if passed else "❌ FloodWait pause test FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    results = [test_sustained_rate(), test_flood_wait_pause()]
+    sys.exit(0 if all(results) else 1)
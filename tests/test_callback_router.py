@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Callback Router Test Script
+
+Checks the callback query routing table against the if/elif chain it
+replaced (kept below as legacy_route):
+- every callback data the chain handled goes to the same handler
+- prefix routes pick the longest matching prefix and respect conditions
+- string handlers are imported on first dispatch; latency and errors are
+  recorded per route
+- benchmark: routing cost over the full route set, chain vs table
+
+Usage:
+    python tests/test_callback_router.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.callback_routes as routes
+from modules.core.callback_router import CallbackRouter, callback_router
+
+# Callback data of every kind the bot sends
+SAMPLE_DATA = [
+    "confirm_restart", "cancel_update", "toggle_ai_response_on", "toggle_x", "feature_info_voice",
+    "admin_panel", "support_donate", "admin_view_stats", "admin_refresh_stats", "admin_export_stats",
+    "admin_users", "admin_users_filter_active_2", "group_permissions_help", "dismiss_permissions_help",
+    "group_start", "features_header", "help_start", "help_help", "help", "back", "commands_start",
+    "commands_help", "settings", "settings_ai_models", "settings_v", "settings_voice", "settings_text",
+    "settings_lans", "language_fr", "settings_voice_inlines", "settings_back", "settings_assistant",
+    "settings_support", "support_developers", "support_admins", "settings_others", "voice_toggle_123",
+    "mode_teacher", "rate_5", "feedback_good_1", "img_feedback_positive_9", "img_feedback_negative_9",
+    "img_regenerate_9", "img_style_anime_9", "group_commands", "group_cmd_ai", "about_bot", "group_support",
+    "admin_view_history", "history_user_42", "history_page_42_3", "history_search", "history_back",
+    "history_download_42", "admin_search_user", "support", "help_ai_start", "help_img_help", "cmd_ai_start",
+    "cmd_img_help", "cmd_voice", "back_to_image_42", "back_to_group_start", "settings_others_refresh",
+    "commands", "user_settings_lang", "uinfo_settings_42", "uinfo_history_42", "premium_info",
+    "premium_plans", "premium_paid_notify", "settings_image_count", "img_count_2", "set_text_model_qwen3",
+    "set_image_model_flux", "ai_model_heading_text", "check_tokens_42", "show_plans", "generate_similar_7",
+    "progress_check_7", "progress_info_7", "video_help", "back_to_menu", "shareimg_confirm", "snippet_cancel",
+    "announce_confirm", "something_unknown",
+]
+
+# Routes that run.create_bot_instance adds per client
+CLIENT_ROUTES = {"shareimg_confirm": "shareimg", "shareimg_cancel": "shareimg", "snippet_confirm": "snippet",
+                 "snippet_cancel": "snippet", "announce_confirm": "announce", "announce_cancel": "announce"}
+
+VIDEO = "modules.video.video_handlers:video_callback_handler"
+
+
+def legacy_route(data):
+    """The handler the previous filters and if/elif chain in run.py picked (same order)"""
+    if data in CLIENT_ROUTES:
+        return CLIENT_ROUTES[data]
+    if (data.startswith("check_tokens_") or data == "show_plans" or data.startswith("generate_similar_")
+            or data.startswith("progress_check_") or data.startswith("progress_info_")
+            or data == "video_help" or data == "back_to_menu"):
+        return VIDEO
+    if data == "confirm_restart" or data == "cancel_restart":
+        return "modules.admin.restart:handle_restart_callback"
+    if data == "confirm_update" or data == "cancel_update":
+        return "modules.admin.update:handle_update_callback"
+    if data.startswith("toggle_") and data.count("_") >= 2:
+        return "modules.maintenance:handle_feature_toggle"
+    elif data.startswith("feature_info_"):
+        return "modules.maintenance:handle_feature_info"
+    elif data == "admin_panel":
+        return "modules.user.user_support:admin_panel_callback"
+    elif data == "support_donate":
+        return "modules.maintenance:handle_donation"
+    elif data == "admin_view_stats":
+        return "modules.admin:handle_stats_panel"
+    elif data == "admin_refresh_stats":
+        return "modules.admin:handle_refresh_stats"
+    elif data == "admin_export_stats":
+        return "modules.admin:handle_export_stats"
+    elif data == "admin_users":
+        return "modules.admin:handle_user_management"
+    elif data.startswith("admin_users_filter_"):
+        return routes.admin_users_filter_callback
+    elif data == "group_permissions_help":
+        return "modules.group.group_permissions:handle_permissions_help"
+    elif data == "dismiss_permissions_help":
+        return routes.dismiss_permissions_help_callback
+    elif data == "group_start":
+        return routes.group_start_callback
+    elif data == "admin_header" or data == "features_header" or data == "admin_tools_header":
+        return routes.header_callback
+    if data == "help_start":
+        return "modules.user.help:help_inline_start"
+    elif data == "help_help" or data == "help":
+        return "modules.user.help:help_inline_help"
+    elif data == "back":
+        return "modules.user.start:start_inline"
+    elif data == "commands_start":
+        return "modules.user.commands:command_inline_start"
+    elif data == "commands_help":
+        return "modules.user.commands:command_inline_help"
+    elif data == "settings":
+        return "modules.user.settings:settings_inline"
+    elif data == "settings_ai_models":
+        return "modules.user.ai_model:ai_model_settings_panel"
+    elif data == "settings_v":
+        return "modules.user.settings:settings_language_callback"
+    elif data in ["settings_voice", "settings_text"]:
+        return "modules.user.settings:change_voice_setting"
+    elif data == "settings_lans":
+        return "modules.user.lang_settings:settings_langs_callback"
+    elif data.startswith("language_"):
+        return "modules.user.lang_settings:change_language_setting"
+    elif data == "settings_voice_inlines":
+        return "modules.user.settings:settings_voice_inlines"
+    elif data == "settings_back":
+        return "modules.user.settings:settings_inline"
+    elif data == "settings_assistant":
+        return "modules.user.assistant:settings_assistant_callback"
+    elif data == "settings_support":
+        return "modules.user.user_support:settings_support_callback"
+    elif data == "support_developers":
+        return "modules.user.dev_support:support_developers_callback"
+    elif data == "support_admins":
+        return "modules.user.user_support:support_admins_callback"
+    elif data == "settings_others":
+        return "modules.maintenance:settings_others_callback"
+    elif data.startswith("voice_toggle_"):
+        return "modules.speech.voice_to_text:handle_voice_toggle"
+    elif data.startswith("mode_"):
+        return "modules.user.assistant:change_mode_setting"
+    elif data.startswith("rate_"):
+        return "modules.feedback_nd_rating:handle_rate_callback"
+    elif (data.startswith("feedback_") or data.startswith("img_feedback_positive_")
+          or data.startswith("img_feedback_negative_") or data.startswith("img_regenerate_")
+          or data.startswith("img_style_")):
+        return "modules.image.image_generation:handle_image_feedback"
+    elif data == "group_commands":
+        return "modules.user.group_start:handle_group_command_inline"
+    elif data.startswith("group_cmd_"):
+        return "modules.user.group_start:handle_group_callbacks"
+    elif data == "about_bot" or data == "group_support":
+        return "modules.user.group_start:handle_group_callbacks"
+    elif data == "admin_view_history":
+        return "modules.admin.user_history:show_history_search_panel"
+    elif data.startswith("history_user_"):
+        return routes.history_user_callback
+    elif data.startswith("history_page_"):
+        return routes.history_page_callback
+    elif data == "history_search":
+        return "modules.admin.user_history:show_history_search_panel"
+    elif data == "history_back":
+        return "modules.admin.user_history:show_history_search_panel"
+    elif data.startswith("history_download_"):
+        return routes.history_download_callback
+    elif data == "admin_search_user":
+        return "modules.admin.user_history:show_user_search_form"
+    elif data == "support":
+        return "modules.user.user_support:settings_support_callback"
+    elif data.startswith("help_") and data != "help":
+        return "modules.user.help:handle_help_category"
+    elif data.startswith("cmd_"):
+        return routes.command_category_callback
+    elif data.startswith("back_to_image_"):
+        return routes.back_to_image_callback
+    elif data == "back_to_group_start":
+        return "modules.user.group_start:handle_group_callbacks"
+    elif data == "settings_others_refresh":
+        return "modules.maintenance:settings_others_refresh_callback"
+    elif data == "commands":
+        return "modules.user.commands:command_inline_help"
+    elif data.startswith("user_settings_"):
+        return "modules.user.user_settings_panel:handle_user_settings_callback"
+    elif data.startswith("uinfo_settings_"):
+        return "modules.group.group_info:uinfo_settings_callback"
+    elif data.startswith("uinfo_history_"):
+        return "modules.group.group_info:uinfo_history_callback"
+    elif data == "premium_info":
+        return routes.premium_info_callback
+    elif data == "premium_plans":
+        return "modules.user.start:premium_plans_callback"
+    elif data == "premium_paid_notify":
+        return "modules.user.start:premium_paid_notify_callback"
+    elif data == "settings_image_count":
+        return "modules.user.settings:settings_image_count_callback"
+    elif data.startswith("img_count_"):
+        return "modules.user.settings:change_image_count_callback"
+    elif data.startswith("set_text_model_"):
+        return "modules.user.ai_model:handle_set_text_model"
+    elif data.startswith("set_image_model_"):
+        return "modules.user.ai_model:handle_set_image_model"
+    elif data.startswith("ai_model_heading_"):
+        return "modules.user.ai_model:handle_ai_model_heading_click"
+    return None
+
+
+def client_router():
+    """The router as run.create_bot_instance sets it up"""
+    router = callback_router.copy()
+    for data, name in CLIENT_ROUTES.items():
+        router.exact(data, name=name, guarded=False)(name)
+    return router
+
+
+def route_target(route):
+    return route.handler if route is not None else None
+
+
+def test_same_routes():
+    print(f"🧪 Routing {len(SAMPLE_DATA)} kinds of callback data...")
+    router = client_router()
+    mismatches = [(data, legacy_route(data), route_target(router.resolve(data)))
+                  for data in SAMPLE_DATA if legacy_route(data) != route_target(router.resolve(data))]
+    guarded = {data for data in SAMPLE_DATA if router.resolve(data) is not None and not router.resolve(data).guarded}
+    expected_unguarded = {data for data in SAMPLE_DATA if legacy_route(data) in (VIDEO, *CLIENT_ROUTES.values())}
+    passed = not mismatches and guarded == expected_unguarded
+    print(f"  {len(router.routes)} routes")
+    print("✅ Same routes test PASSED" if passed else f"❌ Same routes test FAILED: {mismatches}")
+    return passed
+
+
+def test_prefix_rules():
+    print("🧪 Checking longest-prefix matching and route conditions...")
+    router = CallbackRouter()
+    router.prefix("a_")("short")
+    router.prefix("a_b_")("long")
+    router.prefix("a_b_c", when=lambda data: data.endswith("!"))("conditional")
+    router.exact("a_b_")("exact")
+    passed = (route_target(router.resolve("a_x")) == "short"
+              and route_target(router.resolve("a_b_x")) == "long"
+              and route_target(router.resolve("a_b_c!")) == "conditional"
+              and route_target(router.resolve("a_b_c?")) == "long"
+              and route_target(router.resolve("a_b_")) == "exact"
+              and router.resolve("b") is None and router.resolve("") is None and router.resolve(None) is None
+              and router.get_stats()["unrouted"] == 3)
+    print("✅ Prefix rules test PASSED" if passed else "❌ Prefix rules test FAILED")
+    return passed
+
+
+async def recorded_handler(client, callback_query):
+    await asyncio.sleep(0.001)
+    if callback_query == "fail":
+        raise ValueError("handler failed")
+    return callback_query
+
+
+async def test_dispatch_stats():
+    print("🧪 Dispatching through a lazily imported handler...")
+    router = CallbackRouter()
+    router.prefix("page_", name="page")(f"{__name__}:recorded_handler")
+    route = router.resolve("page_2")
+    results = [await router.dispatch(route, None, "ok") for _ in range(3)]
+    try:
+        await router.dispatch(route, None, "fail")
+        raised = False
+    except ValueError:
+        raised = True
+    stats = router.get_stats()
+    page = stats["by_route"].get("page", {})
+    passed = (results == ["ok"] * 3 and raised and route.handler is recorded_handler
+              and page.get("calls") == 4 and page.get("errors") == 1 and page.get("avg_ms", 0) >= 1
+              and stats["slowest"] == "page")
+    print(f"  {page}")
+    print("✅ Dispatch stats test PASSED" if passed else f"❌ Dispatch stats test FAILED: {stats}")
+    return passed
+
+
+def benchmark_routing(presses: int = 200000):
+    print(f"🧪 Benchmarking routing of {presses} button presses...")
+    rng = random.Random(3)
+    workload = [rng.choice(SAMPLE_DATA) for _ in range(presses)]
+    router = client_router()
+
+    start = time.perf_counter()
+    for data in workload:
+        legacy_route(data)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in workload:
+        router.resolve(data)
+    table = time.perf_counter() - start
+
+    # Data handled near the end of the old chain
+    tail = ["ai_model_heading_text", "set_image_model_flux", "img_count_2"] * (presses // 3)
+    start = time.perf_counter()
+    for data in tail:
+        legacy_route(data)
+    legacy_tail = time.perf_counter() - start
+    start = time.perf_counter()
+    for data in tail:
+        router.resolve(data)
+    table_tail = time.perf_counter() - start
+
+    print(f"  mixed presses: if/elif chain {legacy / presses * 1e9:.0f} ns, table {table / presses * 1e9:.0f} ns "
+          f"({legacy / table:.1f}x faster)")
+    print(f"  end of the chain: if/elif chain {legacy_tail / len(tail) * 1e9:.0f} ns, "
+          f"table {table_tail / len(tail) * 1e9:.0f} ns ({legacy_tail / table_tail:.1f}x faster)")
+    return table < legacy and table_tail < legacy_tail
+
+
+async def main():
+    results = [
+        test_same_routes(),
+        test_prefix_rules(),
+        await test_dispatch_stats(),
+        benchmark_routing(),
+    ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
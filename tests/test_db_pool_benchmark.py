@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+MongoDB Connection Pool Benchmark
+
+Compares MongoDB connections, monitor threads and memory per bot process
+between the old layout (every settings module opening its own MongoClient)
+and the shared DatabaseService pool, under MULTIPLE_BOTS.
+
+Each bot process is simulated by a subprocess with MULTIPLE_BOTS=true, so
+the per-process pool sizing from config applies. Requires a reachable
+DATABASE_URL.
+
+Usage:
+    python tests/test_db_pool_benchmark.py [num_bots]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that used to create their own MongoClient at import time
+LEGACY_CLIENT_MODULES = [
+    "modules/user/user_bans_management.py",
+    "modules/user/premium_management.py",
+    "modules/user/ai_model.py",
+    "modules/user/settings.py",
+    "modules/user/lang_settings.py",
+    "modules/user/global_setting.py",
+    "modules/user/assistant.py",
+    "modules/group/group_permissions.py",
+    "modules/group/group_settings.py",
+    "modules/lang.py",
+    "modules/image/image_generation.py",
+    "modules/feedback_nd_rating.py",
+    "database/user_db.py",
+]
+
+# Collections those modules read on a typical update
+COLLECTIONS = ["user_bans", "premium_users", "user_ai_model_settings", "user_lang", "user_voice_setting", "ai_mode", "groups"]
+
+# Runs inside each simulated bot process
+PROCESS_SCRIPT = r'''
+import gc, json, sys, threading, time
+import psutil
+from pymongo import MongoClient
+from config import DATABASE_URL
+from modules.core.database import db_service
+
+mode, legacy_clients = sys.argv[1], int(sys.argv[2])
+process = psutil.Process()
+extra = []
+if mode == "legacy":
+    # One default-configured client per module, as the old imports did
+    for _ in range(legacy_clients):
+        client = MongoClient(DATABASE_URL)
+        client["aibotdb"].command("ping")
+        extra.append(client)
+        for name in COLLECTIONS:
+            client["aibotdb"][name].find_one({"user_id": 0})
+
+for name in COLLECTIONS:
+    db_service.get_collection(name).find_one({"user_id": 0})
+time.sleep(1)
+
+connections = sum(
+    1 for conn in process.connections(kind="tcp")
+    if conn.status == psutil.CONN_ESTABLISHED and conn.raddr and conn.raddr.port == 27017
+)
+clients = sum(1 for obj in gc.get_objects() if isinstance(obj, MongoClient))
+print(json.dumps({
+    "clients": clients,
+    "connections": connections,
+    "threads": threading.active_count(),
+    "rss_mb": round(process.memory_info().rss / 1024 / 1024, 1),
+    "pool": db_service.get_pool_report(),
+}))
+'''
+
+def run_process(mode, env):
+    """Run one simulated bot process and return its measurements"""
+    script = f"COLLECTIONS = {COLLECTIONS!r}\n" + PROCESS_SCRIPT
+    result = subprocess.run(
+        [sys.executable, "-c", script, mode, str(len(LEGACY_CLIENT_MODULES))],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        print(f"❌ {mode} process failed:\n{result.stderr[-2000:]}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def check_no_stray_clients(env):
+    """Import the formerly stray modules and count MongoClient objects"""
+    modules = [path[:-3].replace("/", ".") for path in LEGACY_CLIENT_MODULES]
+    script = (
+        "import gc, importlib\n"
+        "from pymongo import MongoClient\n"
+        f"for name in {modules!r}:\n"
+        "    importlib.import_module(name)\n"
+        "print(sum(1 for obj in gc.get_objects() if isinstance(obj, MongoClient)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        print("⚠️ Could not import bot modules (missing dependencies?), skipping stray client check")
+        return None
+    return int(result.stdout.strip().splitlines()[-1])
+
+def benchmark(num_bots):
+    env = os.environ.copy()
+    env["MULTIPLE_BOTS"] = "true"
+    env["NUM_OF_BOTS"] = str(num_bots)
+    for i in range(1, num_bots + 1):
+        env.setdefault(f"BOT_TOKEN{i}", f"benchmark_token:{i}")
+
+    print(f"🧪 MongoDB pool benchmark with MULTIPLE_BOTS, {num_bots} bot processes")
+    results = {}
+    for mode in ("legacy", "shared"):
+        per_process = run_process(mode, env)
+        if per_process is None:
+            return False
+        results[mode] = per_process
+        print(
+            f"  {mode:>6}: {per_process['clients']} MongoClient(s), {per_process['connections']} connections, "
+            f"{per_process['threads']} threads, {per_process['rss_mb']} MB RSS per process"
+        )
+
+    print("\n📊 Totals across all bot processes:")
+    for key, label in (("connections", "connections"), ("threads", "threads"), ("rss_mb", "MB RSS")):
+        before = results["legacy"][key] * num_bots
+        after = results["shared"][key] * num_bots
+        print(f"  {label:>12}: {before:g} -> {after:g}")
+    pool = results["shared"]["pool"]
+    print(f"  pool limit per process: {pool['min_pool_size']}-{pool['max_pool_size']}, total {pool['max_pool_size'] * num_bots}")
+
+    clients = check_no_stray_clients(env)
+    if clients is not None:
+        status = "✅" if clients == 1 else "❌"
+        print(f"\n{status} MongoClient instances after importing all bot modules: {clients}")
+        return clients == 1
+    return True
+
+if __name__ == "__main__":
+    num_bots = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    success = benchmark(num_bots)
+    sys.exit(0 if success else 1)
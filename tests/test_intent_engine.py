@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Intent Engine Test Script
+
+Checks modules.core.intent_engine and benchmarks the auto image generation
+heuristics of ai_res, which now use it, against the previous keyword loops
+and per-call regexes:
+- the Aho-Corasick automaton finds the same keywords as substring search,
+  including overlapping ones and with whole-word matching
+- analyze_user_intent_for_images and extract_visual_concepts_from_response
+  give the same results as before on a corpus of chat messages and replies
+- per-message cost of both, before and after
+
+Usage:
+    python tests/test_intent_engine.py [iterations]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Imported first: ai_res and modules.user import each other, and only this order resolves
+import modules.user  # noqa: F401
+from modules.core.intent_engine import KeywordAutomaton
+from modules.models.ai_res import (
+    MEDIUM_IMAGE_INDICATORS,
+    MULTIPLE_IMAGE_INDICATORS,
+    STRONG_IMAGE_INDICATORS,
+    VISUAL_SUBJECTS,
+    analyze_user_intent_for_images,
+    extract_visual_concepts_from_response,
+)
+
+MESSAGES = [
+    "hi", "hello there!", "thanks a lot, that helped", "how are you today?",
+    "can you create an image of a cat sitting on a tree at sunset",
+    "please draw 3 different dragons flying over a castle",
+    "generate 2 images of a futuristic city at night", "show me some pictures of mountains",
+    "what would a robot chef look like?", "imagine a forest made of crystal",
+    "explain the difference between tcp and udp in detail please, with examples of when each is used",
+    "write a python function that sorts a list of dictionaries by a key",
+    "what does this error mean: KeyError 'name' in my flask app",
+    "translate this sentence into french: the weather is nice today and i want to go to the park",
+    "create such 4 wallpapers with ocean theme", "make a few logos for my bakery called Sweet Crumbs",
+    "I need picture of a car", "design an icon for a music app", "how does photosynthesis work?",
+    "give me 5 examples of metaphors", "Can you make me a landscape painting in watercolor style?",
+    "list the planets of the solar system", "what's the capital of australia", "draw me something nice",
+    "set of 3 characters for a fantasy game", "tell me a joke about cats and dogs",
+    "I want to see a sunset over the ocean", "summarize the history of the roman empire in 10 points",
+    "bunch of flowers in a vase, please create image", "",
+    "My code keeps failing with a segmentation fault when I free the buffer twice, why does that happen "
+    "and how would you restructure the cleanup so every allocation is released exactly once?",
+]
+
+RESPONSES = [
+    "Sure! Imagine a stunning sunset over the ocean, with vibrant colors. A majestic castle stands on the hill, like a painting.",
+    "TCP is connection-oriented while UDP is connectionless. For example, TCP is used for web traffic. "
+    "UDP is used for streaming, such as video calls and online games.",
+    "Here's a python function:\n```python\ndef sort_by(items, key):\n    return sorted(items, key=lambda d: d[key])\n```\n"
+    "This returns a new list and leaves the original untouched.",
+    "Photosynthesis converts light into chemical energy. Under a microscope a leaf looks like a green landscape of cells. "
+    "Chlorophyll absorbs red and blue light, which is why leaves appear green.",
+    "I'll create a gorgeous mountain landscape for you! Picture towering peaks, a graceful river, and a colorful sky.",
+    "The capital of Australia is Canberra. It was chosen as a compromise between Sydney and Melbourne.",
+    "A double free corrupts the allocator's bookkeeping. Set the pointer to NULL after freeing it, and give every "
+    "buffer a single owner that is responsible for releasing it, for example with a cleanup label at the end of the function. "
+    "Tools like AddressSanitizer or valgrind will show you exactly where the second free happens.",
+]
+
+
+def legacy_analyze_user_intent(user_message):
+    """The previous analyze_user_intent_for_images"""
+    user_msg_lower = user_message.lower()
+    number_patterns = [
+        r'\b(\d+)\s+(?:different|various|multiple|types?|kinds?|examples?)',
+        r'\b(\d+)\s+(?:image|images|picture|pictures|photo|photos)',
+        r'(?:create|generate|make|draw|show)\s+(?:such\s+)?(\d+)',
+        r'(\d+)\s+(?:of|such)'
+    ]
+    requested_count = 1
+    for pattern in number_patterns:
+        match = re.search(pattern, user_msg_lower)
+        if match:
+            requested_count = int(match.group(1))
+            break
+    strong_score = sum(1 for indicator in STRONG_IMAGE_INDICATORS if indicator in user_msg_lower)
+    medium_score = sum(1 for indicator in MEDIUM_IMAGE_INDICATORS if indicator in user_msg_lower) * 0.7
+    visual_score = sum(1 for subject in VISUAL_SUBJECTS if subject in user_msg_lower) * 0.8
+    multiple_score = sum(1 for indicator in MULTIPLE_IMAGE_INDICATORS if indicator in user_msg_lower) * 0.6
+    total_score = strong_score + medium_score + visual_score + multiple_score
+    if strong_score > 0:
+        confidence, intent = "high", "definite_image_request"
+    elif total_score >= 1.5:
+        confidence, intent = "medium", "likely_image_request"
+    elif total_score >= 0.8:
+        confidence, intent = "low", "possible_image_request"
+    else:
+        confidence, intent = "none", "no_image_request"
+    return {
+        "intent": intent,
+        "confidence": confidence,
+        "score": total_score,
+        "requested_count": min(requested_count, 4),
+        "has_visual_subjects": visual_score > 0,
+        "wants_multiple": multiple_score > 0 or requested_count > 1,
+        "detected_subjects": [subject for subject in VISUAL_SUBJECTS if subject in user_msg_lower]
+    }
+
+
+def legacy_extract_visual_concepts(ai_response, user_intent):
+    """The previous extract_visual_concepts_from_response"""
+    response_lower = ai_response.lower()
+    extracted_concepts = []
+    descriptive_patterns = [
+        r'(?:beautiful|stunning|amazing|gorgeous|magnificent|spectacular|breathtaking|majestic|elegant|graceful)\s+([^.!?]*?)(?:\.|!|\?|$)',
+        r'(?:imagine|picture|visualize|think of|envision)\s+([^.!?]*?)(?:\.|!|\?|$)',
+        r'(?:like|such as|for example|including)\s+([^.!?]*?)(?:\.|!|\?|$)',
+        r'(?:a|an|the)\s+([^.!?]*?(?:landscape|scene|view|sight|image|picture|photo))(?:\.|!|\?|$)'
+    ]
+    for pattern in descriptive_patterns:
+        for match in re.findall(pattern, response_lower, re.IGNORECASE):
+            concept = re.sub(r'\s+', ' ', match.strip())
+            if len(concept) > 10 and len(concept) < 100:
+                extracted_concepts.append(concept)
+    for subject in user_intent.get("detected_subjects", []):
+        if subject in response_lower:
+            context_match = re.search(rf'.{{0,50}}{subject}.{{0,50}}', response_lower)
+            if context_match:
+                context = context_match.group().strip()
+                context = re.sub(r'\b(?:the|a|an|is|are|was|were|will|would|could|should|might|may)\b', '', context)
+                context = re.sub(r'\s+', ' ', context).strip()
+                if len(context) > 5:
+                    extracted_concepts.append(context)
+    return extracted_concepts[:3]
+
+
+def test_automaton():
+    print("🧪 Testing keyword automaton against substring search...")
+    rng = random.Random(11)
+    for _ in range(2000):
+        keywords = ["".join(rng.choice("ab c") for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 12))]
+        text = "".join(rng.choice("abcd ") for _ in range(rng.randint(0, 80)))
+        expected = {keyword for keyword in keywords if keyword and keyword in text}
+        if KeywordAutomaton(keywords).find(text) != expected:
+            print(f"❌ {keywords} in {text!r}")
+            return False
+    words = KeywordAutomaton(["cat", "what", "?"], whole_words=True)
+    if words.find("whatsapp concatenate") or words.find("what is that cat?") != {"what", "cat", "?"}:
+        print("❌ Whole-word matching")
+        return False
+    print("✅ Keyword automaton test PASSED")
+    return True
+
+
+def test_same_results():
+    print("🧪 Comparing results with the previous heuristics...")
+    for message in MESSAGES:
+        intent = analyze_user_intent_for_images(message)
+        if intent != legacy_analyze_user_intent(message):
+            print(f"❌ Intent differs for {message!r}")
+            return False
+        for response in RESPONSES:
+            if extract_visual_concepts_from_response(response, intent) != legacy_extract_visual_concepts(response, intent):
+                print(f"❌ Concepts differ for {message!r} / {response[:40]!r}")
+                return False
+    print("✅ Same results test PASSED")
+    return True
+
+
+def benchmark(iterations):
+    print(f"🧪 Benchmark over {len(MESSAGES)} messages and {len(RESPONSES)} replies, {iterations} iterations")
+
+    def measure(function, inputs):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for args in inputs:
+                function(*args)
+        return (time.perf_counter() - start) / (iterations * len(inputs)) * 1e6
+
+    messages = [(message,) for message in MESSAGES]
+    legacy_us = measure(legacy_analyze_user_intent, messages)
+    current_us = measure(analyze_user_intent_for_images, messages)
+    print(f"  intent per message: {legacy_us:.1f} µs -> {current_us:.1f} µs ({legacy_us / current_us:.1f}x)")
+
+    intent = analyze_user_intent_for_images("draw a beautiful landscape with a castle")
+    replies = [(response, intent) for response in RESPONSES]
+    legacy_reply_us = measure(legacy_extract_visual_concepts, replies)
+    current_reply_us = measure(extract_visual_concepts_from_response, replies)
+    print(f"  visual concepts per reply: {legacy_reply_us:.1f} µs -> {current_reply_us:.1f} µs "
+          f"({legacy_reply_us / current_reply_us:.1f}x)")
+
+    passed = current_us < legacy_us and current_reply_us < legacy_reply_us
+    print("✅ Benchmark PASSED" if passed else "❌ Benchmark FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    results = [test_automaton(), test_same_results(), benchmark(iterations)]
+    sys.exit(0 if all(results) else 1)
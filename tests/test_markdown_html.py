@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Markdown to Telegram HTML Test Script
+
+Checks modules.core.text_formatter against a golden corpus of AI-style
+markdown, checks that split_html produces balanced messages within the
+limit, and benchmarks markdown_to_html against the previous converter,
+which ran a dozen regex passes with placeholder substitution.
+
+Usage:
+    python tests/test_markdown_html.py [iterations]
+"""
+
+import html
+import os
+import random
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.core.text_formatter import MESSAGE_LIMIT, markdown_to_html, split_html
+
+# (markdown, expected HTML)
+GOLDEN = [
+    ("", ""),
+    ("plain text", "plain text"),
+    ("**bold** and __bold__", "<b>bold</b> and <b>bold</b>"),
+    ("*italic* and _italic_", "<i>italic</i> and <i>italic</i>"),
+    ("~~gone~~", "<s>gone</s>"),
+    ("**bold with *italic* inside**", "<b>bold with <i>italic</i> inside</b>"),
+    ("# Title", "<b>Title</b>"),
+    ("### Steps with **bold**\ntext", "<b>Steps with <b>bold</b></b>\ntext"),
+    ("C# is not a header", "C# is not a header"),
+    ("use `a < b && c`", "use <code>a &lt; b &amp;&amp; c</code>"),
+    ("`**not bold**`", "<code>**not bold**</code>"),
+    ("```python\ndef f(x):\n    return x * 2 < 3\n```",
+     "<pre><code>def f(x):\n    return x * 2 &lt; 3</code></pre>"),
+    ("before\n```\n**raw**\n```\nafter", "before\n<pre><code>**raw**</code></pre>\nafter"),
+    ("```js\nunclosed(", "<pre><code>unclosed(</code></pre>"),
+    ("[docs](https://example.com/?a=1&b=2)", '<a href="https://example.com/?a=1&amp;b=2">docs</a>'),
+    ("[**bold link**](https://example.com)", '<a href="https://example.com"><b>bold link</b></a>'),
+    ("Tom & Jerry <3 \"quotes\" 'single'", "Tom &amp; Jerry &lt;3 &quot;quotes&quot; &#x27;single&#x27;"),
+    ("- item one\n- item **two**", "- item one\n- item <b>two</b>"),
+    # Delimiters that cannot be paired stay literal, keeping the tags balanced
+    ("**a *b** c*", "<b>a *b</b> c*"),
+    ("**unclosed bold", "**unclosed bold"),
+    ("**bold across\nlines**", "**bold across\nlines**"),
+    ("2 * 3 * 4", "2 * 3 * 4"),
+    ("* bullet with *emphasis*", "* bullet with <i>emphasis</i>"),
+    ("snake_case_name and _italic_", "snake_case_name and <i>italic</i>"),
+    ("***both***", "<b>*both</b>*"),
+]
+
+
+class BalanceChecker(HTMLParser):
+    """Fails on a closing tag that does not match the innermost open tag"""
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.balanced = True
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.balanced = False
+
+
+def is_balanced(text):
+    checker = BalanceChecker()
+    checker.feed(text)
+    checker.close()
+    return checker.balanced and not checker.stack
+
+
+def legacy_markdown_to_html(text):
+    """The previous markdown_to_html"""
+    if not text or not isinstance(text, str):
+        return text or ""
+    code_blocks = []
+    def save_code_block(match):
+        code_blocks.append(match.group(0))
+        return f"<<<CODEBLOCK{len(code_blocks) - 1}>>>"
+    text = re.sub(r'```[\s\S]*?```', save_code_block, text)
+    inline_codes = []
+    def save_inline_code(match):
+        inline_codes.append(match.group(0))
+        return f"<<<INLINECODE{len(inline_codes) - 1}>>>"
+    text = re.sub(r'`[^`]+`', save_inline_code, text)
+    text = html.escape(text)
+    text = re.sub(r'^#{1,6}\s*(.+)$', r'<b>\1</b>', text, flags=re.MULTILINE)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+    text = re.sub(r'__(.+?)__', r'<b>\1</b>', text)
+    text = re.sub(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<i>\1</i>', text)
+    text = re.sub(r'(?<!_)_(?!_)(.+?)(?<!_)_(?!_)', r'<i>\1</i>', text)
+    text = re.sub(r'~~(.+?)~~', r'<s>\1</s>', text)
+    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
+    for i, code in enumerate(inline_codes):
+        html_code = f"<code>{html.escape(code[1:-1])}</code>"
+        text = text.replace(f"&lt;&lt;&lt;INLINECODE{i}&gt;&gt;&gt;", html_code)
+        text = text.replace(f"<<<INLINECODE{i}>>>", html_code)
+    for i, block in enumerate(code_blocks):
+        match = re.match(r'```(?:\w+)?\n?([\s\S]*?)```', block)
+        code_content = match.group(1).strip() if match else block[3:-3].strip()
+        html_code = f"<pre><code>{html.escape(code_content)}</code></pre>"
+        text = text.replace(f"&lt;&lt;&lt;CODEBLOCK{i}&gt;&gt;&gt;", html_code)
+        text = text.replace(f"<<<CODEBLOCK{i}>>>", html_code)
+    return text
+
+
+def make_answer(rng, sections):
+    """A long, code-heavy AI answer"""
+    parts = ["## Solution\n"]
+    for n in range(sections):
+        parts.append(f"### Step {n + 1}\nCall `handler_{n}()` with **care**; see "
+                     f"[the docs](https://docs.python.org/3/?q={n}&lang=en) for *details*.\n")
+        parts.append("- check that a < b & c\n- ~~old way~~ **new way**\n")
+        lines = [f"    value_{i} = compute(x * {i}) if x < {rng.randint(1, 99)} else None" for i in range(rng.randint(10, 40))]
+        parts.append("```python\ndef step_%d(x):\n%s\n    return x\n```\n" % (n, "\n".join(lines)))
+    return "\n".join(parts)
+
+
+def test_golden():
+    print("🧪 Testing golden corpus...")
+    failures = 0
+    for markdown, expected in GOLDEN:
+        result = markdown_to_html(markdown)
+        if result != expected or not is_balanced(result):
+            failures += 1
+            print(f"❌ {markdown!r}\n   got      {result!r}\n   expected {expected!r}")
+    print("✅ Golden corpus test PASSED" if not failures else f"❌ Golden corpus test FAILED ({failures} cases)")
+    return not failures
+
+
+def test_split():
+    print("🧪 Testing message splitting...")
+    rng = random.Random(3)
+    for trial in range(200):
+        rendered = markdown_to_html(make_answer(rng, rng.randint(1, 40)) + "\n" + "word" * rng.randint(0, 3000))
+        limit = rng.choice([MESSAGE_LIMIT, 1000, 300])
+        chunks = split_html(rendered, limit)
+        text_only = lambda value: re.sub(r'<[^>]+>|\n', '', value)
+        if (any(len(chunk) > limit or not is_balanced(chunk) for chunk in chunks)
+                or text_only("".join(chunks)) != text_only(rendered)
+                or any(re.search(r'&(?!#?\w+;)', chunk) for chunk in chunks)):
+            print(f"❌ Bad split in trial {trial} (limit {limit}): {[len(chunk) for chunk in chunks]}")
+            return False
+    print("✅ Message splitting test PASSED")
+    return True
+
+
+def benchmark(iterations):
+    print(f"🧪 Converting a long code-heavy answer {iterations} times")
+    answer = make_answer(random.Random(1), 12)
+
+    def measure(convert):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            convert(answer)
+        return (time.perf_counter() - start) / iterations * 1000
+
+    legacy_ms = measure(legacy_markdown_to_html)
+    current_ms = measure(markdown_to_html)
+    same = legacy_markdown_to_html(answer) == markdown_to_html(answer)
+    print(f"  {len(answer):,} characters: {legacy_ms:.2f} ms -> {current_ms:.2f} ms per answer ({legacy_ms / current_ms:.1f}x)")
+    print(f"  output identical to the previous converter: {same}")
+    passed = same and current_ms < legacy_ms
+    print("✅ Benchmark PASSED" if passed else "❌ Benchmark FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    results = [test_golden(), test_split(), benchmark(iterations)]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Outbound Governor Test Script
+
+Installs modules.core.telegram_governor on a fake client and checks, for a
+single private chat:
+- a burst beyond the chat's bucket is paced, with replies served before
+  edits that were queued earlier
+- waiting edits of the same message are coalesced into one call that
+  sends the latest text
+- chat actions are dropped rather than queued when the chat is busy, and
+  do not use up a group's message allowance
+- a FloodWait is retried after the requested wait
+
+Usage:
+    python tests/test_outbound_governor.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyrogram.errors import FloodWait
+
+from modules.core.telegram_governor import GROUP_CHAT_BURST, OutboundGovernor, PRIVATE_CHAT_BURST
+
+
+class FakeClient:
+    """Records the calls that reach Telegram"""
+
+    def __init__(self):
+        self.calls = []
+        self.flood_once = True
+
+    async def send_message(self, chat_id, text):
+        self.calls.append(("send", text))
+        return text
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        if text == "flood" and self.flood_once:
+            self.flood_once = False
+            raise FloodWait(1)
+        self.calls.append(("edit", text))
+        return text
+
+    async def send_chat_action(self, chat_id, action):
+        self.calls.append(("action", action))
+        return True
+
+
+async def run():
+    client = FakeClient()
+    governor = OutboundGovernor()
+    governor.install(client)
+
+    # Use up the chat's burst, then queue edits and a reply behind it
+    await asyncio.gather(*(client.send_message(1, f"message {n}") for n in range(PRIVATE_CHAT_BURST)))
+    edits = [asyncio.create_task(client.edit_message_text(1, 100, f"progress {n}")) for n in range(5)]
+    await asyncio.sleep(0)
+    reply = asyncio.create_task(client.send_message(1, "reply"))
+    action = await client.send_chat_action(1, "typing")
+    results = await asyncio.gather(*edits, reply)
+
+    started = time.monotonic()
+    flood_result = await client.edit_message_text(1, 101, "flood")
+    flood_elapsed = time.monotonic() - started
+    return client.calls, results, action, flood_result, flood_elapsed, governor.get_stats()
+
+
+async def run_group_actions():
+    """A typing indicator followed by a burst of replies in a group"""
+    client = FakeClient()
+    OutboundGovernor().install(client)
+    actions = [await client.send_chat_action(-100, "typing") for _ in range(2)]
+    started = time.monotonic()
+    await asyncio.gather(*(client.send_message(-100, f"reply {n}") for n in range(GROUP_CHAT_BURST)))
+    return actions, time.monotonic() - started
+
+
+def test_governor():
+    print("🧪 Testing outbound governor...")
+    calls, results, action, flood_result, flood_elapsed, stats = asyncio.run(run())
+    print(f"  calls reaching Telegram: {calls}")
+    print(f"  stats: {stats}")
+
+    sent_after_burst = calls[PRIVATE_CHAT_BURST:]
+    reply_first = sent_after_burst[:2] == [("send", "reply"), ("edit", "progress 4")]
+    coalesced = results[:5] == ["progress 4"] * 5 and stats["coalesced"] == 4
+    dropped = action is False and ("action", "typing") not in calls
+    retried = flood_result == "flood" and flood_elapsed >= 1.0 and stats["flood_retries"] == 1
+
+    group_actions, burst_elapsed = asyncio.run(run_group_actions())
+    print(f"  group burst after a typing indicator: {burst_elapsed * 1000:.0f} ms")
+    # The second action within a few seconds is skipped, and neither delays the replies
+    actions_separate = group_actions == [True, False] and burst_elapsed < 0.5
+
+    passed = reply_first and coalesced and dropped and retried and actions_separate
+    print("✅ Outbound governor test PASSED" if passed else "❌ Outbound governor test FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_governor() else 1)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Panel Cache Test Script
+
+Checks the rendered panel cache and the panels that use it:
+- a panel is rendered once per (panel, language, state) and then served
+  from the cache; concurrent callbacks share one render
+- a render that started before an invalidation is not cached
+- invalidating from another thread (the UI bundle warm-up) while the event
+  loop fills the cache neither fails nor loses the invalidation
+- per-user placeholders are filled in without touching other braces
+- the voice settings panel is not re-rendered when navigating back to it,
+  and switching the setting shows the panel for the new state
+- benchmark: rendering the settings panel on every callback (previous) vs
+  the cache, with all translations already cached
+
+Usage:
+    python tests/test_panel_cache.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules
+import modules.lang as lang_module
+import modules.user.settings as settings
+from modules.core.panel_cache import PanelCache, RenderedPanel, panel_cache
+
+
+class PrefixTranslator:
+    """Prefixes every line with the target language"""
+
+    requests = 0
+
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        PrefixTranslator.requests += 1
+        return "\n".join(f"[{self.target}] {line}" for line in text.split("\n"))
+
+
+class MemoryCollection:
+    """The parts of a pymongo collection that the settings panels and translation cache use"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, filter, projection=None):
+        return [self.docs[key] for key in filter.get("key", {}).get("$in", []) if key in self.docs]
+
+    def find_one(self, filter):
+        return self.docs.get(filter.get("user_id", filter.get("key")))
+
+    def insert_one(self, doc):
+        self.docs[doc["user_id"]] = dict(doc)
+
+    def update_one(self, filter, update, upsert=False):
+        key = filter.get("user_id", filter.get("key"))
+        self.docs.setdefault(key, dict(filter)).update(update["$set"])
+
+    def bulk_write(self, requests, ordered=True):
+        pass
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, text, reply_markup=None, **kwargs):
+        self.edits.append((text, reply_markup))
+
+
+class FakeCallback:
+    def __init__(self, user_id, data=""):
+        self.from_user = type("User", (), {"id": user_id, "mention": f"@user{user_id}"})()
+        self.data = data
+        self.message = FakeMessage()
+
+
+def setup():
+    # Wait for the startup warm-up, which invalidates panels when it adds translations
+    modules.prefetch_thread.join()
+    lang_module.GoogleTranslator = PrefixTranslator
+    collection = MemoryCollection()
+    lang_module.get_translation_cache = lambda: collection
+    # Keep test strings out of the on-disk translation cache
+    lang_module.add_to_translation_cache = lambda text, translation, lang: None
+    settings.user_voice_collection = MemoryCollection()
+    settings.get_user_language = lambda user_id: "fr"
+
+
+async def test_render_once():
+    print("🧪 Rendering one panel from 10 concurrent callbacks, then again...")
+    cache = PanelCache()
+    renders = []
+
+    async def render():
+        renders.append(1)
+        await asyncio.sleep(0.01)
+        return RenderedPanel("Hello {mention}, {user_id} {not_a_placeholder}", "keyboard")
+
+    panels = await asyncio.gather(*[cache.get_or_render("start", "hi", (), render) for _ in range(10)])
+    again = await cache.get_or_render("start", "hi", (), render)
+    other_state = await cache.get_or_render("start", "hi", ("premium",), render)
+    stats = cache.get_stats()
+    passed = (len(renders) == 2
+              and all(panel is panels[0] for panel in panels + [again])
+              and other_state is not again
+              and again.fill(mention="@a", user_id=1) == "Hello @a, 1 {not_a_placeholder}"
+              and stats["hits"] == 1 and stats["entries"] == 2)
+    print("✅ Render once test PASSED" if passed else f"❌ Render once test FAILED: {len(renders)} renders, {stats}")
+    return passed
+
+
+async def test_invalidation():
+    print("🧪 Invalidating panels, including during a render...")
+    cache = PanelCache()
+
+    async def render():
+        return RenderedPanel("text")
+
+    await cache.get_or_render("help_start", "fr", (), render)
+    await cache.get_or_render("help_start", "ru", (), render)
+    cache.invalidate(lang="fr")
+    partial = cache.get("help_start", "fr") is None and cache.get("help_start", "ru") is not None
+
+    async def slow_render():
+        await asyncio.sleep(0.01)
+        return RenderedPanel("rendered before the translations changed")
+
+    task = asyncio.create_task(cache.get_or_render("settings", "fr", (), slow_render))
+    await asyncio.sleep(0)
+    cache.invalidate()
+    await task
+    passed = partial and cache.get("settings", "fr") is None and len(cache) == 0
+    print("✅ Invalidation test PASSED" if passed else "❌ Invalidation test FAILED")
+    return passed
+
+
+async def test_invalidation_from_thread():
+    print("🧪 Invalidating panels from a thread while the loop renders...")
+    cache = PanelCache(maxsize=200)
+    errors = []
+    done = threading.Event()
+
+    async def render():
+        return RenderedPanel("text")
+
+    def invalidate():
+        while not done.is_set():
+            try:
+                cache.invalidate(lang="fr")
+            except Exception as e:
+                errors.append(e)
+                return
+
+    thread = threading.Thread(target=invalidate)
+    thread.start()
+    try:
+        for i in range(20000):
+            await cache.get_or_render("settings", "fr" if i % 2 else "ru", (i,), render)
+            cache.get("settings", "ru", (i - 1,))
+    finally:
+        done.set()
+        thread.join()
+    cache.invalidate(lang="fr")
+    passed = not errors and not any(key[1] == "fr" for key in cache._data)
+    print("✅ Threaded invalidation test PASSED" if passed else f"❌ Threaded invalidation test FAILED: {errors!r}")
+    return passed
+
+
+async def test_voice_panel():
+    print("🧪 Opening the voice settings panel, switching to text and back...")
+    panel_cache.invalidate()
+    renders = []
+    render_voice_panel = settings._render_voice_panel
+
+    async def counting_render(current_language, voice_setting):
+        renders.append(voice_setting)
+        return await render_voice_panel(current_language, voice_setting)
+
+    settings._render_voice_panel = counting_render
+    try:
+        callback = FakeCallback(user_id=1)
+        await settings.settings_language_callback(None, callback)
+        await settings.settings_language_callback(None, callback)
+        callback.data = "settings_text"
+        await settings.change_voice_setting(None, callback)
+        await settings.settings_language_callback(None, FakeCallback(user_id=1))
+        callback.data = "settings_voice"
+        await settings.change_voice_setting(None, callback)
+    finally:
+        settings._render_voice_panel = render_voice_panel
+
+    captions = [text for text, _ in callback.message.edits]
+    passed = (renders == ["voice", "text"]
+              and captions[0] == captions[1] == captions[3]
+              and "[fr] Text" in captions[2]
+              and "[fr] Voice" in captions[3])
+    print(f"  {len(captions) + 1} panel views, {len(renders)} renders")
+    print("✅ Voice panel test PASSED" if passed else f"❌ Voice panel test FAILED: {renders}, {captions}")
+    return passed
+
+
+async def benchmark_settings_navigation(views: int = 2000):
+    print(f"🧪 Benchmarking {views} views of the settings panel...")
+    state = ("fr", True, 12, "chatbot", "voice", "qwen3", "flux-dev")
+    # Translate everything once, so both sides only hit the translation caches
+    await settings._render_settings_panel(*state)
+
+    start = time.perf_counter()
+    for _ in range(views):
+        panel = await settings._render_settings_panel(*state)
+        panel.fill(mention="@user", user_id=1)
+    rendering = time.perf_counter() - start
+
+    cache = PanelCache()
+    start = time.perf_counter()
+    for _ in range(views):
+        panel = await cache.get_or_render("settings", "fr", state[1:], lambda: settings._render_settings_panel(*state))
+        panel.fill(mention="@user", user_id=1)
+    cached = time.perf_counter() - start
+
+    print(f"  rendering every time (previous): {rendering / views * 1e6:.1f} µs per view")
+    print(f"  panel cache: {cached / views * 1e6:.1f} µs per view ({rendering / cached:.0f}x faster)")
+    return cached < rendering
+
+
+async def main():
+    setup()
+    results = [
+        await test_render_once(),
+        await test_invalidation(),
+        await test_invalidation_from_thread(),
+        await test_voice_panel(),
+        await benchmark_settings_navigation(),
+    ]
+    print(f"  global panel cache: {panel_cache.get_stats()}")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Request Queue Micro-Benchmark
+
+Measures the per-request admission check and the expiry sweep of
+modules.core.request_queue with a large number of tracked users, against
+the previous implementation, which scanned every tracked user on every
+request and kept a regular (non-slotted) dataclass per user.
+
+Usage:
+    python tests/test_request_queue_benchmark.py [num_users]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.core import request_queue
+from modules.core.request_state_backend import LocalRequestStateBackend
+
+# Keep the benchmark in-process regardless of REQUEST_STATE_BACKEND
+request_queue.request_state_backend = LocalRequestStateBackend()
+request_queue.logger.disabled = True
+
+
+@dataclass
+class LegacyUserRequestState:
+    """The previous per-user state layout"""
+    user_id: int
+    image_processing: bool = False
+    text_processing: bool = False
+    image_start_time: float = field(default=0.0)
+    text_start_time: float = field(default=0.0)
+    image_task_info: str = field(default="")
+    text_task_info: str = field(default="")
+
+
+def legacy_cleanup(states):
+    """The previous cleanup_expired_requests, run on every admission check"""
+    current_time = time.time()
+    for user_id, state in list(states.items()):
+        if state.image_processing and current_time - state.image_start_time > 600.0:
+            state.image_processing = False
+        if state.text_processing and current_time - state.text_start_time > 300.0:
+            state.text_processing = False
+        if not state.image_processing and not state.text_processing:
+            if current_time - max(state.image_start_time, state.text_start_time) > 300:
+                del states[user_id]
+
+
+def measure_memory(factory, num_users):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    states = factory(num_users)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return states, size / num_users
+
+
+def benchmark(num_users):
+    print(f"🧪 Request queue benchmark with {num_users:,} tracked users")
+    now = time.time()
+
+    def make_legacy(n):
+        return {
+            uid: LegacyUserRequestState(uid, text_processing=True, text_start_time=now, text_task_info="Processing message")
+            for uid in range(n)
+        }
+
+    def make_current(n):
+        request_queue.user_request_states.clear()
+        request_queue._expiry_heap.clear()
+        for uid in range(n):
+            request_queue.start_text_request(uid, "Processing message")
+        return request_queue.user_request_states
+
+    def make_slotted(n):
+        return {
+            uid: request_queue.UserRequestState(uid, text_start_time=now, text_task_info="Processing message")
+            for uid in range(n)
+        }
+
+    legacy_states, legacy_bytes = measure_memory(make_legacy, num_users)
+    _, slotted_bytes = measure_memory(make_slotted, num_users)
+    _, current_bytes = measure_memory(make_current, num_users)
+    print(f"  state per tracked user: {legacy_bytes:.0f} B -> {slotted_bytes:.0f} B")
+    print(f"  with expiry index and lease: {current_bytes:.0f} B")
+
+    checks = 200
+    started = time.perf_counter()
+    for _ in range(checks):
+        legacy_cleanup(legacy_states)
+    legacy_us = (time.perf_counter() - started) / checks * 1e6
+
+    async def run_checks():
+        for i in range(checks * 100):
+            await request_queue.can_start_text_request(num_users + i)
+    started = time.perf_counter()
+    asyncio.run(run_checks())
+    current_us = (time.perf_counter() - started) / (checks * 100) * 1e6
+    print(f"  admission check: {legacy_us:,.1f} µs -> {current_us:,.2f} µs per request")
+
+    # Sweep when 1% of the requests have expired
+    expiring = num_users // 100
+    for uid in range(expiring):
+        request_queue.user_request_states[uid].text_start_time = now - 1000
+        request_queue._schedule_expiry(now - 700, uid, "text", now - 1000)
+    started = time.perf_counter()
+    expired = request_queue.cleanup_expired_requests(now)
+    sweep_ms = (time.perf_counter() - started) * 1000
+    print(f"  expiry sweep: {expired:,} expired in {sweep_ms:.2f} ms, {len(request_queue.user_request_states):,} still tracked")
+
+    passed = expired == expiring and current_us < legacy_us
+    print("✅ Benchmark PASSED" if passed else "❌ Benchmark FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sys.exit(0 if benchmark(num_users) else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Request State Backend Test Script
+
+Checks that the one-request-at-a-time guard holds across bot processes:
+several processes race to acquire the same user's lease and exactly one
+may win, and two concurrent messages from one user to one process must not
+both be admitted. The local backend is checked in-process; the Mongo
+backend needs a reachable DATABASE_URL.
+
+Usage:
+    python tests/test_request_state_backend.py [num_processes]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_USER_ID = -424242
+
+
+def test_local_backend():
+    """Two owners sharing a local lease table"""
+    print("🧪 Testing local backend...")
+    from modules.core.request_state_backend import LocalRequestStateBackend
+
+    async def run():
+        backend = LocalRequestStateBackend(owner="bot-1")
+        ok = await backend.acquire(TEST_USER_ID, "text")
+        blocked = not await backend.acquire(TEST_USER_ID, "text", owner="bot-2")
+        reentrant = await backend.acquire(TEST_USER_ID, "text")
+        other_kind = await backend.acquire(TEST_USER_ID, "image", owner="bot-2")
+        backend.release(TEST_USER_ID, "text", owner="bot-2")  # not the owner, must be ignored
+        still_blocked = not await backend.acquire(TEST_USER_ID, "text", owner="bot-2")
+        backend.release(TEST_USER_ID, "text")
+        freed = await backend.acquire(TEST_USER_ID, "text", owner="bot-2")
+        return all([ok, blocked, reentrant, other_kind, still_blocked, freed])
+
+    passed = asyncio.run(run())
+    print("✅ Local backend test PASSED" if passed else "❌ Local backend test FAILED")
+    return passed
+
+
+def test_same_process_race():
+    """Two messages from one user reach one bot process while the backend is slow"""
+    print("🧪 Testing concurrent requests of one user in one process...")
+    from modules.core import request_queue
+    from modules.core.request_state_backend import LocalRequestStateBackend
+
+    class SlowBackend(LocalRequestStateBackend):
+        async def acquire(self, user_id, kind, owner=None):
+            await asyncio.sleep(0.01)
+            return await super().acquire(user_id, kind, owner)
+
+    async def run():
+        backend = request_queue.request_state_backend = SlowBackend(owner="bot-1")
+        results = await asyncio.gather(*[request_queue.can_start_text_request(TEST_USER_ID) for _ in range(2)])
+        allowed = [ok for ok, _ in results].count(True)
+        request_queue.start_text_request(TEST_USER_ID, "first")
+        held = backend.get_stats()["leases"] == 1
+        request_queue.finish_text_request(TEST_USER_ID)
+        freed = backend.get_stats()["leases"] == 0 and TEST_USER_ID not in request_queue.user_request_states
+        # A slot that is claimed but not used is given back by finish_text_request
+        claimed, _ = await request_queue.can_start_text_request(TEST_USER_ID)
+        request_queue.finish_text_request(TEST_USER_ID)
+        reclaimed, _ = await request_queue.can_start_text_request(TEST_USER_ID)
+        request_queue.finish_text_request(TEST_USER_ID)
+        return allowed == 1 and held and freed and claimed and reclaimed
+
+    passed = asyncio.run(run())
+    print("✅ Same-process race test PASSED" if passed else "❌ Same-process race test FAILED")
+    return passed
+
+
+def _race_worker(start_at, results):
+    """One simulated bot process trying to take the same lease"""
+    from modules.core.request_state_backend import MongoLeaseBackend
+
+    async def run():
+        backend = MongoLeaseBackend()
+        while time.time() < start_at:
+            await asyncio.sleep(0.001)
+        started = time.perf_counter()
+        won = await backend.acquire(TEST_USER_ID, "text")
+        results.append((won, (time.perf_counter() - started) * 1000))
+        if won:
+            # Hold the lease until every process has tried
+            await asyncio.sleep(1.0)
+            backend.release(TEST_USER_ID, "text")
+            await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+
+
+def test_mongo_backend_race(num_processes=4):
+    """Several processes acquire the same lease at once; only one may win"""
+    print(f"🧪 Testing Mongo lease backend with {num_processes} processes...")
+    manager = multiprocessing.Manager()
+    results = manager.list()
+    start_at = time.time() + 2.0
+    processes = [multiprocessing.Process(target=_race_worker, args=(start_at, results)) for _ in range(num_processes)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=30)
+
+    if len(results) != num_processes:
+        print("⚠️ Some processes failed (no database?), skipping Mongo race test")
+        return True
+    winners = sum(1 for won, _ in results if won)
+    latencies = sorted(ms for _, ms in results)
+    print(f"  winners: {winners}/{num_processes}, acquire latency p50 {latencies[len(latencies) // 2]:.1f} ms")
+    passed = winners == 1
+    print("✅ Mongo lease race test PASSED" if passed else "❌ Mongo lease race test FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    num_processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    results = [test_local_backend(), test_same_process_race(), test_mongo_backend_race(num_processes)]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming Reply Test Script
+
+Checks modules.models.streaming_reply without Telegram:
+- the incremental markdown closers match sanitize_markdown for every
+  prefix of randomly chunked text
+- a long streamed reply rolls over into several messages that each fit
+  Telegram's limit, with a cut code block reopened in the next message
+- a provider that stops sending chunks is given up on instead of holding
+  the request forever
+- a provider that fails before its first chunk falls through to the next
+  candidate, and both outcomes reach the health scoreboard
+
+Usage:
+    python tests/test_streaming_reply.py
+"""
+
+import asyncio
+import html
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Imported first: ai_res and modules.user import each other, and only this order resolves
+import modules.user  # noqa: F401
+import modules.models.ai_res as ai_res
+import modules.models.multi_provider_text as multi_provider_text
+from modules.core.provider_health import text_provider_health
+from modules.models.ai_res import sanitize_markdown
+from modules.models.streaming_reply import MESSAGE_LIMIT, MarkdownStreamState, StreamingReply
+
+
+class FakeMessage:
+    """Records the text a Telegram message ends up with"""
+
+    def __init__(self, text=""):
+        self.text = text
+        self.chat = None
+        self.sent = []
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        reply = FakeMessage(text)
+        self.sent.append(reply)
+        return reply
+
+    async def delete(self):
+        self.text = None
+
+
+def test_incremental_sanitize():
+    print("🧪 Testing incremental markdown closers...")
+    rng = random.Random(7)
+    alphabet = "ab`*[]()\n "
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        state = MarkdownStreamState()
+        position = 0
+        while position < len(text):
+            step = rng.randint(1, 5)
+            state.feed(text[position:position + step])
+            position += step
+            if state.sanitized() != sanitize_markdown(state.text):
+                print(f"❌ Mismatch for {state.text!r}")
+                return False
+    print("✅ Incremental sanitize test PASSED")
+    return True
+
+
+def test_rollover():
+    print("🧪 Testing rollover of long replies...")
+    lines = [f"line {i} " + "x" * (i % 50) + "\n" for i in range(500)]
+    lines.insert(200, "```python\n")
+    body = "".join(lines)
+
+    async def run():
+        user_message, placeholder = FakeMessage(), FakeMessage("⏳")
+        reply = StreamingReply(user_message, placeholder, render=html.escape)
+        for start in range(0, len(body), 37):
+            await reply.feed(body[start:start + 37])
+        return await reply.finish()
+
+    messages = asyncio.run(run())
+    lengths = [len(m.text) for m in messages]
+    print(f"  {len(body):,} characters in {len(messages)} messages: {lengths}")
+    fits = all(length <= MESSAGE_LIMIT for length in lengths)
+    reopened = all(m.text.startswith("```python") for m in messages[2:])
+    passed = len(messages) > 1 and fits and reopened
+    print("✅ Rollover test PASSED" if passed else "❌ Rollover test FAILED")
+    return passed
+
+
+def test_stalled_stream():
+    print("🧪 Testing a provider that stops sending chunks...")
+    release = threading.Event()
+
+    def stalling_stream(history, model):
+        def chunks():
+            yield "Hello"
+            # Blocks like a provider whose connection went quiet
+            release.wait(5)
+            yield " world"
+        return chunks()
+
+    async def run(get_streaming_response):
+        ai_res.get_streaming_response = get_streaming_response
+        received = []
+        started = time.monotonic()
+        try:
+            async for chunk in ai_res.stream_response_async([{"role": "user", "content": "hi"}], model="gpt-4o"):
+                received.append(chunk)
+        except RuntimeError as e:
+            return received, time.monotonic() - started, str(e)
+        return received, time.monotonic() - started, None
+
+    get_streaming_response, get_stream_timeouts = ai_res.get_streaming_response, ai_res.get_stream_timeouts
+    ai_res.get_stream_timeouts = lambda model: (0.3, 0.2)
+    try:
+        idle = asyncio.run(run(stalling_stream))
+        silent = asyncio.run(run(lambda history, model: iter(release.wait, True)))
+    finally:
+        release.set()
+        ai_res.get_streaming_response, ai_res.get_stream_timeouts = get_streaming_response, get_stream_timeouts
+
+    print(f"  stalled after text: {idle[0]} in {idle[1]:.2f}s ({idle[2]})")
+    print(f"  never started: {silent[0]} in {silent[1]:.2f}s ({silent[2]})")
+    passed = (idle[0] == ["Hello"] and idle[2] and idle[1] < 1.0
+              and silent[0] == [] and silent[2] and silent[1] < 1.0)
+    print("✅ Stalled stream test PASSED" if passed else "❌ Stalled stream test FAILED")
+    return passed
+
+
+def test_stream_fallthrough():
+    print("🧪 Testing a provider that fails before its first chunk...")
+    model = multi_provider_text.normalize_model_name("gpt-4o")
+    candidates = multi_provider_text.build_provider_candidates(model)
+    first, second = candidates[0][0], candidates[1][0]
+    before = {name: text_provider_health.get_stats().get(name, {}).get("calls", 0) for name in (first.name, second.name)}
+
+    def fake_stream(provider, messages, use_model, temperature, max_tokens):
+        def chunks():
+            if provider is first:
+                raise ConnectionError("connection refused")
+            yield "streamed"
+        return chunks()
+
+    generate_streaming_with_provider = multi_provider_text.generate_streaming_with_provider
+    multi_provider_text.generate_streaming_with_provider = fake_stream
+    try:
+        stream = multi_provider_text.get_streaming_response_multi_provider([{"role": "user", "content": "hi"}], model)
+        chunks = list(stream) if stream is not None else None
+    finally:
+        multi_provider_text.generate_streaming_with_provider = generate_streaming_with_provider
+
+    stats = text_provider_health.get_stats()
+    recorded = all(stats.get(name, {}).get("calls", 0) == before[name] + 1 for name in before)
+    print(f"  {first.name} failed, {second.name} streamed {chunks}")
+    passed = chunks == ["streamed"] and recorded
+    print("✅ Stream fallthrough test PASSED" if passed else f"❌ Stream fallthrough test FAILED: {stats}")
+    return passed
+
+
+if __name__ == "__main__":
+    results = [test_incremental_sanitize(), test_rollover(), test_stalled_stream(), test_stream_fallthrough()]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Translation Batching Test Script
+
+Checks how modules.lang handles strings that are in none of the caches,
+with a recording translator instead of Google and an in-memory collection
+instead of MongoDB:
+- a settings panel of 20 new buttons costs one translator request
+- identical concurrent requests share one translation
+- strings that come back untranslated are not sent again
+- a batch whose lines come back mangled falls back to one request per string
+- placeholders survive batching
+
+Usage:
+    python tests/test_translation_batching.py
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.lang as lang_module
+from modules.lang import async_translate_to_lang, batch_translate, get_translation_network_stats
+
+
+class RecordingTranslator:
+    """Prefixes every line with the target language; some strings stay untranslated"""
+
+    requests = []
+    untranslatable = set()
+    drop_line = False
+
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        RecordingTranslator.requests.append(text)
+        lines = [line if line in self.untranslatable else f"[{self.target}] {line}" for line in text.split("\n")]
+        if self.drop_line and len(lines) > 1:
+            lines = lines[:-1]
+        return "\n".join(lines)
+
+
+class MemoryCollection:
+    """The parts of a pymongo collection that the translation cache uses"""
+
+    def __init__(self):
+        self.docs = {}
+        self.bulk_writes = 0
+
+    def find(self, filter, projection=None):
+        return [self.docs[key] for key in filter["key"]["$in"] if key in self.docs]
+
+    def find_one(self, filter):
+        return self.docs.get(filter["key"])
+
+    def update_one(self, filter, update, upsert=False):
+        self.docs[filter["key"]] = {"key": filter["key"], **update["$set"]}
+
+    def bulk_write(self, requests, ordered=True):
+        self.bulk_writes += 1
+
+
+def setup():
+    collection = MemoryCollection()
+    lang_module.GoogleTranslator = RecordingTranslator
+    lang_module.get_translation_cache = lambda: collection
+    # Keep test strings out of the on-disk translation cache
+    lang_module.add_to_translation_cache = lambda text, translation, lang: None
+    return collection
+
+
+def fresh(label):
+    return f"{label} {uuid.uuid4().hex[:8]}"
+
+
+async def test_settings_panel():
+    print("🧪 Translating a settings panel of 20 new buttons...")
+    RecordingTranslator.requests.clear()
+    buttons = [fresh(f"Button {i}") for i in range(20)]
+    translated = await batch_translate(buttons, lang="fr")
+    passed = (translated == [f"[fr] {button}" for button in buttons]
+              and len(RecordingTranslator.requests) == 1)
+    print(f"  {len(RecordingTranslator.requests)} translator request(s), previously {len(buttons)}")
+    print("✅ Settings panel test PASSED" if passed else "❌ Settings panel test FAILED")
+    return passed
+
+
+async def test_single_flight():
+    print("🧪 Translating the same new string 10 times at once...")
+    RecordingTranslator.requests.clear()
+    text = fresh("Welcome to the bot")
+    results = await asyncio.gather(*[async_translate_to_lang(text, lang="ru") for _ in range(10)])
+    passed = set(results) == {f"[ru] {text}"} and len(RecordingTranslator.requests) == 1
+    print("✅ Single flight test PASSED" if passed else "❌ Single flight test FAILED")
+    return passed
+
+
+async def test_negative_cache():
+    print("🧪 Translating a string that stays untranslated twice...")
+    RecordingTranslator.requests.clear()
+    text = fresh("GPT-4o")
+    RecordingTranslator.untranslatable.add(text)
+    first = await async_translate_to_lang(text, lang="hi")
+    second = await async_translate_to_lang(text, lang="hi")
+    passed = first == second == text and len(RecordingTranslator.requests) == 1
+    print("✅ Negative cache test PASSED" if passed else "❌ Negative cache test FAILED")
+    return passed
+
+
+async def test_mangled_batch():
+    print("🧪 Translating a batch whose lines come back mangled...")
+    RecordingTranslator.requests.clear()
+    RecordingTranslator.drop_line = True
+    texts = [fresh(f"Option {i}") for i in range(5)]
+    try:
+        translated = await batch_translate(texts, lang="ar")
+    finally:
+        RecordingTranslator.drop_line = False
+    passed = translated == [f"[ar] {text}" for text in texts] and len(RecordingTranslator.requests) == 1 + len(texts)
+    print("✅ Mangled batch test PASSED" if passed else "❌ Mangled batch test FAILED")
+    return passed
+
+
+async def test_placeholders():
+    print("🧪 Translating placeholders and multi-line strings in one batch...")
+    texts = [fresh("Hello {mention}, pick a model"), fresh("Line one\nLine two"), fresh("Settings for {user_id}")]
+    translated = await batch_translate(texts, lang="zh")
+    passed = (translated[0].startswith("[zh-CN] Hello {mention},")
+              and translated[1] == "[zh-CN] " + texts[1].replace("\n", "\n[zh-CN] ")
+              and translated[2].endswith("{user_id} " + texts[2].split()[-1]))
+    print("✅ Placeholder test PASSED" if passed else f"❌ Placeholder test FAILED: {translated}")
+    return passed
+
+
+async def main():
+    collection = setup()
+    results = [
+        await test_settings_panel(),
+        await test_single_flight(),
+        await test_negative_cache(),
+        await test_mangled_batch(),
+        await test_placeholders(),
+    ]
+    print(f"  network stats: {get_translation_network_stats()}")
+    print(f"  {collection.bulk_writes} bulk writes to the database cache")
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -9,6 +9,8 @@ import sys
 import time
 import asyncio
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
 # Add parent directory to path for imports
@@ -22,8 +24,10 @@ from modules.lang_resources.translation_cache import (
     get_cached_translation, 
     add_to_translation_cache,
     get_translation_stats,
-    preload_all_caches
+    preload_all_caches,
+    _get_store
 )
+from modules.lang_resources.hot_cache import HotCache
 
 # Common UI text elements that are frequently translated
 UI_ELEMENTS = [
@@ -166,6 +170,100 @@ async def test_mention_translation():
             mention_preserved = mention in translated
             print(f"  '{original}' => '{translated}' (Mention preserved: {mention_preserved})")
 
+def make_legacy_lookup(lang: str, entries: Dict[str, str], hot_size: int = 1000):
+    """The previous get_cached_translation: a global RLock and a never-evicting hot dict of the first N entries"""
+    lock = threading.RLock()
+    file_cache = {lang: dict(entries)}
+    hot_cache = {lang: dict(list(entries.items())[:hot_size])}
+    stats = {"hits": 0, "misses": 0}
+
+    def lookup(text, lang):
+        if lang == 'en':
+            return text
+        if lang not in file_cache:
+            return None
+        with lock:
+            if lang in hot_cache and text in hot_cache[lang]:
+                stats["hits"] += 1
+                return hot_cache[lang][text]
+            if lang in file_cache and text in file_cache[lang]:
+                stats["hits"] += 1
+                if len(hot_cache[lang]) < hot_size:
+                    hot_cache[lang][text] = file_cache[lang][text]
+                return file_cache[lang][text]
+            stats["misses"] += 1
+            return None
+    return lookup
+
+def measure_concurrent_lookup_throughput(lookups_per_thread: int = 50000):
+    """Measure cached lookups per second with several threads looking up at once"""
+    print("\n=== Testing Concurrent Lookup Throughput ===")
+
+    results = {}
+    for lang in TEST_LANGUAGES:
+        store = _get_store(lang)
+        entries = dict(list(store.items())[:2000]) if store else {}
+        if not entries:
+            print(f"  {lang}: no cached translations, skipped")
+            continue
+        keys = list(entries)
+        rng = random.Random(7)
+        # Popular strings are looked up far more often than the rest
+        workload = [keys[min(int(rng.paretovariate(1.2)) - 1, len(keys) - 1)] for _ in range(lookups_per_thread)]
+        legacy_lookup = make_legacy_lookup(lang, entries)
+
+        print(f"\nTesting language: {lang} ({len(keys)} cached strings)")
+        for threads in (1, 4, 8):
+            rates = {}
+            for name, lookup in (("locked (previous)", legacy_lookup), ("lock-free", get_cached_translation)):
+                def worker():
+                    for text in workload:
+                        lookup(text, lang)
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    start_time = time.perf_counter()
+                    for future in [executor.submit(worker) for _ in range(threads)]:
+                        future.result()
+                    elapsed = time.perf_counter() - start_time
+                rates[name] = threads * lookups_per_thread / elapsed
+            print(f"  {threads} threads: " + ", ".join(f"{name} {rate / 1000:.0f}k lookups/s" for name, rate in rates.items()))
+            results.setdefault(lang, {})[threads] = rates
+
+    return results
+
+def test_hot_tier_admission():
+    """Compare hot tier hit rates under a skewed workload mixed with bursts of one-off strings"""
+    print("\n=== Testing Hot Tier Admission ===")
+
+    rng = random.Random(5)
+    catalog = [f"UI string number {i} that is shown in some menu" for i in range(20000)]
+    requests = []
+    for i in range(200000):
+        if i % 10000 >= 8000:
+            requests.append(f"one-off AI reply fragment {i}")  # a scan: never repeated
+        else:
+            # Halfway through, other strings become popular (e.g. a new menu)
+            rank = min(int(rng.paretovariate(1.1)) - 1, len(catalog) // 2 - 1)
+            requests.append(catalog[rank if i < 100000 else rank + len(catalog) // 2])
+
+    hot = HotCache(max_bytes=512 * 1024)
+    legacy_hot: Dict[str, str] = {}
+    legacy_hits = 0
+    for text in requests:
+        if hot.get(text) is None:
+            hot.put(text, text.upper())
+        if text in legacy_hot:
+            legacy_hits += 1
+        elif len(legacy_hot) < len(hot) or len(legacy_hot) < 1000:
+            legacy_hot[text] = text.upper()
+
+    stats = hot.get_stats()
+    legacy_rate = legacy_hits / len(requests) * 100
+    print(f"  first-N hot dict (previous): {legacy_rate:.1f}% hits")
+    print(f"  W-TinyLFU, {hot.max_bytes // 1024} KB: {stats['hit_rate']:.1f}% hits, {stats['entries']} entries, "
+          f"{stats['evictions']} evictions, {stats['rejections']} rejections")
+    print(f"  memory budget respected: {stats['bytes'] <= hot.max_bytes}")
+    return {"legacy_hit_rate": legacy_rate, "hit_rate": stats["hit_rate"]}
+
 async def main():
     """Run all tests"""
     # Preload caches
@@ -183,6 +281,8 @@ async def main():
     await measure_single_translation_speed()
     await measure_batch_translation_speed()
     await test_mention_translation()
+    test_hot_tier_admission()
+    measure_concurrent_lookup_throughput()
     
     # Print final cache stats
     stats = get_translation_stats()
@@ -190,6 +290,8 @@ async def main():
     print(f"  Cache entries: {stats['cache_entries']}")
     print(f"  Hit rate: {stats.get('hit_rate', 0)}%")
     print(f"  Memory usage: {stats.get('memory_usage', 0)} MB")
+    for lang, lang_stats in stats.get("languages", {}).items():
+        print(f"  {lang}: {lang_stats}")
     
     print("\nTranslation performance tests completed!")
 
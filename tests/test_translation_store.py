@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Translation Store Test Script
+
+Checks modules.lang_resources.cache_store, the on-disk format of the
+translation cache:
+- entries survive reopening, before and after compaction
+- a legacy JSON cache file is imported on first use
+- a record torn by a crash is ignored and cut off by the next writer
+- several processes appending and compacting at the same time lose nothing
+- lookups from another thread are not held up while a compaction runs
+- startup and write cost compared with the previous JSON file, which was
+  parsed completely at startup and rewritten completely on every save
+
+Usage:
+    python tests/test_translation_store.py [entries]
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.lang_resources.cache_store import TranslationStore
+
+
+def make_entries(count, prefix="text"):
+    return {f"{prefix} {i}: Please select an option": f"कृपया एक विकल्प चुनें {i}" for i in range(count)}
+
+
+def test_roundtrip():
+    print("🧪 Testing reopen and compaction...")
+    with tempfile.TemporaryDirectory() as directory:
+        entries = make_entries(5000)
+        store = TranslationStore(directory, "hindi_cache")
+        for start in range(0, 5000, 50):
+            batch = dict(list(entries.items())[start:start + 50])
+            store.append(batch)
+        store.append({"text 7: Please select an option": "updated"})
+        entries["text 7: Please select an option"] = "updated"
+        store.close()
+
+        store = TranslationStore(directory, "hindi_cache")
+        if len(store) != 5000 or any(store.get(key) != value for key, value in entries.items()):
+            print("❌ Entries lost after reopening")
+            return False
+        if not store.compact() or store.get_stats()["log_bytes"] != 0:
+            print("❌ Compaction did not empty the log")
+            return False
+        store.close()
+
+        store = TranslationStore(directory, "hindi_cache")
+        if len(store) != 5000 or dict(store.items()) != entries or store.get("missing") is not None:
+            print("❌ Entries lost after compaction")
+            return False
+        store.close()
+    print("✅ Reopen and compaction test PASSED")
+    return True
+
+
+def test_legacy_import():
+    print("🧪 Testing legacy JSON import...")
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = os.path.join(directory, "french_cache.json")
+        entries = {"Settings": "Paramètres", "Help": "Aide", "🔙 Back": "🔙 Retour"}
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        store = TranslationStore(directory, "french_cache", legacy_json=legacy)
+        imported = dict(store.items())
+        store.close()
+        # Later changes to the JSON file are not picked up again
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+        store = TranslationStore(directory, "french_cache", legacy_json=legacy)
+        reopened = dict(store.items())
+        store.close()
+    passed = imported == entries and reopened == entries
+    print("✅ Legacy import test PASSED" if passed else "❌ Legacy import test FAILED")
+    return passed
+
+
+def test_torn_record():
+    print("🧪 Testing recovery from a torn record...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranslationStore(directory, "arabic_cache")
+        store.append({"one": "واحد", "two": "اثنان"})
+        store.close()
+        # A crash in the middle of a write leaves part of a record behind
+        with open(os.path.join(directory, "arabic_cache.log"), "ab") as f:
+            f.write(b"\x01\x02\x03\x04\x05\x00\x00\x00\x09")
+
+        store = TranslationStore(directory, "arabic_cache")
+        survived = store.get("one") == "واحد" and store.get("two") == "اثنان"
+        store.append({"three": "ثلاثة"})
+        store.close()
+        store = TranslationStore(directory, "arabic_cache")
+        passed = survived and len(store) == 3 and store.get("three") == "ثلاثة" and store.get_stats()["torn_records"] == 0
+        store.close()
+    print("✅ Torn record test PASSED" if passed else "❌ Torn record test FAILED")
+    return passed
+
+
+def _writer(directory, worker, count):
+    store = TranslationStore(directory, "russian_cache")
+    for start in range(0, count, 25):
+        store.append({f"w{worker} {i}": f"перевод {worker} {i}" for i in range(start, min(start + 25, count))})
+        if start % 500 == 0:
+            store.compact()
+    store.close()
+
+
+def test_processes():
+    print("🧪 Testing concurrent writers in separate processes...")
+    workers, count = 4, 2000
+    with tempfile.TemporaryDirectory() as directory:
+        processes = [multiprocessing.Process(target=_writer, args=(directory, worker, count)) for worker in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        store = TranslationStore(directory, "russian_cache")
+        expected = {f"w{worker} {i}": f"перевод {worker} {i}" for worker in range(workers) for i in range(count)}
+        passed = all(process.exitcode == 0 for process in processes) and dict(store.items()) == expected
+        store.close()
+    print("✅ Concurrent writers test PASSED" if passed else "❌ Concurrent writers test FAILED")
+    return passed
+
+
+def test_lookup_during_compaction(count=200_000):
+    print(f"🧪 Looking up entries while {count:,} entries are compacted...")
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranslationStore(directory, "hindi_cache")
+        entries = make_entries(count)
+        store.append(entries)
+        keys = list(entries)[::997]
+        compacting = threading.Thread(target=store.compact)
+        slowest = 0.0
+        lookups = 0
+        compacting.start()
+        while compacting.is_alive():
+            for key in keys:
+                started = time.perf_counter()
+                found = store.get(key) == entries[key]
+                slowest = max(slowest, time.perf_counter() - started)
+                lookups += 1
+                if not found:
+                    print(f"❌ Lookup during compaction test FAILED: {key!r} missing")
+                    return False
+        compacting.join()
+        passed = store.get_stats()["compactions"] == 1 and slowest < 0.1
+        print(f"  {lookups:,} lookups during compaction, slowest {slowest * 1000:.2f} ms")
+        store.close()
+    print("✅ Lookup during compaction test PASSED" if passed else "❌ Lookup during compaction test FAILED")
+    return passed
+
+
+def benchmark(count):
+    print(f"🧪 Benchmark with {count:,} cached translations")
+    entries = make_entries(count)
+    batch = make_entries(50, prefix="new")
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = os.path.join(directory, "hindi_cache.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+
+        # Previous format: parse everything at startup, rewrite everything per batch
+        start = time.perf_counter()
+        with open(legacy, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        json_load = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.update(batch)
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        json_write = time.perf_counter() - start
+
+        TranslationStore(directory, "hindi_cache", legacy_json=legacy).close()
+        start = time.perf_counter()
+        store = TranslationStore(directory, "hindi_cache")
+        store_open = time.perf_counter() - start
+        start = time.perf_counter()
+        store.append(batch)
+        store_write = time.perf_counter() - start
+        keys = list(entries)[::max(1, count // 10000)]
+        start = time.perf_counter()
+        found = sum(1 for key in keys if store.get(key) is not None)
+        lookup = (time.perf_counter() - start) / len(keys)
+        store.close()
+
+    print(f"  startup: {json_load * 1000:.1f} ms (JSON) -> {store_open * 1000:.2f} ms (store)")
+    print(f"  saving a batch of 50: {json_write * 1000:.1f} ms (JSON) -> {store_write * 1000:.2f} ms (store)")
+    print(f"  lookup of a key not in memory: {lookup * 1e6:.1f} µs")
+    passed = found == len(keys) and store_open < json_load and store_write < json_write
+    print("✅ Benchmark PASSED" if passed else "❌ Benchmark FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    results = [test_roundtrip(), test_legacy_import(), test_torn_record(), test_processes(), test_lookup_during_compaction(),
+               benchmark(entries)]
+    sys.exit(0 if all(results) else 1)
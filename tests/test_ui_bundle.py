@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+UI Bundle Test Script
+
+Checks the precompiled UI string bundles, with a recording translator
+instead of Google and an in-memory collection instead of MongoDB:
+- the source scan finds ui_strings.py constants and literals passed to the
+  translation helpers, but not f-strings
+- building a language costs a few batched translator requests
+- a rebuild only translates new strings and drops removed ones
+- the premium plans panel renders in a new language without touching the
+  translator or the database
+- benchmark: first render of the panel, sequential per-string translation
+  (previous) vs the bundle
+
+Usage:
+    python tests/test_ui_bundle.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules
+import modules.lang as lang_module
+import modules.lang_resources.ui_bundle as ui_bundle
+from modules.lang import async_translate_to_lang
+
+# Seconds per translator request in the benchmark
+TRANSLATOR_LATENCY = 0.02
+
+
+class RecordingTranslator:
+    """Prefixes every line with the target language"""
+
+    requests = []
+    latency = 0
+
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        RecordingTranslator.requests.append(text)
+        time.sleep(self.latency)
+        return "\n".join(f"[{self.target}] {line}" for line in text.split("\n"))
+
+
+class MemoryCollection:
+    """The parts of a pymongo collection that the translation cache uses"""
+
+    def __init__(self):
+        self.docs = {}
+        self.queries = 0
+
+    def find(self, filter, projection=None):
+        self.queries += 1
+        return [self.docs[key] for key in filter["key"]["$in"] if key in self.docs]
+
+    def find_one(self, filter):
+        self.queries += 1
+        return self.docs.get(filter["key"])
+
+    def update_one(self, filter, update, upsert=False):
+        self.docs[filter["key"]] = {"key": filter["key"], **update["$set"]}
+
+    def bulk_write(self, requests, ordered=True):
+        pass
+
+
+class FakeMessage:
+    def __init__(self):
+        self.chat = type("Chat", (), {"id": 1})()
+        self.id = 10
+
+    async def delete(self):
+        pass
+
+
+class FakeCallbackQuery:
+    def __init__(self, user_id):
+        self.from_user = type("User", (), {"id": user_id})()
+        self.message = FakeMessage()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.captions = []
+
+    async def edit_message_media(self, **kwargs):
+        pass
+
+    async def edit_message_caption(self, **kwargs):
+        self.captions.append(kwargs["caption"])
+
+
+def setup(directory):
+    # Wait for the startup warm-up so it does not replace the bundles built here
+    modules.prefetch_thread.join()
+    collection = MemoryCollection()
+    lang_module.GoogleTranslator = RecordingTranslator
+    lang_module.get_translation_cache = lambda: collection
+    # Keep test strings out of the on-disk translation cache
+    lang_module.add_to_translation_cache = lambda text, translation, lang: None
+    ui_bundle.CACHE_DIR = directory
+    return collection
+
+
+def test_extraction():
+    print("🧪 Collecting static UI strings from the source...")
+    strings = set(ui_bundle.extract_static_strings())
+    from modules.user import ui_strings
+    from modules.user.start import button_list
+    expected = {
+        ui_strings.START_MESSAGE,
+        ui_strings.HELP_MESSAGE,
+        "💳 Get Subscription",
+        "🔙 Back to Benefits",
+        "After payment, click below to notify admin and **send a screenshot of your payment to {admin_contact} **for faster verification.",
+    }
+    missing = expected - strings
+    # Built at runtime, so not static
+    dynamic = [text for text in strings if "{user_reply" in text]
+    passed = not missing and not dynamic and not any(text in strings for text in button_list if "{" in text)
+    print(f"  {len(strings)} static strings found")
+    print("✅ Extraction test PASSED" if passed else f"❌ Extraction test FAILED: missing {missing}, dynamic {dynamic}")
+    return passed
+
+
+def check_build(strings):
+    print(f"🧪 Building the fr bundle for {len(strings)} strings...")
+    RecordingTranslator.requests.clear()
+    counts = ui_bundle.build_bundles(strings, languages=["fr"], rebuild=True)
+    bundled = [ui_bundle.get_bundled_translation(text, "fr") for text in strings]
+    placeholder = ui_bundle.get_bundled_translation("Hello {mention}, welcome", "fr")
+    on_disk = ui_bundle._load_bundle("fr")
+    passed = (counts == {"fr": len(strings)}
+              and None not in bundled
+              and placeholder == "[fr] Hello {mention}, welcome"
+              and len(on_disk) == len(strings)
+              and len(RecordingTranslator.requests) < len(strings))
+    print(f"  {len(RecordingTranslator.requests)} translator request(s) for {len(strings)} strings")
+    print("✅ Build test PASSED" if passed else f"❌ Build test FAILED: {counts}, {placeholder}")
+    return passed
+
+
+def check_incremental_rebuild(strings):
+    print("🧪 Rebuilding after adding one string and removing another...")
+    RecordingTranslator.requests.clear()
+    added = f"New button {uuid.uuid4().hex[:8]}"
+    removed = strings[0]
+    counts = ui_bundle.build_bundles(strings[1:] + [added], languages=["fr"])
+    passed = (counts == {"fr": 1}
+              and len(RecordingTranslator.requests) == 1
+              and ui_bundle.get_bundled_translation(added, "fr") == f"[fr] {added}"
+              and ui_bundle.get_bundled_translation(removed, "fr") is None
+              and removed not in ui_bundle._load_bundle("fr"))
+    print("✅ Incremental rebuild test PASSED" if passed else f"❌ Incremental rebuild test FAILED: {counts}")
+    return passed
+
+
+async def check_panel_render(collection):
+    print("🧪 Rendering the premium plans panel in a freshly built language...")
+    from modules.user.start import premium_plans_callback
+    ui_bundle.build_bundles(languages=["ru"], rebuild=True)
+    RecordingTranslator.requests.clear()
+    queries = collection.queries
+    lang_module.get_user_language = lambda user_id: "ru"
+    client = FakeClient()
+    await premium_plans_callback(client, FakeCallbackQuery(user_id=42))
+    caption = client.captions[0] if client.captions else ""
+    passed = (not RecordingTranslator.requests
+              and collection.queries == queries
+              and "[ru] 💎 **Premium Subscription Plans** 💎" in caption
+              and "{admin_contact}" not in caption)
+    print(f"  {len(RecordingTranslator.requests)} translator request(s), {collection.queries - queries} database queries")
+    print("✅ Panel render test PASSED" if passed else f"❌ Panel render test FAILED: {caption!r}")
+    return passed
+
+
+async def benchmark_first_render():
+    print("🧪 Benchmarking the first render of a 9-string panel in a new language...")
+    RecordingTranslator.latency = TRANSLATOR_LATENCY
+    try:
+        # Previous: one await per string, each a cache miss
+        panel = [f"Panel string {i} {uuid.uuid4().hex[:8]}" for i in range(9)]
+        RecordingTranslator.requests.clear()
+        start = time.perf_counter()
+        for text in panel:
+            await async_translate_to_lang(text, lang="ar")
+        sequential = time.perf_counter() - start
+        sequential_requests = len(RecordingTranslator.requests)
+
+        # Now: translated when the bundle was built, looked up at render time
+        panel = [f"Panel string {i} {uuid.uuid4().hex[:8]}" for i in range(9)]
+        ui_bundle.build_bundles(panel, languages=["ar"])
+        RecordingTranslator.requests.clear()
+        start = time.perf_counter()
+        await lang_module.batch_translate(panel, lang="ar")
+        bundled = time.perf_counter() - start
+    finally:
+        RecordingTranslator.latency = 0
+    print(f"  per-string (previous): {sequential * 1000:.1f} ms, {sequential_requests} translator requests")
+    print(f"  bundle: {bundled * 1000:.3f} ms, {len(RecordingTranslator.requests)} translator requests")
+    print(f"  bundle stats: {ui_bundle.get_bundle_stats()}")
+    return bundled < sequential and not RecordingTranslator.requests
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        collection = setup(directory)
+        strings = [f"Label {i} {uuid.uuid4().hex[:8]}" for i in range(60)] + ["Hello {mention}, welcome"]
+        results = [
+            test_extraction(),
+            check_build(strings),
+            check_incremental_rebuild(strings),
+            await check_panel_render(collection),
+            await benchmark_first_render(),
+        ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Waiting Indicator Test Script
+
+Drives modules.core.waiting_indicator with fake messages and a fast timer:
+- several waits in one chat share a single typing refresh per interval
+- each waiting message steps through its statuses, and no edit reaches a
+  message after it has been released
+- status edits are skipped while the outbound governor has a queue
+
+Usage:
+    python tests/test_waiting_indicator.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.core.waiting_indicator as waiting_indicator
+from modules.core.waiting_indicator import WaitingIndicatorService
+
+STATUSES = ["one", "two", "three", "four"]
+
+
+class FakeChat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeClient:
+    """Records chat actions"""
+
+    def __init__(self):
+        self.actions = []
+
+    async def send_chat_action(self, chat_id, action):
+        self.actions.append(chat_id)
+
+
+class FakeMessage:
+    """Records the edits a waiting message receives"""
+
+    next_id = 0
+
+    def __init__(self, client, chat_id, text=""):
+        FakeMessage.next_id += 1
+        self.id = FakeMessage.next_id
+        self._client = client
+        self.chat = FakeChat(chat_id)
+        self.text = text
+        self.edits = []
+
+    async def reply_text(self, text):
+        return FakeMessage(self._client, self.chat.id, text)
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+        self.text = text
+
+
+async def run_shared_chat():
+    client = FakeClient()
+    service = WaitingIndicatorService()
+    waits = [await service.start(FakeMessage(client, 1), STATUSES) for _ in range(5)]
+    await asyncio.sleep(0.5)
+    released = waits[0]
+    service.release(released)
+    edits_at_release = list(released.edits)
+    await asyncio.sleep(0.5)
+    for wait in waits[1:]:
+        service.release(wait)
+    return client, waits, edits_at_release, service.get_stats()
+
+
+async def run_busy_governor():
+    client = FakeClient()
+    service = WaitingIndicatorService()
+    waiting_indicator.outbound_governor._queued = waiting_indicator.BUSY_QUEUE_DEPTH
+    try:
+        wait = await service.start(FakeMessage(client, 2), STATUSES)
+        await asyncio.sleep(0.3)
+        service.release(wait)
+    finally:
+        waiting_indicator.outbound_governor._queued = 0
+    return wait, service.get_stats()
+
+
+def test_waiting_indicator():
+    print("🧪 Testing waiting indicator service...")
+    waiting_indicator.TICK_INTERVAL = 0.05
+    waiting_indicator.STATUS_EDIT_INTERVAL = 0.05
+    waiting_indicator.CHAT_ACTION_REFRESH = 0.4
+
+    client, waits, edits_at_release, stats = asyncio.run(run_shared_chat())
+    print(f"  chat actions: {len(client.actions)} for {len(waits)} waits, stats: {stats}")
+    shared = len(client.actions) <= 3 and stats["chat_actions_shared"] > 0
+    stepped = all(wait.edits == STATUSES[1:] for wait in waits[1:])
+    quiet_after_release = waits[0].edits == edits_at_release
+    released = stats["active"] == 0
+
+    busy_wait, busy_stats = asyncio.run(run_busy_governor())
+    print(f"  busy governor: edits {busy_wait.edits}, stats: {busy_stats}")
+    skipped = busy_wait.edits == [] and busy_stats["edits_skipped"] > 0
+
+    passed = shared and stepped and quiet_after_release and released and skipped
+    print("✅ Waiting indicator test PASSED" if passed else "❌ Waiting indicator test FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_waiting_indicator() else 1)